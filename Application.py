@@ -84,7 +84,8 @@ class Application:
 
         self.upst_api = APIManager(
             space=self.physics_manager.space,
-            script_manager=None
+            script_manager=None,
+            physics=self.physics_manager
         )
 
 
@@ -214,17 +215,20 @@ class Application:
         stats.session_start = time.time()
         while self.running:
             self.freeze_watcher.ping()
+            self.profiler.mark_frame()
             time_delta = self.clock.tick(config.app.clock_tickrate) / 1000.0
             self.debug_manager.update(time_delta)
-            self.gizmos.update(time_delta)
-            self.physics_debug_manager.update(time_delta)
             events = pygame.event.get()
-            self.input_handler.process_events(profiler=self.profiler, events=events)
-            self.update(time_delta)
+            with self.physics_manager.worker.hold():
+                self.gizmos.update(time_delta)
+                self.physics_debug_manager.update(time_delta)
+                self.input_handler.process_events(profiler=self.profiler, events=events)
+                self.update(time_delta)
 
             self.renderer.draw()
+        self.physics_manager.worker.stop()
         stats.accumulate_session_time()
-        stats.save()
+        stats.flush()
         self.save_load_manager.create_snapshot()
         self.config.save_to_file()
         pygame.quit()
@@ -47,6 +47,18 @@ class RenderingConfig:
     spring_point_a_texture = "sprites/app/spring_attachment.png"
     spring_point_b_texture = "sprites/app/spring_attachment.png"
     draw_circle_pointer:bool = True
+    batched_shapes: bool = True
+    static_layer_cache: bool = True
+    batched_constraints: bool = True
+    constraint_cache_mb: float = 32.0
+    sprite_cache_mb: float = 96.0
+    sprite_rotation_step: float = 1.0
+    sprite_scale_step: float = 0.02
+    fractal_tiles: bool = True
+    fractal_tile_px: int = 128
+    fractal_cache_mb: float = 128.0
+    fractal_frame_budget_ms: float = 12.0
+    gizmo_alpha_buckets: int = 8
 
 @dataclass
 class ContextMenuConfig:
@@ -74,6 +86,10 @@ class PhysicsConfig:
     air_friction_quadratic = 0.00100
     air_friction_multiplier = 1.0
     air_density = 1.225
+    batched_air_friction: bool = True
+    spatial_cell_size: float = 100.0
+    threaded_stepping: bool = False
+    ccd_sweep_fraction: float = 0.5
 
 @dataclass
 class ScriptingConfig:
@@ -108,6 +124,7 @@ class PhysicsDebugConfig:
     text_scale: float = 1.0
     energy_bar_height: float = 20.0
     trail_length: int = 50
+    trail_segments: int = 16
     show_constraints: bool = True
     constraint_color: Tuple[int, int, int] = (255, 200, 0)
     show_constraint_info: bool = True
@@ -148,6 +165,8 @@ class ProfilerConfig:
     normal_size: Tuple[int, int] = (800, 400)
     paused: bool = False
     auto_remove_threshold: float = 1.0
+    ring_capacity: int = 65536
+    trace_history: int = 200000
 
 @dataclass
 class SynthesizerConfig:
@@ -210,6 +229,7 @@ class GridConfig:
     max_lines: int = 1000
     skip_offscreen_lines: bool = True
     ruler_skip_factor: int = 2
+    cache_layer: bool = True
     polar: PolarGridConfig = field(default_factory=PolarGridConfig)
 
     _subconfigs: ClassVar[Dict[str, Type]] = {"polar": PolarGridConfig}
@@ -241,12 +261,19 @@ class DebugConfig:
     show_camera_debug: bool = False
     show_snapshots_debug: bool = True
     show_console: bool = False
+    log_rate_limit: int = 200  # сообщений в секунду на категорию, ошибки не ограничиваются
+    log_error_stacks: bool = False
+    log_file_max_kb: int = 4096
+    log_file_backups: int = 3
+    log_queue_max: int = 65536  # записей в очереди LogWriter, лишние считаются в dropped
 
 @dataclass
 class SnapshotConfig:
     save_object_positions: bool = True
     save_camera_position: bool = False
-    max_snapshots: int = 50
+    max_snapshots: int = 0  # 0 = ограничение только по memory_budget_mb
+    memory_budget_mb: float = 256.0
+    keyframe_interval: int = 20
 
 @dataclass
 class SaveLoadConfig:
@@ -15,6 +15,7 @@ import colorama
 import pyperclip
 
 from UPST.config import config
+from UPST.debug.log_writer import LogWriter
 
 colorama.init()
 
@@ -54,7 +55,7 @@ class LogEntry:
 class DebugManager:
     def __init__(self, max_log_entries=2000):
         self.enabled = True
-        self.log_entries: List[LogEntry] = []
+        self.log_entries: deque = deque(maxlen=max_log_entries)
         self.max_log_entries = max_log_entries
         self.categories: Dict[str, bool] = defaultdict(lambda: True)
         self.min_log_level = LogLevel.DEBUG
@@ -86,6 +87,12 @@ class DebugManager:
         self.performance_counters = defaultdict(float)
         self.stats = defaultdict(int)
 
+        self._ansi_colors = {
+            LogLevel.TRACE: "\033[38;5;245m", LogLevel.DEBUG: "\033[38;5;245m",
+            LogLevel.INFO: "\033[38;5;39m", LogLevel.SUCCESS: "\033[38;5;46m",
+            LogLevel.WARNING: "\033[38;5;226m", LogLevel.ERROR: "\033[38;5;203m",
+            LogLevel.CRITICAL: "\033[38;5;196m"
+        }
         self.log_colors = {
             LogLevel.TRACE: (150, 150, 150), LogLevel.DEBUG: (200, 200, 200),
             LogLevel.INFO: (100, 200, 255), LogLevel.SUCCESS: (50, 255, 100),
@@ -103,6 +110,14 @@ class DebugManager:
         self.console_bg_color = (10, 10, 15)
         self.log_file = "debug_log.txt"
         self.auto_save_logs = True
+        self.writer = LogWriter(self.log_file, int(config.debug.log_file_max_kb * 1024), config.debug.log_file_backups,
+                                max_queue=config.debug.log_queue_max)
+        self._last_key = None
+        self._last_args = None
+        self._repeats = 0
+        self._rate_windows: Dict[str, List[float]] = defaultdict(lambda: [0.0, 0])
+        self._suppressed: Dict[str, int] = defaultdict(int)
+        self._last_summary = time.time()
 
         self._axis_limits = {'fps': [0.0, 144.0], 'frame_time': [0.0, 20.0], 'memory': [0.0, 100.0]}
         self._axis_smooth_factor = 0.92
@@ -137,6 +152,9 @@ class DebugManager:
         self.performance_history['memory'].append(mem_mb)
 
         now = time.time()
+        if now - self._last_summary > 1.0:
+            self._flush_summaries()
+            self._last_summary = now
         if now - self._last_cache_clear > 2.0:
             self._text_cache.clear()
             self._last_cache_clear = now
@@ -186,7 +204,40 @@ class DebugManager:
             exc_info: Optional[Any] = None):
         if not self.enabled or not self.categories[category] or level < self.min_log_level:
             return
-
+        # подряд идущие одинаковые сообщения схлопываются в счётчик
+        key = (level, category, message)
+        if key == self._last_key and not exc_info:
+            self._repeats += 1
+            return
+        self._flush_repeats()
+        self._last_key = None
+        if level < LogLevel.ERROR:
+            window = self._rate_windows[category]
+            now = time.time()
+            if now - window[0] >= 1.0:
+                window[0], window[1] = now, 0
+            window[1] += 1
+            if window[1] > config.debug.log_rate_limit:
+                self._suppressed[category] += 1
+                return
+        self._last_key, self._last_args = key, color_override
+        self._emit(level, message, category, include_stack, color_override, exc_info)
+
+    def _flush_repeats(self):
+        if self._repeats and self._last_key:
+            level, category, message = self._last_key
+            self._emit(level, f"{message} (repeated {self._repeats} more times)", category, False, self._last_args, None)
+        self._repeats = 0
+
+    def _flush_summaries(self):
+        self._flush_repeats()
+        self._last_key = None
+        for category, count in list(self._suppressed.items()):
+            if count:
+                self._emit(LogLevel.WARNING, f"{count} messages suppressed by rate limit", category, False, None, None)
+        self._suppressed.clear()
+
+    def _emit(self, level, message, category, include_stack, color_override, exc_info):
         stack_trace = None
         exc_type_str = None
         line_no = None
@@ -199,8 +250,8 @@ class DebugManager:
                 filename = os.path.basename(exc_tb.tb_frame.f_code.co_filename)
                 message = f"{exc_type_str}: {exc_value} (in {filename}:{line_no})\n{message}"
 
-        if include_stack or level >= LogLevel.ERROR:
-            stack_trace = ''.join(traceback.format_stack(limit=5))
+        if include_stack or (config.debug.log_error_stacks and level >= LogLevel.ERROR):
+            stack_trace = ''.join(traceback.format_stack(limit=7)[:-2])
 
         reset = "\033[0m"
         display_color = color_override or self.log_colors.get(level, (255, 255, 255))
@@ -209,14 +260,9 @@ class DebugManager:
             r, g, b = color_override
             ansi_color = f"\033[38;2;{r};{g};{b}m"
         else:
-            ansi_colors = {
-                LogLevel.TRACE: "\033[38;5;245m", LogLevel.DEBUG: "\033[38;5;245m",
-                LogLevel.INFO: "\033[38;5;39m", LogLevel.SUCCESS: "\033[38;5;46m",
-                LogLevel.WARNING: "\033[38;5;226m", LogLevel.ERROR: "\033[38;5;203m",
-                LogLevel.CRITICAL: "\033[38;5;196m"
-            }
-            ansi_color = ansi_colors.get(level, "")
+            ansi_color = self._ansi_colors.get(level, "")
 
+        entries = self.log_entries
         for line in message.split('\n'):
             entry = LogEntry(
                 timestamp=time.time() - self.start_time, level=level, message=line,
@@ -224,36 +270,32 @@ class DebugManager:
                 color=display_color, exc_type=exc_type_str, line_no=line_no
             )
 
-            if len(self.log_entries) >= self.max_log_entries:
-                self.log_entries.pop(0)
-                if self.selected_index > 0:
-                    self.selected_index -= 1
-            self.log_entries.append(entry)
+            if len(entries) >= self.max_log_entries and self.selected_index > 0:
+                self.selected_index -= 1
+            entries.append(entry)
 
-            if self.selected_index == -1 or self.selected_index == len(self.log_entries) - 2:
-                self.selected_index = len(self.log_entries) - 1
+            if self.selected_index == -1 or self.selected_index == len(entries) - 2:
+                self.selected_index = len(entries) - 1
                 self._ensure_visible()
 
-            if self.auto_save_logs and level >= LogLevel.WARNING:
-                self._save_log_entry(entry)
-
             ts_str = f"{entry.timestamp:.3f}"
-            print(f"{ansi_color}[{ts_str}] [{level.name:<8}] [{category}] {line}{reset}")
+            record = self._format_record(entry) if self.auto_save_logs and level >= LogLevel.WARNING else None
+            self.writer.write(f"{ansi_color}[{ts_str}] [{level.name:<8}] [{category}] {line}{reset}", record,
+                              sync=level >= LogLevel.ERROR)
 
     def log_exception(self, message: str = "An exception occurred", category: str = "Exception"):
         exc_info = sys.exc_info()
         self.log(LogLevel.CRITICAL, message, category, include_stack=True, exc_info=exc_info)
 
+    def _format_record(self, entry: LogEntry) -> str:
+        ts_str = time.strftime("%H:%M:%S", time.gmtime(entry.timestamp + self.start_time))
+        text = f"[{ts_str}] [{entry.level.name}] [{entry.category}] {entry.message}\n"
+        if entry.stack_trace:
+            text += f"Stack:\n{entry.stack_trace}\n"
+        return text + "-" * 40 + "\n"
+
     def _save_log_entry(self, entry: LogEntry):
-        try:
-            with open(self.log_file, 'a', encoding='utf-8') as f:
-                ts_str = time.strftime("%H:%M:%S", time.gmtime(entry.timestamp + self.start_time))
-                f.write(f"[{ts_str}] [{entry.level.name}] [{entry.category}] {entry.message}\n")
-                if entry.stack_trace:
-                    f.write(f"Stack:\n{entry.stack_trace}\n")
-                f.write("-" * 40 + "\n")
-        except Exception as e:
-            print(f"Failed to save log: {e}")
+        self.writer.write(None, self._format_record(entry))
 
     def _ensure_visible(self):
         if self.selected_index < 0: return
@@ -654,6 +696,7 @@ class DebugManager:
 
     def clear_logs(self):
         self.log_entries.clear()
+        self._last_key = None
         self.selected_index = -1
         self.scroll_offset = 0.0
         self.log(LogLevel.INFO, "Logs cleared", "System")
@@ -665,7 +708,7 @@ class DebugManager:
                 "performance_counters": dict(self.performance_counters),
                 "stats": dict(self.stats),
                 "recent_logs": [{"ts": e.timestamp, "level": e.level.name, "msg": e.message, "cat": e.category} for e in
-                                self.log_entries[-200:]]
+                                list(self.log_entries)[-200:]]
             }
             filename = f"debug_dump_{int(time.time())}.json"
             with open(filename, 'w', encoding='utf-8') as f:
@@ -0,0 +1,166 @@
+# UPST/debug/headless_benchmark.py
+# Headless physics throughput / determinism runner.
+#
+#   python -m UPST.debug.headless_benchmark --scene pyramid --steps 2000 --seed 1
+#   python -m UPST.debug.headless_benchmark --load "DemoSaves/rope.space" --steps 1000 -o bench.json
+#
+# Only PhysicsManager is built: no window, Renderer, UI, plugins or audio output.
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import hashlib
+import json
+import random
+import struct
+import sys
+import time
+
+import numpy as np
+import pymunk
+
+from UPST.config import config
+from UPST.debug.debug_manager import get_debug, LogLevel
+from UPST.physics.physics_manager import PhysicsManager
+from UPST.scripting.script_manager import ScriptManager
+from UPST.utils.serialization import (read_save_file, restore_physics_settings, restore_bodies,
+                                      restore_constraints, restore_static_lines)
+
+
+def _peak_memory_mb():
+    try:
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+    except ImportError:
+        import psutil
+        info = psutil.Process(os.getpid()).memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024.0 * 1024.0)
+
+
+def _add_floor(pm, width=20000.0, y=0.0, thickness=200.0):
+    floor = pymunk.Poly(pm.static_body, [(-width / 2, y - thickness), (-width / 2, y),
+                                         (width / 2, y), (width / 2, y - thickness)])
+    floor.friction = 1.0
+    floor.elasticity = 0.5
+    pm.space.add(floor)
+    pm.static_lines.append(floor)
+
+
+def scene_pyramid(pm, rng, size=40):
+    _add_floor(pm)
+    box = 20.0
+    for row in range(size):
+        for i in range(size - row):
+            body = pymunk.Body(1.0, pymunk.moment_for_box(1.0, (box, box)))
+            body.position = ((i - (size - row) / 2.0) * box * 1.05 + rng.uniform(-0.5, 0.5), box / 2 + row * box)
+            shape = pymunk.Poly.create_box(body, (box, box))
+            shape.friction = 0.7
+            pm.space.add(body, shape)
+
+
+def scene_rain(pm, rng, count=2000):
+    _add_floor(pm)
+    for _ in range(count):
+        r = rng.uniform(3.0, 8.0)
+        body = pymunk.Body(1.0, pymunk.moment_for_circle(1.0, 0, r))
+        body.position = (rng.uniform(-1500.0, 1500.0), rng.uniform(50.0, 3000.0))
+        shape = pymunk.Circle(body, r)
+        shape.friction = 0.5
+        shape.elasticity = 0.3
+        pm.space.add(body, shape)
+
+
+SCENES = {"pyramid": scene_pyramid, "rain": scene_rain}
+
+
+def build_physics_manager():
+    config.multithreading.pymunk_threaded = False
+    pm = PhysicsManager(None, undo_redo_manager=None, script_manager=ScriptManager(None))
+    pm.set_gravity_mode(mode="world", g=(0, -981))
+    return pm
+
+
+def load_save(pm, path):
+    data = read_save_file(path)
+    restore_physics_settings(pm, data)
+    loaded_bodies, _ = restore_bodies(pm, data)
+    restore_constraints(pm, data, loaded_bodies)
+    restore_static_lines(pm, data)
+    return len(data.get("scripts", {}) or {})
+
+
+def state_hash(pm):
+    h = hashlib.sha256()
+    for b in pm.space.bodies:
+        p, v = b.position, b.velocity
+        h.update(struct.pack("<6d", p.x, p.y, b.angle, v.x, v.y, b.angular_velocity))
+    return h.hexdigest()
+
+
+def run(steps, seed=0, scene="pyramid", load=None, warmup=10):
+    random.seed(seed)
+    np.random.seed(seed)
+    pm = build_physics_manager()
+    skipped_scripts = 0
+    if load:
+        skipped_scripts = load_save(pm, load)
+    else:
+        SCENES[scene](pm, random.Random(seed))
+    dt = pm._fixed_dt
+    for _ in range(warmup):
+        pm.step(dt)
+    pm.phase_times = {}
+    t_start = time.perf_counter()
+    for _ in range(steps):
+        pm.step(dt)
+    elapsed = time.perf_counter() - t_start
+    phases = pm.phase_times
+    pm.phase_times = None
+    return {
+        "scene": load or scene,
+        "seed": seed,
+        "steps": steps,
+        "warmup_steps": warmup,
+        "dt": dt,
+        "bodies": len(pm.space.bodies),
+        "shapes": len(pm.space.shapes),
+        "constraints": len(pm.space.constraints),
+        "skipped_scripts": skipped_scripts,
+        "elapsed_s": elapsed,
+        "steps_per_sec": steps / elapsed if elapsed > 0 else 0.0,
+        "phase_ms": {k: v * 1000.0 for k, v in sorted(phases.items())},
+        "phase_ms_per_step": {k: v * 1000.0 / max(1, steps) for k, v in sorted(phases.items())},
+        "peak_memory_mb": _peak_memory_mb(),
+        "state_hash": state_hash(pm),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless PhysicsManager benchmark")
+    parser.add_argument("--scene", choices=sorted(SCENES), default="pyramid")
+    parser.add_argument("--load", help="path to a .space save to load instead of a scripted scene")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    dbg = get_debug()
+    dbg.min_log_level = LogLevel.CRITICAL
+    dbg.auto_save_logs = False
+
+    result = run(args.steps, seed=args.seed, scene=args.scene, load=args.load, warmup=args.warmup)
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+# UPST/debug/log_writer.py
+import os
+import sys
+import queue
+import atexit
+import threading
+
+
+class LogWriter:
+    """Background sink for DebugManager: console lines and file records are queued by
+    the caller and written in batches by one daemon thread that keeps the log file open
+    and rotates it by size (path -> path.1 -> ... -> path.<backups>). The queue holds at
+    most `max_queue` items, overflow is counted in `dropped`; sync writes (errors) flush
+    the pending queue and themselves before returning, so they survive a crash."""
+
+    def __init__(self, path, max_bytes=4 * 1024 * 1024, backups=3, flush_interval=0.25, stream=None,
+                 max_queue=65536):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.stream = stream or sys.stdout
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._file = None
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="LogWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, console_line=None, file_text=None, sync=False):
+        if sync:
+            with self._lock:
+                self._drain(last=(console_line, file_text))
+            return
+        try:
+            self.queue.put_nowait((console_line, file_text))
+        except queue.Full:
+            self.dropped += 1
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'a', encoding='utf-8')
+        return self._file
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _write_batch(self, batch):
+        console = [c for c, _ in batch if c is not None]
+        records = [f for _, f in batch if f is not None]
+        if console:
+            try:
+                self.stream.write("\n".join(console) + "\n")
+                self.stream.flush()
+            except Exception:
+                pass
+        if records:
+            try:
+                f = self._open()
+                f.write("".join(records))
+                f.flush()
+                if self.max_bytes and f.tell() >= self.max_bytes:
+                    self._rotate()
+            except Exception as e:
+                self.dropped += len(records)
+                print(f"Failed to save log: {e}")
+
+    def _drain(self, first=None, last=None):
+        # синхронная запись (last) идёт после всего, что уже стоит в очереди
+        batch = [] if first is None else [first]
+        try:
+            while last is not None or len(batch) < 4096:
+                batch.append(self.queue.get_nowait())
+        except queue.Empty:
+            pass
+        if last is not None:
+            batch.append(last)
+        self._write_batch(batch)
+
+    def _run(self):
+        while self._running:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._drain(item)
+
+    def close(self):
+        self._running = False
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        with self._lock:
+            try:
+                while True:
+                    self._drain(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+        if self._file is not None:
+            self._file.close()
+            self._file = None
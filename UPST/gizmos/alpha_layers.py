@@ -0,0 +1,58 @@
+# UPST/gizmos/alpha_layers.py
+import math
+import pygame
+
+_MAX_RECTS = 64  # больше - сливаем в один прямоугольник, чтобы не дробить блиты
+
+
+class AlphaLayers:
+    """Persistent translucent layers for GizmosManager.
+
+    Alpha values are quantized into `buckets` levels; each level owns one screen-sized
+    SRCALPHA surface that lives across frames and carries its alpha as a surface alpha.
+    Gizmos are drawn opaque into their layer and every draw records its bounding rect,
+    so `composite` blits and the next `begin` clears only the regions actually touched."""
+
+    def __init__(self, buckets=8):
+        self.buckets = max(1, int(buckets))
+        self.size = None
+        self.layers = {}
+        self.dirty = {}
+
+    def quantize(self, alpha):
+        step = 255.0 / self.buckets
+        return max(1, min(255, int(round(math.ceil(alpha / step) * step))))
+
+    def begin(self, size):
+        if size != self.size:
+            self.size = size
+            self.layers.clear()
+            self.dirty.clear()
+            return
+        for a, rects in self.dirty.items():
+            layer = self.layers[a]
+            for r in rects:
+                layer.fill((0, 0, 0, 0), r)
+        self.dirty = {}
+
+    def target(self, alpha):
+        """Layer surface for `alpha` and the rect list its draws must be appended to."""
+        a = self.quantize(alpha)
+        layer = self.layers.get(a)
+        if layer is None:
+            layer = self.layers[a] = pygame.Surface(self.size, pygame.SRCALPHA)
+            layer.set_alpha(a)
+        rects = self.dirty.get(a)
+        if rects is None:
+            rects = self.dirty[a] = []
+        return layer, rects
+
+    def composite(self, screen):
+        bounds = screen.get_rect()
+        for a, rects in self.dirty.items():
+            rects[:] = [r for r in (r.clip(bounds) for r in rects) if r.width and r.height]
+            if len(rects) > _MAX_RECTS:
+                rects[:] = [rects[0].unionall(rects[1:])]
+            layer = self.layers[a]
+            for r in rects:
+                screen.blit(layer, r.topleft, r)
@@ -0,0 +1,160 @@
+# UPST/gizmos/gizmo_store.py
+import numpy as np
+from numba import njit
+
+POINT, LINE, CIRCLE, RECT, ARROW, CROSS = range(6)
+
+_NO_BOUNDS = (0.0, 0.0, 0.0, 0.0)
+# порядок полей в строке, которую добавляет GizmoStore.add
+_KIND, _X0, _Y0, _X1, _Y1, _A, _B, _R, _G, _BL, _AL, _THICK, _FILLED, _WORLD, _CULL, \
+    _BX0, _BY0, _BX1, _BY1, _HAS_BOUNDS, _DUR, _LAYER = range(22)
+_FIELDS = 22
+
+
+@njit(cache=True, nogil=True)
+def cull_primitives(kind, geom, ext, world, cull_dist, bounds, has_bounds, n,
+                    tx, ty, s, cx, cy, sw, sh, margin, dist_on, out_idx, out_scr, out_ext):
+    k = 0
+    for i in range(n):
+        w = world[i]
+        if w:
+            x0 = (geom[i, 0] - tx) * s + cx
+            y0 = cy - (geom[i, 1] - ty) * s
+            x1 = (geom[i, 2] - tx) * s + cx
+            y1 = cy - (geom[i, 3] - ty) * s
+            sc = s
+        else:
+            x0, y0, x1, y1 = geom[i, 0], geom[i, 1], geom[i, 2], geom[i, 3]
+            sc = 1.0
+        kd = kind[i]
+        a = ext[i, 0] * sc
+        b = ext[i, 1] * sc
+        if kd == LINE or kd == ARROW:
+            lo_x, hi_x = min(x0, x1), max(x0, x1)
+            lo_y, hi_y = min(y0, y1), max(y0, y1)
+        elif kd == RECT:
+            lo_x, hi_x = x0 - a * 0.5, x0 + a * 0.5
+            lo_y, hi_y = y0 - b * 0.5, y0 + b * 0.5
+        else:
+            lo_x, hi_x = x0 - a, x0 + a
+            lo_y, hi_y = y0 - a, y0 + a
+        if hi_x < -margin or lo_x > sw + margin or hi_y < -margin or lo_y > sh + margin:
+            continue
+        if dist_on and w and cull_dist[i] > 0.0:
+            dx = geom[i, 0] - tx
+            dy = geom[i, 1] - ty
+            if dx * dx + dy * dy > cull_dist[i] * cull_dist[i]:
+                continue
+        if has_bounds[i]:
+            px, py = geom[i, 0], geom[i, 1]
+            if px < bounds[i, 0] or px > bounds[i, 2] or py < bounds[i, 1] or py > bounds[i, 3]:
+                continue
+        out_idx[k] = i
+        out_scr[k, 0] = min(max(x0, -32768.0), 32767.0)
+        out_scr[k, 1] = min(max(y0, -32768.0), 32767.0)
+        out_scr[k, 2] = min(max(x1, -32768.0), 32767.0)
+        out_scr[k, 3] = min(max(y1, -32768.0), 32767.0)
+        out_ext[k, 0] = a
+        out_ext[k, 1] = b
+        k += 1
+    return k
+
+
+class GizmoStore:
+    """Structure-of-arrays storage for geometric gizmos (points, lines, circles, rects,
+    arrows, crosses).
+
+    `add` only appends a flat tuple to a staging list; `flush` moves the staged rows
+    into preallocated column arrays in one numpy copy. Culling and the world->screen
+    transform run over the columns in a single numba pass and expiry is a mask."""
+
+    def __init__(self, capacity=1024):
+        self.n = 0
+        self._staged = []
+        self._alloc(capacity)
+
+    def _alloc(self, cap):
+        old = getattr(self, 'kind', None)
+        n = self.n
+        kind = np.zeros(cap, dtype=np.int8)
+        geom = np.zeros((cap, 4), dtype=np.float64)
+        ext = np.zeros((cap, 2), dtype=np.float64)
+        color = np.zeros((cap, 4), dtype=np.uint8)
+        thick = np.zeros(cap, dtype=np.int32)
+        filled = np.zeros(cap, dtype=np.bool_)
+        world = np.zeros(cap, dtype=np.bool_)
+        cull_dist = np.zeros(cap, dtype=np.float64)
+        bounds = np.zeros((cap, 4), dtype=np.float64)
+        has_bounds = np.zeros(cap, dtype=np.bool_)
+        dur = np.zeros(cap, dtype=np.float64)
+        layer = np.zeros(cap, dtype=np.int32)
+        if old is not None and n:
+            kind[:n], geom[:n], ext[:n], color[:n] = self.kind[:n], self.geom[:n], self.ext[:n], self.color[:n]
+            thick[:n], filled[:n], world[:n] = self.thick[:n], self.filled[:n], self.world[:n]
+            cull_dist[:n] = self.cull_dist[:n]
+            bounds[:n], has_bounds[:n], dur[:n], layer[:n] = self.bounds[:n], self.has_bounds[:n], self.dur[:n], self.layer[:n]
+        self.kind, self.geom, self.ext, self.color = kind, geom, ext, color
+        self.thick, self.filled, self.world, self.cull_dist = thick, filled, world, cull_dist
+        self.bounds, self.has_bounds, self.dur, self.layer = bounds, has_bounds, dur, layer
+        self.capacity = cap
+        self._idx = np.zeros(cap, dtype=np.int64)
+        self._scr = np.zeros((cap, 4), dtype=np.float64)
+        self._ext = np.zeros((cap, 2), dtype=np.float64)
+
+    def __len__(self):
+        return self.n + len(self._staged)
+
+    def add(self, kind, p0, p1, a, b, color, thickness, filled, layer, world, cull_distance, cull_bounds, duration):
+        self._staged.append((kind, p0[0], p0[1], p1[0], p1[1], a, b, *color, thickness, filled, world,
+                             cull_distance, *(cull_bounds or _NO_BOUNDS), cull_bounds is not None, duration, layer))
+
+    def flush(self):
+        if not self._staged:
+            return
+        staged, self._staged = self._staged, []
+        rows = np.array(staged, dtype=np.float64).reshape(-1, _FIELDS)
+        k = len(rows)
+        if self.n + k > self.capacity:
+            self._alloc(max(self.n + k, self.capacity * 2))
+        s = slice(self.n, self.n + k)
+        self.kind[s] = rows[:, _KIND]
+        self.geom[s] = rows[:, _X0:_Y1 + 1]
+        self.ext[s] = rows[:, _A:_B + 1]
+        self.color[s] = np.clip(rows[:, _R:_AL + 1], 0, 255)
+        self.thick[s] = rows[:, _THICK]
+        self.filled[s] = rows[:, _FILLED] != 0
+        self.world[s] = rows[:, _WORLD] != 0
+        self.cull_dist[s] = rows[:, _CULL]
+        self.bounds[s] = rows[:, _BX0:_BY1 + 1]
+        self.has_bounds[s] = rows[:, _HAS_BOUNDS] != 0
+        self.dur[s] = rows[:, _DUR]
+        self.layer[s] = rows[:, _LAYER]
+        self.n += k
+
+    def keep(self, mask):
+        idx = np.flatnonzero(mask)
+        k = len(idx)
+        if k == self.n:
+            return
+        for arr in (self.kind, self.geom, self.ext, self.color, self.thick, self.filled, self.world,
+                    self.cull_dist, self.bounds, self.has_bounds, self.dur, self.layer):
+            arr[:k] = arr[idx]
+        self.n = k
+
+    def expire(self, now):
+        """Drops rows by the same rule GizmosManager applies to GizmoData lists."""
+        self.flush()
+        d = self.dur[:self.n]
+        self.keep((d <= 0) | (now - d < 1.0))
+
+    def clear(self):
+        self._staged = []
+        self.n = 0
+
+    def cull(self, tx, ty, scale, cx, cy, sw, sh, margin, distance_culling):
+        """Returns (rows, screen endpoints (k, 4), screen extents (k, 2)) of visible rows."""
+        self.flush()
+        k = cull_primitives(self.kind, self.geom, self.ext, self.world, self.cull_dist, self.bounds, self.has_bounds,
+                            self.n, tx, ty, scale, cx, cy, sw, sh, margin, distance_culling,
+                            self._idx, self._scr, self._ext)
+        return self._idx[:k], self._scr[:k], self._ext[:k]
@@ -5,13 +5,15 @@ from enum import Enum
 from typing import List, Tuple, Optional, Dict, Callable, Any
 import pygame
 import pygame.gfxdraw
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
 
 from UPST.config import config
 from UPST.modules.profiler import profile, start_profiling, stop_profiling
 from UPST.debug.debug_manager import Debug
 
-from UPST.modules.fast_math import process_gizmo_chunk, resolve_text_collisions_parallel
+from UPST.gizmos.gizmo_store import GizmoStore, POINT, LINE, CIRCLE, RECT, ARROW, CROSS
+from UPST.gizmos.label_placer import LabelPlacer
+from UPST.gizmos.alpha_layers import AlphaLayers
 
 class GizmoType(Enum):
     POINT = "point"
@@ -55,6 +57,7 @@ class GizmoData:
     on_click: Optional[Callable[[], None]] = None
     unique_id: Optional[str] = None
     owner: Any = None
+    priority: int = 0
 
 class GizmosManager:
     def __init__(self, camera, screen):
@@ -80,12 +83,12 @@ class GizmosManager:
         self._screen_height = config.app.screen_height
         self._half_screen_width = self._screen_width // 2
         self._half_screen_height = self._screen_height // 2
-        self._alpha_surfaces: Dict[int, pygame.Surface] = {}
-        self._alpha_surface_frame: Dict[int, int] = {}
+        self.alpha_layers = AlphaLayers(config.rendering.gizmo_alpha_buckets)
         self._frame_id = 0
-
-        self._executor = ThreadPoolExecutor(max_workers=config.multithreading.gizmos_max_workers)
-        self._prepared_data = None
+        # геометрия (точки, линии, стрелки...) живёт в массивах, текст и кнопки - в GizmoData
+        self.primitives = GizmoStore()
+        self.persistent_primitives = GizmoStore()
+        self.label_placer = LabelPlacer()
 
     def handle_event(self, event: pygame.event.Event):
         if event.type == pygame.WINDOWRESIZED:
@@ -133,20 +136,30 @@ class GizmosManager:
         self.time_accumulator += delta_time
         current_time = self.time_accumulator
         self.gizmos = [g for g in self.gizmos if g.duration <= 0 or current_time - g.duration < 1.0]
+        self.primitives.expire(current_time)
+        self.persistent_primitives.flush()
 
         unused_keys = set(self.unique_gizmos.keys()) - self.used_unique_gizmos
         for key in unused_keys:
             del self.unique_gizmos[key]
         self.used_unique_gizmos.clear()
 
-    def _get_temp_surface(self, alpha: int) -> pygame.Surface:
-        if alpha not in self._alpha_surfaces:
-            self._alpha_surfaces[alpha] = pygame.Surface(self.screen.get_size(), pygame.SRCALPHA)
-            self._alpha_surface_frame[alpha] = -1
-        if self._alpha_surface_frame[alpha] != self._frame_id:
-            self._alpha_surfaces[alpha].fill((0, 0, 0, 0))
-            self._alpha_surface_frame[alpha] = self._frame_id
-        return self._alpha_surfaces[alpha]
+    def _gizmo_bounds(self, g, pos):
+        scale = self.camera.scaling if g.world_space else 1.0
+        pad = g.thickness + 2
+        if g.gizmo_type in (GizmoType.LINE, GizmoType.ARROW) and g.end_position:
+            end = self.camera.world_to_screen(g.end_position) if g.world_space else g.end_position
+            pad += 20 if g.gizmo_type == GizmoType.ARROW else 0
+            x0, x1 = sorted((pos[0], end[0]))
+            y0, y1 = sorted((pos[1], end[1]))
+            return pygame.Rect(int(x0) - pad, int(y0) - pad, int(x1 - x0) + 2 * pad, int(y1 - y0) + 2 * pad)
+        if g.gizmo_type in (GizmoType.RECT, GizmoType.BUTTON, GizmoType.TEXT):
+            w, h = g.width * scale, g.height * scale
+            if g.gizmo_type == GizmoType.TEXT:
+                w, h = self._object_extent(g, self.camera.scaling) * 2, g.font_size * 2
+        else:
+            w = h = g.size * scale * 2
+        return pygame.Rect(int(pos[0] - w / 2) - pad, int(pos[1] - h / 2) - pad, int(w) + 2 * pad, int(h) + 2 * pad)
 
     @profile("draw", "gizmos")
     def draw(self):
@@ -154,77 +167,183 @@ class GizmosManager:
             return
         try:
             all_gizmos = list(self.unique_gizmos.values()) + self.gizmos + self.persistent_gizmos
-            if not all_gizmos:
+            total = len(all_gizmos) + len(self.primitives) + len(self.persistent_primitives)
+            if not total:
                 return
             self._frame_id += 1
+            self.alpha_layers.begin(self.screen.get_size())
 
             for g in all_gizmos:
                 g._screen_pos = None
                 g._adjusted_screen_pos = None
                 g._is_visible = None
 
-            cam_pos = (self.camera.translation.tx, self.camera.translation.ty)
-            screen_size = (self._screen_width, self._screen_height)
-            chunk_size = max(1, len(all_gizmos) // 4)
-            chunks = [all_gizmos[i:i + chunk_size] for i in range(0, len(all_gizmos), chunk_size)]
-            futures = []
-            for chunk in chunks:
-                args = (
-                    chunk,
-                    cam_pos[0], cam_pos[1],
-                    self.camera.scaling,
-                    self._screen_width,
-                    self._screen_height,
-                    self.cull_margin,
-                    self.distance_culling_enabled
-                )
-                future = self._executor.submit(process_gizmo_chunk, *args)
-                futures.append(future)
-            visible_entries = []
-            for future in as_completed(futures):
-                visible_entries.extend(future.result())
-
+            cam = self.camera
+            view = (cam.translation.tx, cam.translation.ty, cam.scaling,
+                    cam.screen_width * 0.5, cam.screen_height * 0.5)
+            drawn = 0
+            for store in (self.primitives, self.persistent_primitives):
+                rows, scr, ext = store.cull(*view, self._screen_width, self._screen_height, self.cull_margin,
+                                            self.distance_culling_enabled)
+                self._render_primitives(store, rows, scr, ext)
+                drawn += len(rows)
+
+            visible_entries = self._cull_objects(all_gizmos, *view)
             text_entries = [e for e in visible_entries if e[0].gizmo_type == GizmoType.TEXT and e[0].collision]
             other_entries = [e for e in visible_entries if not (e[0].gizmo_type == GizmoType.TEXT and e[0].collision)]
-            adjusted_texts = resolve_text_collisions_parallel(text_entries, self._screen_width, self._screen_height)
-            alpha_used = set()
-            self._render_non_text_gizmos(other_entries, alpha_used)
-            self._render_adjusted_texts(adjusted_texts, alpha_used)
-            self._blit_alpha_surfaces(alpha_used)
+            adjusted_texts = self._place_labels(text_entries)
+            self._render_non_text_gizmos(other_entries)
+            self._render_adjusted_texts(adjusted_texts)
+            self.alpha_layers.composite(self.screen)
 
+            drawn += len(other_entries) + len(adjusted_texts)
             self.stats = {
-                'total_gizmos': len(all_gizmos),
-                'culled_frustum': len(all_gizmos) - len(visible_entries),
+                'total_gizmos': total,
+                'culled_frustum': total - drawn - (len(text_entries) - len(adjusted_texts)),
                 'culled_distance': 0,
                 'culled_occlusion': len(text_entries) - len(adjusted_texts),
-                'drawn_gizmos': len(other_entries) + len(adjusted_texts)
+                'drawn_gizmos': drawn
             }
         except Exception as e:
             Debug.log_error(f"Error in Gizmos: {e}", "Gizmos")
-    def _render_non_text_gizmos(self, entries, alpha_used):
+
+    def _object_extent(self, g, scale):
+        s = scale if g.world_space else 1.0
+        if g.gizmo_type == GizmoType.TEXT:
+            fs = g.font_size * (s if g.font_world_space else 1.0)
+            return fs * len(g.text) * 0.3
+        if g.gizmo_type == GizmoType.BUTTON:
+            return max(g.width, g.height) * s * 0.5
+        return 10.0
+
+    def _cull_objects(self, objects, tx, ty, scale, cx, cy):
+        n = len(objects)
+        if not n:
+            return []
+        pos = np.array([g.position for g in objects], dtype=np.float64).reshape(n, 2)
+        world = np.fromiter((g.world_space for g in objects), dtype=np.bool_, count=n)
+        r = np.fromiter((self._object_extent(g, scale) for g in objects), dtype=np.float64, count=n)
+        sx = np.where(world, (pos[:, 0] - tx) * scale + cx, pos[:, 0])
+        sy = np.where(world, cy - (pos[:, 1] - ty) * scale, pos[:, 1])
+        m = self.cull_margin
+        ok = ((sx + r >= -m) & (sx - r <= self._screen_width + m) &
+              (sy + r >= -m) & (sy - r <= self._screen_height + m))
+        if self.distance_culling_enabled:
+            cd = np.fromiter((g.cull_distance for g in objects), dtype=np.float64, count=n)
+            far = (pos[:, 0] - tx) ** 2 + (pos[:, 1] - ty) ** 2 > cd * cd
+            ok &= ~(world & (cd > 0) & far)
+        for i, g in enumerate(objects):
+            if g.cull_bounds and ok[i]:
+                min_x, min_y, max_x, max_y = g.cull_bounds
+                ok[i] = min_x <= pos[i, 0] <= max_x and min_y <= pos[i, 1] <= max_y
+        idx = np.flatnonzero(ok).tolist()
+        sx, sy, r = sx.astype(np.int64).tolist(), sy.astype(np.int64).tolist(), r.tolist()
+        return [(objects[i], (sx[i], sy[i]), r[i]) for i in idx]
+
+    def _place_labels(self, text_entries):
+        if not text_entries:
+            self.label_placer.reset()
+            return []
+        n = len(text_entries)
+        surfs = []
+        for g, _, _ in text_entries:
+            size = int(g.font_size * self.camera.scaling) if (g.font_world_space and g.world_space) else g.font_size
+            surfs.append(self._get_text_surface(g.text, g.color, g.font_name, size))
+        ax = np.array([e[1] for e in text_entries], dtype=np.float64).reshape(n, 2)
+        w = np.fromiter((s.get_width() + 4 for s in surfs), dtype=np.float64, count=n)
+        h = np.fromiter((s.get_height() + 4 for s in surfs), dtype=np.float64, count=n)
+        priority = np.fromiter((g.priority for g, _, _ in text_entries), dtype=np.int64, count=n)
+        group = np.fromiter((hash((g.font_size, tuple(g.color), id(g.owner))) for g, _, _ in text_entries),
+                            dtype=np.int64, count=n)
+        x, y, ok = self.label_placer.place(ax[:, 0].copy(), ax[:, 1].copy(), w, h, priority, group,
+                                           self._screen_width, self._screen_height)
+        x, y = x.astype(np.int64).tolist(), y.astype(np.int64).tolist()
+        return [(g, pos, (x[i], y[i]), surfs[i]) for i, (g, pos, _) in enumerate(text_entries) if ok[i]]
+
+    @profile("_render_primitives", "gizmos")
+    def _render_primitives(self, store, rows, scr, ext):
+        if not len(rows):
+            return
+        screen = self.screen
+        kinds = store.kind[rows].tolist()
+        rgba = store.color[rows]
+        alphas = rgba[:, 3].tolist()
+        colors = list(map(tuple, rgba.tolist()))
+        thick = store.thick[rows].tolist()
+        filled = store.filled[rows].tolist()
+        pts = scr.tolist()
+        sizes = ext.tolist()
+        heads = None
+        if ARROW in kinds:
+            # наконечники всех стрелок считаем одним проходом
+            d = scr[:, 2:4] - scr[:, 0:2]
+            length = np.hypot(d[:, 0], d[:, 1])
+            safe = np.where(length > 0, length, 1.0)
+            nx, ny = d[:, 0] / safe, d[:, 1] / safe
+            a = np.minimum(length * 0.3, 20.0)
+            heads = np.column_stack((scr[:, 2] - a * (nx * 0.8 + ny * 0.6), scr[:, 3] - a * (ny * 0.8 - nx * 0.6),
+                                     scr[:, 2] - a * (nx * 0.8 - ny * 0.6), scr[:, 3] - a * (ny * 0.8 + nx * 0.6)))
+            heads = np.clip(heads, -32768, 32767).tolist()
+            has_head = (length > 0).tolist()
+        bounds = None
+        if min(alphas) < 255:
+            # габариты полупрозрачных примитивов - для грязных прямоугольников слоёв
+            r = np.maximum(ext[:, 0], ext[:, 1])[:, None]
+            seg = np.isin(store.kind[rows], (LINE, ARROW))[:, None]
+            lo = np.where(seg, np.minimum(scr[:, 0:2], scr[:, 2:4]), scr[:, 0:2] - r)
+            hi = np.where(seg, np.maximum(scr[:, 0:2], scr[:, 2:4]), scr[:, 0:2] + r)
+            pad = store.thick[rows][:, None] + 2 + np.where(seg, 20, 0)
+            bounds = np.column_stack((lo - pad, hi - lo + 2 * pad)).astype(np.int64).tolist()
+        for j, kd in enumerate(kinds):
+            x0, y0, x1, y1 = pts[j]
+            color = colors[j]
+            surface = screen
+            if alphas[j] < 255:
+                surface, dirty = self.alpha_layers.target(alphas[j])
+                dirty.append(pygame.Rect(bounds[j]))
+                color = color[:3]
+            if kd == LINE:
+                self._draw_line_gfx(surface, (x0, y0), (x1, y1), color, thick[j])
+            elif kd == ARROW:
+                self._draw_line_gfx(surface, (x0, y0), (x1, y1), color, thick[j])
+                if has_head[j]:
+                    lx, ly, rx, ry = heads[j]
+                    self._draw_line_gfx(surface, (x1, y1), (lx, ly), color, thick[j])
+                    self._draw_line_gfx(surface, (x1, y1), (rx, ry), color, thick[j])
+            elif kd == POINT:
+                r = int(sizes[j][0])
+                if r > 0:
+                    pygame.gfxdraw.filled_circle(surface, int(x0), int(y0), r, color)
+            elif kd == CIRCLE:
+                self._draw_circle_gfx(surface, (int(x0), int(y0)), int(sizes[j][0]), color, filled[j], thick[j])
+            elif kd == RECT:
+                rect = pygame.Rect(0, 0, int(sizes[j][0]), int(sizes[j][1]))
+                rect.center = (int(x0), int(y0))
+                self._draw_rect_gfx(surface, rect, color, filled[j], thick[j])
+            elif kd == CROSS:
+                h = sizes[j][0] * 0.5
+                self._draw_line_gfx(surface, (x0 - h, y0), (x0 + h, y0), color, thick[j])
+                self._draw_line_gfx(surface, (x0, y0 - h), (x0, y0 + h), color, thick[j])
+
+    def _render_non_text_gizmos(self, entries):
         for g, screen_pos, _ in entries:
-            self._draw_gizmo(g, screen_pos, alpha_used)
-
-    def _render_adjusted_texts(self, adjusted_texts, alpha_used):
-        for g, orig_pos, adj_pos in adjusted_texts:
-            surf_target = self.screen if g.alpha == 255 else self._get_temp_surface(g.alpha)
-            if g.alpha != 255:
-                alpha_used.add(g.alpha)
-            self._draw_line_gfx(surf_target, orig_pos, adj_pos, g.color, 2)
-            size = int(g.font_size * self.camera.scaling) if (
-                        g.font_world_space and g.world_space) else g.font_size
-            surf = self._get_text_surface(g.text, g.color, g.font_name, size)
+            self._draw_gizmo(g, screen_pos)
+
+    def _render_adjusted_texts(self, adjusted_texts):
+        for g, orig_pos, adj_pos, surf in adjusted_texts:
+            surf_target = self.screen
             r = surf.get_rect(center=adj_pos)
+            if g.alpha < 255:
+                surf_target, dirty = self.alpha_layers.target(g.alpha)
+                dirty.append(r.inflate(8, 8).union(pygame.Rect(orig_pos, (1, 1)).inflate(4, 4)))
+            if adj_pos != orig_pos:
+                self._draw_line_gfx(surf_target, orig_pos, adj_pos, g.color, 2)
             if g.background_color:
                 bg = pygame.Surface((r.width + 4, r.height + 4), pygame.SRCALPHA)
                 bg.fill(g.background_color)
                 surf_target.blit(bg, (r.left - 2, r.top - 2))
             surf_target.blit(surf, r)
 
-    def _blit_alpha_surfaces(self, alpha_used):
-        for a in alpha_used:
-            self.screen.blit(self._alpha_surfaces[a], (0, 0))
-
     def _draw_line_gfx(self, surface, start, end, color, thickness):
         x1, y1 = map(int, start)
         x2, y2 = map(int, end)
@@ -250,10 +369,11 @@ class GizmosManager:
                 color = tuple(int(min(255, max(0, c))) for c in color)
                 pygame.gfxdraw.line(surface, lx1, ly1, lx2, ly2, color)
 
-    def _draw_gizmo(self, gizmo: GizmoData, pos: Tuple[int, int], alpha_used):
-        surface = self.screen if gizmo.alpha == 255 else self._get_temp_surface(gizmo.alpha)
+    def _draw_gizmo(self, gizmo: GizmoData, pos: Tuple[int, int]):
+        surface = self.screen
         if gizmo.alpha < 255:
-            alpha_used.add(gizmo.alpha)
+            surface, dirty = self.alpha_layers.target(gizmo.alpha)
+            dirty.append(self._gizmo_bounds(gizmo, pos))
         color = gizmo.color
         scale = self.camera.scaling if gizmo.world_space else 1.0
 
@@ -347,9 +467,11 @@ class GizmosManager:
 
     def clear(self):
         self.gizmos.clear()
+        self.primitives.clear()
 
     def clear_persistent(self):
         self.persistent_gizmos.clear()
+        self.persistent_primitives.clear()
 
     def clear_unique(self):
         self.unique_gizmos.clear()
@@ -441,57 +563,51 @@ class GizmosManager:
                 for i in range(thickness):
                     pygame.gfxdraw.rectangle(surface, (x - i, y - i, w + 2 * i, h + 2 * i), color)
 
+    def _rgba(self, color):
+        c = self.colors.get(color, color) if isinstance(color, str) else color
+        if isinstance(c, str):
+            c = tuple(pygame.Color(c))
+        return (c[0], c[1], c[2], c[3] if len(c) > 3 else 255)
+
+    def _add_primitive(self, kind, p0, p1, a, b, color, thickness, filled, layer, world_space, cull_distance,
+                       cull_bounds, duration):
+        store = self.persistent_primitives if duration == -1 else self.primitives
+        store.add(kind, p0, p1, a, b, self._rgba(color), thickness, filled, layer, world_space, cull_distance,
+                  cull_bounds, duration)
+
     def draw_point(self, position, color='white', size=3.0, duration=0.1, layer=0, world_space=True, cull_distance=-1.0,
                    cull_bounds=None):
-        g = GizmoData(gizmo_type=GizmoType.POINT, position=position,
-                      color=self.colors.get(color, color) if isinstance(color, str) else color, size=size,
-                      duration=duration, layer=layer, world_space=world_space, cull_distance=cull_distance,
-                      cull_bounds=cull_bounds)
-        self._add_gizmo(g)
+        self._add_primitive(POINT, position, position, size, 0.0, color, 1, True, layer, world_space,
+                            cull_distance, cull_bounds, duration)
 
     def draw_line(self, start, end, color='white', thickness=1, duration=0.1, layer=0, world_space=True,
                   cull_distance=-1.0, cull_bounds=None):
-        g = GizmoData(gizmo_type=GizmoType.LINE, position=start, end_position=end,
-                      color=self.colors.get(color, color) if isinstance(color, str) else color, thickness=thickness,
-                      duration=duration, layer=layer, world_space=world_space, cull_distance=cull_distance,
-                      cull_bounds=cull_bounds)
-        self._add_gizmo(g)
+        self._add_primitive(LINE, start, end, 0.0, 0.0, color, thickness, False, layer, world_space,
+                            cull_distance, cull_bounds, duration)
 
     def draw_circle(self, center, radius, color='white', filled=False, thickness=1, duration=0.1, layer=0,
                     world_space=True, cull_distance=-1.0, cull_bounds=None):
-        g = GizmoData(gizmo_type=GizmoType.CIRCLE, position=center,
-                      color=self.colors.get(color, color) if isinstance(color, str) else color, size=radius,
-                      filled=filled, thickness=thickness, duration=duration, layer=layer, world_space=world_space,
-                      cull_distance=cull_distance, cull_bounds=cull_bounds)
-        self._add_gizmo(g)
+        self._add_primitive(CIRCLE, center, center, radius, 0.0, color, thickness, filled, layer, world_space,
+                            cull_distance, cull_bounds, duration)
 
     def draw_rect(self, center, width, height, color='white', filled=False, thickness=1, duration=0.1, layer=0,
                   world_space=True, cull_distance=-1.0, cull_bounds=None):
-        g = GizmoData(gizmo_type=GizmoType.RECT, position=center,
-                      color=self.colors.get(color, color) if isinstance(color, str) else color, width=width,
-                      height=height, filled=filled, thickness=thickness, duration=duration, layer=layer,
-                      world_space=world_space, cull_distance=cull_distance, cull_bounds=cull_bounds)
-        self._add_gizmo(g)
+        self._add_primitive(RECT, center, center, width, height, color, thickness, filled, layer, world_space,
+                            cull_distance, cull_bounds, duration)
 
     def draw_arrow(self, start, end, color='white', thickness=2, duration=0.1, layer=0, world_space=True,
                    cull_distance=-1.0, cull_bounds=None):
-        g = GizmoData(gizmo_type=GizmoType.ARROW, position=start, end_position=end,
-                      color=self.colors.get(color, color) if isinstance(color, str) else color, thickness=thickness,
-                      duration=duration, layer=layer, world_space=world_space, cull_distance=cull_distance,
-                      cull_bounds=cull_bounds)
-        self._add_gizmo(g)
+        self._add_primitive(ARROW, start, end, 0.0, 0.0, color, thickness, False, layer, world_space,
+                            cull_distance, cull_bounds, duration)
 
     def draw_cross(self, center, size, color='white', thickness=1, duration=0.1, layer=0, world_space=True,
                    cull_distance=-1.0, cull_bounds=None):
-        g = GizmoData(gizmo_type=GizmoType.CROSS, position=center,
-                      color=self.colors.get(color, color) if isinstance(color, str) else color, size=size,
-                      thickness=thickness, duration=duration, layer=layer, world_space=world_space,
-                      cull_distance=cull_distance, cull_bounds=cull_bounds)
-        self._add_gizmo(g)
+        self._add_primitive(CROSS, center, center, size, 0.0, color, thickness, False, layer, world_space,
+                            cull_distance, cull_bounds, duration)
 
     def draw_text(self, position, text, color='white', background_color=None, duration=0.1, layer=0,
                   world_space=True, font_name="Consolas", font_size=14, font_world_space=False,
-                  cull_distance=-1.0, cull_bounds=None, collision=False, owner=None):
+                  cull_distance=-1.0, cull_bounds=None, collision=False, owner=None, priority=0):
         g = GizmoData(
             gizmo_type=GizmoType.TEXT,
             position=position,
@@ -508,6 +624,7 @@ class GizmosManager:
             background_color=background_color,
             collision=collision,
             owner=owner,
+            priority=priority,
         )
         self._add_gizmo(g)
 
@@ -533,15 +650,11 @@ class GizmosManager:
             f"Active: {len(self.gizmos)}",
             f"Persistent: {len(self.persistent_gizmos)}",
             f"Unique: {len(self.unique_gizmos)}",
-            f"Threads: {str(config.multithreading.gizmos_max_workers)}"
+            f"Primitives: {len(self.primitives)} + {len(self.persistent_primitives)}"
         ]
         for i, ln in enumerate(lines):
             self.draw_text((x, y + i * 22), ln, 'white', font_size=18, world_space=False, duration=0.1)
 
-    def __del__(self):
-        if hasattr(self, '_executor'):
-            self._executor.shutdown(wait=False)
-
 _gizmos_instance: Optional[GizmosManager] = None
 
 def get_gizmos(): return _gizmos_instance
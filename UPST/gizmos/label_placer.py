@@ -0,0 +1,157 @@
+# UPST/gizmos/label_placer.py
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, nogil=True)
+def _blocking_bottom(x, y, w, h, px, py, pw, ph, head, nxt, item, cell, gw, gh):
+    # нижняя граница самого низкого из пересекающихся уже размещённых прямоугольников
+    c0 = max(0, min(gw - 1, int(x // cell)))
+    c1 = max(0, min(gw - 1, int((x + w) // cell)))
+    r0 = max(0, min(gh - 1, int(y // cell)))
+    r1 = max(0, min(gh - 1, int((y + h) // cell)))
+    bottom = -1.0
+    for r in range(r0, r1 + 1):
+        for c in range(c0, c1 + 1):
+            e = head[r * gw + c]
+            while e >= 0:
+                j = item[e]
+                if x < px[j] + pw[j] and x + w > px[j] and y < py[j] + ph[j] and y + h > py[j]:
+                    bottom = max(bottom, py[j] + ph[j])
+                e = nxt[e]
+    return bottom
+
+
+@njit(cache=True, nogil=True)
+def place_labels(ax, ay, w, h, group, order, prev_ax, prev_ay, prev_dx, prev_dy, prev_group,
+                 cell, gw, gh, sw, sh, reuse_r, max_tries, out_x, out_y, out_ok):
+    n = ax.shape[0]
+    cells = gw * gh
+    # прошлые подписи раскладываем по ячейкам якоря, чтобы найти «свою» без O(n^2)
+    m = prev_ax.shape[0]
+    prev_head = np.full(cells, -1, np.int64)
+    prev_next = np.full(max(1, m), -1, np.int64)
+    for j in range(m):
+        c = max(0, min(gw - 1, int(prev_ax[j] // cell)))
+        r = max(0, min(gh - 1, int(prev_ay[j] // cell)))
+        k = r * gw + c
+        prev_next[j] = prev_head[k]
+        prev_head[k] = j
+
+    cap = 0
+    for i in range(n):
+        cap += (int(w[i] // cell) + 2) * (int(h[i] // cell) + 2)
+    head = np.full(cells, -1, np.int64)
+    nxt = np.empty(max(1, cap), np.int64)
+    item = np.empty(max(1, cap), np.int64)
+    px = np.zeros(n)
+    py = np.zeros(n)
+    used = 0
+    reuse_sq = reuse_r * reuse_r
+
+    for oi in range(n):
+        i = order[oi]
+        wi, hi = w[i], h[i]
+        out_ok[i] = False
+        if wi > sw or hi > sh:
+            continue
+        dx, dy = 0.0, 0.0
+        c = max(0, min(gw - 1, int(ax[i] // cell)))
+        r = max(0, min(gh - 1, int(ay[i] // cell)))
+        best = reuse_sq
+        for rr in range(max(0, r - 1), min(gh, r + 2)):
+            for cc in range(max(0, c - 1), min(gw, c + 2)):
+                j = prev_head[rr * gw + cc]
+                while j >= 0:
+                    if prev_group[j] == group[i]:
+                        d = (prev_ax[j] - ax[i]) ** 2 + (prev_ay[j] - ay[i]) ** 2
+                        if d <= best:
+                            best = d
+                            dx, dy = prev_dx[j], prev_dy[j]
+                    j = prev_next[j]
+
+        placed = False
+        for attempt in range(2):
+            if attempt == 1:
+                if dx == 0.0 and dy == 0.0:
+                    break
+                dx, dy = 0.0, 0.0
+            x = min(max(ax[i] + dx - wi * 0.5, 0.0), sw - wi)
+            y = min(max(ay[i] + dy - hi * 0.5, 0.0), sh - hi)
+            for _ in range(max_tries):
+                b = _blocking_bottom(x, y, wi, hi, px, py, w, h, head, nxt, item, cell, gw, gh)
+                if b < 0.0:
+                    placed = True
+                    break
+                if b + 2.0 + hi > sh:
+                    break
+                y = b + 2.0
+            if placed:
+                break
+        if not placed:
+            continue
+
+        px[i], py[i] = x, y
+        out_x[i] = x + wi * 0.5
+        out_y[i] = y + hi * 0.5
+        out_ok[i] = True
+        c0 = max(0, min(gw - 1, int(x // cell)))
+        c1 = max(0, min(gw - 1, int((x + wi) // cell)))
+        r0 = max(0, min(gh - 1, int(y // cell)))
+        r1 = max(0, min(gh - 1, int((y + hi) // cell)))
+        for rr in range(r0, r1 + 1):
+            for cc in range(c0, c1 + 1):
+                k = rr * gw + cc
+                item[used] = i
+                nxt[used] = head[k]
+                head[k] = used
+                used += 1
+
+
+class LabelPlacer:
+    """Screen-space label layout for GizmosManager.
+
+    Labels are placed in priority order (then top to bottom); each one is tested
+    only against labels already registered in the uniform grid cells it covers and
+    slides below whatever blocks it, up to `max_tries` times, otherwise it is hidden.
+    A label whose anchor moved less than `reuse_radius` pixels since the previous
+    frame first tries its previous offset, so stacked labels do not flicker."""
+
+    def __init__(self, cell=64, reuse_radius=6.0, max_tries=8):
+        self.cell = cell
+        self.reuse_radius = reuse_radius
+        self.max_tries = max_tries
+        self._prev = None
+        self._last = None
+
+    def reset(self):
+        self._prev = None
+        self._last = None
+
+    def place(self, ax, ay, w, h, priority, group, screen_w, screen_h):
+        """Returns label centres (x, y) and a visibility mask, all aligned with the input."""
+        n = len(ax)
+        key = (screen_w, screen_h)
+        last = self._last
+        if (last is not None and last[0] == key and len(last[1]) == n and np.array_equal(last[1], ax)
+                and np.array_equal(last[2], ay) and np.array_equal(last[3], w) and np.array_equal(last[4], h)
+                and np.array_equal(last[5], priority) and np.array_equal(last[6], group)):
+            return last[7]
+        order = np.lexsort((ax, ay, -priority)).astype(np.int64)
+        out_x = ax.copy()
+        out_y = ay.copy()
+        ok = np.zeros(n, dtype=np.bool_)
+        prev = self._prev
+        if prev is None:
+            empty = np.zeros(0, dtype=np.float64)
+            prev = (empty, empty, empty, empty, np.zeros(0, dtype=np.int64))
+        cell = float(self.cell)
+        gw = max(1, int(screen_w // cell) + 1)
+        gh = max(1, int(screen_h // cell) + 1)
+        place_labels(ax, ay, w, h, group, order, prev[0], prev[1], prev[2], prev[3], prev[4],
+                     cell, gw, gh, float(screen_w), float(screen_h), float(self.reuse_radius),
+                     self.max_tries, out_x, out_y, ok)
+        self._prev = (ax[ok], ay[ok], (out_x - ax)[ok], (out_y - ay)[ok], group[ok])
+        result = (out_x, out_y, ok)
+        self._last = (key, ax, ay, w, h, priority, group, result)
+        return result
@@ -1,7 +1,74 @@
-import collections, math, pygame, time
+import math, pygame, time
+import numpy as np
 from typing import Dict, List, Optional, Tuple
 from UPST.config import config
 
+
+class SeriesBuffer:
+    """Preallocated (x, y) ring for one plotted series. `version` counts appends, so the
+    trace layer and the analysis cache can tell whether anything changed since last time."""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self.xs = np.zeros(self.capacity, dtype=np.float64)
+        self.ys = np.zeros(self.capacity, dtype=np.float64)
+        self.head = 0
+        self.count = 0
+        self.version = 0
+        self._ordered = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, x: float, y: float) -> None:
+        self.xs[self.head] = x
+        self.ys[self.head] = y
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.version += 1
+
+    def resize(self, capacity: int) -> None:
+        xs, ys = self.arrays()
+        self.capacity = max(1, int(capacity))
+        k = min(len(xs), self.capacity)
+        self.xs = np.zeros(self.capacity, dtype=np.float64)
+        self.ys = np.zeros(self.capacity, dtype=np.float64)
+        if k:
+            self.xs[:k] = xs[-k:]
+            self.ys[:k] = ys[-k:]
+        self.count = k
+        self.head = k % self.capacity
+        self.version += 1
+        self._ordered = None
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Samples oldest first; the arrays are cached until the next append."""
+        o = self._ordered
+        if o is None or o[0] != self.version:
+            if self.count < self.capacity:
+                xs, ys = self.xs[:self.count].copy(), self.ys[:self.count].copy()
+            else:
+                xs = np.concatenate((self.xs[self.head:], self.xs[:self.head]))
+                ys = np.concatenate((self.ys[self.head:], self.ys[:self.head]))
+            o = self._ordered = (self.version, xs, ys)
+        return o[1], o[2]
+
+    def last(self) -> float:
+        return float(self.ys[(self.head - 1) % self.capacity])
+
+
+def _decimate(px: np.ndarray, py: np.ndarray, limit: int) -> Tuple[np.ndarray, np.ndarray]:
+    # больше точек, чем колонок: на каждую колонку оставляем вертикальный отрезок min..max
+    if len(px) <= 2 * limit: return px, py
+    col = np.floor(px).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, col[1:] != col[:-1]])
+    out_x = np.repeat(px[starts], 2)
+    out_y = np.empty(len(out_x))
+    out_y[0::2] = np.minimum.reduceat(py, starts)
+    out_y[1::2] = np.maximum.reduceat(py, starts)
+    return out_x, out_y
+
+
 class Plotter:
     BASE_COLORS: List[Tuple[int, int, int]] = [(0, 255, 255), (255, 105, 180), (147, 255, 180), (255, 215, 0),
                                                (130, 130, 255), (255, 165, 0), (255, 99, 71), (128, 0, 128),
@@ -59,8 +126,7 @@ class Plotter:
         self.show_extrema_labels = show_extrema_labels
         self.show_extrema = show_extrema
 
-        self.data: Dict[str, collections.deque] = collections.defaultdict(lambda: collections.deque(maxlen=self.max_samples))
-        self.x_data: Dict[str, collections.deque] = collections.defaultdict(lambda: collections.deque(maxlen=self.max_samples))
+        self.data: Dict[str, SeriesBuffer] = {}
         self.colors: Dict[str, Tuple[int, int, int]] = {}
         self.hidden_keys: set = set()
         self.overlay_mode: bool = True
@@ -72,7 +138,13 @@ class Plotter:
         self.current_group_filter: str = "All"
         self.available_groups: set = {"ungrouped"}
         self._osc_cache: Dict[str, Tuple[Dict, int]] = {}
+        self._analysis: Dict[str, Tuple[int, Dict]] = {}
         self._frame_counter: int = 0
+        self._text_cache: Dict[Tuple[str, Tuple[int, int, int]], pygame.Surface] = {}
+        self._layer: Optional[pygame.Surface] = None
+        self._layer_key = None
+        self._layer_map = None
+        self._drawn: Dict[str, int] = {}
         self._extrema_labels = []
 
         self._mouse_pos: Optional[Tuple[int, int]] = None
@@ -176,9 +248,14 @@ class Plotter:
         return self.colors[key]
 
     def add_data(self, key: str, y: float, x: Optional[float] = None, group: Optional[str] = None) -> None:
-        self.data[key].append(y)
+        buf = self.data.get(key)
+        if buf is None:
+            buf = self.data[key] = SeriesBuffer(self.max_samples)
+        elif buf.capacity != self.max_samples:
+            buf.resize(self.max_samples)
+            self._layer_key = None
         if x is None: x = time.perf_counter() * 1000
-        self.x_data[key].append(x)
+        buf.append(x, y)
         group = group or "ungrouped"
         self.groups[key] = group
         self.available_groups.add(group)
@@ -187,14 +264,14 @@ class Plotter:
     def set_overlay_mode(self, mode: bool) -> None: self.overlay_mode = mode
     def set_sort_by_value(self, sort_by_value: bool) -> None: self.sort_by_value = sort_by_value
     def clear_data(self) -> None:
-        self.data.clear(); self.x_data.clear(); self.groups.clear()
+        self.data.clear(); self.groups.clear()
         self.available_groups = {"ungrouped"}; self.group_visibility.clear()
-        self._osc_cache.clear()
+        self._osc_cache.clear(); self._analysis.clear(); self._layer_key = None
     def hide_key(self, key: str) -> None: self.hidden_keys.add(key)
     def show_key(self, key: str) -> None: self.hidden_keys.discard(key)
     def clear_key(self, key: str) -> None:
-        self.data.pop(key, None); self.x_data.pop(key, None)
-        self._osc_cache.pop(key, None)
+        self.data.pop(key, None)
+        self._osc_cache.pop(key, None); self._analysis.pop(key, None); self._layer_key = None
     def set_group_filter(self, group_name: str) -> None: self.current_group_filter = group_name
     def get_available_groups(self) -> List[str]:
         return ["All"] + sorted(self.available_groups - {"ungrouped"}) if len(self.available_groups) > 1 else ["All"]
@@ -217,18 +294,18 @@ class Plotter:
         pad = val_range * self.PADDING_RATIO
         return val_min - pad, val_max + pad
 
-    def _find_extrema(self, ys: List[float]) -> Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]:
+    def _find_extrema(self, ys) -> Tuple[List[Tuple[int, float]], List[Tuple[int, float]]]:
+        ys = np.asarray(ys, dtype=np.float64)
         if len(ys) < 3: return [], []
-        peaks, troughs = [], []
-        for i in range(1, len(ys) - 1):
-            window = ys[max(0, i - 2):min(len(ys), i + 3)]
-            local_max = max(window); local_min = min(window)
-            if ys[i] == local_max and ys[i] > ys[i - 1] and ys[i] > ys[i + 1]:
-                prominence = ys[i] - max(ys[i - 1], ys[i + 1])
-                peaks.append((i, prominence))
-            elif ys[i] == local_min and ys[i] < ys[i - 1] and ys[i] < ys[i + 1]:
-                prominence = min(ys[i - 1], ys[i + 1]) - ys[i]
-                troughs.append((i, prominence))
+        win = np.lib.stride_tricks.sliding_window_view
+        hi = win(np.pad(ys, 2, constant_values=-np.inf), 5).max(axis=1)[1:-1]
+        lo = win(np.pad(ys, 2, constant_values=np.inf), 5).min(axis=1)[1:-1]
+        c, l, r = ys[1:-1], ys[:-2], ys[2:]
+        pk = (c == hi) & (c > l) & (c > r)
+        tr = ~pk & (c == lo) & (c < l) & (c < r)
+        pi, ti = np.flatnonzero(pk), np.flatnonzero(tr)
+        peaks = list(zip((pi + 1).tolist(), (c[pi] - np.maximum(l[pi], r[pi])).tolist()))
+        troughs = list(zip((ti + 1).tolist(), (np.minimum(l[ti], r[ti]) - c[ti]).tolist()))
         return peaks, troughs
 
     def _linear_regression(self, xs: List[float], ys: List[float]) -> Tuple[float, float]:
@@ -240,52 +317,37 @@ class Plotter:
         intercept = (sum_y - slope * sum_x) / n
         return slope, intercept
 
-    def _detect_zero_crossings(self, ys: List[float], xs: List[float]) -> List[float]:
+
+    def _detect_zero_crossings(self, ys, xs) -> List[float]:
+        ys = np.asarray(ys, dtype=np.float64)
+        xs = np.asarray(xs, dtype=np.float64)
         if len(ys) < 2: return []
-        crossings = []
-        for i in range(1, len(ys)):
-            y0, y1 = ys[i - 1], ys[i]
-            if y0 * y1 < 0:
-                t = abs(y0) / (abs(y0) + abs(y1))
-                x_cross = xs[i - 1] + t * (xs[i] - xs[i - 1])
-                crossings.append(x_cross)
-        return crossings
+        i = np.flatnonzero(ys[:-1] * ys[1:] < 0)
+        y0, y1 = np.abs(ys[i]), np.abs(ys[i + 1])
+        return (xs[i] + y0 / (y0 + y1) * (xs[i + 1] - xs[i])).tolist()
+
+    @staticmethod
+    def _dt_median(xs) -> float:
+        return float(np.median(np.abs(np.diff(xs)))) if len(xs) > 1 else 1.0
 
     def _detect_frequency_components(self, ys, xs):
+        ys = np.asarray(ys, dtype=np.float64)
         N = len(ys)
         if N < 16 or not self.enable_osc_analysis: return []
-        t0 = xs[0]
-        tN = xs[-1]
-        diffs = [xs[i + 1] - xs[i] for i in range(len(xs) - 1)] if len(xs) > 1 else [1.0]
-        dt_med = self._median([abs(d) for d in diffs]) if diffs else 1.0
-        scale = 1.0
-        if dt_med > 1.0: scale = 0.001
+        scale = 0.001 if self._dt_median(xs) > 1.0 else 1.0
         total_t = (xs[-1] - xs[0]) * scale
         if total_t <= 1e-9: return []
         Fs = N / total_t
-        mean_y = sum(ys) / N
-        ys_d = [v - mean_y for v in ys]
-        w = self._hann_win(N)
-        ys_w = [ys_d[i] * w[i] for i in range(N)]
         max_k = min(N // 2, 32)
-        comps = []
-        for k in range(1, max_k):
-            re = im = 0.0
-            for n in range(N):
-                ang = 2 * math.pi * k * n / N
-                re += ys_w[n] * math.cos(ang)
-                im -= ys_w[n] * math.sin(ang)
-            mag = math.hypot(re, im) / N
-            freq = k * Fs / N
-            if mag > 1e-9: comps.append((mag, freq, k))
-        if not comps: return []
-        mags = [m for m, f, _ in comps]
-        maxm = max(mags)
-        medm = self._median(mags) if mags else 0.0
-        res = []
-        for m, f, k in comps[:5]:
-            if m > 1e-6 and (m > 0.2 * maxm or m > medm * 2):
-                res.append((m, f))
+        mag = np.abs(np.fft.rfft((ys - ys.mean()) * self._hann_win(N))[1:max_k]) / N
+        k = np.arange(1, max_k)
+        keep = mag > 1e-9
+        if not keep.any(): return []
+        mags = mag[keep]
+        maxm = float(mags.max())
+        medm = float(np.median(mags))
+        comps = zip(mags[:5].tolist(), (k[keep][:5] * Fs / N).tolist())
+        res = [(m, f) for m, f in comps if m > 1e-6 and (m > 0.2 * maxm or m > medm * 2)]
         return res[:2]
 
     def _estimate_period_from_crossings(self, crossings: List[float]) -> float:
@@ -293,89 +355,92 @@ class Plotter:
         intervals = [crossings[i] - crossings[i - 1] for i in range(1, len(crossings))]
         return sum(intervals) / len(intervals) * 2 if intervals else float('inf')
 
+
     def _hann_win(self, n):
-        return [0.5 - 0.5 * math.cos(2 * math.pi * i / (n - 1)) for i in range(n)] if n > 1 else [1.0]
+        return np.hanning(n) if n > 1 else np.ones(1)
 
     def _median(self, arr):
         a = sorted(arr)
         m = len(a) // 2
         return (a[m] if len(a) % 2 == 1 else 0.5 * (a[m - 1] + a[m])) if a else 0.0
 
+
     def _autocorr_period(self, xs, ys):
-        n = len(ys)
+        y = np.asarray(ys, dtype=np.float64)
+        n = len(y)
         if n < 16 or not self.enable_osc_analysis: return float('inf'), 0.0
-        mean_y = sum(ys) / n
-        y = [v - mean_y for v in ys]
+        y = y - y.mean()
         max_lag = min(n // 4, 64)
-        ac = [0.0] * (max_lag + 1)
-        den = sum(v * v for v in y) + 1e-12
-        for lag in range(1, max_lag + 1):
-            num = sum(y[i] * y[i + lag] for i in range(n - lag))
-            ac[lag] = num / den
-        if not ac[1:]: return float('inf'), 0.0
-        mx = max(ac[1:])
+        den = float(np.dot(y, y)) + 1e-12
+        ac = np.zeros(max_lag + 1)
+        ac[1:] = np.correlate(y, y, 'full')[n:n + max_lag] / den
+        mx = float(ac[1:].max())
         if mx <= 0.05: return float('inf'), mx
-        peak_lag = None
-        for i in range(2, len(ac) - 1):
-            if ac[i] > ac[i - 1] and ac[i] >= ac[i + 1] and ac[i] > 0.3 * mx:
-                peak_lag = i
-                break
-        if peak_lag is None:
-            peak_lag = 1 + ac[1:].index(mx)
-        diffs = [xs[i + 1] - xs[i] for i in range(len(xs) - 1)] if len(xs) > 1 else [1.0]
-        dt_med = self._median([abs(d) for d in diffs]) if diffs else 1.0
-        scale = 1.0
-        if dt_med > 1.0: scale = 0.001
-        period = peak_lag * dt_med * scale
-        return period, mx
+        i = np.arange(2, len(ac) - 1)
+        hit = np.flatnonzero((ac[i] > ac[i - 1]) & (ac[i] >= ac[i + 1]) & (ac[i] > 0.3 * mx))
+        peak_lag = int(i[hit[0]]) if len(hit) else 1 + int(np.argmax(ac[1:]))
+        dt_med = self._dt_median(xs)
+        scale = 0.001 if dt_med > 1.0 else 1.0
+        return peak_lag * dt_med * scale, mx
 
     def _estimate_amplitude_and_decay(self, ys, xs):
+        ys = np.asarray(ys, dtype=np.float64)
+        xs = np.asarray(xs, dtype=np.float64)
         if len(ys) < 8 or not self.enable_osc_analysis: return 0.0, 0.0
-        pks, tr = self._find_extrema([y - sum(ys) / len(ys) for y in ys])
-        ext = [(i, abs(ys[i]), xs[i]) for i, _ in pks + tr]
-        if len(ext) < 2:
-            mean_amp = sum(abs(v) for v in ys) / len(ys)
-            return mean_amp, 0.0
-        ext.sort()
-        diffs = [xs[i + 1] - xs[i] for i in range(len(xs) - 1)] if len(xs) > 1 else [1.0]
-        dt_med = self._median([abs(d) for d in diffs]) if diffs else 1.0
-        scale = 1.0
-        if dt_med > 1.0: scale = 0.001
-        tvals = [t * scale for _, _, t in ext]
-        amps = [a for _, a, _ in ext if a > 1e-9]
-        if len(amps) < 2: return sum(amps) / len(amps) if amps else 0.0, 0.0
-        lnamps = [math.log(a) for a in amps if a > 1e-9]
-        if len(lnamps) < 2: return sum(amps) / len(amps), 0.0
-        n = len(lnamps)
-        xs_lr = tvals[:n]
-        sumx = sum(xs_lr)
-        sumy = sum(lnamps)
-        sumxy = sum(x * y for x, y in zip(xs_lr, lnamps))
-        sumx2 = sum(x * x for x in xs_lr)
+        pks, tr = self._find_extrema(ys - ys.mean())
+        idx = np.array(sorted(i for i, _ in pks + tr), dtype=np.int64)
+        if len(idx) < 2: return float(np.abs(ys).mean()), 0.0
+        scale = 0.001 if self._dt_median(xs) > 1.0 else 1.0
+        tvals = xs[idx] * scale
+        amps = np.abs(ys[idx])
+        amps = amps[amps > 1e-9]
+        if len(amps) < 2: return (float(amps.mean()) if len(amps) else 0.0), 0.0
+        n = len(amps)
+        lnamps = np.log(amps)
+        t = tvals[:n]
+        sumx, sumy = float(t.sum()), float(lnamps.sum())
+        sumxy, sumx2 = float(np.dot(t, lnamps)), float(np.dot(t, t))
+        mean_amp = float(amps.mean())
         denom = n * sumx2 - sumx * sumx
-        if abs(denom) < 1e-12: return sum(amps) / len(amps), 0.0
+        if abs(denom) < 1e-12: return mean_amp, 0.0
         b = (n * sumxy - sumx * sumy) / denom
-        decay = -b if b < 0 else 0.0
-        mean_amp = sum(amps) / len(amps)
-        return mean_amp, decay
+        return mean_amp, (-b if b < 0 else 0.0)
+
+    def _series_analysis(self, key: str) -> Dict:
+        """Centred samples and extrema of a series; zero crossings and oscillation stats are
+        filled in on first use. Recomputed only when the series' data changed."""
+        buf = self.data[key]
+        hit = self._analysis.get(key)
+        if hit is not None and hit[0] == buf.version: return hit[1]
+        xs, ys = buf.arrays()
+        base = float(ys.mean()) if len(ys) else 0.0
+        ys_c = ys - base
+        pks, trs = self._find_extrema(ys_c)
+        res = {"base": base, "ys_c": ys_c, "peaks": pks, "troughs": trs, "crossings": None, "stats": None}
+        self._analysis[key] = (buf.version, res)
+        return res
+
+    def _crossings(self, key: str) -> List[float]:
+        a = self._series_analysis(key)
+        if a["crossings"] is None:
+            a["crossings"] = self._detect_zero_crossings(a["ys_c"], self.data[key].arrays()[0])
+        return a["crossings"]
 
     def get_oscillation_stats(self, key):
         if not self.enable_osc_analysis or key not in self.data or len(self.data[key]) < 16:
             return {"valid": False}
-        ys = list(self.data[key])
-        xs = list(self.x_data[key])
-        if len(xs) != len(ys) or len(xs) < 16: return {"valid": False}
-        diffs = [xs[i + 1] - xs[i] for i in range(len(xs) - 1)] if len(xs) > 1 else [1.0]
-        dt_med = self._median([abs(d) for d in diffs]) if diffs else 1.0
-        scale = 1.0
-        if dt_med > 1.0: scale = 0.001
-        xs_s = [x * scale for x in xs]
-        base = sum(ys) / len(ys)
-        ys_c = [y - base for y in ys]
-        crossings = self._detect_zero_crossings(ys_c, xs) if self.enable_osc_analysis else []
-        pks, tr = self._find_extrema(ys_c)
-        peak_count = len(pks)
-        trough_count = len(tr)
+        a = self._series_analysis(key)
+        if a["stats"] is None:
+            a["stats"] = self._compute_oscillation_stats(key, a)
+        return a["stats"]
+
+    def _compute_oscillation_stats(self, key, a):
+        xs, _ = self.data[key].arrays()
+        dt_med = self._dt_median(xs)
+        ys_c = a["ys_c"]
+        crossings = self._crossings(key)
+        peak_count = len(a["peaks"])
+        trough_count = len(a["troughs"])
         if peak_count + trough_count < self.min_extrema_for_osc: return {"valid": False}
         per_cross = self._estimate_period_from_crossings(crossings) if crossings else float('inf')
         per_auto, acf_conf = self._autocorr_period(xs, ys_c)
@@ -405,7 +470,6 @@ class Plotter:
     def _get_cached_osc_stats(self, key: str) -> Dict[str, float]:
         if not self.enable_osc_analysis:
             return {"valid": False}
-        self._frame_counter += 1
         current_stats = self.get_oscillation_stats(key)
         if current_stats["valid"]:
             self._osc_cache[key] = (current_stats, self._frame_counter)
@@ -446,10 +510,8 @@ class Plotter:
             rect.move_ip(fx, fy)
             self._extrema_labels.append({"value": pts[idx][1], "x": fx, "y": fy, "rect": rect, "txt": lbl})
 
-    def _render_zero_crossings(self, ys_centered: List[float], xs: List[float],
-                               x_min: float, x_max: float, y_zero: float) -> None:
+    def _render_zero_crossings(self, crossings: List[float], x_min: float, x_max: float, y_zero: float) -> None:
         if not self.enable_osc_analysis: return
-        crossings = self._detect_zero_crossings(ys_centered, xs)
         x_range = x_max - x_min or 1.0
         w = self.surface_size[0] - self.MARGIN_LEFT
         for xc in crossings:
@@ -457,25 +519,17 @@ class Plotter:
             x = self.MARGIN_LEFT + t * w
             pygame.draw.line(self.surface, self.ZERO_COLOR, (x, y_zero - 7), (x, y_zero + 7), width=2)
 
-    def _render_decay_envelope(self, pts: List[Tuple[float, float]], ys_centered: List[float],
-                               xs: List[float], decay: float, mean_amp: float) -> None:
-        if not self.enable_osc_analysis or decay <= 1e-6 or not pts: return
-        y_max_abs = max(abs(y) for y in ys_centered)
+    def _render_decay_envelope(self, pts: np.ndarray, ys_centered: np.ndarray,
+                               xs: np.ndarray, decay: float, mean_amp: float) -> None:
+        if not self.enable_osc_analysis or decay <= 1e-6 or not len(pts): return
+        y_max_abs = float(np.abs(ys_centered).max())
         if y_max_abs < 1e-6: return
-        color = self.ENVELOPE_COLOR
-        t0 = xs[0]
-        env_pts = []
-        neg_env_pts = []
-        for (px, py), x in zip(pts, xs):
-            amp_t = mean_amp * math.exp(-decay * (x - t0))
-            ratio = amp_t / y_max_abs
-            env_y = py - ratio * (py - self.MARGIN_TOP)
-            neg_env_y = py + ratio * (py - self.MARGIN_TOP)
-            env_pts.append((px, env_y))
-            neg_env_pts.append((px, neg_env_y))
-        if len(env_pts) > 1:
-            pygame.draw.lines(self.surface, color, False, env_pts, width=2)
-            pygame.draw.lines(self.surface, color, False, neg_env_pts, width=2)
+        if len(pts) < 2: return
+        ratio = mean_amp * np.exp(-decay * (xs - xs[0])) / y_max_abs
+        px, py = pts[:, 0], pts[:, 1]
+        off = ratio * (py - self.MARGIN_TOP)
+        pygame.draw.lines(self.surface, self.ENVELOPE_COLOR, False, np.column_stack((px, py - off)).tolist(), width=2)
+        pygame.draw.lines(self.surface, self.ENVELOPE_COLOR, False, np.column_stack((px, py + off)).tolist(), width=2)
 
     def _render_spectrum(self, stats: Dict[str, float], y_pos: int) -> None:
         if not self.enable_osc_analysis or not stats.get("spectrum"): return
@@ -493,116 +547,182 @@ class Plotter:
             txt = self.font.render(f"{freq:.1f}Hz", True, self.TEXT_COLOR)
             self.surface.blit(txt, (x - txt.get_width() // 2 + bar_w // 2, y_pos + 22))
 
-    def _render_overlay_mode(self, keys: List[str]) -> None:
-        all_vals = [v for k in keys for v in self.data[k]]
-        all_x = [x for k in keys for x in self.x_data[k]]
-        if not all_vals:
-            self._render_no_data()
-            return
-        global_min = min(all_vals)
-        global_max = max(all_vals)
-        y_min, y_max = self._get_padded_range(global_min, global_max)
-        y_range = y_max - y_min or 1.0
-        h = self.surface_size[1] - self.MARGIN_TOP - self.MARGIN_BOTTOM
+    def _to_screen(self, xs: np.ndarray, ys: np.ndarray, x_min: float, x_range: float,
+                   band: Tuple[float, float, float, float]) -> np.ndarray:
+        top, height, draw_min, draw_max = band
         w = self.surface_size[0] - self.MARGIN_LEFT
-        x_min = x_max = 0.0
-        if all_x:
-            x_min_raw, x_max_raw = min(all_x), max(all_x)
-            x_min, x_max = self._get_padded_range(x_min_raw, x_max_raw)
-            x_range = x_max - x_min or 1.0
-        smoothed_key = 'overlay'
+        return np.column_stack((self.MARGIN_LEFT + (xs - x_min) / x_range * w,
+                                top + (draw_max - ys) / (draw_max - draw_min or 1.0) * height))
+
+    @staticmethod
+    def _band_close(band, cached) -> bool:
+        if cached is None or band[0] != cached[0] or band[1] != cached[1]: return False
+        px = cached[1] / (cached[3] - cached[2] or 1.0)
+        return abs(band[2] - cached[2]) * px <= 0.5 and abs(band[3] - cached[3]) * px <= 0.5
+
+    def _draw_traces(self, keys: List[str], x_min: float, x_range: float,
+                     bands: Dict[str, Tuple[float, float, float, float]]):
+        """Draws the series polylines into a persistent layer and returns the mapping
+        (x_min, x_range, bands) it was drawn with; the caller blits `self._layer`.
+        While the axes stay within half a pixel the layer is scrolled by the x shift and
+        only samples appended since the last call are drawn; otherwise it is redrawn,
+        with min/max decimation when a series has more samples than pixel columns."""
+        size = tuple(self.surface_size)
+        w = size[0] - self.MARGIN_LEFT
+        if self._layer is None or self._layer.get_size() != size:
+            self._layer = pygame.Surface(size, pygame.SRCALPHA)
+            self._layer_key = None
+        layer = self._layer
+        series = {k: self.data[k].arrays() for k in keys}
+        mono = {k: len(xs) < 2 or not (np.diff(xs) < 0).any() for k, (xs, _) in series.items()}
+        struct = (size, self.overlay_mode, tuple(keys))
+        m = self._layer_map
+        reuse = self._layer_key == struct and m is not None and w > 0 and all(mono.values())
+        if reuse:
+            cx_min, cx_range, cbands = m
+            reuse = (abs(x_range - cx_range) / cx_range * w <= 1.0
+                     and all(self._band_close(bands[k], cbands.get(k)) for k in keys))
+        if reuse:
+            shift = int(round((x_min - cx_min) / cx_range * w))
+            cx_min += shift * cx_range / w
+            reuse = 0 <= shift < w
+        if reuse:
+            # отсчёты, вытесненные из кольца, стираем по самому старому x; если у какого-то
+            # ряда вытесненное лежит правее этой границы - стереть нельзя, перерисовываем
+            firsts = [xs[0] for xs, _ in series.values() if len(xs)]
+            bx = self.MARGIN_LEFT + ((min(firsts) if firsts else cx_min) - cx_min) / cx_range * w
+            for k in keys:
+                buf, xs = self.data[k], series[k][0]
+                if len(xs) and buf.count == buf.capacity and self.MARGIN_LEFT + (xs[0] - cx_min) / cx_range * w > bx + 1:
+                    reuse = False
+                    break
+        if not reuse:
+            layer.fill((0, 0, 0, 0))
+            for k in keys:
+                xs, ys = series[k]
+                pts = self._to_screen(xs, ys, x_min, x_range, bands[k])
+                if mono[k]:
+                    pts = np.column_stack(_decimate(pts[:, 0], pts[:, 1], w))
+                if len(pts) > 1:
+                    pygame.draw.aalines(layer, self._get_color(k), False, pts.tolist())
+                self._drawn[k] = self.data[k].version
+            self._layer_key = struct
+            self._layer_map = (x_min, x_range, dict(bands))
+            return self._layer_map
+        if shift:
+            layer.scroll(-shift, 0)
+            layer.fill((0, 0, 0, 0), (size[0] - shift, 0, shift, size[1]))
+        if bx > 0:
+            layer.fill((0, 0, 0, 0), (0, 0, int(bx), size[1]))
+        for k in keys:
+            buf = self.data[k]
+            new = buf.version - self._drawn.get(k, 0)
+            if new <= 0: continue
+            xs, ys = series[k]
+            tail = min(len(xs), new + 1)
+            pts = self._to_screen(xs[-tail:], ys[-tail:], cx_min, cx_range, cbands[k])
+            pts = np.column_stack(_decimate(pts[:, 0], pts[:, 1], w))
+            if len(pts) > 1:
+                pygame.draw.aalines(layer, self._get_color(k), False, pts.tolist())
+            self._drawn[k] = buf.version
+        self._layer_map = (cx_min, cx_range, cbands)
+        return self._layer_map
+
+    def _smoothed(self, smoothed_key: str, y_min: float, y_max: float) -> Tuple[float, float]:
         self._smoothed_range.setdefault(smoothed_key, (y_min, y_max))
         old_min, old_max = self._smoothed_range[smoothed_key]
         new_min = old_min + (y_min - old_min) * self.smoothing_factor
         new_max = old_max + (y_max - old_max) * self.smoothing_factor
         self._smoothed_range[smoothed_key] = (new_min, new_max)
-        draw_min, draw_max = new_min, new_max
+        return new_min, new_max
+
+    def _x_extent(self, keys: List[str]) -> Tuple[float, float]:
+        xs = [self.data[k].arrays()[0] for k in keys if len(self.data[k])]
+        return self._get_padded_range(min(float(a.min()) for a in xs), max(float(a.max()) for a in xs))
+
+    def _render_series_overlays(self, key: str, pts: np.ndarray, x_min: float, x_max: float,
+                                base_line_y: float, spectrum_y: Optional[int] = None) -> None:
+        a = self._series_analysis(key)
+        if a["peaks"] or a["troughs"]:
+            self._render_extrema_markers(pts, key, a["peaks"], a["troughs"])
+        stats = self._get_cached_osc_stats(key)
+        if stats["valid"]:
+            xs = self.data[key].arrays()[0]
+            self._render_zero_crossings(self._crossings(key), x_min, x_max, base_line_y)
+            self._render_decay_envelope(pts, a["ys_c"], xs, stats["decay_rate"], stats["mean_amplitude"])
+            if spectrum_y is not None:
+                self._render_spectrum(stats, spectrum_y)
+
+    def _render_overlay_mode(self, keys: List[str]) -> None:
+        live = [k for k in keys if len(self.data[k])]
+        if not live:
+            self._render_no_data()
+            return
+        ys_all = [self.data[k].arrays()[1] for k in live]
+        y_min, y_max = self._get_padded_range(min(float(a.min()) for a in ys_all), max(float(a.max()) for a in ys_all))
+        h = self.surface_size[1] - self.MARGIN_TOP - self.MARGIN_BOTTOM
+        x_min, x_max = self._x_extent(live)
+        draw_min, draw_max = self._smoothed('overlay', y_min, y_max)
+        bands = {k: (self.MARGIN_TOP, h, draw_min, draw_max) for k in live}
+        x_min, x_range, bands = self._draw_traces(live, x_min, x_max - x_min or 1.0, bands)
+        x_max = x_min + x_range
+        _, _, draw_min, draw_max = bands[live[0]]
         draw_range = draw_max - draw_min or 1.0
-        base_line_y = self.MARGIN_TOP + (new_max - 0.0) / draw_range * h if draw_range else self.MARGIN_TOP
+        base_line_y = self.MARGIN_TOP + (draw_max - 0.0) / draw_range * h if draw_range else self.MARGIN_TOP
         pygame.draw.line(self.surface, self.ZERO_COLOR, (self.MARGIN_LEFT, base_line_y),
                          (self.surface_size[0], base_line_y), width=1)
-        for key in keys:
-            ys = list(self.data[key])
-            xs = list(self.x_data[key])
-            if not ys or not xs: continue
-            col = self._get_color(key)
-            pts = [(self.MARGIN_LEFT + (xs[i] - x_min) / x_range * w,
-                    self.MARGIN_TOP + (draw_max - ys[i]) / draw_range * h) for i in range(len(ys))]
-            if len(pts) > 1:
-                pygame.draw.aalines(self.surface, col, False, pts)
-            if pts:
-                pygame.draw.circle(self.surface, col, (int(pts[-1][0]), int(pts[-1][1])), 3)
-            if not self.enable_osc_analysis:
-                continue
-            base = sum(ys) / len(ys)
-            ys_centered = [y - base for y in ys]
-            pks, trs = self._find_extrema(ys_centered)
-            if pks or trs:
-                self._render_extrema_markers(pts, key, pks, trs)
-            stats = self._get_cached_osc_stats(key)
-            if stats["valid"]:
-                self._render_zero_crossings(ys_centered, xs, x_min, x_max, base_line_y)
-                self._render_decay_envelope(pts, ys_centered, xs, stats["decay_rate"], stats["mean_amplitude"])
-        self._draw_labels_overlay(keys)
+        self.surface.blit(self._layer, (0, 0))
+        for key in live:
+            xs, ys = self.data[key].arrays()
+            pts = self._to_screen(xs, ys, x_min, x_range, bands[key])
+            pygame.draw.circle(self.surface, self._get_color(key), (int(pts[-1][0]), int(pts[-1][1])), 3)
+            if self.enable_osc_analysis:
+                self._render_series_overlays(key, pts, x_min, x_max, base_line_y)
+        self._draw_labels_overlay(live)
         self._draw_grid_range(draw_min, draw_max)
         self._draw_x_axis_labels(x_min, x_max)
         self._render_extrema_labels()
 
     def _render_split_mode(self, keys: List[str]) -> None:
-        w = self.surface_size[0] - self.MARGIN_LEFT
         total_h = self.surface_size[1] - self.MARGIN_TOP - self.MARGIN_BOTTOM
         bar_h = total_h / len(keys) if keys else 0
-        all_x = [x for k in keys for x in self.x_data[k]]
-        x_min = x_max = 0.0
-        if all_x:
-            x_min_raw, x_max_raw = min(all_x), max(all_x)
-            x_min, x_max = self._get_padded_range(x_min_raw, x_max_raw)
-            x_range = x_max - x_min or 1.0
+        live = [k for k in keys if len(self.data[k])]
+        if live:
+            x_min, x_max = self._x_extent(live)
+            bands = {}
+            for i, key in enumerate(keys):
+                if key not in live: continue
+                ys = self.data[key].arrays()[1]
+                y_min, y_max = self._get_padded_range(float(ys.min()), float(ys.max()))
+                draw_min, draw_max = self._smoothed(f"bar_{key}", y_min, y_max)
+                bands[key] = (self.MARGIN_TOP + i * bar_h, bar_h * 0.8, draw_min, draw_max)
+            x_min, x_range, bands = self._draw_traces(live, x_min, x_max - x_min or 1.0, bands)
+            x_max = x_min + x_range
+            self.surface.blit(self._layer, (0, 0))
         for i, key in enumerate(keys):
-            ys = list(self.data[key])
-            xs = list(self.x_data[key])
-            if not ys or not xs: continue
+            if key not in live: continue
+            xs, ys = self.data[key].arrays()
             col = self._get_color(key)
-            y0 = self.MARGIN_TOP + i * bar_h
-            local_min = min(ys)
-            local_max = max(ys)
-            y_min, y_max = self._get_padded_range(local_min, local_max)
-            y_range = y_max - y_min or 1.0
-            scale_h = bar_h * 0.8
-            smoothed_key = f"bar_{key}"
-            self._smoothed_range.setdefault(smoothed_key, (y_min, y_max))
-            old_min, old_max = self._smoothed_range[smoothed_key]
-            new_min = old_min + (y_min - old_min) * self.smoothing_factor
-            new_max = old_max + (y_max - old_max) * self.smoothing_factor
-            self._smoothed_range[smoothed_key] = (new_min, new_max)
-            draw_min, draw_max = new_min, new_max
-            draw_range = draw_max - draw_min or 1.0
-            pts = [(self.MARGIN_LEFT + (xs[j] - x_min) / x_range * w,
-                    y0 + (draw_max - ys[j]) / draw_range * scale_h) for j in range(len(ys))]
-            if len(pts) > 1:
-                pygame.draw.aalines(self.surface, col, False, pts)
-            if pts:
-                pygame.draw.circle(self.surface, col, (int(pts[-1][0]), int(pts[-1][1])), 3)
-            if not self.enable_osc_analysis:
-                self._draw_label_split(key, ys, col, y0)
-                continue
-            base = sum(ys) / len(ys)
-            ys_centered = [y - base for y in ys]
-            pks, trs = self._find_extrema(ys_centered)
-            if pks or trs:
-                self._render_extrema_markers(pts, key, pks, trs)
-            stats = self._get_cached_osc_stats(key)
-            if stats["valid"]:
+            y0, scale_h, draw_min, draw_max = bands[key]
+            pts = self._to_screen(xs, ys, x_min, x_range, bands[key])
+            pygame.draw.circle(self.surface, col, (int(pts[-1][0]), int(pts[-1][1])), 3)
+            if self.enable_osc_analysis:
                 base_line_y = y0 + (draw_max - 0.0) / (draw_max - draw_min or 1) * scale_h
-                self._render_zero_crossings(ys_centered, xs, x_min, x_max, base_line_y)
-                self._render_decay_envelope(pts, ys_centered, xs, stats["decay_rate"], stats["mean_amplitude"])
-                self._render_spectrum(stats, int(y0 + bar_h - 25))
+                self._render_series_overlays(key, pts, x_min, x_max, base_line_y, int(y0 + bar_h - 25))
             self._draw_label_split(key, ys, col, y0)
         for i in range(len(keys) + 1):
             y = self.MARGIN_TOP + i * bar_h
             pygame.draw.line(self.surface, self.DIVIDER_COLOR, (0, y), (self.surface_size[0], y), width=2)
         self._render_extrema_labels()
 
+    def _text(self, txt: str, color: Tuple[int, int, int]) -> pygame.Surface:
+        key = (txt, color)
+        surf = self._text_cache.get(key)
+        if surf is None:
+            if len(self._text_cache) > 512: self._text_cache.clear()
+            surf = self._text_cache[key] = self.font.render(txt, True, color)
+        return surf
+
     def _compute_grid_steps(self, axis_length: int) -> int:
         step_px = self.BASE_GRID_PIXEL_STEP * self.grid_density
         return max(1, int(axis_length / step_px))
@@ -628,14 +748,14 @@ class Plotter:
                 txt = f"{x_val:.4f}".rstrip('0').rstrip('.')
                 if '.' not in txt and abs(x_val) < 1000:
                     txt = str(int(round(x_val)))
-            lbl = self.font.render(txt, True, self.TEXT_COLOR)
+            lbl = self._text(txt, self.TEXT_COLOR)
             self.surface.blit(lbl, (x - lbl.get_width() // 2, self.surface_size[1] - self.MARGIN_BOTTOM // 2))
 
     def _draw_labels_overlay(self, keys: List[str]) -> None:
         y_offset = self.LABEL_Y_OFFSET
         for i, key in enumerate(keys):
-            ys = self.data[key]
-            avg = sum(ys) / len(ys)
+            ys = self.data[key].arrays()[1]
+            avg = float(ys.mean())
             txt = f"{key} [{self.groups.get(key, 'ungrouped')}]: {ys[-1]:.2f} Avg: {avg:.2f}"
             lbl = self.font.render(txt, True, self._get_color(key))
             bg = pygame.Surface(lbl.get_size())
@@ -677,11 +797,11 @@ class Plotter:
                 txt = f"{y_val:.4f}".rstrip('0').rstrip('.')
                 if '.' not in txt and abs(y_val) < 1000:
                     txt = str(int(round(y_val)))
-            lbl = self.font.render(txt, True, self.TEXT_COLOR)
+            lbl = self._text(txt, self.TEXT_COLOR)
             self.surface.blit(lbl, (self.surface_size[0] - self.GRID_LABEL_X_OFFSET, y - 10))
 
-    def _draw_label_split(self, key: str, vals: collections.deque, col: Tuple[int, int, int], y0: float) -> None:
-        avg = sum(vals) / len(vals)
+    def _draw_label_split(self, key: str, vals: np.ndarray, col: Tuple[int, int, int], y0: float) -> None:
+        avg = float(vals.mean())
         txt = f"{key} [{self.groups.get(key, 'ungrouped')}]: {vals[-1]:.1f} Avg: {avg:.1f}"
         lbl = self.font.render(txt, True, col)
         bg = pygame.Surface(lbl.get_size())
@@ -806,6 +926,7 @@ class Plotter:
             self.surface.blit(surf, (0, 0))
 
     def get_surface(self) -> pygame.Surface:
+        self._frame_counter += 1
         self.surface.fill(self.BG_COLOR)
         keys = self._get_filtered_keys()
         if not keys:
@@ -822,24 +943,20 @@ class Plotter:
         if self._hovered_key is not None and self._hovered_x is not None:
             w = self.surface_size[0] - self.MARGIN_LEFT
             h = self.surface_size[1] - self.MARGIN_TOP - self.MARGIN_BOTTOM
-            all_vals = [v for k in keys for v in self.data[k]]
-            all_x = [x for k in keys for x in self.x_data[k]]
-            if all_vals and all_x:
-                global_min = min(all_vals)
-                global_max = max(all_vals)
-                y_min, y_max = self._get_padded_range(global_min, global_max)
+            live = [k for k in keys if len(self.data[k])]
+            if live:
+                ys_all = [self.data[k].arrays()[1] for k in live]
+                y_min, y_max = self._get_padded_range(min(float(a.min()) for a in ys_all), max(float(a.max()) for a in ys_all))
                 draw_min, draw_max = self._smoothed_range.get('overlay', (y_min, y_max))
                 draw_range = draw_max - draw_min or 1.0
-                x_min_raw, x_max_raw = min(all_x), max(all_x)
-                x_min, x_max = self._get_padded_range(x_min_raw, x_max_raw)
+                x_min, x_max = self._x_extent(live)
                 x_range = x_max - x_min or 1.0
                 t = (self._hovered_x - x_min) / x_range
                 x = self.MARGIN_LEFT + t * w
                 pygame.draw.line(self.surface, (255, 255, 255, 180), (x, self.MARGIN_TOP),
                                  (x, self.surface_size[1] - self.MARGIN_BOTTOM), width=1)
                 if self._hovered_idx is not None:
-                    ys = list(self.data[self._hovered_key])
-                    xs = list(self.x_data[self._hovered_key])
+                    xs, ys = self.data[self._hovered_key].arrays()
                     start_idx = max(0, self._hovered_idx - 5)
                     pts = [(self.MARGIN_LEFT + (xs[i] - x_min) / x_range * w,
                             self.MARGIN_TOP + (ys[i] - draw_min) / draw_range * h) for i in
@@ -895,41 +1012,37 @@ class Plotter:
             1] - self.MARGIN_BOTTOM:
             self._hovered_key = None
             return
-        all_vals = [v for k in keys for v in self.data[k]]
-        all_x = [x for k in keys for x in self.x_data[k]]
-        if not all_vals or not all_x or len(all_vals) < 16: return
-        global_min = min(all_vals)
-        global_max = max(all_vals)
-        y_min, y_max = self._get_padded_range(global_min, global_max)
+        live = [k for k in keys if len(self.data[k])]
+        if sum(len(self.data[k]) for k in live) < 16: return
+        ys_all = [self.data[k].arrays()[1] for k in live]
+        y_min, y_max = self._get_padded_range(min(float(a.min()) for a in ys_all), max(float(a.max()) for a in ys_all))
         draw_min, draw_max = self._smoothed_range.get('overlay', (y_min, y_max))
         draw_range = draw_max - draw_min or 1.0
-        x_min_raw, x_max_raw = min(all_x), max(all_x)
-        x_min, x_max = self._get_padded_range(x_min_raw, x_max_raw)
+        x_min, x_max = self._x_extent(live)
         x_range = x_max - x_min or 1.0
         best_dist = float('inf')
         best_key = best_info = best_x = best_y = None
         best_idx = None
-        for key in keys:
-            ys = list(self.data[key])
-            xs = list(self.x_data[key])
-            if len(ys) < 16 or len(xs) < 16: continue
-            pts = [(self.MARGIN_LEFT + (xs[i] - x_min) / x_range * w,
-                    self.MARGIN_TOP + (ys[i] - draw_min) / draw_range * h) for i in range(len(ys))]
-            for i, (px, py) in enumerate(pts):
-                dist = math.hypot(mx - px, my - py)
-                if dist < 12 and dist < best_dist:
-                    best_dist = dist
-                    best_key = key
-                    best_x = xs[i]
-                    best_y = ys[i]
-                    best_idx = i
-                    info = self._compute_local_stats(xs, ys, i)
-                    osc = self._get_cached_osc_stats(key) if self.enable_osc_analysis else {}
-                    info["osc_stats"] = osc if osc.get("valid") else None
-                    info["value"] = ys[i]
-                    info["x"] = xs[i]
-                    info["index"] = i
-                    best_info = info
+        for key in live:
+            xs, ys = self.data[key].arrays()
+            if len(ys) < 16: continue
+            d = np.hypot(mx - (self.MARGIN_LEFT + (xs - x_min) / x_range * w),
+                         my - (self.MARGIN_TOP + (ys - draw_min) / draw_range * h))
+            i = int(np.argmin(d))
+            if d[i] < 12 and d[i] < best_dist:
+                best_dist = float(d[i])
+                best_key = key
+                best_x = float(xs[i])
+                best_y = float(ys[i])
+                best_idx = i
+        if best_key is not None:
+            xs, ys = (a.tolist() for a in self.data[best_key].arrays())
+            best_info = self._compute_local_stats(xs, ys, best_idx)
+            osc = self._get_cached_osc_stats(best_key)
+            best_info["osc_stats"] = osc if osc.get("valid") else None
+            best_info["value"] = ys[best_idx]
+            best_info["x"] = xs[best_idx]
+            best_info["index"] = best_idx
         self._hovered_key = best_key
         self._hovered_info = best_info
         self._hovered_x = best_x
@@ -938,8 +1051,7 @@ class Plotter:
         self._hovered_area = 0.0
         if best_key and best_idx is not None:
             col = self._get_color(best_key)
-            xs = list(self.x_data[best_key])
-            ys = list(self.data[best_key])
+            xs, ys = (a.tolist() for a in self.data[best_key].arrays())
             if len(xs) < 2 or len(ys) < 2: return
             x = xs[best_idx]
             y = ys[best_idx]
@@ -975,33 +1087,33 @@ class Plotter:
         w = self.surface_size[0] - self.MARGIN_LEFT
         total_h = self.surface_size[1] - self.MARGIN_TOP - self.MARGIN_BOTTOM
         bar_h = total_h / len(keys) if keys else 0
-        all_x = [x for k in keys for x in self.x_data[k]]
-        if not all_x: return
-        x_min_raw, x_max_raw = min(all_x), max(all_x)
-        x_min, x_max = self._get_padded_range(x_min_raw, x_max_raw)
+        live = [k for k in keys if len(self.data[k])]
+        if not live: return
+        x_min, x_max = self._x_extent(live)
         x_range = x_max - x_min or 1.0
         best_dist = float('inf')
-        best_key = best_info = None
+        best_key = best_j = None
         for i, key in enumerate(keys):
-            ys = list(self.data[key])
-            xs = list(self.x_data[key])
-            if not ys or not xs: continue
+            if key not in live: continue
+            xs, ys = self.data[key].arrays()
             y0 = self.MARGIN_TOP + i * bar_h
-            local_min = min(ys)
-            local_max = max(ys)
-            y_min, y_max = self._get_padded_range(local_min, local_max)
+            y_min, y_max = self._get_padded_range(float(ys.min()), float(ys.max()))
             draw_min, draw_max = self._smoothed_range.get(f"bar_{key}", (y_min, y_max))
             draw_range = draw_max - draw_min or 1.0
             scale_h = bar_h * 0.8
-            pts = [(self.MARGIN_LEFT + (xs[j] - x_min) / x_range * w,
-                    y0 + (draw_max - ys[j]) / draw_range * scale_h) for j in range(len(ys))]
-            for j, (px, py) in enumerate(pts):
-                dist = self._point_distance((mx, my), (px, py))
-                if dist < 12 and dist < best_dist:
-                    best_dist = dist
-                    best_key = key
-                    best_info = self._compute_local_stats(xs, ys, j)
-                    stats = self._get_cached_osc_stats(key)
-                    best_info["osc_stats"] = stats if stats.get("valid") else None
+            # то же смещение, что в _point_distance
+            d = np.hypot(mx - (self.MARGIN_LEFT + (xs - x_min) / x_range * w) - 17,
+                         my - (y0 + (draw_max - ys) / draw_range * scale_h) - 50)
+            j = int(np.argmin(d))
+            if d[j] < 12 and d[j] < best_dist:
+                best_dist = float(d[j])
+                best_key = key
+                best_j = j
+        best_info = None
+        if best_key is not None:
+            xs, ys = (a.tolist() for a in self.data[best_key].arrays())
+            best_info = self._compute_local_stats(xs, ys, best_j)
+            stats = self._get_cached_osc_stats(best_key)
+            best_info["osc_stats"] = stats if stats.get("valid") else None
         self._hovered_key = best_key
         self._hovered_info = best_info
\ No newline at end of file
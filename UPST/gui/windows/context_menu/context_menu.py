@@ -167,7 +167,9 @@ class ContextMenu(ContextMenuHandlers):
                     if event.ui_element == self._rename_ok:
                         new_name = self._rename_entry.get_text().strip()
                         if new_name:
+                            old_name = getattr(self.clicked_object, 'name', None)
                             self.clicked_object.name = new_name
+                            self.app.physics_manager.spatial_index.on_renamed(self.clicked_object, old_name)
                             get_undo_redo().take_snapshot()
                         self._rename_win.kill()
                         return True
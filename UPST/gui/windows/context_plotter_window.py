@@ -352,8 +352,8 @@ class ContextPlotterWindow:
             root.destroy()
             if not fp: return
             key = f"{self.current_y_axis} / {self.current_x_axis}"
-            xs = self.plotter.x_data.get(key, [])
-            ys = self.plotter.data.get(key, [])
+            buf = self.plotter.data.get(key)
+            xs, ys = buf.arrays() if buf is not None else ([], [])
             with open(fp, 'w', newline='') as f:
                 wr = csv.writer(f)
                 wr.writerow([self.current_x_axis, self.current_y_axis])
@@ -9,6 +9,7 @@ import pymunk
 from math import isfinite
 
 from UPST.modules.undo_redo_manager import get_undo_redo
+from UPST.physics.body_buffer import geometry_changed
 
 
 class PropertiesWindow:
@@ -388,6 +389,7 @@ class PropertiesWindow:
                 shape = self._get_shape_by_index(idx)
                 if isinstance(shape, pymunk.Circle):
                     shape.unsafe_set_radius(val)
+                    geometry_changed()
                     self._update_moment_preview()
             elif key.startswith("shape_") and key.endswith('_offset_x'):
                 idx = int(key.split('_')[1])
@@ -396,6 +398,7 @@ class PropertiesWindow:
                 shape = self._get_shape_by_index(idx)
                 if isinstance(shape, pymunk.Circle):
                     shape.offset = pymunk.Vec2d(ox, oy)
+                    geometry_changed()
             elif key.startswith("shape_") and key.endswith('_offset_y'):
                 idx = int(key.split('_')[1])
                 oy = self._safe_float(text, 0.0)
@@ -403,6 +406,7 @@ class PropertiesWindow:
                 shape = self._get_shape_by_index(idx)
                 if isinstance(shape, pymunk.Circle):
                     shape.offset = pymunk.Vec2d(ox, oy)
+                    geometry_changed()
             elif key.startswith("shape_") and key.endswith('_collision_entry'):
                 idx = int(key.split('_')[1])
                 ct = int(self._safe_float(text, 0))
@@ -546,6 +550,7 @@ class PropertiesWindow:
                 shape = self._get_shape_by_index(idx)
                 if isinstance(shape, pymunk.Circle):
                     shape.unsafe_set_radius(val)
+                    geometry_changed()
             if key.endswith('_offset_x') or key.endswith('_offset_y'):
                 pass
 
@@ -1,4 +1,4 @@
-import pickle
+import os
 import threading
 
 import pygame
@@ -7,6 +7,8 @@ from pygame_gui.elements import UIWindow, UIButton, UIPanel, UILabel, UIProgress
     UITextEntryBox, UIImage
 from UPST.utils.utils import surface_to_bytes, bytes_to_surface
 from UPST.debug.debug_manager import Debug
+from UPST.utils.serialization import read_save_file
+from UPST.modules.save_load_manager import SaveLoadManager
 
 
 
@@ -166,9 +168,26 @@ class RepositoryWindow(UIWindow):
                 except Exception as e:
                     Debug.log(f"Preview decode failed for idx {idx}: {e}")
             threading.Thread(target=_load_preview, daemon=True).start()
+        elif (fp := self._cached_scene(item)):
+            def _read_cached_preview():
+                # у уже скачанной сцены превью берётся из заголовка контейнера, мир не распаковывается
+                try:
+                    _, surf = SaveLoadManager.read_save_info(fp)
+                    surf = pygame.transform.smoothscale(surf, (128, 128)) if surf else self._default_preview()
+                    pygame.event.post(pygame.event.Event(REPO_PREVIEW_READY_EVENT, {"index": idx, "surface": surf}))
+                except Exception as e:
+                    Debug.log(f"Cached preview read failed for idx {idx}: {e}")
+            threading.Thread(target=_read_cached_preview, daemon=True).start()
         else:
             self._set_preview(idx, self._default_preview())
 
+    def _cached_scene(self, item):
+        try:
+            fp = self.app.repository_manager.local_path(str(item.get("id", "")))
+        except ValueError:
+            return None
+        return fp if os.path.isfile(fp) else None
+
     def _default_preview(self):
         surf = pygame.Surface((128, 128))
         surf.fill((40, 40, 40))
@@ -217,9 +236,7 @@ class RepositoryWindow(UIWindow):
         try:
             self.status.set_text("Downloading...")
             fp = self.app.repository_manager.download(item["id"], item["title"], self._update_progress)
-            with open(fp, "rb") as f:
-                data = pickle.load(f)
-            scene_data = dict(data)
+            scene_data = dict(read_save_file(fp, safe=True))
             meta = scene_data.pop("_repo_meta", {})
             self.app.save_load_manager._apply_loaded_data(scene_data)
             self.app.current_scene_meta = meta
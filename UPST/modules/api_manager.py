@@ -5,14 +5,28 @@ from UPST.debug.debug_manager import Debug
 from UPST.physics import physics_manager
 from UPST.physics.physics_manager import PhysicsManager
 from UPST.scripting import script_manager
+import functools
 import math
 import random
 
 
+def _serialized(method):
+    """Runs the method through worker.call: with physics on its own thread the space is
+    only touched on the worker or under its lock (same as PhysicsManager)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        worker = getattr(self.physics_manager, 'worker', None)
+        if worker is None:
+            return method(self, *args, **kwargs)
+        return worker.call(method, self, *args, **kwargs)
+    return wrapper
+
+
 class APIManager:
-    def __init__(self, space, script_manager):
+    def __init__(self, space, script_manager, physics=None):
         self.space = space
         self.script_manager = script_manager
+        self.physics_manager = physics
         self.static_body = space.static_body
         self.theme = config.world.themes.get(config.world.current_theme, {})
         self.static_lines = []
@@ -45,6 +59,7 @@ class APIManager:
         self.static_lines.append(shape)
         return shape
 
+    @_serialized
     def create_box(self, pos=(0, 0), size=(1, 1), angle=0, mass=1.0, friction=0.7, elasticity=0.5,
                    color=None, name="Box", layer=1, group=0, sensor=False) -> pymunk.Body:
         w, h = size
@@ -58,6 +73,7 @@ class APIManager:
             self._sensors.add(shape)
         return self._create_dynamic_shape(body, shape, friction, elasticity, color)
 
+    @_serialized
     def create_circle(self, pos=(0, 0), radius=1.0, mass=1.0, friction=0.7, elasticity=0.5, color=None,
                       name="Circle", layer=1, group=0, sensor=False) -> pymunk.Body:
         body = pymunk.Body(mass, pymunk.moment_for_circle(mass, 0, radius), body_type=pymunk.Body.DYNAMIC)
@@ -69,6 +85,7 @@ class APIManager:
             self._sensors.add(shape)
         return self._create_dynamic_shape(body, shape, friction, elasticity, color)
 
+    @_serialized
     def create_polygon(self, pos=(0, 0), vertices=None, mass=1.0, friction=0.7, elasticity=0.5, color=None,
                        name="Polygon", layer=1, group=0, sensor=False) -> pymunk.Body:
         if vertices is None:
@@ -85,6 +102,7 @@ class APIManager:
 
     # ==================== STATIC SHAPES ====================
 
+    @_serialized
     def create_static_box(self, pos=(0, 0), size=(1, 1), angle=0, friction=0.7, elasticity=0.5, color=None,
                           name="StaticBox", layer=1, group=0) -> pymunk.Shape:
         w, h = size
@@ -93,12 +111,14 @@ class APIManager:
         shape.filter = pymunk.ShapeFilter(group=group, categories=layer, mask=layer)
         return self._create_static_shape(shape, friction, elasticity, color)
 
+    @_serialized
     def create_static_circle(self, pos=(0, 0), radius=1.0, friction=0.7, elasticity=0.5, color=None,
                              name="StaticCircle", layer=1, group=0) -> pymunk.Shape:
         shape = pymunk.Circle(self.static_body, radius, offset=pos)
         shape.filter = pymunk.ShapeFilter(group=group, categories=layer, mask=layer)
         return self._create_static_shape(shape, friction, elasticity, color)
 
+    @_serialized
     def create_static_segment(self, a=(0, 0), b=(1, 0), thickness=0.1, friction=0.7, elasticity=0.5, color=None,
                               name="StaticSegment", layer=1, group=0) -> pymunk.Shape:
         shape = pymunk.Segment(self.static_body, a, b, thickness)
@@ -107,6 +127,7 @@ class APIManager:
 
     # ==================== KINEMATIC BODIES ====================
 
+    @_serialized
     def create_kinematic_box(self, pos=(0, 0), size=(1, 1), angle=0, color=None, name="KinematicBox") -> pymunk.Body:
         w, h = size
         body = pymunk.Body(1, pymunk.moment_for_box(1, (w, h)), body_type=pymunk.Body.KINEMATIC)
@@ -119,12 +140,14 @@ class APIManager:
 
     # ==================== JOINTS AND CONSTRAINTS ====================
 
+    @_serialized
     def create_pin_joint(self, body_a: pymunk.Body, body_b: pymunk.Body,
                          anchor_a: Tuple[float, float], anchor_b: Tuple[float, float]) -> pymunk.Constraint:
         joint = pymunk.PinJoint(body_a, body_b, anchor_a, anchor_b)
         self.space.add(joint)
         return joint
 
+    @_serialized
     def create_slide_joint(self, body_a: pymunk.Body, body_b: pymunk.Body,
                            anchor_a: Tuple[float, float], anchor_b: Tuple[float, float],
                            min: float, max: float) -> pymunk.Constraint:
@@ -132,12 +155,14 @@ class APIManager:
         self.space.add(joint)
         return joint
 
+    @_serialized
     def create_pivot_joint(self, body_a: pymunk.Body, body_b: pymunk.Body,
                            anchor: Tuple[float, float]) -> pymunk.Constraint:
         joint = pymunk.PivotJoint(body_a, body_b, anchor)
         self.space.add(joint)
         return joint
 
+    @_serialized
     def create_spring(self, body_a: pymunk.Body, body_b: pymunk.Body,
                       anchor_a: Tuple[float, float], anchor_b: Tuple[float, float],
                       rest_length: float, stiffness: float, damping: float) -> pymunk.Constraint:
@@ -145,17 +170,20 @@ class APIManager:
         self.space.add(joint)
         return joint
 
+    @_serialized
     def create_motor(self, body_a: pymunk.Body, body_b: pymunk.Body, rate: float) -> pymunk.Constraint:
         joint = pymunk.SimpleMotor(body_a, body_b, rate)
         self.space.add(joint)
         return joint
 
+    @_serialized
     def remove_joint(self, joint: pymunk.Constraint):
         if joint in self.space.constraints:
             self.space.remove(joint)
 
     # ==================== COLLISION HANDLING ====================
 
+    @_serialized
     def add_collision_handler(self, collision_type_a: int, collision_type_b: int,
                               begin_func: Callable = None, pre_solve_func: Callable = None,
                               post_solve_func: Callable = None, separate_func: Callable = None):
@@ -185,11 +213,13 @@ class APIManager:
 
     # ==================== QUERY METHODS ====================
 
+    @_serialized
     def raycast(self, start: Tuple[float, float], end: Tuple[float, float],
                 radius: float = 0.0, shape_filter=None) -> Optional[pymunk.SegmentQueryInfo]:
         """Cast a ray and return first hit"""
         return self.space.segment_query_first(start, end, radius, shape_filter)
 
+    @_serialized
     def raycast_all(self, start: Tuple[float, float], end: Tuple[float, float],
                     radius: float = 0.0, shape_filter=None) -> List[pymunk.SegmentQueryInfo]:
         """Cast a ray and return all hits"""
@@ -202,11 +232,13 @@ class APIManager:
         self.space.segment_query(start, end, radius, shape_filter, query_func)
         return hits
 
+    @_serialized
     def point_query(self, point: Tuple[float, float], max_distance: float = 0.0,
                     shape_filter=None) -> Optional[pymunk.PointQueryInfo]:
         """Query nearest shape at point"""
         return self.space.point_query_nearest(point, max_distance, shape_filter)
 
+    @_serialized
     def point_query_all(self, point: Tuple[float, float], max_distance: float = 0.0,
                         shape_filter=None) -> List[pymunk.PointQueryInfo]:
         """Query all shapes at point"""
@@ -218,6 +250,7 @@ class APIManager:
         self.space.point_query(point, max_distance, shape_filter, query_func)
         return hits
 
+    @_serialized
     def aabb_query(self, bb: Tuple[float, float, float, float],
                    shape_filter=None) -> List[pymunk.Shape]:
         """Query shapes in bounding box"""
@@ -232,16 +265,19 @@ class APIManager:
 
     # ==================== FORCES AND IMPULSES ====================
 
+    @_serialized
     def apply_force(self, obj: pymunk.Body, force: Tuple[float, float],
                     point: Optional[Tuple[float, float]] = None):
         if isinstance(obj, pymunk.Body) and obj.body_type == pymunk.Body.DYNAMIC:
             obj.apply_force_at_world_point(force, point or obj.position)
 
+    @_serialized
     def apply_impulse(self, obj: pymunk.Body, impulse: Tuple[float, float],
                       point: Optional[Tuple[float, float]] = None):
         if isinstance(obj, pymunk.Body) and obj.body_type == pymunk.Body.DYNAMIC:
             obj.apply_impulse_at_world_point(impulse, point or obj.position)
 
+    @_serialized
     def apply_local_force(self, obj: pymunk.Body, force: Tuple[float, float],
                           point: Optional[Tuple[float, float]] = None):
         """Apply force in local coordinates"""
@@ -249,16 +285,19 @@ class APIManager:
             world_force = obj.rotation_vector.rotated(force)
             obj.apply_force_at_world_point(world_force, point or obj.position)
 
+    @_serialized
     def apply_torque(self, obj: pymunk.Body, torque: float):
         if isinstance(obj, pymunk.Body) and obj.body_type == pymunk.Body.DYNAMIC:
             obj.torque += torque
 
+    @_serialized
     def apply_angular_impulse(self, obj: pymunk.Body, impulse: float):
         if isinstance(obj, pymunk.Body) and obj.body_type == pymunk.Body.DYNAMIC:
             obj.angular_velocity += impulse / obj.moment
 
     # ==================== BODY MANIPULATION ====================
 
+    @_serialized
     def set_transform(self, obj: pymunk.Body, pos: Optional[Tuple[float, float]] = None,
                       angle: Optional[float] = None):
         if isinstance(obj, pymunk.Body):
@@ -269,14 +308,17 @@ class APIManager:
         else:
             Debug.log_warning("Transform set on non-body", "Scripting")
 
+    @_serialized
     def set_velocity(self, obj: pymunk.Body, velocity: Tuple[float, float]):
         if isinstance(obj, pymunk.Body):
             obj.velocity = velocity
 
+    @_serialized
     def set_angular_velocity(self, obj: pymunk.Body, omega: float):
         if isinstance(obj, pymunk.Body):
             obj.angular_velocity = omega
 
+    @_serialized
     def set_mass(self, obj: pymunk.Body, mass: float):
         if isinstance(obj, pymunk.Body):
             obj.mass = mass
@@ -329,6 +371,7 @@ class APIManager:
 
     # ==================== SPACE MANAGEMENT ====================
 
+    @_serialized
     def delete(self, obj: Union[pymunk.Body, pymunk.Shape, pymunk.Constraint]):
         if isinstance(obj, pymunk.Body):
             self._remove_body(obj)
@@ -339,6 +382,7 @@ class APIManager:
         else:
             Debug.log_error("Cannot delete non-physics object", "Scripting")
 
+    @_serialized
     def clear_all(self):
         """Clear all dynamic objects from space"""
         for body in list(self.space.bodies):
@@ -351,35 +395,49 @@ class APIManager:
 
         self.static_lines.clear()
 
+    @_serialized
     def get_all(self) -> List[Union[pymunk.Body, pymunk.Shape]]:
         return list(self.space.bodies) + list(self.space.shapes)
 
+    @_serialized
     def get_bodies(self) -> List[pymunk.Body]:
         return list(self.space.bodies)
 
+    @_serialized
     def get_shapes(self) -> List[pymunk.Shape]:
         return list(self.space.shapes)
 
+    @_serialized
     def get_joints(self) -> List[pymunk.Constraint]:
         return list(self.space.constraints)
 
     # ==================== SEARCH AND FILTER ====================
 
+    @_serialized
     def find_by_name(self, name: str) -> Optional[pymunk.Body]:
+        if self.physics_manager:
+            return self.physics_manager.spatial_index.find_by_name(name)
         for b in self.space.bodies:
             if getattr(b, 'name', None) == name:
                 return b
         return None
 
+    @_serialized
     def find_by_tag(self, tag: str) -> List[pymunk.Body]:
+        if self.physics_manager:
+            return self.physics_manager.spatial_index.find_by_tag(tag)
         return [b for b in self.space.bodies if hasattr(b, 'tags') and tag in b.tags]
 
+    @_serialized
     def find_by_type(self, shape_type: type) -> List[pymunk.Shape]:
         """Find all shapes of specific type"""
         return [s for s in self.space.shapes if isinstance(s, shape_type)]
 
+    @_serialized
     def find_in_radius(self, center: Tuple[float, float], radius: float) -> List[pymunk.Body]:
         """Find bodies within radius"""
+        if self.physics_manager:
+            return [b for b in self.physics_manager.bodies_in_radius(center, radius) if b != self.static_body]
         bodies = []
         for body in self.space.bodies:
             if body != self.static_body:
@@ -395,10 +453,14 @@ class APIManager:
         if not hasattr(obj, 'tags'):
             obj.tags = set()
         obj.tags.add(tag)
+        if self.physics_manager and isinstance(obj, pymunk.Body):
+            self.physics_manager.spatial_index.on_tag_added(obj, tag)
 
     def remove_tag(self, obj: Union[pymunk.Body, pymunk.Shape], tag: str):
         if hasattr(obj, 'tags'):
             obj.tags.discard(tag)
+            if self.physics_manager and isinstance(obj, pymunk.Body):
+                self.physics_manager.spatial_index.on_tag_removed(obj, tag)
 
     def has_tag(self, obj: Union[pymunk.Body, pymunk.Shape], tag: str) -> bool:
         return hasattr(obj, 'tags') and tag in obj.tags
@@ -458,25 +520,30 @@ class APIManager:
 
     # ==================== SIMULATION CONTROL ====================
 
+    @_serialized
     def pause_simulation(self):
         pm = self._find_physics_manager()
         if pm:
             pm.pause_physics()
 
+    @_serialized
     def resume_simulation(self):
         pm = self._find_physics_manager()
         if pm:
             pm.resume_physics()
 
+    @_serialized
     def set_simulation_speed(self, speed: float):
         pm = self._find_physics_manager()
         if pm:
             pm.set_simulation_speed_multiplier(speed)
 
+    @_serialized
     def get_simulation_time(self) -> float:
         pm = self._find_physics_manager()
         return pm.simulation_time if pm else 0.0
 
+    @_serialized
     def set_gravity(self, x: float, y: float):
         """Set gravity vector"""
         self.space.gravity = (x, y)
@@ -485,6 +552,7 @@ class APIManager:
         """Get current gravity vector"""
         return self.space.gravity
 
+    @_serialized
     def set_damping(self, damping: float):
         """Set space damping"""
         self.space.damping = damping
@@ -592,4 +660,4 @@ class APIManager:
             'constraints': len(self.space.constraints),
             'static_shapes': len(self.static_lines),
             'sensors': len(self._sensors)
-        }
\ No newline at end of file
+        }
@@ -1,11 +1,23 @@
 import os,random,time,math,pygame
+import numpy as np
+from collections import OrderedDict
 from pymunk import Vec2d
-from collections import deque
-from UPST.config import config
 from UPST.modules.profiler import profile
 
+# колонки строки облака в массиве ячейки
+_TEX,_BX,_BY,_DEPTH,_SCALE,_SPEED,_ANGLE,_PHASE,_SPAWN=range(9)
+_WHITE=(255,255,255)
+
 class CloudManager:
-    def __init__(self,folder="clouds",cell_size=2048,clouds_per_cell=6,seed=12345,scale_quant=0.05,scaled_cache_limit=400,max_px=512,fade_duration=0.0,discard_dist=8192,max_depth_cells=64):
+    """Procedural cloud field.
+
+    Clouds are generated per cell, lazily, when the cell enters the visible range; each cell
+    is a float array with one row per cloud. The rows of the visible range are concatenated
+    once per range change, so the per-frame placement is a single numpy pass.
+    Sprites are cached per texture, log-quantized scale, angle, alpha level and tint in an
+    O(1) LRU bounded by `cache_mb`; translucent clouds get pre-multiplied sprites instead
+    of a copy and fill every frame."""
+    def __init__(self,folder="clouds",cell_size=2048,clouds_per_cell=6,seed=12345,scale_quant=0.05,cache_mb=64.0,max_px=512,fade_duration=0.0,discard_dist=8192,max_depth_cells=64,alpha_levels=16):
         self.folder=folder
         self.cell_size=cell_size
         self.per_cell=clouds_per_cell
@@ -13,16 +25,20 @@ class CloudManager:
         self.textures=[]
         self.cells={}
         self.start_t=time.time()
-        self.scaled_tex_cache={}
-        self.scaled_order=deque()
+        self.sprites=OrderedDict()
+        self.sprite_bytes=0
+        self.cache_budget=int(cache_mb*1024*1024)
         self.scale_quant=scale_quant
-        self.cache_limit=scaled_cache_limit
+        self._log_q=math.log1p(max(1e-3,scale_quant))
+        self.alpha_levels=max(1,int(alpha_levels))
         self.max_px=max_px
         self.fade_duration=fade_duration
         self.physics_manager=None
         self.depth_layers={}
         self.discard_dist=discard_dist
         self.max_depth_cells=max_depth_cells
+        self._range=None
+        self._rows=np.zeros((0,9),dtype=np.float64)
         self._load_textures(folder)
 
     def set_physics_manager(self,physics_manager):
@@ -44,29 +60,34 @@ class CloudManager:
         self.folder=folder
         self._load_textures(folder)
         self.cells.clear()
-        self.scaled_tex_cache.clear()
-        self.scaled_order.clear()
+        self.clear_cache()
         self.depth_layers.clear()
+        self._range=None
+
+    def clear_cache(self):
+        self.sprites.clear()
+        self.sprite_bytes=0
 
     def _make_cell(self,cx,cy):
         seed_val=(cx*73856093)^(cy*19349663)^self.seed
         rnd=random.Random(seed_val)
         cs=self.cell_size
         base_x0=cx*cs
-        lst=[]
-        for _ in range(self.per_cell):
-            tx=rnd.choice(self.textures) if self.textures else None
+        n_tex=len(self.textures)
+        rows=np.zeros((self.per_cell,9),dtype=np.float64)
+        for i in range(self.per_cell):
+            # тот же порядок вызовов rnd, что и раньше - небо не меняется
+            ti=rnd.randrange(n_tex) if n_tex else -1
             rx=rnd.random()*cs
             ry=(rnd.random()-0.5)*cs
             depth=rnd.uniform(0.015,0.5)
             scale=rnd.uniform(1,2.6)
             base_speed=rnd.uniform(15.0,125.0)
-            angle=0.0
             phase=rnd.random()*1000.0
             spawn_time=time.time()-self.start_t
-            lst.append((tx,base_x0+rx,cy*cs+ry,depth,scale,base_speed,angle,phase,spawn_time))
-        self.cells[(cx,cy)]=lst
-        return lst
+            rows[i]=(ti,base_x0+rx,cy*cs+ry,depth,scale,base_speed,0.0,phase,spawn_time)
+        self.cells[(cx,cy)]=rows
+        return rows
 
     def _visible_cell_bounds(self,cam,sw,sh,margin=2):
         tl=cam.screen_to_world((0,0))
@@ -76,83 +97,110 @@ class CloudManager:
         cx1=int(math.floor(max(tl[0],br[0])/cs))+margin
         cam_scale=cam.scaling
         visible_height=sh/cam_scale
-        visible_width=sw/cam_scale
         max_cells_y=int(min(self.max_depth_cells, math.ceil(visible_height/cs)))+margin
         cy0=-max_cells_y
         cy1=+max_cells_y
         return cx0,cy0,cx1,cy1
 
-    def _discard_distant_cells(self,cam):
+    def _discard_distant_cells(self,cam,bounds):
+        # ячейки текущего диапазона не выбрасываем, иначе они пересоздаются каждый кадр
+        cx0,cy0,cx1,cy1=bounds
         cam_x,cam_y=cam.position
+        cs=self.cell_size
+        lim=self.discard_dist*self.discard_dist
         for key in list(self.cells.keys()):
             cx,cy=key
-            cell_x=cx*self.cell_size+self.cell_size/2
-            cell_y=cy*self.cell_size+self.cell_size/2
-            dx=cell_x-cam_x
-            dy=cell_y-cam_y
-            if dx*dx+dy*dy>self.discard_dist*self.discard_dist:
+            if cx0<=cx<=cx1 and cy0<=cy<=cy1: continue
+            dx=cx*cs+cs/2-cam_x
+            dy=cy*cs+cs/2-cam_y
+            if dx*dx+dy*dy>lim:
                 del self.cells[key]
 
+    def _rows_for(self,cam,bounds):
+        if bounds!=self._range:
+            cx0,cy0,cx1,cy1=bounds
+            parts=[]
+            for cx in range(cx0,cx1+1):
+                for cy in range(cy0,cy1+1):
+                    rows=self.cells.get((cx,cy))
+                    parts.append(self._make_cell(cx,cy) if rows is None else rows)
+            self._rows=np.concatenate(parts) if parts else np.zeros((0,9),dtype=np.float64)
+            self._range=bounds
+            self._discard_distant_cells(cam,bounds)
+        return self._rows
+
     def iter_visible_clouds(self,cam,sw,sh):
-        cx0,cy0,cx1,cy1=self._visible_cell_bounds(cam,sw,sh)
+        """Visible clouds back to front as (texture, screen_x, screen_y, depth, screen_scale, angle, alpha)."""
+        rows=self._rows_for(cam,self._visible_cell_bounds(cam,sw,sh))
+        if not len(rows) or not self.textures: return []
         t=time.time()-self.start_t
-        cs=self.cell_size
         fd=max(1e-6,float(self.fade_duration))
         sim_speed=1.0
         if self.physics_manager:
             base_freq=self.physics_manager.simulation_frequency
             sim_speed=(base_freq/60.0)*self.physics_manager.simulation_speed_multiplier if base_freq>0 else 1.0
-        visible_clouds=[]
         cam_x,cam_y=cam.position
         cam_scale=cam.scaling
-        screen_rect=pygame.Rect(0,0,sw,sh)
-        for cx in range(cx0,cx1+1):
-            for cy in range(cy0,cy1+1):
-                key=(cx,cy)
-                if key not in self.cells: self._make_cell(cx,cy)
-                lst=self.cells[key]
-                for tup in lst:
-                    tx,bx,by,depth,scale,base_speed,angle,phase,spawn_time=tup
-                    speed=base_speed*sim_speed
-                    elapsed=max(0.0,t-spawn_time)
-                    wx=bx+speed*elapsed
-                    wy=by
-                    raw=(t-spawn_time)/fd
-                    alpha=1.0 if raw!=raw else max(0.0,min(1.0,float(raw)))
-                    parallax_x=cam_x*(1.0-depth)
-                    parallax_y=cam_y*(1.0-depth)
-                    adjusted_wx=(wx-cam_x)*depth+parallax_x
-                    adjusted_wy=(wy-cam_y)*depth+parallax_y
-                    screen_pos=cam.world_to_screen((adjusted_wx,adjusted_wy))
-                    sx_proj=self.max_px*scale*cam_scale*depth
-                    if sx_proj<4: continue
-                    screen_rect_extended=screen_rect.inflate(sx_proj*2,sx_proj*2)
-                    if not screen_rect_extended.collidepoint(screen_pos): continue
-                    visible_clouds.append((tx,wx,wy,depth,scale,angle,alpha))
-        self._discard_distant_cells(cam)
-        return sorted(visible_clouds,key=lambda x:x[3])
-
-    def _evict_if_needed(self):
-        while len(self.scaled_order)>self.cache_limit:
-            old=self.scaled_order.popleft()
-            if old in self.scaled_tex_cache:
-                try:del self.scaled_tex_cache[old]
-                except KeyError:pass
-
-    def get_scaled_texture(self,tex,scale,angle=0.0,max_px=None):
+        depth=rows[:,_DEPTH]
+        age=t-rows[:,_SPAWN]
+        wx=rows[:,_BX]+rows[:,_SPEED]*sim_speed*np.maximum(0.0,age)
+        ax=(wx-cam_x)*depth+cam_x*(1.0-depth)
+        ay=(rows[:,_BY]-cam_y)*depth+cam_y*(1.0-depth)
+        tr=cam.translation
+        sx=(ax-tr.tx)*cam_scale+cam._cx
+        sy=cam._cy-(ay-tr.ty)*cam_scale
+        scale=rows[:,_SCALE]*cam_scale*depth
+        ext=self.max_px*scale
+        vis=(ext>=4)&(rows[:,_TEX]>=0)&(sx>=-ext)&(sx<sw+ext)&(sy>=-ext)&(sy<sh+ext)
+        idx=np.flatnonzero(vis)
+        if not len(idx): return []
+        idx=idx[np.argsort(depth[idx],kind='stable')]
+        alpha=np.clip(age[idx]/fd,0.0,1.0)
+        tex=self.textures
+        return [(tex[int(ti)%len(tex)],x,y,d,s,a,al) for ti,x,y,d,s,a,al in zip(
+            rows[idx,_TEX].tolist(),sx[idx].tolist(),sy[idx].tolist(),depth[idx].tolist(),
+            scale[idx].tolist(),rows[idx,_ANGLE].tolist(),alpha.tolist())]
+
+    def _cache_get(self,key):
+        hit=self.sprites.get(key)
+        if hit is None: return None
+        self.sprites.move_to_end(key)
+        return hit[0]
+
+    def _cache_put(self,key,surf):
+        size=surf.get_width()*surf.get_height()*surf.get_bytesize()
+        self.sprites[key]=(surf,size)
+        self.sprite_bytes+=size
+        while self.sprite_bytes>self.cache_budget and len(self.sprites)>1:
+            _,(_,freed)=self.sprites.popitem(last=False)
+            self.sprite_bytes-=freed
+        return surf
+
+    def quantize_scale(self,scale):
+        if scale<=0: return 0.0
+        lq=self._log_q
+        return round(math.exp(round(math.log(scale)/lq)*lq),4)
+
+    def get_scaled_texture(self,tex,scale,angle=0.0,max_px=None,alpha=255,tint=_WHITE):
+        """Scaled (and rotated) sprite with `alpha` and `tint` already multiplied in."""
         if not tex: return None
         if max_px is None:max_px=self.max_px
-        q=self.scale_quant
-        scale_q=round(scale/q)*q
+        scale_q=self.quantize_scale(scale)
         if scale_q<=0: return None
         a=0.0 if abs(angle)<0.01 else round(angle,1)
-        key=(id(tex),round(scale_q,3),a)
-        st=self.scaled_tex_cache.get(key)
-        if st is not None:
-            try:self.scaled_order.remove(key)
-            except ValueError:pass
-            self.scaled_order.append(key)
-            return st
+        step=255.0/self.alpha_levels
+        a_q=max(0,min(255,int(round(round(alpha/step)*step))))
+        if a_q==0: return None
+        tint=tuple(tint[:3])
+        key=(id(tex),scale_q,a,max_px,a_q,tint)
+        st=self._cache_get(key)
+        if st is not None: return st
+        if a_q<255 or tint!=_WHITE:
+            base=self.get_scaled_texture(tex,scale,angle,max_px)
+            if base is None: return None
+            s=base.copy()
+            s.fill((*tint,a_q),special_flags=pygame.BLEND_RGBA_MULT)
+            return self._cache_put(key,s)
         w,h=tex.get_size()
         w_new=min(int(w*scale_q),max_px)
         h_new=min(int(h*scale_q),max_px)
@@ -164,51 +212,34 @@ class CloudManager:
                 s=tex
             else:
                 s=pygame.transform.smoothscale(tex,(w_new,h_new))
-        self.scaled_tex_cache[key]=s
-        self.scaled_order.append(key)
-        if len(self.scaled_order)>self.cache_limit:
-            self._evict_if_needed()
-        return s
+        return self._cache_put(key,s)
 
 
 class CloudRenderer:
-    def __init__(self,screen,camera,clouds:CloudManager,min_px=32):
+    def __init__(self,screen,camera,clouds:CloudManager,min_px=32,tint=_WHITE):
         self.screen=screen
         self.camera=camera
         self.clouds=clouds
         self.min_px=min_px
+        self.tint=tint
 
     @profile("Cloud Renderer","Renderer")
     def draw(self):
-        sw,sh=config.app.screen_width,config.app.screen_height
-        cam_pos=self.camera.position
-        cam_scale=max(0.01,self.camera.scaling)
+        sw,sh=self.screen.get_size()
         get_tex=self.clouds.get_scaled_texture
-        cam_w2s=self.camera.world_to_screen
-        visible_clouds=self.clouds.iter_visible_clouds(self.camera,sw,sh)
-        for tx,wx,wy,depth,scale,angle,alpha in visible_clouds:
-            if not tx: continue
-            final_scale=scale*cam_scale*depth
+        max_px=self.clouds.max_px
+        blits=[]
+        for tx,screen_x,screen_y,depth,final_scale,angle,alpha in self.clouds.iter_visible_clouds(self.camera,sw,sh):
             w,h=tx.get_size()
             if w*final_scale<self.min_px or h*final_scale<self.min_px: continue
-            parallax_x=cam_pos[0]*(1.0-depth)
-            parallax_y=cam_pos[1]*(1.0-depth)
-            adjusted_wx=(wx-cam_pos[0])*depth+parallax_x
-            adjusted_wy=(wy-cam_pos[1])*depth+parallax_y
-            screen_pos=cam_w2s((adjusted_wx,adjusted_wy))
-            screen_x,screen_y=screen_pos
-            s=get_tex(tx,final_scale,angle,max_px=self.clouds.max_px)
+            a_int=int(round(255.0*alpha))
+            if a_int<=0: continue
+            s=get_tex(tx,final_scale,angle,max_px=max_px,alpha=a_int,tint=self.tint)
             if not s: continue
             sx,sy=s.get_size()
-            a_val=float(alpha) if not math.isnan(alpha) else 1.0
-            a_int=max(0,min(255,int(round(255.0*a_val))))
-            if a_int==0: continue
             adjusted_x=screen_x-sx*0.5
             adjusted_y=screen_y-sy*0.5
             if adjusted_x+sx<0 or adjusted_x>sw or adjusted_y+sy<0 or adjusted_y>sh: continue
-            if a_int>=255:
-                self.screen.blit(s,(adjusted_x,adjusted_y))
-            else:
-                temp=s.copy()
-                temp.fill((255,255,255,a_int),special_flags=pygame.BLEND_RGBA_MULT)
-                self.screen.blit(temp,(adjusted_x,adjusted_y))
\ No newline at end of file
+            blits.append((s,(adjusted_x,adjusted_y)))
+        if blits:
+            self.screen.blits(blits,doreturn=False)
@@ -6,6 +6,7 @@ from typing import Dict, Callable, Any
 
 from UPST.config import config
 from UPST.modules.graph_manager import GraphManager
+from UPST.modules.profiler import get_profiler
 
 
 class ConsoleHandler:
@@ -24,6 +25,7 @@ class ConsoleHandler:
             'eval': self._cmd_eval,
             'python': self._cmd_python,
             'graph': self._cmd_graph,
+            'profile': self._cmd_profile,
         }
         self._plugin_help: Dict[str, str] = {}
 
@@ -80,6 +82,7 @@ class ConsoleHandler:
             output.append("eval <expr>     - Evaluate Python expression")
             output.append("python          - Start external Python interpreter")
             output.append("graph <expr>    - Plot mathematical expression (e.g. 'x**2 + sin(x)')")
+            output.append("profile export <file> [sec] - Export profiler trace (.json) or flame stacks")
             if self._plugin_commands:
                 output.append("\n=== Plugin Commands ===")
                 for cmd in sorted(self._plugin_commands.keys()):
@@ -94,7 +97,9 @@ class ConsoleHandler:
                     'exec': "exec <code>     - Execute arbitrary Python statements",
                     'eval': "eval <expr>     - Evaluate a Python expression and print result",
                     'python': "python          - Launch an external interactive Python shell",
-                    'graph': "graph <expr>    - Plot a 2D graph of the given expression (use 'x' as variable)"
+                    'graph': "graph <expr>    - Plot a 2D graph of the given expression (use 'x' as variable)",
+                    'profile': "profile export <file> [sec] - Write the last [sec] seconds of profiler spans: "
+                               "*.json as Chrome Trace Event format, other names as collapsed stacks"
                 }
                 output.append(help_map.get(cmd, f"{cmd} - No detailed help available"))
             elif cmd in self._plugin_commands:
@@ -121,6 +126,19 @@ class ConsoleHandler:
     def _cmd_graph(self, expr: str):
         self.graph_manager.handle_graph_command(expr)
 
+    def _cmd_profile(self, args: str):
+        log = self.ui_manager.console_ui.console_window.add_output_line_to_log
+        parts = args.split()
+        profiler = get_profiler()
+        if not profiler or len(parts) < 2 or parts[0] != 'export':
+            log("Usage: profile export <file.json|file.txt> [seconds]")
+            return
+        try:
+            seconds = float(parts[2]) if len(parts) > 2 else None
+            log(f"Profile written to {profiler.export(parts[1], seconds)}")
+        except Exception as e:
+            log(f"Profile export error: {e}")
+
     def draw_graph(self):
         self.graph_manager.draw_graph()
 
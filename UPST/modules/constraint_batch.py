@@ -0,0 +1,226 @@
+# UPST/modules/constraint_batch.py
+from collections import OrderedDict
+
+import pymunk
+import pygame
+import pygame.gfxdraw
+import numpy as np
+
+from UPST.config import config
+from UPST.modules.shape_batch import transform_points, PoseReader
+
+_I16_MIN, _I16_MAX = -32768, 32767
+_DRAWN = (pymunk.DampedSpring, pymunk.PinJoint, pymunk.SlideJoint, pymunk.PivotJoint)
+
+
+def _length_bucket(length):
+    """Strip length rounded to a power-of-two step of about 1/32..1/64 of itself (at least
+    2 px), so an oscillating spring cycles through a few cached strips instead of one per pixel."""
+    step = 1 << max(1, int(length).bit_length() - 6)
+    return max(1, int(round(length / step)) * step)
+
+
+class ConstraintBatch:
+    """Batched drawing of springs and joints for Renderer.
+
+    Body indices are packed once per constraint list; per frame anchor offsets are
+    re-read together with body poses (PoseReader), every anchor goes through one camera
+    transform and constraints are culled by their screen AABB against the view rect. Textured springs are drawn as one strip sprite each: the
+    tinted tile (per colour, thickness and zoom bucket) and the rotated strip (per
+    segment count, length bucket and rotation bucket) live across frames in an LRU bounded
+    by `budget_bytes`, so a resting spring costs a single blit."""
+
+    def __init__(self, renderer, budget_mb=32.0, rotation_step=1.0):
+        self.renderer = renderer
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.step = max(0.01, float(rotation_step))
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._constraints = None
+        self.poses = PoseReader()
+        self._build([])
+
+    def invalidate(self):
+        self._constraints = None
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def _get(self, key):
+        hit = self.entries.get(key)
+        if hit is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return hit[0]
+
+    def _put(self, key, surf):
+        size = surf.get_width() * surf.get_height() * surf.get_bytesize()
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self.entries[key] = (surf, size)
+        self.nbytes += size
+        while self.nbytes > self.budget and len(self.entries) > 1:
+            _, (_, freed) = self.entries.popitem(last=False)
+            self.nbytes -= freed
+        return surf
+
+    def _build(self, constraints):
+        items, bodies, body_idx, owner = [], [], {}, []
+        for c in constraints:
+            if not isinstance(c, _DRAWN):
+                continue
+            items.append(c)
+            for body in (c.a, c.b):
+                i = body_idx.get(body)
+                if i is None:
+                    i = body_idx[body] = len(bodies)
+                    bodies.append(body)
+                owner.append(i)
+        self._constraints = list(constraints)
+        self.items, self.bodies = items, bodies
+        self.is_spring = np.array([isinstance(c, pymunk.DampedSpring) for c in items], dtype=np.bool_)
+        # строки 2k и 2k+1 - якоря a и b k-й связи
+        self.owner = np.array(owner, dtype=np.int64)
+        self.local = np.zeros((len(owner), 2), dtype=np.float64)
+        self.screen_pts = np.zeros((len(owner), 2), dtype=np.float64)
+
+    def _sync(self, constraints):
+        constraints = list(constraints)
+        if self._constraints is None or constraints != self._constraints:
+            self._build(constraints)
+
+    def _poses(self, worker):
+        pos, ang = self.poses.read(worker, self.bodies)
+        # якоря читаются каждый кадр: правка anchor_a/anchor_b не меняет список связей
+        local = self.local
+        for k, c in enumerate(self.items):
+            a, b = c.anchor_a, c.anchor_b
+            local[2 * k, 0] = a.x
+            local[2 * k, 1] = a.y
+            local[2 * k + 1, 0] = b.x
+            local[2 * k + 1, 1] = b.y
+        return pos, ang
+
+    def _tile(self, path, zoom_h, tile_h, rgb):
+        """Spring texture at a zoom bucket and thickness, tinted once."""
+        key = ('tile', path, zoom_h, tile_h, rgb)
+        surf = self._get(key)
+        if surf is None:
+            base = self.renderer._get_texture(path)
+            if not base: return None
+            if base.get_height() != zoom_h:
+                base = pygame.transform.smoothscale(base, (base.get_width(), zoom_h))
+            surf = pygame.transform.smoothscale(base, (base.get_width(), tile_h))
+            surf.fill((*rgb, 255), special_flags=pygame.BLEND_RGBA_MULT)
+            self._put(key, surf)
+        return surf
+
+    def _strip(self, path, zoom_h, tile_h, rgb, segments, length, bucket):
+        key = ('strip', path, zoom_h, tile_h, rgb, segments, length, bucket)
+        surf = self._get(key)
+        if surf is None:
+            tile = self._tile(path, zoom_h, tile_h, rgb)
+            if tile is None: return None
+            seg_w = max(1, int(round(length / segments)))
+            seg = pygame.transform.smoothscale(tile, (seg_w, tile_h))
+            strip = pygame.Surface((seg_w * segments, tile_h), pygame.SRCALPHA)
+            strip.blits([(seg, (i * seg_w, 0)) for i in range(segments)], doreturn=False)
+            if seg_w * segments != length:
+                strip = pygame.transform.smoothscale(strip, (length, tile_h))
+            surf = pygame.transform.rotate(strip, bucket * self.step) if bucket else strip
+            self._put(key, surf)
+        return surf
+
+    def _anchor(self, path, scale):
+        key = ('anchor', path, round(scale, 3))
+        surf = self._get(key)
+        if surf is None:
+            base = self.renderer._get_texture(path)
+            if not base: return None
+            size = (int(base.get_width() * scale), int(base.get_height() * scale))
+            if size[0] <= 0 or size[1] <= 0: return None
+            surf = self._put(key, pygame.transform.smoothscale(base, size) if scale != 1.0 else base)
+        return surf
+
+    def draw(self, screen, camera):
+        s = float(camera.scaling)
+        if s > 100: return
+        pm = self.renderer.physics_manager
+        with pm.worker.hold():
+            constraints = list(pm.space.constraints)
+        self._sync(constraints)
+        items = self.items
+        if not items: return
+        pos, ang = self._poses(pm.worker)
+        transform_points(self.local, self.owner, pos, np.cos(ang), np.sin(ang), s,
+                         float(camera.translation.tx), float(camera.translation.ty),
+                         float(camera._cx), float(camera._cy), self.screen_pts)
+        pa, pb = self.screen_pts[0::2], self.screen_pts[1::2]
+        n = len(items)
+        hidden = np.fromiter((getattr(c, 'hidden', False) for c in items), dtype=np.bool_, count=n)
+        size = np.fromiter((getattr(c, 'size', 10.0) for c in items), dtype=np.float64, count=n)
+        sw, sh = screen.get_size()
+        pad = np.maximum(size * 2.0 * s, 8.0)
+        vis = (~hidden & np.isfinite(pa).all(axis=1) & np.isfinite(pb).all(axis=1)
+               & (np.maximum(pa[:, 0], pb[:, 0]) + pad >= 0) & (np.minimum(pa[:, 0], pb[:, 0]) - pad <= sw)
+               & (np.maximum(pa[:, 1], pb[:, 1]) + pad >= 0) & (np.minimum(pa[:, 1], pb[:, 1]) - pad <= sh))
+        idx = np.flatnonzero(vis)
+        if not len(idx): return
+        ia = np.clip(np.rint(pa[idx]), _I16_MIN, _I16_MAX).astype(np.int64).tolist()
+        ib = np.clip(np.rint(pb[idx]), _I16_MIN, _I16_MAX).astype(np.int64).tolist()
+        d = pb[idx] - pa[idx]
+        scr_len = np.hypot(d[:, 0], d[:, 1])
+        angle = np.degrees(np.arctan2(d[:, 1], d[:, 0]))
+        mid = (pa[idx] + pb[idx]) * 0.5
+
+        rc = config.rendering
+        theme = config.world.themes[config.world.current_theme]
+        default_color = (*getattr(theme, 'constraint_color', (200, 200, 255)), 200)
+        spring_path = getattr(rc, 'spring_texture', '')
+        segmented = bool(spring_path) and getattr(rc, 'spring_texture_segmented', True)
+        tile_world_width = getattr(rc, 'spring_texture_tile_world_width', 20.0)
+        base_tex = self.renderer._get_texture(spring_path) if segmented else None
+        zoom_h = max(1, int(base_tex.get_height() * s / 15)) if base_tex else 0
+        anchor_paths = (getattr(rc, 'spring_point_a_texture', ''), getattr(rc, 'spring_point_b_texture', ''))
+        buckets = int(round(360.0 / self.step))
+        blits, anchors = [], []
+        for j, k in enumerate(idx.tolist()):
+            c = items[k]
+            color = getattr(c, 'color', default_color)
+            if len(color) == 3: color = (*color, 200)
+            rgb = tuple(color[:3])
+            visual_size = size[k]
+            if base_tex is not None and self.is_spring[k]:
+                rest_len = c.rest_length
+                if rest_len <= 0.1 or scr_len[j] <= 0.1 * s or scr_len[j] < 0.5: continue
+                length = _length_bucket(scr_len[j])
+                segments = max(1, int(round(rest_len / tile_world_width)))
+                tile_h = max(1, int(visual_size * zoom_h / 10))
+                bucket = int(round(-angle[j] / self.step)) % buckets
+                sprite = self._strip(spring_path, zoom_h, tile_h, rgb, segments, length, bucket)
+                if sprite is not None:
+                    w, h = sprite.get_size()
+                    blits.append((sprite, (int(mid[j, 0] - w // 2), int(mid[j, 1] - h // 2))))
+            else:
+                if blits:
+                    screen.blits(blits, doreturn=False)
+                    blits = []
+                pygame.draw.line(screen, rgb, ia[j], ib[j], max(1, int(visual_size * 2 * s)))
+            anchors.append((j, color, visual_size))
+        if blits:
+            screen.blits(blits, doreturn=False)
+
+        for j, color, visual_size in anchors:
+            for (x, y), path in ((ia[j], anchor_paths[0]), (ib[j], anchor_paths[1])):
+                if path:
+                    tex = self._anchor(path, 0.1 * s * (visual_size / 5))
+                    if tex: screen.blit(tex, (x - tex.get_width() // 2, y - tex.get_height() // 2))
+                else:
+                    r = max(1, int(s))
+                    pygame.gfxdraw.filled_circle(screen, x, y, r, color)
+                    pygame.gfxdraw.aacircle(screen, x, y, r, (50, 50, 50))
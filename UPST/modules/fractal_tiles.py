@@ -0,0 +1,175 @@
+# UPST/modules/fractal_tiles.py
+import math
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from UPST.config import config
+from UPST.modules.taichi_kernels import _taichi_compute_fractal, _taichi_compute_fractal_deepzoom, np_f
+
+_LEVELS_PER_OCTAVE = 4
+_COARSE_LEVELS = 2 * _LEVELS_PER_OCTAVE  # грубый слой: пиксель в 4 раза крупнее
+_REF_BLOCK = 8  # тайлы одного блока 8x8 делят одну опорную орбиту
+
+
+class FractalTileCache:
+    """Tiled, progressively refined escape-time renderer for GraphManager.
+
+    The plane is cut into square tiles of `tile_px` pixels on a quarter-octave zoom ladder;
+    a tile is keyed by (fractal params, level, tx, ty) and kept in an LRU bounded by
+    `budget_bytes`. Each frame the coarse layer (4x larger pixels) covering the view is
+    computed in full, then fine tiles closest to the centre are computed until the frame
+    budget runs out; missing fine tiles are drawn from the upscaled coarse layer. Panning
+    and zooming only compute tiles that were not seen before. Deep-zoom tiles reuse one
+    reference orbit per block of tiles."""
+
+    def __init__(self, manager):
+        self.manager = manager
+        rc = config.rendering
+        self.tile_px = max(16, int(rc.fractal_tile_px) // 4 * 4)
+        self.budget = int(rc.fractal_cache_mb * 1024 * 1024)
+        self.frame_budget = rc.fractal_frame_budget_ms / 1000.0
+        self.tiles = OrderedDict()
+        self.orbits = OrderedDict()
+        self.nbytes = 0
+        self.pending = 0
+        self._canvas = None
+        self._arr = np.zeros((self.tile_px, self.tile_px, 3), dtype=np.uint8)
+
+    def clear(self):
+        self.tiles.clear()
+        self.orbits.clear()
+        self.nbytes = 0
+        self.pending = 0
+
+    def _put(self, key, surf):
+        size = surf.get_width() * surf.get_height() * surf.get_bytesize()
+        self.tiles[key] = (surf, size)
+        self.nbytes += size
+        while self.nbytes > self.budget and len(self.tiles) > 1:
+            _, (_, freed) = self.tiles.popitem(last=False)
+            self.nbytes -= freed
+
+    def _get(self, key):
+        hit = self.tiles.get(key)
+        if hit is None:
+            return None
+        self.tiles.move_to_end(key)
+        return hit[0]
+
+    def _orbit(self, params, level, tx, ty, ps):
+        name, max_iter, esc, c = params[:4]
+        bx, by = tx // _REF_BLOCK, ty // _REF_BLOCK
+        key = (params, level, bx, by)
+        hit = self.orbits.get(key)
+        if hit is not None:
+            self.orbits.move_to_end(key)
+            return hit
+        span = _REF_BLOCK * self.tile_px * ps
+        x0, y0 = bx * span, by * span
+        m = self.manager
+        rx, ry = m._select_reference_point(name, x0, x0 + span, y0, y0 + span, max_iter, esc, c)
+        rx, ry = np_f(rx), np_f(ry)
+        ox, oy = m._compute_reference_orbit(rx, ry, max_iter, np_f(esc * esc))
+        hit = self.orbits[key] = (ox, oy, rx, ry)
+        if len(self.orbits) > 64:
+            self.orbits.popitem(last=False)
+        return hit
+
+    def _compute(self, params, palette, level, tx, ty, deep):
+        name, max_iter, esc, c = params[:4]
+        n = self.tile_px
+        ps = 2.0 ** (level / _LEVELS_PER_OCTAVE)
+        x0, y1 = tx * n * ps, (ty + 1) * n * ps
+        arr = self._arr
+        r_vals, g_vals, b_vals = palette
+        fractal_type = 0 if name == 'mandelbrot' else 1
+        c_real = np_f(c.real) if c else np_f(0.0)
+        c_imag = np_f(c.imag) if c else np_f(0.0)
+        esc_sq = np_f(esc * esc)
+        try:
+            if deep:
+                ox, oy, rx, ry = self._orbit(params, level, tx, ty, ps)
+                half = n * ps * 0.5
+                _taichi_compute_fractal_deepzoom(arr, np_f(x0 + half), np_f(y1 - half), np_f(half), n, n,
+                                                 int(max_iter), np_f(esc), fractal_type, c_real, c_imag,
+                                                 r_vals, g_vals, b_vals, len(r_vals), ox, oy, rx, ry)
+            else:
+                _taichi_compute_fractal(arr, np_f(x0), np_f(x0 + n * ps), np_f(y1 - n * ps), np_f(y1), n, n,
+                                        int(max_iter), esc_sq, fractal_type, c_real, c_imag,
+                                        r_vals, g_vals, b_vals, len(r_vals))
+        except Exception as e:
+            print(f"Taichi fractal tile error: {e}")
+            arr.fill(0)
+        surf = pygame.surfarray.make_surface(arr.swapaxes(0, 1))
+        self._put((params, level, tx, ty), surf)
+        return surf
+
+    def _tile_range(self, level, x_min, x_max, y_min, y_max):
+        t = self.tile_px * 2.0 ** (level / _LEVELS_PER_OCTAVE)
+        return math.floor(x_min / t), math.floor(x_max / t), math.floor(y_min / t), math.floor(y_max / t)
+
+    def render(self, name, x_min, x_max, y_min, y_max, w, h, max_iter, escape_radius, c_param, palette_obj):
+        if w <= 0 or h <= 0 or x_max <= x_min or y_max <= y_min:
+            return pygame.Surface((1, 1)), (0, 0)
+        deadline = time.perf_counter() + self.frame_budget
+        params = (name, int(max_iter), float(escape_radius), c_param,
+                  tuple(map(tuple, palette_obj)) if palette_obj else None)
+        palette = self.manager._fractal_palette(max_iter, palette_obj)
+        deep = max(x_max - x_min, y_max - y_min) < 1e-10 and config.app.use_f64
+        ps_view = (x_max - x_min) / w
+        level = round(math.log2(ps_view) * _LEVELS_PER_OCTAVE)
+        coarse = level + _COARSE_LEVELS
+        n = self.tile_px
+
+        # грубый слой считаем целиком - он в 16 раз дешевле и закрывает дыры
+        cx0, cx1, cy0, cy1 = self._tile_range(coarse, x_min, x_max, y_min, y_max)
+        for ty in range(cy0, cy1 + 1):
+            for tx in range(cx0, cx1 + 1):
+                if (params, coarse, tx, ty) not in self.tiles:
+                    self._compute(params, palette, coarse, tx, ty, deep)
+
+        tx0, tx1, ty0, ty1 = self._tile_range(level, x_min, x_max, y_min, y_max)
+        mx, my = (tx0 + tx1) * 0.5, (ty0 + ty1) * 0.5
+        order = sorted(((tx, ty) for ty in range(ty0, ty1 + 1) for tx in range(tx0, tx1 + 1)),
+                       key=lambda p: (p[0] - mx) ** 2 + (p[1] - my) ** 2)
+        cw, ch = (tx1 - tx0 + 1) * n, (ty1 - ty0 + 1) * n
+        if self._canvas is None or self._canvas.get_width() < cw or self._canvas.get_height() < ch:
+            self._canvas = pygame.Surface((max(cw, self._canvas.get_width() if self._canvas else 0),
+                                           max(ch, self._canvas.get_height() if self._canvas else 0)))
+        canvas = self._canvas
+        sub, k = n // 4, 0
+        self.pending = 0
+        for tx, ty in order:
+            surf = self._get((params, level, tx, ty))
+            if surf is None and (k == 0 or time.perf_counter() < deadline):
+                surf = self._compute(params, palette, level, tx, ty, deep)
+                k += 1
+            dst = ((tx - tx0) * n, (ty1 - ty) * n)
+            if surf is not None:
+                canvas.blit(surf, dst)
+                continue
+            self.pending += 1
+            ctx, cty = tx // 4, ty // 4
+            parent = self._get((params, coarse, ctx, cty))
+            if parent is not None:
+                part = parent.subsurface(((tx - 4 * ctx) * sub, (3 - (ty - 4 * cty)) * sub, sub, sub))
+                canvas.blit(pygame.transform.scale(part, (n, n)), dst)
+
+        ps = 2.0 ** (level / _LEVELS_PER_OCTAVE)
+        t = n * ps
+        left = (x_min - tx0 * t) / ps
+        top = ((ty1 + 1) * t - y_max) / ps
+        vw, vh = w * ps_view / ps, h * ps_view / ps
+        ix, iy = int(left), int(top)
+        iw = max(1, min(cw - ix, int(math.ceil(left + vw)) - ix))
+        ih = max(1, min(ch - iy, int(math.ceil(top + vh)) - iy))
+        view = canvas.subsurface((ix, iy, iw, ih))
+        if (iw, ih) == (w, h):
+            return view.copy(), (0, 0)
+        # субпиксельный остаток сдвига переносим в смещение блита
+        f = ps / ps_view
+        off = (int(round((ix - left) * f)), int(round((iy - top) * f)))
+        return pygame.transform.scale(view, (max(1, int(round(iw * f))), max(1, int(round(ih * f))))), off
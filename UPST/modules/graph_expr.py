@@ -0,0 +1,342 @@
+# UPST/modules/graph_expr.py
+# Graph expressions are parsed once into a checked AST and evaluated over whole numpy
+# arrays. The namespace is the one graph plots always had: names from `math` plus the
+# plot variables, no builtins. Where eval() of a sample would raise or return a
+# non-number, the array result holds nan, so callers keep filtering with isfinite.
+import ast
+import math
+
+import numpy as np
+
+try:
+    import numba as nb
+except ImportError:
+    nb = None
+
+MATH_NAMES = {k: getattr(math, k) for k in dir(math) if not k.startswith('_')}
+
+_UFUNCS = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan, 'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan,
+    'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh, 'asinh': np.arcsinh, 'acosh': np.arccosh,
+    'atanh': np.arctanh, 'exp': np.exp, 'expm1': np.expm1, 'log10': np.log10, 'log2': np.log2,
+    'log1p': np.log1p, 'sqrt': np.sqrt, 'fabs': np.fabs, 'floor': np.floor, 'ceil': np.ceil,
+    'trunc': np.trunc, 'degrees': np.degrees, 'radians': np.radians, 'atan2': np.arctan2,
+    'copysign': np.copysign, 'fmod': np.fmod, 'pow': np.power, 'isfinite': np.isfinite,
+    'isinf': np.isinf, 'isnan': np.isnan, 'exp2': np.exp2, 'cbrt': np.cbrt,
+}
+_BINOPS = {
+    ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.true_divide,
+    ast.Pow: np.power, ast.Mod: np.mod, ast.FloorDiv: np.floor_divide,
+}
+_BINOP_SRC = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.Pow: '**', ast.Mod: '%',
+              ast.FloorDiv: '//'}
+_CMPOPS = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+           ast.Eq: np.equal, ast.NotEq: np.not_equal}
+_CMP_SRC = {ast.Lt: '<', ast.LtE: '<=', ast.Gt: '>', ast.GtE: '>=', ast.Eq: '==', ast.NotEq: '!='}
+_UNARY = {ast.USub: np.negative, ast.UAdd: np.positive}
+
+# узлы, которые разрешены вообще (eval по элементам), и те, что считаются массивами
+_SAFE_NODES = (ast.Expression, ast.Constant, ast.Name, ast.Load, ast.BinOp, ast.UnaryOp, ast.Call,
+               ast.Compare, ast.IfExp, ast.BoolOp, ast.Tuple, ast.List, ast.keyword, ast.Attribute,
+               ast.operator, ast.unaryop, ast.cmpop, ast.boolop)
+_VECTOR_NODES = (ast.Expression, ast.Constant, ast.Name, ast.Load, ast.BinOp, ast.UnaryOp, ast.Call,
+                 ast.Compare, ast.IfExp, ast.Attribute)
+# атрибуты чисел, доступные в выражениях (z.real, z.conjugate() в комплексных графиках)
+_SAFE_ATTRS = {'real', 'imag', 'conjugate'}
+_NUMBA_MATH = {'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2', 'sinh', 'cosh', 'tanh', 'asinh',
+               'acosh', 'atanh', 'exp', 'expm1', 'log', 'log10', 'log2', 'log1p', 'sqrt', 'fabs', 'floor',
+               'ceil', 'trunc', 'degrees', 'radians', 'copysign', 'fmod', 'pow', 'hypot', 'isfinite',
+               'isinf', 'isnan', 'erf', 'erfc', 'gamma', 'lgamma'}
+
+JIT_MIN_SAMPLES = 50000
+_jit_cache = {}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def _log(x, base=None):
+    return np.log(x) if base is None else np.log(x) / np.log(base)
+
+
+def _hypot(*args):
+    if len(args) == 2:
+        return np.hypot(*args)
+    return np.sqrt(sum(np.square(a) for a in args))
+
+
+def _elementwise(fn):
+    def safe(*a):
+        try:
+            v = fn(*a)
+            return float(v) if isinstance(v, (int, float)) else math.nan
+        except Exception:
+            return math.nan
+
+    def call(*args):
+        return np.frompyfunc(safe, len(args), 1)(*args).astype(np.float64)
+    return call
+
+
+def _is_complex(v):
+    return isinstance(v, complex) or (isinstance(v, np.ndarray) and np.iscomplexobj(v))
+
+
+def _is_scalar(v):
+    return not isinstance(v, np.ndarray)
+
+
+class GraphExpr:
+    """A graph expression compiled once. evaluate(**variables) takes scalars or
+    broadcastable arrays and returns an array; evaluate_scalar matches eval()."""
+
+    def __init__(self, source: str, filename: str = '<graph>'):
+        self.source = source
+        try:
+            self.tree = ast.parse(source.strip(), filename, 'eval')
+        except SyntaxError as e:
+            raise ExpressionError(f"invalid expression near '{e.text}' at offset {e.offset}")
+        self.vectorized = True
+        self.names = set()
+        for node in ast.walk(self.tree):
+            if not isinstance(node, _SAFE_NODES):
+                raise ExpressionError(f"'{type(node).__name__}' is not allowed in graph expressions")
+            if isinstance(node, ast.Name):
+                if node.id.startswith('__'):
+                    raise ExpressionError(f"name '{node.id}' is not allowed")
+                self.names.add(node.id)
+            elif isinstance(node, ast.Attribute):
+                if node.attr not in _SAFE_ATTRS:
+                    raise ExpressionError(f"attribute '{node.attr}' is not allowed")
+            elif isinstance(node, ast.Call):
+                if not isinstance(node.func, (ast.Name, ast.Attribute)):
+                    raise ExpressionError("only math functions can be called")
+                if node.keywords:
+                    self.vectorized = False
+            if not isinstance(node, _VECTOR_NODES + (ast.operator, ast.unaryop, ast.cmpop, ast.keyword)):
+                self.vectorized = False
+            elif isinstance(node, ast.UnaryOp) and type(node.op) not in _UNARY:
+                self.vectorized = False
+        self.code = compile(self.tree, filename, 'eval')
+        self._jit_failed = nb is None
+
+    def __repr__(self):
+        return f"GraphExpr({self.source!r})"
+
+    def __eq__(self, other):
+        return isinstance(other, GraphExpr) and other.source == self.source
+
+    def __hash__(self):
+        return hash(self.source)
+
+    def uses(self, name: str) -> bool:
+        return name in self.names
+
+    def evaluate_scalar(self, **variables):
+        return eval(self.code, {**MATH_NAMES, "__builtins__": {}}, variables)
+
+    def evaluate(self, **variables) -> np.ndarray:
+        arrays = [v for v in variables.values() if isinstance(v, np.ndarray)]
+        shape = np.broadcast_shapes(*(a.shape for a in arrays)) if arrays else ()
+        size = int(np.prod(shape)) if shape else 1
+        if self.vectorized and not self._jit_failed and size >= JIT_MIN_SAMPLES:
+            out = self._evaluate_jit(variables, shape)
+            if out is not None:
+                return out
+        if not self.vectorized:
+            return self._evaluate_elementwise(variables, shape)
+        with np.errstate(all='ignore'):
+            env = {**MATH_NAMES, **variables}
+            result = self._eval(self.tree.body, env)
+        if isinstance(result, np.ndarray) and result.dtype == np.bool_:
+            result = result.astype(np.float64)
+        elif isinstance(result, (bool, int, float, complex)):
+            result = np.asarray(result, dtype=np.complex128 if isinstance(result, complex) else np.float64)
+        elif not isinstance(result, np.ndarray):
+            raise TypeError(f"expression produced {type(result).__name__}")
+        return np.broadcast_to(result, shape) if result.shape != shape else result
+
+    def evaluate_real(self, **variables) -> np.ndarray:
+        """Like evaluate, but entries that eval() would not give as int/float are nan."""
+        if not self.vectorized:
+            shape = self._nan(variables).shape
+            return self._evaluate_elementwise(variables, shape, real_only=True)
+        try:
+            out = self.evaluate(**variables)
+        except Exception:
+            return self._nan(variables)
+        if np.iscomplexobj(out):
+            return self._nan(variables)
+        return out.astype(np.float64, copy=False)
+
+    @staticmethod
+    def _nan(variables):
+        arrays = [v for v in variables.values() if isinstance(v, np.ndarray)]
+        shape = np.broadcast_shapes(*(a.shape for a in arrays)) if arrays else ()
+        return np.full(shape, np.nan)
+
+    def _eval(self, node, env):
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float, complex)):
+                raise TypeError(f"unsupported constant {node.value!r}")
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id not in env:
+                raise NameError(f"name '{node.id}' is not defined")
+            return env[node.id]
+        if isinstance(node, ast.BinOp):
+            a, b = self._eval(node.left, env), self._eval(node.right, env)
+            if _is_scalar(a) and _is_scalar(b):
+                return _PY_BINOPS[type(node.op)](a, b)
+            return _BINOPS[type(node.op)](a, b)
+        if isinstance(node, ast.UnaryOp):
+            v = self._eval(node.operand, env)
+            if isinstance(v, np.ndarray) and v.dtype == np.bool_:
+                v = v.astype(np.float64)
+            return -v if isinstance(node.op, ast.USub) else +v
+        if isinstance(node, ast.Compare):
+            left, result = self._eval(node.left, env), True
+            for op, comp in zip(node.ops, node.comparators):
+                right = self._eval(comp, env)
+                if _is_complex(left) or _is_complex(right):
+                    if type(op) not in (ast.Eq, ast.NotEq):
+                        raise TypeError("complex numbers are not ordered")
+                result = np.logical_and(result, _CMPOPS[type(op)](left, right))
+                left = right
+            # True + True == 2, как у bool в eval
+            return result.astype(np.float64) if isinstance(result, np.ndarray) else bool(result)
+        if isinstance(node, ast.IfExp):
+            cond = self._eval(node.test, env)
+            if _is_scalar(cond):
+                return self._eval(node.body if cond else node.orelse, env)
+            return np.where(cond, self._eval(node.body, env), self._eval(node.orelse, env))
+        if isinstance(node, ast.Attribute):
+            return getattr(self._eval(node.value, env), node.attr)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            return self._eval(node.func, env)(*[self._eval(a, env) for a in node.args])
+        if isinstance(node, ast.Call):
+            fn = env.get(node.func.id)
+            if fn is None:
+                raise NameError(f"name '{node.func.id}' is not defined")
+            args = [self._eval(a, env) for a in node.args]
+            if all(_is_scalar(a) for a in args):
+                return fn(*args)
+            if fn is not MATH_NAMES.get(node.func.id):
+                raise TypeError(f"'{node.func.id}' is not callable")
+            if any(_is_complex(a) for a in args):
+                # math.* не принимают комплексные числа - как и в eval
+                raise TypeError(f"must be real number, not complex ({node.func.id})")
+            name = node.func.id
+            if name == 'log':
+                return _log(*args)
+            if name == 'hypot':
+                return _hypot(*args)
+            uf = _UFUNCS.get(name)
+            if uf is not None:
+                return uf(*args)
+            return _elementwise(fn)(*args)
+        raise TypeError(f"unsupported node {type(node).__name__}")
+
+    def _evaluate_elementwise(self, variables, shape, real_only=False):
+        flat = {k: (np.broadcast_to(v, shape).ravel() if isinstance(v, np.ndarray) else v)
+                for k, v in variables.items()}
+        n = int(np.prod(shape)) if shape else 1
+        out = np.full(n, np.nan, dtype=np.complex128)
+        is_complex = False
+        globs = {**MATH_NAMES, "__builtins__": {}}
+        for i in range(n):
+            local = {k: (v[i] if isinstance(v, np.ndarray) else v) for k, v in flat.items()}
+            local = {k: (v.item() if isinstance(v, np.generic) else v) for k, v in local.items()}
+            try:
+                v = eval(self.code, globs, local)
+            except Exception:
+                continue
+            if isinstance(v, complex):
+                if real_only:
+                    continue
+                is_complex = True
+                out[i] = v
+            elif isinstance(v, (int, float)):
+                out[i] = float(v)
+        if not is_complex:
+            out = out.real.copy()
+        return out.reshape(shape)
+
+    # --- numba ---------------------------------------------------------------------------
+
+    def _to_source(self, node, arg_names):
+        if isinstance(node, ast.Constant):
+            return repr(node.value)
+        if isinstance(node, ast.Name):
+            if node.id in arg_names:
+                return f"_{node.id}"
+            v = MATH_NAMES.get(node.id)
+            if isinstance(v, float):
+                return repr(v) if math.isfinite(v) else f"_m.{node.id}"
+            raise ExpressionError(node.id)
+        if isinstance(node, ast.BinOp):
+            return f"({self._to_source(node.left, arg_names)} {_BINOP_SRC[type(node.op)]} {self._to_source(node.right, arg_names)})"
+        if isinstance(node, ast.UnaryOp):
+            return f"({'-' if isinstance(node.op, ast.USub) else '+'}{self._to_source(node.operand, arg_names)})"
+        if isinstance(node, ast.Compare):
+            parts = [self._to_source(node.left, arg_names)]
+            for op, comp in zip(node.ops, node.comparators):
+                parts += [_CMP_SRC[type(op)], self._to_source(comp, arg_names)]
+            return f"({' '.join(parts)})"
+        if isinstance(node, ast.IfExp):
+            return (f"({self._to_source(node.body, arg_names)} if {self._to_source(node.test, arg_names)} "
+                    f"else {self._to_source(node.orelse, arg_names)})")
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _NUMBA_MATH \
+                and node.func.id not in arg_names:
+            return f"_m.{node.func.id}({', '.join(self._to_source(a, arg_names) for a in node.args)})"
+        raise ExpressionError(ast.dump(node))
+
+    def _kernel(self, arg_names, out_complex):
+        key = (self.source, arg_names, out_complex)
+        kernel = _jit_cache.get(key)
+        if kernel is None:
+            body = self._to_source(self.tree.body, set(arg_names))
+            params = ''.join(f"a_{n}, " for n in arg_names)
+            loads = ''.join(f"        _{n} = a_{n}[i]\n" for n in arg_names)
+            src = (f"def _kernel({params}out):\n"
+                   f"    for i in range(out.shape[0]):\n{loads}"
+                   f"        out[i] = {body}\n")
+            ns = {'_m': math}
+            exec(compile(src, '<graph-jit>', 'exec'), ns)
+            kernel = _jit_cache[key] = nb.njit(cache=False, nogil=True, error_model='numpy')(ns['_kernel'])
+        return kernel
+
+    def _evaluate_jit(self, variables, shape):
+        arg_names = tuple(sorted(k for k in variables if k in self.names))
+        n = int(np.prod(shape))
+        args, out_complex = [], False
+        for k in arg_names:
+            v = variables[k]
+            arr = np.ascontiguousarray(np.broadcast_to(v, shape)).ravel()
+            if np.iscomplexobj(arr):
+                arr, out_complex = arr.astype(np.complex128), True
+            else:
+                arr = arr.astype(np.float64)
+            args.append(arr)
+        out = np.empty(n, dtype=np.complex128 if out_complex else np.float64)
+        try:
+            self._kernel(arg_names, out_complex)(*args, out)
+        except Exception:
+            # функция без numba-реализации или комплексный аргумент math.* - считаем numpy
+            self._jit_failed = True
+            return None
+        return out.reshape(shape)
+
+
+_PY_BINOPS = {
+    ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b, ast.Mult: lambda a, b: a * b,
+    ast.Div: lambda a, b: a / b, ast.Pow: lambda a, b: a ** b, ast.Mod: lambda a, b: a % b,
+    ast.FloorDiv: lambda a, b: a // b,
+}
+
+
+def to_screen(cam, xs, ys):
+    """Vectorized Camera.world_to_screen."""
+    s = cam.scaling
+    return (xs - cam.translation.tx) * s + cam._cx, cam._cy - (ys - cam.translation.ty) * s
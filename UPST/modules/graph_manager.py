@@ -11,6 +11,8 @@ from UPST.modules.profiler import profile, start_profiling, stop_profiling
 import numba as nb
 from UPST.config import config
 from UPST.modules.taichi_kernels import _taichi_compute_fractal
+from UPST.modules.graph_expr import GraphExpr, to_screen
+from UPST.modules.fractal_tiles import FractalTileCache
 
 if config.app.use_f64:
     ti_f = ti.f64
@@ -64,7 +66,7 @@ class CartesianPlugin(GraphPlugin):
     name = "cartesian"
     def compile(self, expr: str, params: Dict[str,Any]) -> Tuple:
         clean_expr = expr[2:].strip() if expr.startswith('y=') else expr
-        code = compile(clean_expr, '<graph>', 'eval')
+        code = GraphExpr(clean_expr)
         return ('cartesian', code, params.get('x_range'))
     def render(self, compiled: Tuple, item: Dict[str,Any], cam: Any, screen_w: int, screen_h: int, t_now: float, safe_env: Dict[str,Any]) -> List[Tuple]:
         code, x_range = compiled[1], compiled[2]
@@ -74,16 +76,9 @@ class CartesianPlugin(GraphPlugin):
         x_min, x_max = x_range if x_range else (x_min_def, x_max_def)
         steps = max(200, min(5000, int(vp_w * cam.scaling * 2)))
         dx = (x_max - x_min) / steps if steps > 0 else 0
-        world_pts, screen_pts = [], []
-        for i in range(steps+1):
-            x = x_min + i * dx
-            try:
-                y = eval(code, safe_env, {"x": x})
-                if isinstance(y,(int,float)) and math.isfinite(y):
-                    world_pts.append((x,y))
-                    screen_pts.append(cam.world_to_screen((x,y)))
-            except Exception: continue
-        return [('line', seg, item['color'], item['width']) for seg in self.manager._apply_line_style(screen_pts, item['style'])], world_pts, screen_pts
+        xs = x_min + np.arange(steps+1) * dx
+        ys = code.evaluate_real(x=xs, t=t_now)
+        return self.manager._curve_result(xs, ys, item, cam)
 
 class ParametricPlugin(GraphPlugin):
     name = "parametric"
@@ -93,8 +88,8 @@ class ParametricPlugin(GraphPlugin):
         expr_x = parts[0][2:].strip() if parts[0].startswith('x=') else parts[0]
         expr_y = parts[1][2:].strip() if parts[1].startswith('y=') else parts[1]
         if parts[0].startswith('y=') and parts[1].startswith('x='): expr_y, expr_x = expr_x, expr_y
-        code_x = compile(expr_x, '<graph>', 'eval')
-        code_y = compile(expr_y, '<graph>', 'eval')
+        code_x = GraphExpr(expr_x)
+        code_y = GraphExpr(expr_y)
         return ('parametric', code_x, code_y, params.get('t_range'))
     def render(self, compiled: Tuple, item: Dict[str,Any], cam: Any, screen_w: int, screen_h: int, t_now: float, safe_env: Dict[str,Any]) -> List[Tuple]:
         code_x, code_y, t_range = compiled[1], compiled[2], compiled[3]
@@ -104,43 +99,24 @@ class ParametricPlugin(GraphPlugin):
         t_min, t_max = t_range if t_range else (t_min_def, t_max_def)
         steps = max(200, min(5000, int(vp_w * cam.scaling * 2)))
         dt = (t_max - t_min) / steps
-        world_pts, screen_pts = [], []
-        for i in range(steps+1):
-            t_val = t_min + i * dt
-            try:
-                x_val = eval(code_x, safe_env, {"t": t_val})
-                y_val = eval(code_y, safe_env, {"t": t_val})
-                if isinstance(x_val,(int,float)) and isinstance(y_val,(int,float)) and math.isfinite(x_val) and math.isfinite(y_val):
-                    pt = (x_val, y_val)
-                    world_pts.append(pt)
-                    screen_pts.append(cam.world_to_screen(pt))
-            except Exception: continue
-        return [('line', seg, item['color'], item['width']) for seg in self.manager._apply_line_style(screen_pts, item['style'])], world_pts, screen_pts
+        ts = t_min + np.arange(steps+1) * dt
+        return self.manager._curve_result(code_x.evaluate_real(t=ts), code_y.evaluate_real(t=ts), item, cam)
 
 class PolarPlugin(GraphPlugin):
     name = "polar"
     def compile(self, expr: str, params: Dict[str,Any]) -> Tuple:
         clean_expr = expr[2:].strip() if expr.startswith(('r=','θ=','theta=')) else expr
-        code_r = compile(clean_expr, '<graph>', 'eval')
+        code_r = GraphExpr(clean_expr)
         return ('polar', code_r, params.get('theta_range'))
     def render(self, compiled: Tuple, item: Dict[str,Any], cam: Any, screen_w: int, screen_h: int, t_now: float, safe_env: Dict[str,Any]) -> List[Tuple]:
         code_r, theta_range = compiled[1], compiled[2]
         theta_min, theta_max = theta_range if theta_range else (0, 2*math.pi)
         steps = max(200, min(5000, int(cam.get_viewport_size()[0] * cam.scaling * 2)))
         dtheta = (theta_max - theta_min) / steps
-        world_pts, screen_pts = [], []
-        for i in range(steps+1):
-            theta = theta_min + i * dtheta
-            try:
-                r_val = eval(code_r, safe_env, {"theta": theta, "θ": theta})
-                if isinstance(r_val,(int,float)) and math.isfinite(r_val):
-                    x_val = r_val * math.cos(theta)
-                    y_val = r_val * math.sin(theta)
-                    pt = (x_val, y_val)
-                    world_pts.append(pt)
-                    screen_pts.append(cam.world_to_screen(pt))
-            except Exception: continue
-        return [('line', seg, item['color'], item['width']) for seg in self.manager._apply_line_style(screen_pts, item['style'])], world_pts, screen_pts
+        theta = theta_min + np.arange(steps+1) * dtheta
+        r_val = code_r.evaluate_real(theta=theta, θ=theta, t=t_now)
+        with np.errstate(all='ignore'):
+            return self.manager._curve_result(r_val * np.cos(theta), r_val * np.sin(theta), item, cam)
 
 class ScatterPlugin(GraphPlugin):
     name = "scatter"
@@ -173,8 +149,8 @@ class FieldPlugin(GraphPlugin):
     def compile(self, expr: str, params: Dict[str,Any]) -> Tuple:
         parts = [p.strip() for p in expr.split(',',1)]
         if len(parts)!=2: raise ValueError("Field requires Fx(x,y), Fy(x,y)")
-        code_fx = compile(parts[0], '<graph>', 'eval')
-        code_fy = compile(parts[1], '<graph>', 'eval')
+        code_fx = GraphExpr(parts[0])
+        code_fy = GraphExpr(parts[1])
         xr = params.get('x_range') or (-5.0,5.0)
         yr = params.get('y_range') or (-5.0,5.0)
         return ('field', code_fx, code_fy, xr, yr)
@@ -183,40 +159,30 @@ class FieldPlugin(GraphPlugin):
         density = max(3, min(10, int(20 * cam.scaling)))
         x_step = (xr[1]-xr[0])/density
         y_step = (yr[1]-yr[0])/density
-        drawables = []
-        for i in range(density+1):
-            for j in range(density+1):
-                x = xr[0] + i * x_step
-                y = yr[0] + j * y_step
-                try:
-                    fx = eval(code_fx, safe_env, {"x":x,"y":y,"t":t_now})
-                    fy = eval(code_fy, safe_env, {"x":x,"y":y,"t":t_now})
-                    if isinstance(fx,(int,float)) and isinstance(fy,(int,float)) and math.isfinite(fx) and math.isfinite(fy):
-                        start = cam.world_to_screen((x,y))
-                        end = cam.world_to_screen((x + fx*0.2, y + fy*0.2))
-                        drawables.append(('arrow', start, end, item['color'], item['width']))
-                except Exception: pass
-        return drawables, [], []
+        xs = (xr[0] + np.arange(density+1) * x_step)[:, None]
+        ys = (yr[0] + np.arange(density+1) * y_step)[None, :]
+        fx = code_fx.evaluate_real(x=xs, y=ys, t=t_now)
+        fy = code_fy.evaluate_real(x=xs, y=ys, t=t_now)
+        xs, ys = np.broadcast_to(xs, fx.shape), np.broadcast_to(ys, fx.shape)
+        ok = np.isfinite(fx) & np.isfinite(fy)
+        x, y = xs[ok], ys[ok]
+        sx, sy = to_screen(cam, x, y)
+        ex, ey = to_screen(cam, x + fx[ok]*0.2, y + fy[ok]*0.2)
+        return [('arrow', (a, b), (c, d), item['color'], item['width'])
+                for a, b, c, d in zip(sx.tolist(), sy.tolist(), ex.tolist(), ey.tolist())], [], []
 
 class ImplicitPlugin(GraphPlugin):
     name = "implicit"
     def compile(self, expr: str, params: Dict[str,Any]) -> Tuple:
-        code_f = compile(expr, '<graph>', 'eval')
+        code_f = GraphExpr(expr)
         xr = params.get('x_range') or (-5.0,5.0)
         yr = params.get('y_range') or (-5.0,5.0)
         return ('implicit', code_f, xr, yr)
     def render(self, compiled: Tuple, item: Dict[str,Any], cam: Any, screen_w: int, screen_h: int, t_now: float, safe_env: Dict[str,Any]) -> List[Tuple]:
         code_f, xr, yr = compiled[1], compiled[2], compiled[3]
-        def f_eval(x,y):
-            try:
-                val = eval(code_f, safe_env, {"x":x,"y":y,"t":t_now})
-                return float(val) if isinstance(val,(int,float)) else float('nan')
-            except Exception: return float('nan')
-        segments_list = []
-        try: segments_list = self.manager._adaptive_implicit_renderer(f_eval, xr[0], xr[1], yr[0], yr[1], max_depth=9)
-        except RecursionError:
-            try: segments_list = self.manager._marching_squares(f_eval, xr[0], xr[1], yr[0], yr[1], threshold=0.0, resolution=200)
-            except Exception: pass
+        x0, x1, y0, y1 = float(xr[0]), float(xr[1]), float(yr[0]), float(yr[1])
+        if x1 == x0 or y1 == y0: return [], [], []
+        segments_list = self.manager._implicit_quadtree(code_f, x0, x1, y0, y1, t_now, max_depth=9)
         drawables = []
         for seg in segments_list:
             if len(seg)==2:
@@ -232,7 +198,7 @@ class ComplexPlugin(GraphPlugin):
         xr = params.get('x_range') or (-3.0,3.0)
         yr = params.get('y_range') or (-3.0,3.0)
         mode = params.get('complex_mode','plane')
-        code_obj = compile(clean_expr, '<complex>', 'eval')
+        code_obj = GraphExpr(clean_expr, '<complex>')
         return ('complex', code_obj, xr, yr, mode)
     def render(self, compiled: Tuple, item: Dict[str,Any], cam: Any, screen_w: int, screen_h: int, t_now: float, safe_env: Dict[str,Any]) -> List[Tuple]:
         code_f, xr, yr, mode = compiled[1], compiled[2], compiled[3], compiled[4]
@@ -273,6 +239,9 @@ class FractalPlugin(GraphPlugin):
         x_min, x_max = cam.translation.tx - scaled_w/2, cam.translation.tx + scaled_w/2
         y_min, y_max = cam.translation.ty - scaled_h/2, cam.translation.ty + scaled_h/2
         palette_obj = _parse_palette(palette_str)
+        if config.rendering.fractal_tiles and not item.get('has_time_dependence', False):
+            surf, offset = self.manager._fractal_cache.render(fractal_name, x_min, x_max, y_min, y_max, screen_w, screen_h, max_iter, er, c_use, palette_obj)
+            return [('fractal_surface', surf, offset)], [], []
         surf, offset = self.manager._render_fractal(fractal_name, x_min, x_max, y_min, y_max, screen_w, screen_h, max_iter, er, c_use, palette_obj)
         return [('fractal_surface', surf, offset)], [], []
 
@@ -308,7 +277,7 @@ class GraphManager:
         self.ui_manager = ui_manager
         self.graph_expression = None
         self._graph_cache = None
-        self._fractal_cache = {}
+        self._fractal_cache = FractalTileCache(self)
         self.last_command = ""
         self.plugins: Dict[str, GraphPlugin] = {}
         self._register_default_plugins()
@@ -452,87 +421,65 @@ class GraphManager:
         except NameError as ne: raise ValueError(f"Undefined symbol in '{expr_str}': {ne}")
         except ZeroDivisionError: raise ValueError(f"Division by zero in '{expr_str}'")
         except Exception as e: raise ValueError(f"Evaluation failed in '{expr_str}': {type(e).__name__}: {e}")
+    def _curve_result(self, xs, ys, item, cam):
+        ok = np.isfinite(xs) & np.isfinite(ys)
+        xs, ys = xs[ok], ys[ok]
+        sx, sy = to_screen(cam, xs, ys)
+        world_pts = list(zip(xs.tolist(), ys.tolist()))
+        screen_pts = list(zip(sx.tolist(), sy.tolist()))
+        return [('line', seg, item['color'], item['width']) for seg in self._apply_line_style(screen_pts, item['style'])], world_pts, screen_pts
     def _draw_arrow(self, surface, color, start, end, width=1):
         angle = math.atan2(end[1]-start[1], end[0]-start[0])
         arrow_len, arrow_angle = 8, math.pi/6
         left = (end[0]-arrow_len*math.cos(angle-arrow_angle), end[1]-arrow_len*math.sin(angle-arrow_angle))
         right = (end[0]-arrow_len*math.cos(angle+arrow_angle), end[1]-arrow_len*math.sin(angle+arrow_angle))
         pygame.draw.polygon(surface, color, [end, left, right])
-    def _adaptive_implicit_renderer(self, f, x_min, x_max, y_min, y_max, depth=0, max_depth=7):
-        def eval_interval(x0,x1,y0,y1):
-            try:
-                vals = [f(x0,y0),f(x1,y0),f(x1,y1),f(x0,y1),f((x0+x1)/2,(y0+y1)/2)]
-                finite_vals = [v for v in vals if math.isfinite(v)]
-                if not finite_vals: return None,None
-                return min(finite_vals), max(finite_vals)
-            except: return None,None
-        min_val, max_val = eval_interval(x_min,x_max,y_min,y_max)
-        if min_val is None or max_val is None: return []
-        if min_val>0 or max_val<0: return []
-        if depth>=max_depth:
-            mid_x, mid_y = (x_min+x_max)/2, (y_min+y_max)/2
-            try:
-                center_val = f(mid_x,mid_y)
-                if not math.isfinite(center_val): return []
-            except: return []
-            segments, corners = [], [(x_min,y_min),(x_max,y_min),(x_max,y_max),(x_min,y_max)]
-            for i in range(4):
-                x_a,y_a = corners[i]
-                x_b,y_b = corners[(i+1)%4]
-                try:
-                    f_a,f_b = f(x_a,y_a),f(x_b,y_b)
-                    if math.isfinite(f_a) and math.isfinite(f_b):
-                        if f_a*f_b<=0 and abs(f_a-f_b)>1e-12:
-                            t = f_a/(f_a-f_b)
-                            ix,iy = x_a+t*(x_b-x_a), y_a+t*(y_b-y_a)
-                            segments.append((ix,iy))
-                except: continue
-            return [segments] if len(segments)==2 else []
-        else:
-            xm,ym = (x_min+x_max)/2,(y_min+y_max)/2
-            segs = []
-            segs += self._adaptive_implicit_renderer(f,x_min,xm,y_min,ym,depth+1,max_depth)
-            segs += self._adaptive_implicit_renderer(f,xm,x_max,y_min,ym,depth+1,max_depth)
-            segs += self._adaptive_implicit_renderer(f,x_min,xm,ym,y_max,depth+1,max_depth)
-            segs += self._adaptive_implicit_renderer(f,xm,x_max,ym,y_max,depth+1,max_depth)
-            return segs
-    def _marching_squares(self, f, x_min, x_max, y_min, y_max, threshold=0.0, resolution=10):
-        dx,dy = (x_max-x_min)/resolution,(y_max-y_min)/resolution
-        grid = []
-        for j in range(resolution+1):
-            row = []
-            y = y_min + j*dy
-            for i in range(resolution+1):
-                x = x_min + i*dx
-                try: val = f(x,y)
-                except: val = float('inf')
-                row.append(val)
-            grid.append(row)
-        segments = []
-        for j in range(resolution):
-            for i in range(resolution):
-                case = 0
-                if grid[j][i]>threshold: case|=1
-                if grid[j][i+1]>threshold: case|=2
-                if grid[j+1][i+1]>threshold: case|=4
-                if grid[j+1][i]>threshold: case|=8
-                if case==0 or case==15: continue
-                x0,y0 = x_min+i*dx,y_min+j*dy
-                x1,y1 = x0+dx,y0
-                x2,y2 = x1,y0+dy
-                x3,y3 = x0,y2
-                def interpolate(p1,p2,v1,v2):
-                    if abs(v1-v2)<1e-9: return p1
-                    t = (threshold-v1)/(v2-v1)
-                    return (p1[0]+t*(p2[0]-p1[0]), p1[1]+t*(p2[1]-p1[1]))
-                mid_x01 = interpolate((x0,y0),(x1,y1),grid[j][i],grid[j][i+1])
-                mid_x12 = interpolate((x1,y1),(x2,y2),grid[j][i+1],grid[j+1][i+1])
-                mid_x23 = interpolate((x2,y2),(x3,y3),grid[j+1][i+1],grid[j+1][i])
-                mid_x30 = interpolate((x3,y3),(x0,y0),grid[j+1][i],grid[j][i])
-                edge_table = {1:[(mid_x30,mid_x01)],2:[(mid_x01,mid_x12)],3:[(mid_x30,mid_x12)],4:[(mid_x12,mid_x23)],5:[(mid_x30,mid_x01),(mid_x12,mid_x23)],6:[(mid_x01,mid_x23)],7:[(mid_x30,mid_x23)],8:[(mid_x23,mid_x30)],9:[(mid_x01,mid_x12),(mid_x23,mid_x30)],10:[(mid_x01,mid_x23)],11:[(mid_x12,mid_x23)],12:[(mid_x30,mid_x12)],13:[(mid_x01,mid_x30)],14:[(mid_x30,mid_x01)],15:[]}
-                if case in edge_table:
-                    for seg in edge_table[case]: segments.append(seg)
-        return segments
+    def _implicit_quadtree(self, code_f, x_min, x_max, y_min, y_max, t_now, max_depth=9):
+        """Zero contour of f(x, y) by quadtree subdivision, one level at a time. A cell is
+        kept while f at its corners and centre straddles zero; each level evaluates, in one
+        call, only the grid points of kept cells not seen at an earlier level. Leaves give
+        one segment when exactly two of their edges cross zero."""
+        n = 1 << (max_depth + 1)
+        m = n + 1
+        vals = np.empty(m * m)
+        have = np.zeros(m * m, dtype=np.bool_)
+        dx, dy = (x_max - x_min) / n, (y_max - y_min) / n
+        ci = cj = np.zeros(1, dtype=np.int64)
+        h = n
+        for depth in range(max_depth + 1):
+            half = h // 2
+            gi = np.stack((ci, ci + h, ci + h, ci, ci + half))
+            gj = np.stack((cj, cj, cj + h, cj + h, cj + half))
+            k = gj * m + gi
+            need = np.unique(k[~have[k]])
+            if len(need):
+                vals[need] = code_f.evaluate_real(x=x_min + (need % m) * dx, y=y_min + (need // m) * dy, t=t_now)
+                have[need] = True
+            v = vals[k]
+            fin = np.isfinite(v)
+            keep = (fin.any(axis=0) & (np.where(fin, v, np.inf).min(axis=0) <= 0)
+                    & (np.where(fin, v, -np.inf).max(axis=0) >= 0))
+            ci, cj, gi, gj, v, fin = ci[keep], cj[keep], gi[:, keep], gj[:, keep], v[:, keep], fin[:, keep]
+            if not len(ci): return []
+            if depth == max_depth: break
+            ci = np.concatenate((ci, ci + half, ci, ci + half))
+            cj = np.concatenate((cj, cj, cj + half, cj + half))
+            h = half
+        # рёбра листа: 0-1, 1-2, 2-3, 3-0
+        ea, eb = np.array([0, 1, 2, 3]), np.array([1, 2, 3, 0])
+        fa, fb = v[ea], v[eb]
+        with np.errstate(all='ignore'):
+            cross = fin[ea] & fin[eb] & (fa * fb <= 0) & (np.abs(fa - fb) > 1e-12)
+            t = np.where(cross, fa / (fa - fb), 0.0)
+        px = x_min + (gi[ea] + t * (gi[eb] - gi[ea])) * dx
+        py = y_min + (gj[ea] + t * (gj[eb] - gj[ea])) * dy
+        leaf = fin[4] & (cross.sum(axis=0) == 2)
+        cols = np.flatnonzero(leaf)
+        if not len(cols): return []
+        first = np.argsort(~cross[:, cols], axis=0, kind='stable')[:2]
+        ax, ay = px[first[0], cols].tolist(), py[first[0], cols].tolist()
+        bx, by = px[first[1], cols].tolist(), py[first[1], cols].tolist()
+        return [[(x0, y0), (x1, y1)] for x0, y0, x1, y1 in zip(ax, ay, bx, by)]
     def serialize(self): return {"last_command":self.last_command}
     def deserialize(self, data):
         cmd = data.get("last_command","")
@@ -552,7 +499,7 @@ class GraphManager:
         cam_tx, cam_ty = cam.translation.tx, cam.translation.ty
         cam_scale = cam.scaling
         steps_base = max(200, min(5000, int(vp_w * cam_scale * 2)))
-        uses_time = any('t' in str(item['compiled'][1]) for item in self.graph_expression if item['compiled'][0] in ('cartesian','parametric','polar','field','implicit'))
+        uses_time = any(isinstance(c, GraphExpr) and c.uses('t') for item in self.graph_expression if item['compiled'][0] in ('cartesian','polar','field','implicit','complex') for c in item['compiled'][1:])
         has_fractal = any(item['compiled'][0]=='fractal' for item in self.graph_expression)
         has_animated_fractal = any(item.get('has_time_dependence',False) for item in self.graph_expression)
         if uses_time or has_fractal or has_animated_fractal:
@@ -673,59 +620,56 @@ class GraphManager:
         y_min,y_max = yr
         dx,dy = (x_max-x_min)/density,(y_max-y_min)/density
         t_now = pygame.time.get_ticks()/1000.0
-        math_dict = {k:getattr(math,k) for k in dir(math) if not k.startswith('_')}
-        base_env = {"t":t_now,"__builtins__":{},**math_dict}
-        drawables = []
-        for i in range(density+1):
-            for j in range(density+1):
-                x = x_min + i*dx
-                y = y_min + j*dy
-                z = complex(x,y)
-                try:
-                    env = {"z":z,"x":x,"y":y,**base_env}
-                    f_val = eval(code_obj, {"__builtins__":{}}, env)
-                    if isinstance(f_val,complex): w=f_val
-                    elif isinstance(f_val,(int,float)): w=complex(f_val,0)
-                    else: continue
-                    if not (math.isfinite(w.real) and math.isfinite(w.imag)): continue
-                    start = cam.world_to_screen((x,y))
-                    end = cam.world_to_screen((w.real,w.imag))
-                    drawables.append(('arrow', start, end, color, width))
-                except Exception: continue
-        return drawables
+        xs = (x_min + np.arange(density+1)*dx)[:, None]
+        ys = (y_min + np.arange(density+1)*dy)[None, :]
+        xs, ys = np.broadcast_arrays(xs, ys)
+        try: w = self._eval_complex_grid(code_obj, xs, ys, t_now)
+        except Exception: return []
+        ok = np.isfinite(w.real) & np.isfinite(w.imag)
+        sx, sy = to_screen(cam, xs[ok], ys[ok])
+        ex, ey = to_screen(cam, w.real[ok], w.imag[ok])
+        return [('arrow', (a, b), (c, d), color, width) for a, b, c, d in zip(sx.tolist(), sy.tolist(), ex.tolist(), ey.tolist())]
+    def _eval_complex_grid(self, code_obj, xs, ys, t_now):
+        z = np.empty(xs.shape, dtype=np.complex128)
+        z.real, z.imag = xs, ys
+        return np.asarray(code_obj.evaluate(z=z, x=xs, y=ys, t=t_now), dtype=np.complex128)
     def _render_complex_color(self, code_obj, x_min, x_max, y_min, y_max, w, h, cam):
         if w<=0 or h<=0:
             empty_surf = pygame.Surface((1,1))
             return empty_surf, (0,0)
-        arr = np.zeros((h,w,3), dtype=np.uint8)
         t_now = pygame.time.get_ticks()/1000.0
-        math_dict = {k:getattr(math,k) for k in dir(math) if not k.startswith('_')}
-        base_env = {"t":t_now,"__builtins__":{},**math_dict}
-        for j in range(h):
-            y = y_max - (j/h)*(y_max-y_min)
-            for i in range(w):
-                x = x_min + (i/w)*(x_max-x_min)
-                z = complex(x,y)
-                try:
-                    env = {"z":z,"x":x,"y":y,**base_env}
-                    f_val = eval(code_obj, {"__builtins__":{}}, env)
-                    if isinstance(f_val,complex): w_val=f_val
-                    elif isinstance(f_val,(int,float)): w_val=complex(f_val,0)
-                    else: w_val=complex(0,0)
-                    if not (math.isfinite(w_val.real) and math.isfinite(w_val.imag)):
-                        hue,val = 0.0,0.0
-                    else:
-                        arg = math.atan2(w_val.imag,w_val.real)
-                        hue = (arg+math.pi)/(2*math.pi)
-                        mag = abs(w_val)
-                        val = min(1.0, math.log1p(mag)/5.0)
-                    r,g,b = self._hsv_to_rgb(hue,1.0,val)
-                    arr[j,i] = (int(r*255),int(g*255),int(b*255))
-                except Exception: arr[j,i] = (0,0,0)
+        xs = x_min + (np.arange(w)/w)*(x_max-x_min)
+        ys = y_max - (np.arange(h)/h)*(y_max-y_min)
+        xs, ys = np.broadcast_arrays(xs[None, :], ys[:, None])
+        try: w_val = self._eval_complex_grid(code_obj, xs, ys, t_now)
+        except Exception: w_val = None
+        if w_val is None:
+            arr = np.zeros((h,w,3), dtype=np.uint8)
+        else:
+            with np.errstate(all='ignore'):
+                bad = ~(np.isfinite(w_val.real) & np.isfinite(w_val.imag))
+                hue = (np.arctan2(w_val.imag, w_val.real)+math.pi)/(2*math.pi)
+                val = np.minimum(1.0, np.log1p(np.abs(w_val))/5.0)
+            hue[bad], val[bad] = 0.0, 0.0
+            arr = self._hsv_to_rgb_array(hue, val)
         surface = pygame.surfarray.make_surface(arr.swapaxes(0,1))
         offset_x = cam.world_to_screen((x_min,0))[0]
         offset_y = cam.world_to_screen((0,y_max))[1]
         return surface, (offset_x,offset_y)
+    @staticmethod
+    def _hsv_to_rgb_array(h, v):
+        # _hsv_to_rgb с s=1 для целого массива
+        i = (h*6.0).astype(np.int64)
+        f = (h*6.0)-i
+        p = v*(1.0-1.0)
+        q = v*(1.0-f)
+        t = v*(1.0-(1.0-f))
+        i %= 6
+        cases = [i==0, i==1, i==2, i==3, i==4, i==5]
+        r = np.select(cases, [v,q,p,p,t,v])
+        g = np.select(cases, [t,v,v,q,p,p])
+        b = np.select(cases, [p,p,t,v,v,q])
+        return (np.stack((r,g,b), axis=-1)*255).astype(np.uint8)
     def _hsv_to_rgb(self, h, s, v):
         if s==0.0: return v,v,v
         i = int(h*6.0)
@@ -741,6 +685,16 @@ class GraphManager:
         if i==4: return t,p,v
         if i==5: return v,p,q
 
+    def _fractal_palette(self, max_iter, palette_obj):
+        if not palette_obj:
+            n = max(1, min(max_iter, 256))
+            i = np.arange(n, dtype=np.float64) / n
+            return (np.minimum(255, 95 + 160 * i).astype(np.uint8),
+                    np.minimum(255, 20 + 100 * i).astype(np.uint8),
+                    (150 * (1.0 - i)).astype(np.uint8))
+        pal = np.array([c[:3] for c in palette_obj], dtype=np.uint8)
+        return np.ascontiguousarray(pal[:, 0]), np.ascontiguousarray(pal[:, 1]), np.ascontiguousarray(pal[:, 2])
+
     def _render_fractal(self, name, x_min, x_max, y_min, y_max, w, h, max_iter, escape_radius, c_param, palette_obj):
         zoom_x = x_max - x_min
         zoom_y = y_max - y_min
@@ -771,19 +725,7 @@ class GraphManager:
             fractal_type = 0 if name == 'mandelbrot' else 1
             c_real = np_f(c_param.real) if c_param else np_f(0.0)
             c_imag = np_f(c_param.imag) if c_param else np_f(0.0)
-            if palette_obj is None:
-                default_len = min(max_iter, 256)
-                r_vals = np.array([min(255, int(95 + 160 * i / default_len)) for i in range(default_len)],
-                                  dtype=np.uint8)
-                g_vals = np.array([min(255, int(20 + 100 * i / default_len)) for i in range(default_len)],
-                                  dtype=np.uint8)
-                b_vals = np.array([min(255, int(150 * (1.0 - i / default_len))) for i in range(default_len)],
-                                  dtype=np.uint8)
-            else:
-                pal_len = len(palette_obj)
-                r_vals = np.array([c[0] for c in palette_obj], dtype=np.uint8)
-                g_vals = np.array([c[1] for c in palette_obj], dtype=np.uint8)
-                b_vals = np.array([c[2] for c in palette_obj], dtype=np.uint8)
+            r_vals, g_vals, b_vals = self._fractal_palette(max_iter, palette_obj)
             try:
                 _taichi_compute_fractal(arr, np_f(x_min), np_f(x_max), np_f(y_min), np_f(y_max),
                                         int(w), int(h), int(max_iter), esc_sq, int(fractal_type),
@@ -836,17 +778,7 @@ class GraphManager:
         scale = np_f(zoom) / half_w
         c_real = np_f(c_param.real) if c_param else np_f(0.0)
         c_imag = np_f(c_param.imag) if c_param else np_f(0.0)
-        if palette_obj is None:
-            default_len = min(max_iter, 256)
-            r_vals = np.array([min(255, int(95 + 160 * i / default_len)) for i in range(default_len)], dtype=np.uint8)
-            g_vals = np.array([min(255, int(20 + 100 * i / default_len)) for i in range(default_len)], dtype=np.uint8)
-            b_vals = np.array([min(255, int(150 * (1.0 - i / default_len))) for i in range(default_len)],
-                              dtype=np.uint8)
-        else:
-            pal_len = len(palette_obj)
-            r_vals = np.array([c[0] for c in palette_obj], dtype=np.uint8)
-            g_vals = np.array([c[1] for c in palette_obj], dtype=np.uint8)
-            b_vals = np.array([c[2] for c in palette_obj], dtype=np.uint8)
+        r_vals, g_vals, b_vals = self._fractal_palette(max_iter, palette_obj)
         try:
             from UPST.modules.taichi_kernels import _taichi_compute_fractal_deepzoom
             _taichi_compute_fractal_deepzoom(
@@ -21,6 +21,9 @@ if IS_LINUX:
         IS_LINUX = False
 
 from UPST.config import config
+from UPST.modules.layer_cache import ScrollingLayer
+
+_LABEL_PAD = 64  # подписи выступают за свою линию - при отрисовке полосы берём линии с запасом
 
 class GridManager:
     def __init__(self, camera, force_field_manager=None):
@@ -51,6 +54,9 @@ class GridManager:
         self._polar_cache = None
         self._polar_cache_scale = 0.0
         self._polar_cache_pos = (0, 0)
+        self._layer = ScrollingLayer(self._render_layer)
+        self._fonts = {}
+        self._text_cache = {}
 
     def toggle_coordinate_display_mode(self):
         modes = ["screen", "world", "relative"]
@@ -63,8 +69,36 @@ class GridManager:
         grid_spacing_world, grid_spacing_pixels = self.calculate_grid_spacing()
         self._handle_snapping(grid_spacing_world, grid_spacing_pixels)
         if not self.enabled or grid_spacing_pixels < 5: return
-        top_left_world = self.camera.screen_to_world((0, 0))
-        bottom_right_world = self.camera.screen_to_world((screen.get_width(), screen.get_height()))
+        if config.grid.cache_layer:
+            bg = tuple(config.world.themes[config.world.current_theme].background_color[:3])
+            self._layer.draw(screen, self.camera, self._layer_key(grid_spacing_world), bg)
+        else:
+            self._render_layer(screen, screen.get_rect(), self.camera)
+
+        if self.coordinate_display_mode in ("world", "relative"):
+            self._draw_cursor_coordinates(screen)
+
+        if self.force_field_manager and self.force_field_manager.physics_manager.running_physics:
+            self._draw_gravity_vectors(screen, grid_spacing_world, grid_spacing_pixels)
+
+        self.draw_scale_indicator(screen, grid_spacing_world, grid_spacing_pixels)
+        if self.coordinate_display_mode == "screen":
+            self.draw_rulers(screen)
+
+    def _layer_key(self, grid_spacing_world):
+        polar = config.grid.polar
+        return (grid_spacing_world, self.coordinate_display_mode, self.polar_enabled and polar.visible,
+                self.grid_color_major, self.grid_color_minor, self.grid_color_origin, self.major_grid_multiplier,
+                self.minor_line_thickness, self.major_line_thickness, self.origin_line_thickness,
+                self.polar_color_radial, polar.angle_step_deg, polar.major_angle_step_deg, polar.enable_labels,
+                polar.min_radius_label_distance_px, polar.label_color_radial, polar.label_font_size,
+                polar.fade_with_zoom, polar.min_alpha, polar.max_alpha)
+
+    def _render_layer(self, screen, rect, cam):
+        # всё, что привязано к миру и не зависит от курсора; rect - обновляемая полоса слоя
+        grid_spacing_world, _ = self.calculate_grid_spacing()
+        top_left_world = cam.screen_to_world((rect.left - _LABEL_PAD, rect.top - _LABEL_PAD))
+        bottom_right_world = cam.screen_to_world((rect.right + _LABEL_PAD, rect.bottom + _LABEL_PAD))
         min_x = min(top_left_world[0], bottom_right_world[0])
         max_x = max(top_left_world[0], bottom_right_world[0])
         min_y = min(top_left_world[1], bottom_right_world[1])
@@ -76,29 +110,37 @@ class GridManager:
         max_y = math.ceil(max_y / grid_spacing_world) * grid_spacing_world
 
         for x in _frange(min_x, max_x + grid_spacing_world / 2, grid_spacing_world):
-            start, end, color, thickness = self._compute_line_params(x, True, top_left_world, bottom_right_world, grid_spacing_world)
+            start, end, color, thickness = self._compute_line_params(cam, x, True, top_left_world, bottom_right_world, grid_spacing_world)
             self._draw_line(screen, start, end, color[:3], thickness)
             if self.coordinate_display_mode == "world":
-                self._draw_world_label(screen, x, 0, is_x=True)
+                self._draw_world_label(screen, cam, x, 0, is_x=True)
         for y in _frange(min_y, max_y + grid_spacing_world / 2, grid_spacing_world):
-            start, end, color, thickness = self._compute_line_params(y, False, top_left_world, bottom_right_world, grid_spacing_world)
+            start, end, color, thickness = self._compute_line_params(cam, y, False, top_left_world, bottom_right_world, grid_spacing_world)
             self._draw_line(screen, start, end, color[:3], thickness)
             if self.coordinate_display_mode == "world":
-                self._draw_world_label(screen, 0, y, is_x=False)
+                self._draw_world_label(screen, cam, 0, y, is_x=False)
 
         if self.polar_enabled:
-            self._draw_polar_grid(screen, top_left_world, bottom_right_world)
+            self._draw_polar_grid(screen, cam)
 
         if self.coordinate_display_mode in ("world", "relative"):
-            self._draw_axis_labels(screen)
-            self._draw_cursor_coordinates(screen)
+            self._draw_axis_labels(screen, cam)
+
+    def _font(self, size, bold=False):
+        font = self._fonts.get((size, bold))
+        if font is None:
+            font = self._fonts[(size, bold)] = pygame.font.SysFont("Consolas", size, bold=bold)
+        return font
+
+    def _text(self, font, label, color):
+        key = (id(font), label, tuple(color))
+        surf = self._text_cache.get(key)
+        if surf is None:
+            if len(self._text_cache) > 1024:
+                self._text_cache.clear()
+            surf = self._text_cache[key] = font.render(label, True, color)
+        return surf
 
-        if self.force_field_manager and self.force_field_manager.physics_manager.running_physics:
-            self._draw_gravity_vectors(screen, grid_spacing_world, grid_spacing_pixels)
-
-        self.draw_scale_indicator(screen, grid_spacing_world, grid_spacing_pixels)
-        if self.coordinate_display_mode == "screen":
-            self.draw_rulers(screen)
     def _apply_grid_colors(self):
         scheme = config.grid.default_colors
         self.grid_color_major = (*scheme.major, 255) if len(scheme.major) == 3 else scheme.major
@@ -110,16 +152,17 @@ class GridManager:
         self.polar_color_radial = polar.radial_line_color
         self.polar_color_circular = polar.circular_line_color
 
-    def _draw_polar_grid(self, screen, top_left, bottom_right):
+    def _draw_polar_grid(self, screen, cam):
         if not config.grid.polar.visible:
             return
         polar = config.grid.polar
         origin = (0.0, 0.0)
-        origin_screen = self.camera.world_to_screen(origin)
+        origin_screen = cam.world_to_screen(origin)
         screen_w, screen_h = screen.get_width(), screen.get_height()
 
-        corner_world = self.camera.screen_to_world((screen_w, screen_h))
-        max_radius_world = math.hypot(-corner_world[0], -corner_world[1]) * 1.05
+        # самый дальний угол: лучи должны выходить за экран при любом положении начала координат
+        max_radius_world = max(math.hypot(*cam.screen_to_world(c))
+                               for c in ((0, 0), (screen_w, 0), (0, screen_h), (screen_w, screen_h))) * 1.05
         grid_spacing_world, _ = self.calculate_grid_spacing()
         if grid_spacing_world <= 1e-12:
             return
@@ -133,14 +176,14 @@ class GridManager:
             alpha = int(polar.min_alpha + (polar.max_alpha - polar.min_alpha) * (1.0 - t))
         circle_color = (*self.polar_color_circular[:3], alpha)
         radial_color = (*self.polar_color_radial[:3], alpha)
-        label_font = pygame.font.SysFont("Consolas", polar.label_font_size)
+        label_font = self._font(polar.label_font_size)
 
         def clamp(c):
             return max(-32768, min(32767, int(round(c))))
 
         for i in range(1, num_circles + 1):
             radius = i * grid_spacing_world
-            radius_px = radius * self.camera.scaling
+            radius_px = radius * cam.scaling
             if radius_px < 1.0:
                 continue
             if radius_px > 32767:
@@ -152,7 +195,7 @@ class GridManager:
                 theta = 2 * math.pi * j / steps
                 x = radius * math.cos(theta)
                 y = radius * math.sin(theta)
-                sx, sy = self.camera.world_to_screen((x, y))
+                sx, sy = cam.world_to_screen((x, y))
                 pts.append((clamp(sx), clamp(sy)))
             # if len(pts) > 2:
             #     pygame.gfxdraw.filled_polygon(screen, pts, (*circle_color[:3], min(30, alpha // 8)))
@@ -166,7 +209,7 @@ class GridManager:
             dx, dy = math.cos(theta), math.sin(theta)
 
             end_world = (dx * max_radius_world, dy * max_radius_world)
-            end_screen = self.camera.world_to_screen(end_world)
+            end_screen = cam.world_to_screen(end_world)
             ox, oy = clamp(origin_screen[0]), clamp(origin_screen[1])
             ex, ey = clamp(end_screen[0]), clamp(end_screen[1])
             if -32768 <= ex <= 32767 and -32768 <= ey <= 32767:
@@ -178,20 +221,20 @@ class GridManager:
                 label_y = origin_screen[1] + dy * label_offset
                 if 0 <= label_x < screen_w and 0 <= label_y < screen_h:
                     label = f"{deg}°"
-                    text_surf = label_font.render(label, True, polar.label_color_radial)
+                    text_surf = self._text(label_font, label, polar.label_color_radial)
                     screen.blit(text_surf, (clamp(label_x) - text_surf.get_width() // 2,
                                             clamp(label_y) - text_surf.get_height() // 2))
             theta += angle_step_rad
 
-    def _draw_axis_labels(self, screen):
+    def _draw_axis_labels(self, screen, cam):
         offset = 1.5 * self.calculate_grid_spacing()[0]
-        x_label_pos = self.camera.world_to_screen((offset, 0))
-        y_label_pos = self.camera.world_to_screen((0, offset))
+        x_label_pos = cam.world_to_screen((offset, 0))
+        y_label_pos = cam.world_to_screen((0, offset))
         if not (all(math.isfinite(c) for c in x_label_pos) and all(math.isfinite(c) for c in y_label_pos)):
             return
-        font = pygame.font.SysFont("Consolas", 14, bold=True)
-        x_surf = font.render("X", True, (200, 200, 200))
-        y_surf = font.render("Y", True, (200, 200, 200))
+        font = self._font(14, bold=True)
+        x_surf = self._text(font, "X", (200, 200, 200))
+        y_surf = self._text(font, "Y", (200, 200, 200))
 
         def clamp_coord(c):
             return max(-32768, min(32767, int(round(c))))
@@ -201,15 +244,15 @@ class GridManager:
         screen.blit(x_surf, x_pos)
         screen.blit(y_surf, y_pos)
 
-    def _draw_world_label(self, screen, x, y, is_x):
+    def _draw_world_label(self, screen, cam, x, y, is_x):
         if abs(x) < 1e-12 and abs(y) < 1e-12:
             return
         world_pos = (x, y)
-        screen_pos = self.camera.world_to_screen(world_pos)
+        screen_pos = cam.world_to_screen(world_pos)
         if not all(math.isfinite(c) for c in screen_pos):
             return
         label = self._format_number(x if is_x else y)
-        text_surf = self.ruler_font.render(label, True, (200, 200, 200))
+        text_surf = self._text(self.ruler_font, label, (200, 200, 200))
         offset = 4
         if is_x:
             pos_x = screen_pos[0] - text_surf.get_width() / 2
@@ -283,7 +326,7 @@ class GridManager:
                 if 0 <= screen_x <= screen_width and screen_x - last_label_x >= min_label_spacing:
                     pygame.gfxdraw.line(screen, int(screen_x), 0, int(screen_x), tick_length, (200, 200, 200))
                     label = format_number(x)
-                    text_surf = self.ruler_font.render(label, True, (200, 200, 200))
+                    text_surf = self._text(self.ruler_font, label, (200, 200, 200))
                     screen.blit(text_surf, (int(screen_x), tick_length + text_offset))
                     last_label_x = screen_x
 
@@ -295,7 +338,7 @@ class GridManager:
                 if 0 <= screen_y <= screen_height and screen_y - last_label_y >= min_label_spacing:
                     pygame.gfxdraw.line(screen, 0, int(screen_y), tick_length, int(screen_y), (200, 200, 200))
                     label = format_number(y)
-                    text_surf = self.ruler_font.render(label, True, (200, 200, 200))
+                    text_surf = self._text(self.ruler_font, label, (200, 200, 200))
                     screen.blit(text_surf, (tick_length + text_offset, int(screen_y)))
                     last_label_y = screen_y
 
@@ -375,7 +418,7 @@ class GridManager:
                 pygame.mouse.set_visible(self._was_visible)
                 self._snapping_active = False
 
-    def _compute_line_params(self, coord, is_vertical, top_left_world, bottom_right_world, grid_spacing_world):
+    def _compute_line_params(self, cam, coord, is_vertical, top_left_world, bottom_right_world, grid_spacing_world):
         if abs(coord) < 1e-12:
             color = self.grid_color_origin
             thickness = self.origin_line_thickness
@@ -386,11 +429,11 @@ class GridManager:
             color = self.grid_color_minor
             thickness = self.minor_line_thickness
         if is_vertical:
-            start = self.camera.world_to_screen((coord, top_left_world[1]))
-            end = self.camera.world_to_screen((coord, bottom_right_world[1]))
+            start = cam.world_to_screen((coord, top_left_world[1]))
+            end = cam.world_to_screen((coord, bottom_right_world[1]))
         else:
-            start = self.camera.world_to_screen((top_left_world[0], coord))
-            end = self.camera.world_to_screen((bottom_right_world[0], coord))
+            start = cam.world_to_screen((top_left_world[0], coord))
+            end = cam.world_to_screen((bottom_right_world[0], coord))
         return start, end, color, thickness
 
     def _draw_line(self, screen, start, end, color, thickness):
@@ -517,7 +560,7 @@ class GridManager:
             tick_height = 6
             for x in (cx1, cx2):
                 pygame.gfxdraw.line(screen, x, cy - tick_height // 2, x, cy + tick_height // 2, (255, 255, 255))
-            text_surf = pygame.font.SysFont("Consolas", 16).render(label, True, (255, 255, 255))
+            text_surf = self._text(self._font(16), label, (255, 255, 255))
             screen.blit(text_surf,
                         (clamp_coord(cx1 + (cx2 - cx1) / 2 - text_surf.get_width() / 2), clamp_coord(cy - 14)))
 
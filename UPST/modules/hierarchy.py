@@ -2,6 +2,13 @@
 import pymunk
 from typing import Optional, List, Any
 
+_links_version = 0
+
+
+def links_version() -> int:
+    """Bumped on every parent change, so cached lists of linked bodies can be revalidated."""
+    return _links_version
+
 class HierarchyNode:
     def __init__(self, name: str = "Object", body: Optional[pymunk.Body] = None):
         self.name = name
@@ -45,6 +52,8 @@ class HierarchyNode:
                 self.body.angle = self._local_angle
 
     def set_parent(self, new_parent: Optional['HierarchyNode']):
+        global _links_version
+        _links_version += 1
         if self.parent:
             self.parent.children.remove(self)
         self.parent = new_parent
@@ -0,0 +1,105 @@
+# UPST/modules/layer_cache.py
+import pygame
+
+
+class LayerView:
+    """Camera stand-in for the pose a cached layer was rendered at. Exposes the attributes
+    the draw code reads from Camera (translation, scaling, _cx/_cy and both transforms)."""
+    __slots__ = ('translation', 'scaling', 'inv_scaling', '_cx', '_cy')
+
+    def __init__(self, tx, ty, scaling, cx, cy):
+        self.translation = _Translation(tx, ty)
+        self.scaling = scaling
+        self.inv_scaling = 1.0 / scaling
+        self._cx = cx
+        self._cy = cy
+
+    def world_to_screen(self, wp):
+        t = self.translation
+        return ((wp[0] - t.tx) * self.scaling + self._cx, self._cy - (wp[1] - t.ty) * self.scaling)
+
+    def screen_to_world(self, sp):
+        t = self.translation
+        return ((sp[0] - self._cx) * self.inv_scaling + t.tx, (self._cy - sp[1]) * self.inv_scaling + t.ty)
+
+
+class _Translation:
+    __slots__ = ('tx', 'ty')
+
+    def __init__(self, tx, ty):
+        self.tx = tx
+        self.ty = ty
+
+
+class ScrollingLayer:
+    """World-anchored off-screen layer that is redrawn only when it has to be.
+
+    `render(surface, rect, view)` draws everything intersecting `rect` as seen through
+    `view`; the surface clip is already set to `rect` and filled with the colour key.
+    The cached pixels are reused while the key, zoom and screen size stay the same.
+    A pan scrolls the surface by whole pixels and re-renders only the exposed strips;
+    the cached translation follows the scrolled pixels exactly, so strips line up
+    with the old content (the layer lags the camera by less than half a pixel).
+
+    The layer is an opaque surface with a colour key rather than SRCALPHA: blitting it
+    is a key test per pixel instead of a blend, and antialiased edges come out blended
+    against the key, which callers pick to be the background colour."""
+
+    def __init__(self, render):
+        self.render = render
+        self.surface = None
+        self.view = None
+        self.key = None
+        self.colorkey = None
+        self.full_renders = 0
+        self.strip_renders = 0
+
+    def invalidate(self):
+        self.key = None
+
+    def draw(self, screen, camera, key, colorkey):
+        size = screen.get_size()
+        s = float(camera.scaling)
+        tx, ty = float(camera.translation.tx), float(camera.translation.ty)
+        cx, cy = float(camera._cx), float(camera._cy)
+        surf = self.surface
+        full = (surf is None or surf.get_size() != size or key != self.key or colorkey != self.colorkey
+                or self.view is None or self.view.scaling != s
+                or (self.view._cx, self.view._cy) != (cx, cy))
+        if not full:
+            view = self.view
+            dx = int(round((view.translation.tx - tx) * s))
+            dy = int(round((ty - view.translation.ty) * s))
+            w, h = size
+            if abs(dx) >= w or abs(dy) >= h:
+                full = True
+            elif dx or dy:
+                self.view = LayerView(view.translation.tx - dx / s, view.translation.ty + dy / s, s, cx, cy)
+                surf.scroll(dx, dy)
+                self.strip_renders += 1
+                if dx > 0:
+                    self._render(pygame.Rect(0, 0, dx, h))
+                elif dx < 0:
+                    self._render(pygame.Rect(w + dx, 0, -dx, h))
+                if dy > 0:
+                    self._render(pygame.Rect(0, 0, w, dy))
+                elif dy < 0:
+                    self._render(pygame.Rect(0, h + dy, w, -dy))
+        if full:
+            if surf is None or surf.get_size() != size:
+                self.surface = pygame.Surface(size)
+            self.surface.set_colorkey(colorkey)
+            self.key, self.colorkey = key, colorkey
+            self.view = LayerView(tx, ty, s, cx, cy)
+            self._render(self.surface.get_rect())
+            self.full_renders += 1
+        screen.blit(self.surface, (0, 0))
+
+    def _render(self, rect):
+        surf = self.surface
+        surf.set_clip(rect)
+        surf.fill(self.colorkey)
+        try:
+            self.render(surf, rect, self.view)
+        finally:
+            surf.set_clip(None)
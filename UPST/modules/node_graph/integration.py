@@ -1,5 +1,4 @@
 # UPST/modules/node_graph/integration.py
-import pickle
 import pygame
 from UPST.modules.node_graph.node_graph_manager import NodeGraphManager
 from UPST.debug.debug_manager import Debug
@@ -8,7 +7,7 @@ from UPST.modules.node_graph.node_tools import get_all_node_tools
 
 def extend_snapshot_manager(snapshot_manager):
     orig_collect = snapshot_manager._collect_snapshot_data
-    orig_load = snapshot_manager.load_snapshot
+    orig_restore = snapshot_manager.restore_snapshot_data
 
     def new_collect(self):
         data = orig_collect()
@@ -16,16 +15,15 @@ def extend_snapshot_manager(snapshot_manager):
         data["node_graph"] = ngm.serialize_for_save()
         return data
 
-    def new_load(self, snapshot_bytes):
-        data = pickle.loads(snapshot_bytes)
-        result = orig_load(snapshot_bytes)
-        if "node_graph" in data:
+    def new_restore(self, data, previous=None):
+        result = orig_restore(data, previous)
+        if "node_graph" in data and (previous is None or previous.get("node_graph") != data["node_graph"]):
             ngm = NodeGraphManager()
             ngm.deserialize_from_save(data["node_graph"])
         return result
 
     snapshot_manager._collect_snapshot_data = new_collect.__get__(snapshot_manager)
-    snapshot_manager.load_snapshot = new_load.__get__(snapshot_manager)
+    snapshot_manager.restore_snapshot_data = new_restore.__get__(snapshot_manager)
     Debug.log_info("Node Graph integrated with SnapshotManager", "NodeGraph")
 
 
@@ -1,6 +1,6 @@
 import time
 import threading
-import collections
+import functools
 import pygame
 import pygame_gui
 import pygame.gfxdraw
@@ -8,53 +8,58 @@ from UPST.gui.plotter import Plotter
 from contextlib import contextmanager
 # from UPST.gizmos_manager import Gizmos
 from UPST.config import config
+from UPST.modules.trace_buffer import TraceRecorder
 
 _global_profiler = None
+_recorder = None
 
 def get_profiler():
     global _global_profiler
     return _global_profiler
 
 def set_profiler(profiler):
-    global _global_profiler
+    global _global_profiler, _recorder
     _global_profiler = profiler
+    _recorder = getattr(profiler, 'recorder', None)
 
 def profile(key, group=None):
     def decorator(func):
+        @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            profiler = get_profiler()
-            if profiler:
-                profiler.start(key, group)
-                try:
-                    return func(*args, **kwargs)
-                finally:
-                    profiler.stop(key)
-            else:
+            rec = _recorder
+            if rec is None or not rec.enabled:
+                return func(*args, **kwargs)
+            ring = rec.ring()
+            ring.begin(key, group)
+            try:
                 return func(*args, **kwargs)
+            finally:
+                ring.end(key)
         return wrapper
     return decorator
 
 @contextmanager
 def profile_context(key, group=None):
-    profiler = get_profiler()
-    if profiler:
-        profiler.start(key, group)
-        try:
-            yield
-        finally:
-            profiler.stop(key)
-    else:
+    rec = _recorder
+    if rec is None or not rec.enabled:
         yield
+        return
+    ring = rec.ring()
+    ring.begin(key, group)
+    try:
+        yield
+    finally:
+        ring.end(key)
 
 class Profiler:
     def __init__(self, manager, max_samples=config.profiler.max_samples, refresh_rate=config.profiler.update_delay, smoothing_factor=0.15):
         self.manager = manager
-        self.data = collections.defaultdict(lambda: collections.deque(maxlen=max_samples))
-        self.thread_local = threading.local()
+        self.recorder = TraceRecorder(config.profiler.ring_capacity, config.profiler.trace_history)
         self.lock = threading.RLock()
         self.visible = False
         self.running = True
         self.paused = config.profiler.paused
+        self.recorder.enabled = not self.paused
         self.refresh_rate = refresh_rate
         self.max_samples = max_samples
         self.smoothing_factor = smoothing_factor
@@ -72,12 +77,6 @@ class Profiler:
         self.thread = threading.Thread(target=self.run, daemon=True)
         self.thread.start()
 
-
-    def _get_current_dict(self):
-        if not hasattr(self.thread_local, 'current'):
-            self.thread_local.current = {}
-        return self.thread_local.current
-
     def toggle_window(self):
         if self.window:
             self.hide_window()
@@ -192,6 +191,7 @@ class Profiler:
                 self.needs_update = True
             elif event.ui_element == self.pause_button:
                 self.paused = not self.paused
+                self.recorder.enabled = not self.paused
                 self.pause_button.set_text('Resume' if self.paused else 'Pause')
             elif event.ui_element == self.toggle_mode_button:
                 self.plotter.set_overlay_mode(not self.plotter.overlay_mode)
@@ -229,29 +229,39 @@ class Profiler:
             )
 
     def start(self, key, group=None):
-        if self.paused:
-            return
-        current = self._get_current_dict()
-        current[key] = {"time": time.perf_counter(), "group": group}
+        if not self.paused:
+            self.recorder.ring().begin(key, group)
 
     def stop(self, key):
-        current = self._get_current_dict()
-        if key not in current:
+        if not self.paused:
+            self.recorder.ring().end(key)
+
+    def mark_frame(self):
+        self.recorder.mark_frame()
+
+    def export(self, path, seconds=None):
+        """.json -> Chrome Trace Event format, anything else -> collapsed stacks for flamegraph.pl."""
+        return self.recorder.export(path, seconds)
+
+    def _collect(self):
+        # агрегация по кадрам идёт здесь, в потоке профайлера, а не в пробах
+        frames = self.recorder.drain()
+        if not frames:
             return
-        start_data = current[key]
-        elapsed = (time.perf_counter() - start_data["time"]) * 1000
-        group = start_data["group"] or "uncategorized"  # ← Гарантируем группу
         now = time.perf_counter()
+        new_group = False
         with self.lock:
-            self.plotter.add_data(key, elapsed, group=group)
-            self.last_data_time[key] = now
+            for _, keys, _ in frames:
+                for key, (ms, group) in keys.items():
+                    self.plotter.add_data(key, ms, group=group)
+                    self.last_data_time[key] = now
+                    if group not in self.plotter.group_visibility:
+                        self.plotter.group_visibility[group] = True
+                    new_group = new_group or group not in self.group_buttons
             self.needs_update = True
-            if group not in self.plotter.group_visibility:
-                self.plotter.group_visibility[group] = True
-            if group not in self.group_buttons:
+            if new_group:
                 self._update_group_controls()
                 self._update_dropdown()
-        del current[key]
 
     def _remove_stale_keys(self):
         now = time.perf_counter()
@@ -265,9 +275,10 @@ class Profiler:
             self.needs_update = True
 
 
-    @profile("profiler_update")
     def run(self):
         while self.running:
+            if not self.paused:
+                self._collect()
             if self.visible and not self.paused:
                 current_time = time.perf_counter()
                 should_update = False
@@ -321,14 +332,14 @@ class Profiler:
             self.thread.join(timeout=1.0)
 
 def start_profiling(key, group=None):
-    profiler = get_profiler()
-    if profiler:
-        profiler.start(key, group)
+    rec = _recorder
+    if rec is not None and rec.enabled:
+        rec.ring().begin(key, group)
 
 def stop_profiling(key):
-    profiler = get_profiler()
-    if profiler:
-        profiler.stop(key)
+    rec = _recorder
+    if rec is not None and rec.enabled:
+        rec.ring().end(key)
 
 
 # Примеры использования профайлера:
@@ -3,10 +3,13 @@ import math
 import pymunk
 import time
 from UPST.config import config
-from UPST.utils.utils import bytes_to_surface
 from UPST.modules.texture_processor import TextureProcessor, TextureState
 from UPST.modules.profiler import profile
 from UPST.modules.cloud_manager import CloudManager, CloudRenderer
+from UPST.modules.shape_batch import ShapeBatch, PoseReader
+from UPST.modules.constraint_batch import ConstraintBatch
+from UPST.modules.sprite_cache import SpriteCache
+from UPST.modules.layer_cache import ScrollingLayer
 
 import pygame.gfxdraw
 
@@ -40,9 +43,25 @@ class Renderer:
         self.INT16_MIN, self.INT16_MAX = -32768, 32767
         self.outline_color = (50, 50, 50, 180)
         self.outline_thickness = 1
+        self.shape_batch = ShapeBatch(self)
+        self._texture_poses = PoseReader()
+        self.static_batch = ShapeBatch(self)
+        self._static_shapes = []
+        self.static_layer = ScrollingLayer(self._render_static_layer)
+        self.constraint_batch = ConstraintBatch(self, config.rendering.constraint_cache_mb,
+                                                config.rendering.sprite_rotation_step)
+        self.sprite_cache = SpriteCache(self._get_texture, config.rendering.sprite_cache_mb,
+                                        config.rendering.sprite_rotation_step, config.rendering.sprite_scale_step)
 
     @profile("_draw_constraints", "renderer")
     def _draw_constraints(self):
+        if config.rendering.batched_constraints:
+            self.constraint_batch.draw(self.screen, self.camera)
+        else:
+            with self.physics_manager.worker.hold():
+                self._draw_constraints_scalar()
+
+    def _draw_constraints_scalar(self):
         cam_scale = self.camera.scaling
         if cam_scale > 100: return
         theme = config.world.themes[config.world.current_theme]
@@ -121,6 +140,32 @@ class Renderer:
 
     @profile("_draw_physics_shapes", "renderer")
     def _draw_physics_shapes(self):
+        worker = self.physics_manager.worker
+        if not config.rendering.batched_shapes:
+            with worker.hold():
+                self._draw_physics_shapes_scalar()
+        elif not config.rendering.static_layer_cache:
+            with worker.hold():
+                shapes = list(self.physics_manager.space.shapes)
+            self.shape_batch.draw(self.screen, self.camera, self.clip_rect, shapes)
+        else:
+            # статика рисуется в кэшируемый слой под всеми остальными телами
+            static, moving = [], []
+            with worker.hold():
+                for shape in self.physics_manager.space.shapes:
+                    (static if shape.body.body_type == pymunk.Body.STATIC else moving).append(shape)
+                key = self.static_batch.state_key(static) if static else None
+            self._static_shapes = static
+            if static:
+                bg = tuple(config.world.themes[config.world.current_theme].background_color[:3])
+                key = (key, self.outline_color, self.outline_thickness, config.rendering.draw_circle_pointer)
+                self.static_layer.draw(self.screen, self.camera, key, bg)
+            self.shape_batch.draw(self.screen, self.camera, self.clip_rect, moving)
+
+    def _render_static_layer(self, surface, rect, view):
+        self.static_batch.draw(surface, view, rect, self._static_shapes)
+
+    def _draw_physics_shapes_scalar(self):
         screen, camera, clip, safe = self.screen, self.camera, self.clip_rect, self.safe_coord
         cam_scale = camera.scaling
         circles, polys, segments = [], [], []
@@ -274,26 +319,31 @@ class Renderer:
     @profile("draw", "renderer")
     def draw(self):
         start_time = pygame.time.get_ticks()
+        # тела рисуются по интерполированному снапшоту воркера; space держим только на чтение живых объектов
+        worker = self.physics_manager.worker
         theme = config.world.themes[config.world.current_theme]
         self.screen.fill(theme.background_color)
         self.gizmos_manager.draw_debug_gizmos()
         self._draw_physics_shapes()
         self._draw_constraints()
-        self.tool_manager.laser_processor.update()
+        with worker.hold():
+            self.tool_manager.laser_processor.update()
         self.tool_manager.laser_processor.draw(self.screen, self.camera)
         self._draw_textured_bodies()
 
         selected_set = getattr(self.physics_manager, 'selected_bodies', set())
-        for body in selected_set:
-            if body not in self.physics_manager.space.bodies: continue
-            for shape in body.shapes:
-                if isinstance(shape, pymunk.Circle):
-                    scr = self.camera.world_to_screen(body.position)
-                    r = shape.radius * self.camera.scaling
-                    pygame.draw.circle(self.screen, (255, 255, 255), (int(scr[0]), int(scr[1])), int(r), 2)
-                elif isinstance(shape, pymunk.Poly):
-                    verts = [self.camera.world_to_screen(body.local_to_world(v)) for v in shape.get_vertices()]
-                    pygame.draw.polygon(self.screen, (255, 255, 255), verts, 3)
+        if selected_set:
+            with worker.hold():
+                for body in selected_set:
+                    if body not in self.physics_manager.space.bodies: continue
+                    for shape in body.shapes:
+                        if isinstance(shape, pymunk.Circle):
+                            scr = self.camera.world_to_screen(body.position)
+                            r = shape.radius * self.camera.scaling
+                            pygame.draw.circle(self.screen, (255, 255, 255), (int(scr[0]), int(scr[1])), int(r), 2)
+                        elif isinstance(shape, pymunk.Poly):
+                            verts = [self.camera.world_to_screen(body.local_to_world(v)) for v in shape.get_vertices()]
+                            pygame.draw.polygon(self.screen, (255, 255, 255), verts, 3)
 
 
         if hasattr(self.ui_manager.app, 'console_handler'): self.ui_manager.app.console_handler.draw_graph()
@@ -325,37 +375,33 @@ class Renderer:
         if current_time - self.last_texture_update > self.texture_update_interval:
             self._update_texture_cache()
             self.last_texture_update = current_time
-        for body in self.physics_manager.space.bodies:
-            tex = None
-            if hasattr(body, 'texture_bytes') and body.texture_bytes is not None:
-                size = getattr(body, 'texture_size', None)
-                if not (size and isinstance(size, (tuple, list)) and len(size) == 2): continue
-                width, height = size
-                if width <= 0 or height <= 0: continue
-                cache_key = (body.texture_bytes, size)
-                if cache_key not in self.texture_cache:
-                    self.texture_cache[cache_key] = bytes_to_surface(body.texture_bytes, size)
-                tex = self.texture_cache[cache_key]
-            elif hasattr(body, 'texture_path') and body.texture_path:
-                tex = self._get_texture(body.texture_path)
-            if not tex: continue
-            scale_mult = getattr(body, 'texture_scale', 1.0)
-            stretch = getattr(body, 'stretch_texture', True)
-            rotation = getattr(body, 'texture_rotation', 0.0)
-            mirror_x = getattr(body, 'texture_mirror_x', False)
-            mirror_y = getattr(body, 'texture_mirror_y', False)
+        sprites = self.sprite_cache
+        worker = self.physics_manager.worker
+        with worker.hold():
+            keyed = [(b, k) for b in self.physics_manager.space.bodies for k in (sprites.source_key(b),) if k is not None]
+        if not keyed: return
+        pos, ang = self._texture_poses.read(worker, [b for b, _ in keyed])
+        for i, (body, src_key) in enumerate(keyed):
             texture_state = getattr(body, 'texture_state', None)
-            texture_offset = getattr(body, 'texture_offset', (0, 0))
-            processed_tex = tex
             if texture_state:
-                processed_tex = self._apply_texture_state(tex, texture_state)
+                mirror_x, mirror_y, rotation = texture_state.mirror_x, texture_state.mirror_y, texture_state.rotation
             else:
-                if mirror_x or mirror_y: processed_tex = pygame.transform.flip(processed_tex, mirror_x, mirror_y)
-                if rotation != 0: processed_tex = pygame.transform.rotozoom(processed_tex, rotation, 1.0)
-            if any(isinstance(s, pymunk.Circle) for s in body.shapes):
-                self._draw_circle_texture(body, processed_tex, scale_mult, stretch, texture_offset)
-            elif any(isinstance(s, pymunk.Poly) for s in body.shapes):
-                self._draw_poly_texture(body, processed_tex, stretch, scale_mult, texture_offset)
+                mirror_x = getattr(body, 'texture_mirror_x', False)
+                mirror_y = getattr(body, 'texture_mirror_y', False)
+                rotation = getattr(body, 'texture_rotation', 0.0)
+            tex = sprites.processed(src_key, body, mirror_x, mirror_y, rotation)
+            if not tex: continue
+            pkey = (src_key, mirror_x, mirror_y, rotation)
+            stretch = getattr(body, 'stretch_texture', True)
+            texture_offset = getattr(body, 'texture_offset', (0, 0))
+            shape = next((s for s in body.shapes if isinstance(s, pymunk.Circle)), None)
+            pose = (pos[i, 0], pos[i, 1]), ang[i]
+            if shape is not None:
+                self._draw_circle_texture(pose, shape, pkey, tex, texture_offset)
+                continue
+            shape = next((s for s in body.shapes if isinstance(s, pymunk.Poly)), None)
+            if shape is not None:
+                self._draw_poly_texture(pose, shape, pkey, tex, stretch, texture_offset)
 
     def _apply_texture_state(self, tex, state: TextureState):
         processed = tex
@@ -368,62 +414,29 @@ class Renderer:
             for key in list(self.texture_cache.keys())[:len(self.texture_cache) - self.texture_cache_size]:
                 del self.texture_cache[key]
 
-    def _draw_circle_texture(self, body, tex, scale_mult, stretch, offset):
-        circle = next(s for s in body.shapes if isinstance(s, pymunk.Circle))
+    def _draw_circle_texture(self, pose, circle, pkey, tex, offset):
         radius_px = circle.radius * self.camera.scaling
         if radius_px <= 0: return
-        diam = radius_px * 2
-        pos = self.camera.world_to_screen(body.position)
-        scaled_tex = pygame.transform.smoothscale(tex, (max(1, int(diam)), max(1, int(diam))))
-        mask = pygame.Surface((scaled_tex.get_width(), scaled_tex.get_height()), pygame.SRCALPHA)
-        pygame.draw.circle(mask, (255, 255, 255, 255), (scaled_tex.get_width() // 2, scaled_tex.get_height() // 2), int(radius_px))
-        scaled_tex.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-        angle_deg = math.degrees(body.angle)
-        offset_x = offset[0] * self.camera.scaling
-        offset_y = offset[1] * self.camera.scaling
-        if abs(angle_deg) > 0.1:
-            rotated = pygame.transform.rotozoom(scaled_tex, angle_deg, 1.0)
-            self.screen.blit(rotated, (pos[0] - rotated.get_width() / 2 + offset_x, pos[1] - rotated.get_height() / 2 + offset_y))
-        else:
-            self.screen.blit(scaled_tex, (pos[0] - scaled_tex.get_width() / 2 + offset_x, pos[1] - scaled_tex.get_height() / 2 + offset_y))
+        (x, y), angle = self.camera.world_to_screen(pose[0]), pose[1]
+        if not (math.isfinite(x) and math.isfinite(y)): return
+        reach = radius_px * 1.5
+        if x + reach < 0 or y + reach < 0 or x - reach > self.screen_w or y - reach > self.screen_h: return
+        sprite = self.sprite_cache.circle_sprite(pkey, tex, radius_px, self.sprite_cache.bucket(angle))
+        s = self.camera.scaling
+        self.screen.blit(sprite, (x - sprite.get_width() / 2 + offset[0] * s, y - sprite.get_height() / 2 + offset[1] * s))
 
-    def _draw_poly_texture(self, body, tex, stretch, scale_mult, offset):
-        poly = next(s for s in body.shapes if isinstance(s, pymunk.Poly))
-        local_verts = poly.get_vertices()
-        if len(local_verts) < 3: return
-        world_verts = [body.local_to_world(v) for v in local_verts]
-        screen_verts = [self.camera.world_to_screen(v) for v in world_verts]
-        if not screen_verts: return
-        min_x = min(v[0] for v in screen_verts)
-        max_x = max(v[0] for v in screen_verts)
-        min_y = min(v[1] for v in screen_verts)
-        max_y = max(v[1] for v in screen_verts)
-        w_scr = max_x - min_x
-        h_scr = max_y - min_y
-        if w_scr <= 0 or h_scr <= 0: return
-        if stretch:
-            tex_surf = pygame.transform.smoothscale(tex, (max(1, int(w_scr)), max(1, int(h_scr))))
-        else:
-            tex_w, tex_h = tex.get_size()
-            scale = min(w_scr / tex_w, h_scr / tex_h)
-            scaled = pygame.transform.smoothscale_by(tex, scale)
-            tex_surf = pygame.transform.smoothscale(scaled, (max(1, int(w_scr)), max(1, int(h_scr))))
-        angle_deg = math.degrees(body.angle)
-        if abs(angle_deg) > 0.1: tex_surf = pygame.transform.rotozoom(tex_surf, angle_deg, 1.0)
-        w_rot, h_rot = tex_surf.get_size()
-        center_x = (min_x + max_x) / 2
-        center_y = (min_y + max_y) / 2
-        offset_x = offset[0] * self.camera.scaling
-        offset_y = offset[1] * self.camera.scaling
-        temp_surf = pygame.Surface((w_rot, h_rot), pygame.SRCALPHA)
-        temp_surf.blit(tex_surf, (0, 0))
-        rel_offset_x = center_x - w_rot / 2
-        rel_offset_y = center_y - h_rot / 2
-        rel_verts = [(sx - rel_offset_x, sy - rel_offset_y) for sx, sy in screen_verts]
-        mask = pygame.Surface((w_rot, h_rot), pygame.SRCALPHA)
-        pygame.draw.polygon(mask, (255, 255, 255, 255), rel_verts)
-        temp_surf.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
-        self.screen.blit(temp_surf, (rel_offset_x + offset_x, rel_offset_y + offset_y))
+    def _draw_poly_texture(self, pose, poly, pkey, tex, stretch, offset):
+        verts = tuple((v.x, v.y) for v in poly.get_vertices())
+        if len(verts) < 3: return
+        s = self.camera.scaling
+        (x, y), angle = self.camera.world_to_screen(pose[0]), pose[1]
+        if not (math.isfinite(x) and math.isfinite(y)): return
+        reach = max(math.hypot(vx, vy) for vx, vy in verts) * s * 1.5
+        if x + reach < 0 or y + reach < 0 or x - reach > self.screen_w or y - reach > self.screen_h: return
+        hit = self.sprite_cache.poly_sprite(pkey, tex, verts, s, stretch, self.sprite_cache.bucket(angle))
+        if hit is None: return
+        sprite, ox, oy = hit
+        self.screen.blit(sprite, (x + ox + offset[0] * s, y + oy + offset[1] * s))
 
     def _get_scaled_texture(self, path, scale):
         key = (path, round(scale, 3))
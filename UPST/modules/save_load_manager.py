@@ -4,21 +4,31 @@ from tkinter import filedialog
 import pickle
 import traceback
 import pymunk
-import gzip
-import lzma
 import threading
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
 import os
+import io
+import time
 import pygame_gui
 
 from UPST.config import config
 from UPST.debug.debug_manager import Debug
 from UPST.gizmos.gizmos_manager import get_gizmos, GizmoType, GizmoData
-from UPST.utils.utils import surface_to_bytes, bytes_to_surface, safe_filedialog
+from UPST.utils.utils import safe_filedialog
+from UPST.utils.serialization import (read_save_file, restore_physics_settings, restore_bodies,
+                                      restore_constraints, restore_static_lines)
+from UPST.utils.blob_store import BlobStore, pack_save_data, unpack_save_data
+from UPST.utils.save_container import write_container, read_save_info
 from UPST.modules.undo_redo_manager import get_undo_redo
 import pygame
 
 
+def _color(c, default=(200, 200, 200, 255)):
+    # инструменты хранят pygame.Color; в сохранение пишем простой кортеж
+    if c is None: return None if default is None else tuple(default)
+    return tuple(int(v) for v in c)
+
+
 class SaveLoadManager:
     def __init__(self, physics_manager, camera, ui_manager, sound_manager, app):
         self.app = app
@@ -29,6 +39,7 @@ class SaveLoadManager:
         self.undo_redo = get_undo_redo()
         self.enable_compression = config.save_load.enable_compression
         self.compression_method = config.save_load.compression_method
+        self.blobs = BlobStore()
 
         self._executor = ThreadPoolExecutor(max_workers=1)
         self._autosave_lock = threading.Lock()
@@ -112,9 +123,7 @@ class SaveLoadManager:
 
     def _load_autosave_task(self):
         try:
-            with open(config.app.autosave_path, "rb") as f:
-                data = f.read()
-            self._apply_loaded_data(pickle.loads(data))
+            self._apply_loaded_data(read_save_file(config.app.autosave_path))
             return True, None
         except Exception as e:
             return False, str(e)
@@ -139,9 +148,7 @@ class SaveLoadManager:
         if not self._autosave_lock.acquire(blocking=False):
             return
         try:
-            snapshot_bytes = pickle.dumps(data)
-            with open(config.app.autosave_path, "wb") as f:
-                f.write(snapshot_bytes)
+            write_container(config.app.autosave_path, pack_save_data(data), codec="none", meta=self._save_meta(data))
             Debug.log_success("Autosave written to root directory.", category="SaveLoadManager")
         except Exception as e:
             Debug.log_error(f"Autosave write failed: {e}", category="SaveLoadManager")
@@ -157,7 +164,7 @@ class SaveLoadManager:
     def create_snapshot(self) -> bytes:
         data = self.capture_snapshot_data()
         self.save_autosave_background(data)
-        return pickle.dumps(data)
+        return pickle.dumps(pack_save_data(data))
 
     def save_world(self):
         root = tk.Tk(); root.withdraw()
@@ -166,11 +173,10 @@ class SaveLoadManager:
                              freeze_watcher=self.app.freeze_watcher)
         if not fp: Debug.log_warning("Canceled...", "SaveLoadManager"); return
         try:
-            data = self._prepare_save_data()
-            if self.enable_compression:
-                if self.compression_method == "lzma": lzma.open(fp,"wb").__enter__().write(pickle.dumps(data))
-                else: gzip.open(fp,"wb").__enter__().write(pickle.dumps(data))
-            else: open(fp,"wb").write(pickle.dumps(data))
+            raw = self._prepare_save_data()
+            codec = self.compression_method if self.enable_compression else "none"
+            write_container(fp, pack_save_data(raw), codec=codec, meta=self._save_meta(raw),
+                            preview_png=self._preview_png(raw))
             Debug.log_success(f"Saved to {fp}", "SaveLoadManager")
         except Exception as e:
             Debug.log_exception(f"Save failed for {fp}: {traceback.format_exc()}", "SaveLoadManager")
@@ -205,6 +211,7 @@ class SaveLoadManager:
                 data['graph_tool_state'] = graph_tool.serialize_for_save()
         sim_bodies = [b for b in self.physics_manager.space.bodies if b is not self.physics_manager.static_body]
         body_map = {b: i for i, b in enumerate(sim_bodies)}
+        used_blobs = set()
         for body in sim_bodies:
             if not hasattr(body, '_script_uuid'):
                 body._script_uuid = uuid.uuid4()
@@ -212,7 +219,7 @@ class SaveLoadManager:
             for shape in body.shapes:
                 shape_data = {"type": shape.__class__.__name__, "friction": float(getattr(shape, "friction", 0.5)),
                               "elasticity": float(getattr(shape, "elasticity", 0.0)),
-                              "color": getattr(shape, "color", (200, 200, 200, 255))}
+                              "color": _color(getattr(shape, "color", None))}
                 if isinstance(shape, pymunk.Circle):
                     shape_data.update(
                         {"radius": float(shape.radius), "offset": tuple(getattr(shape, "offset", (0.0, 0.0)))})
@@ -226,11 +233,15 @@ class SaveLoadManager:
                        'renderer'): tex_surface = self.physics_manager.app.renderer._get_texture(
                 getattr(body, 'texture_path', None))
             texture_path = getattr(body, 'texture_path', None)
-            tex_bytes = surface_to_bytes(tex_surface) if tex_surface else None
-            tex_size = tex_surface.get_size() if tex_surface else None
+            tex_bytes, tex_size = None, None
+            if tex_surface:
+                # одна и та же поверхность конвертируется один раз, байты общие для всех тел
+                key = self.blobs.put_surface(tex_surface)
+                used_blobs.add(key)
+                tex_bytes, tex_size = self.blobs.get(key), tex_surface.get_size()
             body_data = {
                 "_script_uuid": str(body._script_uuid),
-                "color": tuple(getattr(body, "color", (200, 200, 200, 255))),
+                "color": _color(getattr(body, "color", None)),
                 "name": str(getattr(body, "name", "Body"),),
                 "position": tuple(body.position), "angle": float(body.angle), "velocity": tuple(body.velocity),
                 "angular_velocity": float(body.angular_velocity), "mass": float(getattr(body, "mass", 1.0)),
@@ -242,6 +253,7 @@ class SaveLoadManager:
 
             }
             data["bodies"].append(body_data)
+        self.blobs.retain(used_blobs)
 
         for c in list(self.physics_manager.space.constraints):
             if c.a not in body_map or c.b not in body_map: continue
@@ -256,7 +268,7 @@ class SaveLoadManager:
                     "stiffness": float(c.stiffness),
                     "damping": float(c.damping),
                     "size": float(getattr(c, 'size', 10.0)),
-                    "color": getattr(c, 'color', (200, 200, 200, 255))
+                    "color": _color(getattr(c, 'color', None))
                 })
             elif isinstance(c,pymunk.SimpleMotor): cd["rate"] = float(c.rate)
             elif isinstance(c,pymunk.GearJoint): cd.update({"phase":float(c.phase),"ratio":float(c.ratio)})
@@ -264,7 +276,7 @@ class SaveLoadManager:
             elif isinstance(c,pymunk.RotaryLimitJoint): cd.update({"min":float(c.min),"max":float(c.max)})
             data["constraints"].append(cd)
         for line in list(self.physics_manager.static_lines):
-            ld = {"friction":float(getattr(line,"friction",0.5)),"elasticity":float(getattr(line,"elasticity",0.0)),"color":getattr(line,"color",(200,200,200,255))}
+            ld = {"friction":float(getattr(line,"friction",0.5)),"elasticity":float(getattr(line,"elasticity",0.0)),"color":_color(getattr(line,"color",None))}
             if isinstance(line,pymunk.Poly): ld.update({"type":"Poly","vertices":[tuple(v) for v in line.get_vertices()]})
             elif isinstance(line,pymunk.Segment): ld.update({"type":"Segment","a":tuple(line.a),"b":tuple(line.b),"radius":float(line.radius)})
             else: continue
@@ -281,8 +293,8 @@ class SaveLoadManager:
                     text_gizmos.append({
                         'position': tuple(g.position),
                         'text': g.text,
-                        'color': g.color,
-                        'background_color': g.background_color,
+                        'color': _color(g.color),
+                        'background_color': _color(g.background_color, None),
                         'collision': g.collision,
                         'font_name': g.font_name,
                         'font_size': g.font_size,
@@ -324,6 +336,32 @@ class SaveLoadManager:
             data["plugin_states"] = plugin_states
         return data
 
+    def _save_meta(self, data):
+        scripts = data.get("scripts") or {}
+        return {
+            "title": getattr(self.app, "current_scene_meta", {}).get("title", ""),
+            "saved_at": time.time(),
+            "body_count": len(data.get("bodies", [])),
+            "constraint_count": len(data.get("constraints", [])),
+            "script_count": len(scripts.get("object_scripts", [])) + len(scripts.get("world_scripts", [])),
+        }
+
+    def _preview_png(self, data):
+        try:
+            buf = io.BytesIO()
+            pygame.image.save(self.render_preview(data), buf, "preview.png")
+            return buf.getvalue()
+        except Exception as e:
+            Debug.log_warning(f"Preview encoding failed: {e}", "SaveLoadManager")
+            return None
+
+    @staticmethod
+    def read_save_info(fp):
+        """(meta, preview surface or None) of a save without loading the world."""
+        meta, png = read_save_info(fp)
+        preview = pygame.image.load(io.BytesIO(png), "preview.png") if png else None
+        return meta, preview
+
     def load_world(self):
         root = tk.Tk(); root.withdraw()
         fp = safe_filedialog(filedialog.askopenfilename,filetypes=[("UPST Save File","*.space")],
@@ -338,12 +376,7 @@ class SaveLoadManager:
             Debug.log_exception(f"Load failed for {fp}: {traceback.format_exc()}", "SaveLoadManager")
 
     def _load_data_with_fallback(self, fp):
-        methods = [("lzma",lambda:lzma.open(fp,"rb")),("gzip",lambda:gzip.open(fp,"rb")),("none",lambda:open(fp,"rb"))]
-        for name,opener in methods:
-            try:
-                with opener() as f: return pickle.load(f)
-            except (lzma.LZMAError,gzip.BadGzipFile,UnicodeDecodeError,EOFError,ValueError): continue
-        raise Exception("Unable to load file with any compression method")
+        return read_save_file(fp)
 
     def apply_meta(self, meta):
         self.app.current_scene_meta = meta or {}
@@ -351,19 +384,9 @@ class SaveLoadManager:
             self.app.set_window_title(meta.get("title", "Untitled Scene"))
 
     def _apply_loaded_data(self, data):
+        data = unpack_save_data(data)
         self.physics_manager.delete_all()
-        self.physics_manager.set_iterations(int(data.get("iterations",config.physics.iterations)))
-        self.physics_manager.set_simulation_frequency(int(data.get("sim_freq",config.physics.simulation_frequency)))
-        self.physics_manager.space.gravity = tuple(data.get("gravity",(0.0,900.0)))
-        self.physics_manager.set_damping(float(data.get("damping_linear",1.0)),float(data.get("damping_angular",0.0)))
-        self.physics_manager.set_sleep_time_threshold(float(data.get("sleep_time_threshold",config.physics.sleep_time_threshold)))
-        self.physics_manager.set_collision_slop(float(data.get("collision_slop",0.5)))
-        self.physics_manager.set_collision_bias(float(data.get("collision_bias",pow(1.0-0.1,60.0))))
-
-        self.physics_manager.set_air_friction_linear(int(data.get("air_friction_linear",config.physics.air_friction_linear)))
-        self.physics_manager.set_air_friction_quadratic(int(data.get("air_friction_quadratic",config.physics.air_friction_quadratic)))
-        self.physics_manager.set_air_friction_multiplier(int(data.get("air_friction_multiplier",config.physics.air_friction_multiplier)))
-        self.physics_manager.set_air_density(int(data.get("air_density",config.physics.air_density)))
+        restore_physics_settings(self.physics_manager, data)
 
         if "graphs" in data and hasattr(self.physics_manager.app, 'console_handler'):
             graph_mgr = self.physics_manager.app.console_handler.graph_manager
@@ -378,86 +401,17 @@ class SaveLoadManager:
         cam_scale = float(data.get("camera_scaling",getattr(self.camera,"scaling",1.0)))
         self.camera.scaling = cam_scale
         if hasattr(self.camera,"target_scaling"): self.camera.target_scaling = cam_scale
-        loaded_bodies = []
-        body_uuid_map = {}
-        for bd in data.get("bodies", []):
-            body_type = int(bd.get("body_type", int(pymunk.Body.DYNAMIC)))
-            bt = pymunk.Body(body_type=body_type)
-            if '_script_uuid' in bd and bd['_script_uuid']:
-                try:
-                    bt._script_uuid = uuid.UUID(bd['_script_uuid'])
-                except:
-                    bt._script_uuid = uuid.uuid4()
-            else:
-                bt._script_uuid = uuid.uuid4()
-            body_uuid_map[bt._script_uuid] = bt
-            if bt.body_type == pymunk.Body.DYNAMIC:
-                bt.mass = float(bd.get("mass",1.0))
-                bt.moment = float(bd.get("moment",1.0))
-            bt.name = bd.get("name",None)
-            bt.color = bd.get("color",(255,255,255,255))
-            bt.position = pymunk.Vec2d(*bd.get("position",(0.0,0.0)))
-            bt.angle = float(bd.get("angle",0.0))
-            bt.velocity = pymunk.Vec2d(*bd.get("velocity",(0.0,0.0)))
-            bt.angular_velocity = float(bd.get("angular_velocity",0.0))
-            bt.texture_path = bd.get("texture_path")
-            bt.texture_bytes = bd.get("texture_bytes")
-            bt.texture_size = bd.get("texture_size")
-            bt.texture_scale = float(bd.get("texture_scale",1.0))
-            bt.stretch_texture = bool(bd.get("stretch_texture",True))
-            shapes = []
-            for sd in bd.get("shapes",[]):
-                st = sd.get("type","")
-                shp = None
-                if st == "Circle": shp = pymunk.Circle(bt,float(sd["radius"]),tuple(sd.get("offset",(0.0,0.0))))
-                elif st == "Poly": shp = pymunk.Poly(bt,[pymunk.Vec2d(*v) for v in sd["vertices"]])
-                elif st == "Segment": shp = pymunk.Segment(bt,pymunk.Vec2d(*sd["a"]),pymunk.Vec2d(*sd["b"]),float(sd["radius"]))
-                if shp:
-                    shp.friction = float(sd.get("friction",0.5))
-                    shp.elasticity = float(sd.get("elasticity",0.0))
-                    shp.color = tuple(sd.get("color",(200,200,200,255)))
-                    shapes.append(shp)
-            if shapes: self.physics_manager.space.add(bt,*shapes)
-            else: self.physics_manager.space.add(bt)
-            loaded_bodies.append(bt)
+        loaded_bodies, body_uuid_map = restore_bodies(self.physics_manager, data)
         script_data = data.get("scripts", {})
         self.physics_manager.script_manager.deserialize_from_save(script_data, body_uuid_map)
-        for cd in data.get("constraints",[]):
-            a = loaded_bodies[cd["a"]]; b = loaded_bodies[cd["b"]]; ctype = cd["type"]; c = None
-            if ctype == "PinJoint": c = pymunk.PinJoint(a,b,cd["anchor_a"],cd["anchor_b"])
-            elif ctype == "PivotJoint": c = pymunk.PivotJoint(a,b,cd["anchor"])
-            elif ctype == "DampedSpring":
-                c = pymunk.DampedSpring(a, b, cd["anchor_a"], cd["anchor_b"], float(cd["rest_length"]),
-                                        float(cd["stiffness"]), float(cd["damping"]))
-                if "size" in cd:
-                    c.size = float(cd["size"])
-                if "color" in cd:
-                    c.color = tuple(cd["color"])
-            elif ctype == "SimpleMotor": c = pymunk.SimpleMotor(a,b,float(cd["rate"]))
-            elif ctype == "GearJoint": c = pymunk.GearJoint(a,b,float(cd["phase"]),float(cd["ratio"]))
-            elif ctype == "SlideJoint": c = pymunk.SlideJoint(a,b,cd["anchor_a"],cd["anchor_b"],float(cd["min"]),float(cd["max"]))
-            elif ctype == "RotaryLimitJoint": c = pymunk.RotaryLimitJoint(a,b,float(cd["min"]),float(cd["max"]))
-            if c: self.physics_manager.add_constraint(c)
-        for ld in data.get("static_lines",[]):
-            line = None
-            if ld.get("type") == "Poly": line = pymunk.Poly(self.physics_manager.static_body,[pymunk.Vec2d(*v) for v in ld["vertices"]])
-            elif ld.get("type") == "Segment": line = pymunk.Segment(self.physics_manager.static_body,pymunk.Vec2d(*ld["a"]),pymunk.Vec2d(*ld["b"]),float(ld["radius"]))
-            if line:
-                line.friction = float(ld.get("friction",0.5))
-                line.elasticity = float(ld.get("elasticity",0.0))
-                line.color = tuple(ld.get("color",(200,200,200,255)))
-                self.physics_manager.static_lines.append(line)
-                self.physics_manager.space.add(line)
+        restore_constraints(self.physics_manager, data, loaded_bodies)
+        restore_static_lines(self.physics_manager, data)
         if hasattr(self.physics_manager.app,'renderer') and "bodies" in data:
             renderer = self.physics_manager.app.renderer
-            unique_textures = {}
-            for bd in data["bodies"]:
-                tex_bytes = bd.get("texture_bytes"); tex_size = bd.get("texture_size")
-                if tex_bytes and tex_size and tex_bytes not in unique_textures:
-                    surf = bytes_to_surface(tex_bytes,tex_size)
-                    if surf: unique_textures[tex_bytes] = surf
             renderer.texture_cache.clear()
-            for tex_bytes,surf in unique_textures.items(): renderer.texture_cache[tex_bytes] = surf
+            renderer.sprite_cache.clear()
+            for bd in data["bodies"]:
+                renderer.sprite_cache.preload(bd.get("texture_bytes"), bd.get("texture_size"))
 
         gizmos_mgr = get_gizmos()
         if gizmos_mgr and "text_gizmos" in data:
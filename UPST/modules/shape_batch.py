@@ -0,0 +1,273 @@
+# UPST/modules/shape_batch.py
+import pymunk
+import pygame
+import pygame.gfxdraw
+import numpy as np
+from numba import njit
+
+from UPST.physics.body_buffer import geometry_version
+
+_I16_MIN, _I16_MAX = -32768, 32767
+
+
+@njit(cache=True, nogil=True)
+def transform_points(local, owner, pos, cos_a, sin_a, s, tx, ty, cx, cy, out):
+    for k in range(local.shape[0]):
+        i = owner[k]
+        lx = local[k, 0]
+        ly = local[k, 1]
+        wx = pos[i, 0] + lx * cos_a[i] - ly * sin_a[i]
+        wy = pos[i, 1] + lx * sin_a[i] + ly * cos_a[i]
+        out[k, 0] = (wx - tx) * s + cx
+        out[k, 1] = cy - (wy - ty) * s
+
+
+class PoseReader:
+    """Poses of a fixed body list for drawing: rows come from the worker's interpolated
+    snapshot while it runs; bodies outside the snapshot (or everything, when stepping on
+    the main thread) are read live under worker.hold()."""
+
+    def __init__(self):
+        self._key = None
+
+    def read(self, worker, bodies):
+        n = len(bodies)
+        pos = np.empty((n, 2), dtype=np.float64)
+        ang = np.empty(n, dtype=np.float64)
+        snap = worker.interpolated() if worker.running else None
+        live = range(n)
+        if snap is not None:
+            snap_bodies, index, spos, sang = snap
+            if self._key is None or self._key[0] is not snap_bodies or self._key[1] is not bodies:
+                idx = np.array([index.get(b, -1) for b in bodies], dtype=np.int64)
+                self._key = (snap_bodies, bodies, idx)
+            idx = self._key[2]
+            hit = idx >= 0
+            pos[hit] = spos[idx[hit]]
+            ang[hit] = sang[idx[hit]]
+            live = np.flatnonzero(~hit)
+        if len(live):
+            with worker.hold():
+                for i in live:
+                    b = bodies[i]
+                    p = b.position
+                    pos[i, 0] = p.x
+                    pos[i, 1] = p.y
+                    ang[i] = b.angle
+        return pos, ang
+
+
+class ShapeBatch:
+    """Batched drawing of space shapes for Renderer.
+
+    Local geometry (poly vertices, circle offsets, segment endpoints) is packed into one
+    point array and rebuilt only when the space's shape list or geometry_version() changes. Per frame, body
+    poses are gathered once, all points go through a single camera transform, shapes are
+    culled by screen AABB against the renderer clip rect, and translucent shapes are
+    drawn per colour group onto a shared overlay that is blitted once per group."""
+
+    def __init__(self, renderer):
+        self.renderer = renderer
+        self._shapes = None
+        self._overlay = None
+        self.poses = PoseReader()
+        self._geometry = -1
+        self.generation = 0
+        self._build([])
+
+    def invalidate(self):
+        self._shapes = None
+
+    def _build(self, shapes):
+        bodies, body_idx = [], {}
+        poly_shapes, poly_owner, poly_vstart, poly_vcount, poly_verts = [], [], [], [], []
+        circ_shapes, circ_owner, circ_off, circ_r = [], [], [], []
+        seg_shapes, seg_owner, seg_a, seg_b, seg_r = [], [], [], [], []
+        for shape in shapes:
+            if not hasattr(shape, 'color'):
+                continue
+            body = shape.body
+            i = body_idx.get(body)
+            if i is None:
+                i = body_idx[body] = len(bodies)
+                bodies.append(body)
+            if isinstance(shape, pymunk.Circle):
+                circ_shapes.append(shape)
+                circ_owner.append(i)
+                circ_off.append(tuple(shape.offset))
+                circ_r.append(shape.radius)
+            elif isinstance(shape, pymunk.Poly):
+                verts = shape.get_vertices()
+                if len(verts) < 3:
+                    continue
+                poly_shapes.append(shape)
+                poly_owner.append(i)
+                poly_vstart.append(len(poly_verts))
+                poly_vcount.append(len(verts))
+                poly_verts.extend(tuple(v) for v in verts)
+            elif isinstance(shape, pymunk.Segment):
+                seg_shapes.append(shape)
+                seg_owner.append(i)
+                seg_a.append(tuple(shape.a))
+                seg_b.append(tuple(shape.b))
+                seg_r.append(shape.radius)
+        self._shapes = list(shapes)
+        self._geometry = geometry_version()
+        self.generation += 1
+        self.bodies = bodies
+        self.poly_shapes, self.circ_shapes, self.seg_shapes = poly_shapes, circ_shapes, seg_shapes
+        self.poly_vstart = np.array(poly_vstart, dtype=np.int64)
+        self.poly_vcount = np.array(poly_vcount, dtype=np.int64)
+        self.circ_r = np.array(circ_r, dtype=np.float64)
+        self.seg_r = np.array(seg_r, dtype=np.float64)
+        nv, nc, ns = len(poly_verts), len(circ_off), len(seg_a)
+        self._c0, self._s0 = nv, nv + nc
+        vert_owner = np.repeat(np.array(poly_owner, dtype=np.int64), self.poly_vcount)
+        self.local = np.array(poly_verts + circ_off + seg_a + seg_b, dtype=np.float64).reshape(-1, 2)
+        self.owner = np.concatenate([vert_owner, np.array(circ_owner + seg_owner + seg_owner, dtype=np.int64)])
+        self.screen_pts = np.zeros((nv + nc + 2 * ns, 2), dtype=np.float64)
+
+    def _sync(self, shapes):
+        shapes = list(shapes)
+        if self._shapes is None or self._geometry != geometry_version() or shapes != self._shapes:
+            self._build(shapes)
+
+    def state_key(self, shapes):
+        """Everything that decides how `shapes` look apart from the camera: the shape list,
+        body poses and colours. Used to invalidate cached layers of static geometry."""
+        self._sync(shapes)
+        return (self.generation, [(b.position, b.angle) for b in self.bodies],
+                [getattr(s, 'color', None) for s in self._shapes])
+
+    def _overlay_for(self, screen):
+        size = screen.get_size()
+        if self._overlay is None or self._overlay.get_size() != size:
+            self._overlay = pygame.Surface(size, pygame.SRCALPHA)
+        return self._overlay
+
+    def draw(self, screen, camera, clip, shapes=None):
+        r = self.renderer
+        self._sync(r.physics_manager.space.shapes if shapes is None else shapes)
+        if not self._shapes:
+            return
+        pos, ang = self.poses.read(r.physics_manager.worker, self.bodies)
+        s = float(camera.scaling)
+        transform_points(self.local, self.owner, pos, np.cos(ang), np.sin(ang), s,
+                         float(camera.translation.tx), float(camera.translation.ty),
+                         float(camera._cx), float(camera._cy), self.screen_pts)
+        pts = self.screen_pts
+        finite = np.isfinite(pts).all(axis=1)
+        ipts = np.clip(np.rint(np.where(finite[:, None], pts, 0.0)), _I16_MIN, _I16_MAX).astype(np.int64)
+        x0, y0, x1, y1 = clip.x, clip.y, clip.x + clip.w, clip.y + clip.h
+        outline, othick = r.outline_color, r.outline_thickness
+        overlay = self._overlay_for(screen)
+        groups = {}
+
+        # circles
+        c0, s0 = self._c0, self._s0
+        if self.circ_shapes:
+            cp = pts[c0:s0]
+            rp = self.circ_r * s
+            dx = np.clip(cp[:, 0], x0, x1) - cp[:, 0]
+            dy = np.clip(cp[:, 1], y0, y1) - cp[:, 1]
+            vis = finite[c0:s0] & (rp > 0) & (dx * dx + dy * dy <= rp * rp)
+            ic = ipts[c0:s0]
+            ir = np.minimum(rp, _I16_MAX).astype(np.int64)
+            or8, og8, ob8 = outline[:3]
+            for k in np.flatnonzero(vis & (ir > 0)):
+                shape = self.circ_shapes[k]
+                col = shape.color
+                if len(col) == 3: col = (*col, 255)
+                x, y, rad = int(ic[k, 0]), int(ic[k, 1]), int(ir[k])
+                if col[3] == 255:
+                    pygame.gfxdraw.filled_circle(screen, x, y, rad, col[:3])
+                    for t in range(othick): pygame.gfxdraw.aacircle(screen, x, y, max(0, rad - t), (or8, og8, ob8))
+                    if rad > 3: r._draw_circle_pointer(screen, x, y, rad, -ang[self.owner[c0 + k]])
+                else:
+                    groups.setdefault(col, []).append((0, k, x - rad - 1, y - rad - 1, x + rad + 1, y + rad + 1))
+
+        # polygons
+        if self.poly_shapes:
+            vs = self.poly_vstart
+            px, py = pts[:c0, 0], pts[:c0, 1]
+            fin = np.minimum.reduceat(finite[:c0].astype(np.int8), vs) > 0
+            mnx, mxx = np.minimum.reduceat(px, vs), np.maximum.reduceat(px, vs)
+            mny, mxy = np.minimum.reduceat(py, vs), np.maximum.reduceat(py, vs)
+            vis = fin & (mxx >= x0) & (mnx <= x1) & (mxy >= y0) & (mny <= y1)
+            vc = self.poly_vcount
+            or8, og8, ob8 = outline[:3]
+            for k in np.flatnonzero(vis):
+                col = self.poly_shapes[k].color
+                if len(col) == 3: col = (*col, 255)
+                a = vs[k]
+                if col[3] == 255:
+                    verts = ipts[a:a + vc[k]].tolist()
+                    pygame.gfxdraw.filled_polygon(screen, verts, col[:3])
+                    pygame.gfxdraw.aapolygon(screen, verts, (or8, og8, ob8))
+                else:
+                    groups.setdefault(col, []).append((1, k, mnx[k] - 1, mny[k] - 1, mxx[k] + 1, mxy[k] + 1))
+
+        # segments
+        if self.seg_shapes:
+            ns = len(self.seg_shapes)
+            pa, pb = pts[s0:s0 + ns], pts[s0 + ns:]
+            ia, ib = ipts[s0:s0 + ns], ipts[s0 + ns:]
+            rp = self.seg_r * s
+            pad = rp + 2 * othick
+            vis = (finite[s0:s0 + ns] & finite[s0 + ns:]
+                   & (np.maximum(pa[:, 0], pb[:, 0]) + pad >= x0) & (np.minimum(pa[:, 0], pb[:, 0]) - pad <= x1)
+                   & (np.maximum(pa[:, 1], pb[:, 1]) + pad >= y0) & (np.minimum(pa[:, 1], pb[:, 1]) - pad <= y1))
+            thick = np.maximum(1, rp.astype(np.int64))
+            for k in np.flatnonzero(vis):
+                col = self.seg_shapes[k].color
+                if len(col) == 3: col = (*col, 255)
+                a, b, t = ia[k].tolist(), ib[k].tolist(), int(thick[k])
+                ot = t + 2 * othick
+                if col[3] == 255 and outline[3] == 255:
+                    pygame.draw.line(screen, outline[:3], a, b, ot)
+                    pygame.draw.line(screen, col[:3], a, b, t)
+                else:
+                    h = ot // 2 + 1
+                    groups.setdefault(col, []).append((2, k, min(a[0], b[0]) - h, min(a[1], b[1]) - h,
+                                                       max(a[0], b[0]) + h, max(a[1], b[1]) + h))
+
+        if groups:
+            self._draw_translucent(screen, overlay, groups, ipts, ang, s, thick if self.seg_shapes else None)
+
+    def _draw_translucent(self, screen, overlay, groups, ipts, ang, scale, seg_thick):
+        r = self.renderer
+        outline, othick = r.outline_color, r.outline_thickness
+        sw, sh = screen.get_size()
+        c0, s0, ns = self._c0, self._s0, len(self.seg_shapes)
+        vs, vc = self.poly_vstart, self.poly_vcount
+        for col, items in groups.items():
+            left = max(0, int(min(it[2] for it in items)))
+            top = max(0, int(min(it[3] for it in items)))
+            right = min(sw, int(max(it[4] for it in items)) + 1)
+            bottom = min(sh, int(max(it[5] for it in items)) + 1)
+            if right <= left or bottom <= top:
+                continue
+            region = overlay.subsurface((left, top, right - left, bottom - top))
+            region.fill((0, 0, 0, 0))
+            off = np.array((left, top), dtype=np.int64)
+            pointers = []
+            for kind, k, *_ in items:
+                if kind == 0:
+                    x, y = (ipts[c0 + k] - off).tolist()
+                    rad = int(min(self.circ_r[k] * scale, _I16_MAX))
+                    pygame.draw.circle(region, col, (x, y), rad)
+                    for t in range(othick): pygame.draw.circle(region, outline, (x, y), rad - t, 1)
+                    if rad > 3: pointers.append((x + left, y + top, rad, -ang[self.owner[c0 + k]]))
+                elif kind == 1:
+                    verts = (ipts[vs[k]:vs[k] + vc[k]] - off).tolist()
+                    pygame.draw.polygon(region, col, verts)
+                    pygame.draw.polygon(region, outline, verts, othick)
+                else:
+                    a = (ipts[s0 + k] - off).tolist()
+                    b = (ipts[s0 + ns + k] - off).tolist()
+                    t = int(seg_thick[k])
+                    pygame.draw.line(region, outline, a, b, t + 2 * othick)
+                    pygame.draw.line(region, col, a, b, t)
+            screen.blit(region, (left, top))
+            for x, y, rad, ang in pointers:
+                r._draw_circle_pointer(screen, x, y, rad, ang)
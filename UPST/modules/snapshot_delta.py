@@ -0,0 +1,77 @@
+# UPST/modules/snapshot_delta.py
+# Per-object deltas between snapshot dicts (SnapshotManager._collect_snapshot_data).
+# Bodies are keyed by _script_uuid; everything else is compared per top-level key.
+
+_BODY_KEYS = ("bodies",)
+
+
+def body_uuids(state):
+    bodies = state.get("bodies")
+    if bodies is None:
+        return None
+    uuids = [bd.get("_script_uuid") for bd in bodies]
+    if None in uuids or len(set(uuids)) != len(uuids):
+        return None
+    return uuids
+
+
+def can_diff(base, state):
+    return body_uuids(base) is not None and body_uuids(state) is not None
+
+
+def diff_state(base, state):
+    """Delta that turns `base` into `state`. Both must pass can_diff()."""
+    keys = {}
+    for k, v in state.items():
+        if k in _BODY_KEYS:
+            continue
+        if k not in base or base[k] != v:
+            keys[k] = v
+    dropped = [k for k in base if k not in state and k not in _BODY_KEYS]
+
+    base_bodies = {bd["_script_uuid"]: bd for bd in base["bodies"]}
+    changed = {}
+    order = []
+    for bd in state["bodies"]:
+        u = bd["_script_uuid"]
+        order.append(u)
+        old = base_bodies.get(u)
+        if old is None or old != bd:
+            changed[u] = bd
+    present = set(order)
+    removed = [u for u in base_bodies if u not in present]
+    default_order = [u for u in base_bodies if u in present] + [u for u in order if u not in base_bodies]
+    return {
+        "keys": keys,
+        "dropped": dropped,
+        "bodies": changed,
+        "removed": removed,
+        "order": None if default_order == order else order,
+    }
+
+
+def apply_delta(base, delta):
+    state = {k: v for k, v in base.items() if k not in _BODY_KEYS}
+    state.update(delta["keys"])
+    for k in delta["dropped"]:
+        state.pop(k, None)
+    by_uuid = {bd["_script_uuid"]: bd for bd in base["bodies"]}
+    removed = set(delta["removed"])
+    changed = delta["bodies"]
+    order = delta["order"]
+    if order is None:
+        order = [u for u in by_uuid if u not in removed] + [u for u in changed if u not in by_uuid]
+    state["bodies"] = [changed[u] if u in changed else by_uuid[u] for u in order]
+    return state
+
+
+def constraint_signature(state):
+    """Constraints with body indices replaced by uuids, comparable across states."""
+    bodies = state.get("bodies", [])
+    out = []
+    for cd in state.get("constraints", []):
+        rec = dict(cd)
+        rec["a"] = bodies[cd["a"]]["_script_uuid"]
+        rec["b"] = bodies[cd["b"]]["_script_uuid"]
+        out.append(tuple(sorted(rec.items(), key=lambda kv: kv[0])))
+    return out
@@ -3,8 +3,9 @@ import uuid
 import pymunk
 from UPST.config import config
 from UPST.debug.debug_manager import Debug
-from UPST.utils.utils import surface_to_bytes, bytes_to_surface
 from UPST.gizmos.gizmos_manager import get_gizmos, GizmoType, GizmoData
+from UPST.modules.snapshot_delta import can_diff, constraint_signature
+from UPST.utils.blob_store import BlobStore, externalize_scripts, internalize, referenced_blobs
 
 class SnapshotManager:
 
@@ -12,8 +13,10 @@ class SnapshotManager:
         self.physics_manager = physics_manager
         self.camera = camera
         self.script_manager = script_manager
+        self.blobs = BlobStore()
 
     def capture_snapshot_data(self) -> dict:
+        """Snapshot dict with textures and script code replaced by digests into self.blobs."""
         return self._collect_snapshot_data()
 
     def create_snapshot(self) -> bytes:
@@ -21,9 +24,9 @@ class SnapshotManager:
 
         #TODO:сделать запись только последнего снапшота
 
+        data["blobs"] = self.blobs.subset(referenced_blobs(data.get("bodies", []), data.get("scripts")))
         return pickle.dumps(data)
 
-    #TODO: Исправить перезапись тяжелых изображений и кода, проверять наличие перед записью
     def _collect_snapshot_data(self):
         data = {
             "iterations": int(self.physics_manager.space.iterations),
@@ -34,7 +37,7 @@ class SnapshotManager:
             "sleep_time_threshold": float(self.physics_manager.space.sleep_time_threshold),
             "collision_slop": float(self.physics_manager.space.collision_slop),
             "collision_bias": float(self.physics_manager.space.collision_bias),
-            "scripts": self.script_manager.serialize_for_save(),
+            "scripts": externalize_scripts(self.script_manager.serialize_for_save(), self.blobs),
         }
         if hasattr(self.physics_manager.app, 'console_handler') and hasattr(self.physics_manager.app.console_handler,
                                                                             'graph_manager'):
@@ -74,11 +77,11 @@ class SnapshotManager:
                         sd.update({"a": tuple(shape.a), "b": tuple(shape.b), "radius": float(shape.radius)})
                     shapes_data.append(sd)
 
-                tex_bytes, tex_size = None, None
+                tex_blob, tex_size = None, None
                 if hasattr(self.physics_manager.app, 'renderer'):
                     surf = self.physics_manager.app.renderer._get_texture(getattr(body, 'texture_path', None))
                     if surf:
-                        tex_bytes, tex_size = surface_to_bytes(surf), surf.get_size()
+                        tex_blob, tex_size = self.blobs.put_surface(surf), surf.get_size()
 
                 bodies_data.append({
                     "_script_uuid": str(body._script_uuid),
@@ -93,7 +96,7 @@ class SnapshotManager:
                     "body_type": int(body.body_type),
                     "shapes": shapes_data,
                     "texture_path": getattr(body, "texture_path", None),
-                    "texture_bytes": tex_bytes,
+                    "texture_blob": tex_blob,
                     "texture_size": tex_size,
                     "texture_scale": float(getattr(body, "texture_scale", 1.0)),
                     "stretch_texture": bool(getattr(body, "stretch_texture", True)),
@@ -209,7 +212,151 @@ class SnapshotManager:
 
     def load_snapshot(self, snapshot_bytes):
         data = pickle.loads(snapshot_bytes)
+        self.blobs.update(data.pop("blobs", {}))
+        self.restore_snapshot_data(data)
+
+    def restore_snapshot_data(self, data, previous=None):
+        """Restore `data`. With `previous` (the live world, captured right before this call)
+        only bodies, constraints and lines that differ are touched."""
+        data = internalize(data, self.blobs)
+        if previous is not None:
+            previous = internalize(previous, self.blobs)
+        if previous is not None and config.snapshot.save_object_positions and "bodies" in data:
+            try:
+                if self._restore_incremental(data, previous):
+                    Debug.log_success("Snapshot restored (incremental).", category="SnapshotManager")
+                    return
+            except Exception as e:
+                Debug.log_error(f"Incremental snapshot restore failed, falling back to full load: {e}", "SnapshotManager")
+        self._restore_full(data)
+
+    def _restore_full(self, data):
         self.physics_manager.delete_all()
+        pm = self.physics_manager
+        self._apply_world_settings(data)
+        self._apply_camera(data)
+        self._apply_graphs(data)
+        body_uuid_map = {}
+        loaded_bodies = []
+        if config.snapshot.save_object_positions and "bodies" in data:
+            for bd in data["bodies"]:
+                bt = self._create_body(bd)
+                body_uuid_map[bt._script_uuid] = bt
+                loaded_bodies.append(bt)
+
+            body_index_map = {i: b for i, b in enumerate(loaded_bodies)}
+            for cd in data.get("constraints", []):
+                c = self._build_constraint(cd, body_index_map[cd["a"]], body_index_map[cd["b"]])
+                if c is not None:
+                    pm.add_constraint(c)
+            self._build_static_lines(data)
+
+        if hasattr(pm.app, 'renderer') and config.snapshot.save_object_positions:
+            pm.app.renderer.texture_cache.clear()
+            pm.app.renderer.sprite_cache.clear()
+            self._cache_textures(data.get("bodies", []))
+
+        uuid_map = {str(b._script_uuid): b for b in loaded_bodies if hasattr(b, '_script_uuid')}
+        self._apply_text_gizmos(data, uuid_map)
+        self._apply_plugins(data)
+        str_body_map = {str(uid): body for uid, body in body_uuid_map.items()}
+        self.physics_manager.script_manager.deserialize_from_save(data.get("scripts", {}), str_body_map)
+        Debug.log_success("Snapshot restored.", category="SnapshotManager")
+
+    def _restore_incremental(self, data, previous):
+        pm = self.physics_manager
+        if not can_diff(previous, data):
+            return False
+        live = {}
+        for b in pm.space.bodies:
+            if b is pm.static_body:
+                continue
+            uid = getattr(b, '_script_uuid', None)
+            if uid is None or str(uid) in live:
+                return False
+            live[str(uid)] = b
+        prev_bodies = {bd["_script_uuid"]: bd for bd in previous["bodies"]}
+        target = {bd["_script_uuid"] for bd in data["bodies"]}
+
+        self._apply_world_settings(data)
+        self._apply_camera(data)
+        if data.get("graphs") != previous.get("graphs") or data.get("graph_tool_state") != previous.get("graph_tool_state"):
+            self._apply_graphs(data)
+
+        removed = [b for u, b in live.items() if u not in target]
+        removed_set = set(removed)
+        if removed_set:
+            stale = [c for c in pm.space.constraints if c.a in removed_set or c.b in removed_set]
+            if stale:
+                pm.space.remove(*stale)
+            for b in removed:
+                pm.remove_body(b)
+                del live[str(b._script_uuid)]
+
+        added, reshaped, new_textures = 0, 0, []
+        for bd in data["bodies"]:
+            u = bd["_script_uuid"]
+            body = live.get(u)
+            old = prev_bodies.get(u)
+            if body is None:
+                body = self._create_body(bd)
+                live[u] = body
+                added += 1
+                new_textures.append(bd)
+                continue
+            if old is not None and old == bd:
+                self._set_body_kinematics(body, bd)
+                continue
+            shapes_changed = (old is None or old.get("shapes") != bd.get("shapes") or old.get("body_type") != bd.get("body_type")
+                              or len(body.shapes) != len(bd.get("shapes", [])))
+            if shapes_changed:
+                dead = [s for s in body.shapes if s.space is pm.space]
+                if dead:
+                    pm.space.remove(*dead)
+                self._set_body_props(body, bd)
+                shapes = self._build_shapes(body, bd)
+                if shapes:
+                    pm.space.add(*shapes)
+                reshaped += 1
+            else:
+                self._set_body_props(body, bd)
+            if old is None or old.get("texture_bytes") != bd.get("texture_bytes"):
+                new_textures.append(bd)
+
+        if removed or added or constraint_signature(previous) != constraint_signature(data):
+            sim = set(live.values())
+            old_c = [c for c in pm.space.constraints if c.a in sim and c.b in sim]
+            if old_c:
+                pm.space.remove(*old_c)
+            for cd in data.get("constraints", []):
+                a = live[data["bodies"][cd["a"]]["_script_uuid"]]
+                b = live[data["bodies"][cd["b"]]["_script_uuid"]]
+                c = self._build_constraint(cd, a, b)
+                if c is not None:
+                    pm.add_constraint(c)
+
+        if data.get("static_lines") != previous.get("static_lines"):
+            if pm.static_lines:
+                pm.space.remove(*[s for s in pm.static_lines if s.space is pm.space])
+            pm.static_lines.clear()
+            self._build_static_lines(data)
+
+        pm.body_buffer.invalidate()
+        pm.spatial_index.invalidate()
+        if hasattr(pm.app, 'renderer'):
+            self._cache_textures(new_textures)
+
+        if data.get("text_gizmos") != previous.get("text_gizmos"):
+            self._apply_text_gizmos(data, live)
+        if (data.get("plugin_configs") != previous.get("plugin_configs")
+                or data.get("plugin_states") != previous.get("plugin_states")):
+            self._apply_plugins(data)
+        if removed or added or data.get("scripts") != previous.get("scripts"):
+            pm.script_manager.deserialize_from_save(data.get("scripts", {}), live)
+        Debug.log(f"Incremental restore: +{added} -{len(removed)} reshaped {reshaped}", category="Snapshot")
+        return True
+
+    def _apply_world_settings(self, data):
         pm = self.physics_manager
         pm.set_iterations(int(data.get("iterations", config.physics.iterations)))
         pm.set_simulation_frequency(int(data.get("sim_freq", config.physics.simulation_frequency)))
@@ -219,6 +366,7 @@ class SnapshotManager:
         pm.set_collision_slop(float(data.get("collision_slop", 0.5)))
         pm.set_collision_bias(float(data.get("collision_bias", pow(1.0 - 0.1, 60.0))))
 
+    def _apply_camera(self, data):
         if config.snapshot.save_camera_position and "camera_translation" in data:
             tx, ty = data["camera_translation"]
             self.camera.translation = pymunk.Transform(1, 0, 0, 1, float(tx), float(ty))
@@ -226,6 +374,8 @@ class SnapshotManager:
             self.camera.scaling = scale
             if hasattr(self.camera, "target_scaling"):
                 self.camera.target_scaling = scale
+
+    def _apply_graphs(self, data):
         if "graphs" in data and hasattr(self.physics_manager.app, 'console_handler'):
             graph_mgr = self.physics_manager.app.console_handler.graph_manager
             graph_mgr.deserialize(data["graphs"])
@@ -233,115 +383,119 @@ class SnapshotManager:
             graph_tool = self.physics_manager.app.tool_system.get_tool_by_name('graph')
             if graph_tool and hasattr(graph_tool, 'deserialize_from_save'):
                 graph_tool.deserialize_from_save(data["graph_tool_state"])
-        body_uuid_map = {}
-        loaded_bodies = []
-        if config.snapshot.save_object_positions and "bodies" in data:
-            for bd in data["bodies"]:
-                bt = pymunk.Body(body_type=int(bd.get("body_type", pymunk.Body.DYNAMIC)))
-                try:
-                    bt._script_uuid = uuid.UUID(bd["_script_uuid"])
-                except:
-                    bt._script_uuid = uuid.uuid4()
-                body_uuid_map[bt._script_uuid] = bt
 
-                if bt.body_type == pymunk.Body.DYNAMIC:
-                    bt.mass = float(bd.get("mass", 1.0))
-                    bt.moment = float(bd.get("moment", 1.0))
-                bt.name = bd.get("name",None)
-                bt.color = bd.get("color",(255,255,255,255))
-                bt.position = pymunk.Vec2d(*bd.get("position", (0.0, 0.0)))
-                bt.angle = float(bd.get("angle", 0.0))
-                bt.velocity = pymunk.Vec2d(*bd.get("velocity", (0.0, 0.0)))
-                bt.angular_velocity = float(bd.get("angular_velocity", 0.0))
-                bt.texture_path = bd.get("texture_path")
-                bt.texture_bytes = bd.get("texture_bytes")
-                bt.texture_size = bd.get("texture_size")
-                bt.texture_scale = float(bd.get("texture_scale", 1.0))
-                bt.stretch_texture = bool(bd.get("stretch_texture", True))
-                if bt.body_type == pymunk.Body.DYNAMIC:
-                    cog = bd.get("center_of_gravity")
-                    if cog:
-                        bt.center_of_gravity = pymunk.Vec2d(*cog)
-
-                shapes = []
-                for sd in bd.get("shapes", []):
-                    st = sd["type"]
-                    if st == "Circle":
-                        shp = pymunk.Circle(bt, float(sd["radius"]), tuple(sd.get("offset", (0.0, 0.0))))
-                    elif st == "Poly":
-                        shp = pymunk.Poly(bt, [pymunk.Vec2d(*v) for v in sd["vertices"]])
-                    elif st == "Segment":
-                        shp = pymunk.Segment(bt, pymunk.Vec2d(*sd["a"]), pymunk.Vec2d(*sd["b"]), float(sd["radius"]))
-                    else:
-                        continue
-                    shp.friction = float(sd.get("friction", 0.5))
-                    shp.elasticity = float(sd.get("elasticity", 0.0))
-                    shp.color = tuple(sd.get("color", (200, 200, 200, 255)))
-                    shapes.append(shp)
-
-                pm.space.add(bt, *shapes) if shapes else pm.space.add(bt)
-                loaded_bodies.append(bt)
+    def _create_body(self, bd):
+        bt = pymunk.Body(body_type=int(bd.get("body_type", pymunk.Body.DYNAMIC)))
+        try:
+            bt._script_uuid = uuid.UUID(bd["_script_uuid"])
+        except:
+            bt._script_uuid = uuid.uuid4()
+        self._set_body_props(bt, bd)
+        shapes = self._build_shapes(bt, bd)
+        self.physics_manager.space.add(bt, *shapes) if shapes else self.physics_manager.space.add(bt)
+        return bt
 
-            body_index_map = {i: b for i, b in enumerate(loaded_bodies)}
-            for cd in data.get("constraints", []):
-                a, b = body_index_map[cd["a"]], body_index_map[cd["b"]]
-                ctype = cd["type"]
-                if ctype == "PinJoint":
-                    c = pymunk.PinJoint(a, b, cd["anchor_a"], cd["anchor_b"])
-                elif ctype == "PivotJoint":
-                    c = pymunk.PivotJoint(a, b, cd["anchor"])
-                elif ctype == "DampedSpring":
-                    c = pymunk.DampedSpring(a, b, cd["anchor_a"], cd["anchor_b"], float(cd["rest_length"]),
-                                            float(cd["stiffness"]), float(cd["damping"]))
-                    if "size" in cd:
-                        c.size = float(cd["size"])
-                    if "color" in cd:
-                        c.color = tuple(cd["color"])
-                elif ctype == "SimpleMotor":
-                    c = pymunk.SimpleMotor(a, b, float(cd["rate"]))
-                elif ctype == "GearJoint":
-                    c = pymunk.GearJoint(a, b, float(cd["phase"]), float(cd["ratio"]))
-                elif ctype == "SlideJoint":
-                    c = pymunk.SlideJoint(a, b, cd["anchor_a"], cd["anchor_b"], float(cd["min"]), float(cd["max"]))
-                elif ctype == "RotaryLimitJoint":
-                    c = pymunk.RotaryLimitJoint(a, b, float(cd["min"]), float(cd["max"]))
-                else:
-                    continue
-                pm.add_constraint(c)
+    def _set_body_kinematics(self, bt, bd):
+        bt.position = pymunk.Vec2d(*bd.get("position", (0.0, 0.0)))
+        bt.angle = float(bd.get("angle", 0.0))
+        bt.velocity = pymunk.Vec2d(*bd.get("velocity", (0.0, 0.0)))
+        bt.angular_velocity = float(bd.get("angular_velocity", 0.0))
 
-            for ld in data.get("static_lines", []):
-                if "type" not in ld:
-                    Debug.log_warning("Static line entry missing 'type', skipping.", "SnapshotManager")
-                    continue
-                if ld["type"] == "Poly":
-                    line = pymunk.Poly(pm.static_body, [pymunk.Vec2d(*v) for v in ld["vertices"]])
-                elif ld["type"] == "Segment":
-                    line = pymunk.Segment(pm.static_body, pymunk.Vec2d(*ld["a"]), pymunk.Vec2d(*ld["b"]),
-                                          float(ld["radius"]))
-                else:
-                    continue
-                line.friction = float(ld.get("friction", 0.5))
-                line.elasticity = float(ld.get("elasticity", 0.0))
-                line.color = tuple(ld.get("color", (200, 200, 200, 255)))
-                pm.static_lines.append(line)
-                pm.space.add(line)
+    def _set_body_props(self, bt, bd):
+        body_type = int(bd.get("body_type", pymunk.Body.DYNAMIC))
+        if bt.body_type != body_type:
+            bt.body_type = body_type
+        if bt.body_type == pymunk.Body.DYNAMIC:
+            bt.mass = float(bd.get("mass", 1.0))
+            bt.moment = float(bd.get("moment", 1.0))
+        bt.name = bd.get("name", None)
+        bt.color = bd.get("color", (255, 255, 255, 255))
+        self._set_body_kinematics(bt, bd)
+        bt.texture_path = bd.get("texture_path")
+        bt.texture_bytes = bd.get("texture_bytes")
+        bt.texture_size = bd.get("texture_size")
+        bt.texture_scale = float(bd.get("texture_scale", 1.0))
+        bt.stretch_texture = bool(bd.get("stretch_texture", True))
+        if bt.body_type == pymunk.Body.DYNAMIC:
+            cog = bd.get("center_of_gravity")
+            if cog:
+                bt.center_of_gravity = pymunk.Vec2d(*cog)
 
-        if hasattr(pm.app, 'renderer') and config.snapshot.save_object_positions:
-            cache = pm.app.renderer.texture_cache
-            cache.clear()
-            for bd in data.get("bodies", []):
-                tex_bytes, tex_size = bd.get("texture_bytes"), bd.get("texture_size")
-                if tex_bytes and tex_size and tex_bytes not in cache:
-                    surf = bytes_to_surface(tex_bytes, tex_size)
-                    if surf:
-                        cache[tex_bytes] = surf
+    def _build_shapes(self, bt, bd):
+        shapes = []
+        for sd in bd.get("shapes", []):
+            st = sd["type"]
+            if st == "Circle":
+                shp = pymunk.Circle(bt, float(sd["radius"]), tuple(sd.get("offset", (0.0, 0.0))))
+            elif st == "Poly":
+                shp = pymunk.Poly(bt, [pymunk.Vec2d(*v) for v in sd["vertices"]])
+            elif st == "Segment":
+                shp = pymunk.Segment(bt, pymunk.Vec2d(*sd["a"]), pymunk.Vec2d(*sd["b"]), float(sd["radius"]))
+            else:
+                continue
+            shp.friction = float(sd.get("friction", 0.5))
+            shp.elasticity = float(sd.get("elasticity", 0.0))
+            shp.color = tuple(sd.get("color", (200, 200, 200, 255)))
+            shapes.append(shp)
+        return shapes
+
+    def _build_constraint(self, cd, a, b):
+        ctype = cd["type"]
+        if ctype == "PinJoint":
+            c = pymunk.PinJoint(a, b, cd["anchor_a"], cd["anchor_b"])
+        elif ctype == "PivotJoint":
+            c = pymunk.PivotJoint(a, b, cd["anchor"])
+        elif ctype == "DampedSpring":
+            c = pymunk.DampedSpring(a, b, cd["anchor_a"], cd["anchor_b"], float(cd["rest_length"]),
+                                    float(cd["stiffness"]), float(cd["damping"]))
+            if "size" in cd:
+                c.size = float(cd["size"])
+            if "color" in cd:
+                c.color = tuple(cd["color"])
+        elif ctype == "SimpleMotor":
+            c = pymunk.SimpleMotor(a, b, float(cd["rate"]))
+        elif ctype == "GearJoint":
+            c = pymunk.GearJoint(a, b, float(cd["phase"]), float(cd["ratio"]))
+        elif ctype == "SlideJoint":
+            c = pymunk.SlideJoint(a, b, cd["anchor_a"], cd["anchor_b"], float(cd["min"]), float(cd["max"]))
+        elif ctype == "RotaryLimitJoint":
+            c = pymunk.RotaryLimitJoint(a, b, float(cd["min"]), float(cd["max"]))
+        else:
+            return None
+        return c
+
+    def _build_static_lines(self, data):
+        pm = self.physics_manager
+        for ld in data.get("static_lines", []):
+            if "type" not in ld:
+                Debug.log_warning("Static line entry missing 'type', skipping.", "SnapshotManager")
+                continue
+            if ld["type"] == "Poly":
+                line = pymunk.Poly(pm.static_body, [pymunk.Vec2d(*v) for v in ld["vertices"]])
+            elif ld["type"] == "Segment":
+                line = pymunk.Segment(pm.static_body, pymunk.Vec2d(*ld["a"]), pymunk.Vec2d(*ld["b"]),
+                                      float(ld["radius"]))
+            else:
+                continue
+            line.friction = float(ld.get("friction", 0.5))
+            line.elasticity = float(ld.get("elasticity", 0.0))
+            line.color = tuple(ld.get("color", (200, 200, 200, 255)))
+            pm.static_lines.append(line)
+            pm.space.add(line)
+
+    def _cache_textures(self, bodies_data):
+        if not hasattr(self.physics_manager.app, 'renderer'):
+            return
+        sprites = self.physics_manager.app.renderer.sprite_cache
+        for bd in bodies_data:
+            sprites.preload(bd.get("texture_bytes"), bd.get("texture_size"))
 
+    def _apply_text_gizmos(self, data, uuid_map):
         gizmos_mgr = get_gizmos()
         if gizmos_mgr and "text_gizmos" in data:
             gizmos_mgr.clear()
             gizmos_mgr.clear_persistent()
 
-            uuid_map = {str(b._script_uuid): b for b in loaded_bodies if hasattr(b, '_script_uuid')}
             for tg in data['text_gizmos']:
                 owner = uuid_map.get(tg['owner_id'], None)
                 g = GizmoData(
@@ -362,6 +516,8 @@ class SnapshotManager:
                     gizmos_mgr.persistent_gizmos.append(g)
                 else:
                     gizmos_mgr.gizmos.append(g)
+
+    def _apply_plugins(self, data):
         plugin_meta = data.get("plugins", {})
         plugin_configs = data.get("plugin_configs", {})
         if hasattr(self.physics_manager.app, 'plugin_manager') and plugin_meta:
@@ -395,6 +551,3 @@ class SnapshotManager:
                     plugin_def.deserialize(self.physics_manager.app.plugin_manager, instance, state)
                 except Exception as e:
                     Debug.log_error(f"Plugin '{name}' failed to deserialize: {e}", "SaveLoadManager")
-        str_body_map = {str(uid): body for uid, body in body_uuid_map.items()}
-        self.physics_manager.script_manager.deserialize_from_save(data.get("scripts", {}), str_body_map)
-        Debug.log_success("Snapshot restored.", category="SnapshotManager")
\ No newline at end of file
@@ -0,0 +1,157 @@
+# UPST/modules/sprite_cache.py
+import math
+from collections import OrderedDict
+
+import pygame
+
+from UPST.utils.blob_store import blob_digest
+from UPST.utils.utils import bytes_to_surface
+
+
+class SpriteCache:
+    """Texture pipeline for textured bodies.
+
+    Sources are keyed by content digest (texture_bytes) or path, never by the raw bytes.
+    Every stage - decoded source, mirrored/rotated source, and the final masked sprite for
+    a given zoom bucket and rotation bucket - lives in one LRU bounded by `budget_bytes`, so a
+    body that does not change zoom or bucket costs a single blit."""
+
+    def __init__(self, load_texture, budget_mb=96.0, rotation_step=1.0, scale_step=0.02):
+        self.load_texture = load_texture
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.step = max(0.01, float(rotation_step))
+        self.buckets = max(1, int(round(360.0 / self.step)))
+        # масштаб квантуется геометрически: соседние ключи отличаются на (1 + scale_step)
+        self.log_scale_step = math.log1p(max(1e-4, float(scale_step)))
+        self.entries = OrderedDict()
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._digests = {}
+
+    def clear(self):
+        self.entries.clear()
+        self._digests.clear()
+        self.nbytes = 0
+
+    def _get(self, key):
+        hit = self.entries.get(key)
+        if hit is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return hit[0]
+
+    def _put(self, key, value, surf):
+        size = surf.get_width() * surf.get_height() * surf.get_bytesize() if surf else 0
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self.entries[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.budget and len(self.entries) > 1:
+            _, (_, freed) = self.entries.popitem(last=False)
+            self.nbytes -= freed
+        return value
+
+    def _digest(self, data):
+        # хэш считаем один раз на объект bytes, а не на каждый кадр
+        hit = self._digests.get(id(data))
+        if hit is not None and hit[0] is data:
+            return hit[1]
+        if len(self._digests) > 4096:
+            self._digests.clear()
+        key = blob_digest(data)
+        self._digests[id(data)] = (data, key)
+        return key
+
+    def source_key(self, body):
+        data = getattr(body, 'texture_bytes', None)
+        if data is not None:
+            size = getattr(body, 'texture_size', None)
+            if not (size and isinstance(size, (tuple, list)) and len(size) == 2): return None
+            if size[0] <= 0 or size[1] <= 0: return None
+            return ('bytes', self._digest(data), tuple(size))
+        path = getattr(body, 'texture_path', None)
+        return ('path', path) if path else None
+
+    def preload(self, data, size):
+        if data and size:
+            key = ('bytes', self._digest(data), tuple(size))
+            if self._get(key) is None:
+                surf = bytes_to_surface(data, size)
+                self._put(key, surf, surf)
+
+    def source(self, key, body):
+        surf = self._get(key)
+        if surf is None and key not in self.entries:
+            surf = bytes_to_surface(body.texture_bytes, key[2]) if key[0] == 'bytes' else self.load_texture(key[1])
+            self._put(key, surf, surf)
+        return surf
+
+    def processed(self, key, body, mirror_x, mirror_y, rotation):
+        if not (mirror_x or mirror_y or rotation):
+            return self.source(key, body)
+        pkey = (key, mirror_x, mirror_y, rotation)
+        surf = self._get(pkey)
+        if surf is None:
+            surf = self.source(key, body)
+            if surf is None: return None
+            if mirror_x or mirror_y: surf = pygame.transform.flip(surf, mirror_x, mirror_y)
+            if rotation != 0: surf = pygame.transform.rotozoom(surf, rotation, 1.0)
+            self._put(pkey, surf, surf)
+        return surf
+
+    def bucket(self, angle_rad):
+        return int(round(math.degrees(angle_rad) / self.step)) % self.buckets
+
+    def scale_bucket(self, scale):
+        return int(round(math.log(scale) / self.log_scale_step))
+
+    def circle_sprite(self, pkey, tex, radius_px, bucket):
+        diam = max(1, int(radius_px * 2))
+        key = ('c', pkey, diam, int(radius_px), bucket)
+        surf = self._get(key)
+        if surf is None:
+            surf = pygame.transform.smoothscale(tex, (diam, diam))
+            mask = pygame.Surface(surf.get_size(), pygame.SRCALPHA)
+            pygame.draw.circle(mask, (255, 255, 255, 255), (diam // 2, diam // 2), int(radius_px))
+            surf.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+            if bucket: surf = pygame.transform.rotozoom(surf, bucket * self.step, 1.0)
+            self._put(key, surf, surf)
+        return surf
+
+    def poly_sprite(self, pkey, tex, verts, scale, stretch, bucket):
+        """Masked sprite of a polygon at the zoom bucket of `scale` and rotation bucket; returns
+        (surface, top-left offset from the body's screen position) or None."""
+        if not scale > 0: return None
+        zoom = self.scale_bucket(scale)
+        key = ('p', pkey, verts, zoom, stretch, bucket)
+        hit = self._get(key)
+        if hit is not None or key in self.entries:
+            return hit
+        scale = math.exp(zoom * self.log_scale_step)
+        th = math.radians(bucket * self.step)
+        ca, sa = math.cos(th), math.sin(th)
+        pts = [((x * ca - y * sa) * scale, -(x * sa + y * ca) * scale) for x, y in verts]
+        xs, ys = [p[0] for p in pts], [p[1] for p in pts]
+        min_x, max_x, min_y, max_y = min(xs), max(xs), min(ys), max(ys)
+        w_scr, h_scr = max_x - min_x, max_y - min_y
+        if w_scr <= 0 or h_scr <= 0:
+            return self._put(key, None, None)
+        if stretch:
+            tex_surf = pygame.transform.smoothscale(tex, (max(1, int(w_scr)), max(1, int(h_scr))))
+        else:
+            tex_w, tex_h = tex.get_size()
+            scaled = pygame.transform.smoothscale_by(tex, min(w_scr / tex_w, h_scr / tex_h))
+            tex_surf = pygame.transform.smoothscale(scaled, (max(1, int(w_scr)), max(1, int(h_scr))))
+        if bucket: tex_surf = pygame.transform.rotozoom(tex_surf, bucket * self.step, 1.0)
+        w_rot, h_rot = tex_surf.get_size()
+        ox = (min_x + max_x) / 2 - w_rot / 2
+        oy = (min_y + max_y) / 2 - h_rot / 2
+        surf = pygame.Surface((w_rot, h_rot), pygame.SRCALPHA)
+        surf.blit(tex_surf, (0, 0))
+        mask = pygame.Surface((w_rot, h_rot), pygame.SRCALPHA)
+        pygame.draw.polygon(mask, (255, 255, 255, 255), [(x - ox, y - oy) for x, y in pts])
+        surf.blit(mask, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        return self._put(key, (surf, ox, oy), surf)
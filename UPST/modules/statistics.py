@@ -1,10 +1,24 @@
+import os
 import time
 import json
+import atexit
+import threading
 from pathlib import Path
 
 class Statistics:
-    def __init__(self, save_path="stats.json"):
+    """Usage counters persisted to stats.json. Counters live in memory; save() only marks
+    them dirty and a background flusher coalesces writes: it persists after
+    `flush_interval` seconds, immediately once `flush_threshold` changes pile up, and at
+    shutdown. Files are replaced atomically via a temp file."""
+
+    def __init__(self, save_path="stats.json", flush_interval=5.0, flush_threshold=500):
         self.save_path = Path(save_path)
+        self._flush_interval = flush_interval
+        self._flush_threshold = flush_threshold
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._dirty = 0
+        self._dirty_since = 0.0
         self._persistent_keys = {'total_runtime', 'launch_count', 'objects_created',
                                  'paused_times', 'static_created', 'constraints_created',
                                  'objects_cutted', 'scripts_created'}
@@ -17,6 +31,10 @@ class Statistics:
         self._data.setdefault('scripts_created', 0)
         self._data['launch_count'] += 1
         self.save()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="StatsFlusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
 
     def load(self):
         if self.save_path.exists():
@@ -29,10 +47,46 @@ class Statistics:
             except (ValueError, OSError):
                 pass
 
+    def _mark_dirty(self):
+        with self._lock:
+            if not self._dirty:
+                self._dirty_since = time.monotonic()
+            self._dirty += 1
+            due = self._dirty >= self._flush_threshold
+        if due:
+            self._wake.set()
+
     def save(self):
-        persistent_data = {k: self._data[k] for k in self._persistent_keys if k in self._data}
-        with open(self.save_path, 'w') as f:
-            json.dump(persistent_data, f, indent=2)
+        self._mark_dirty()
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            persistent_data = {k: self._data[k] for k in self._persistent_keys if k in self._data}
+            self._dirty = 0
+        tmp = self.save_path.with_name(self.save_path.name + '.tmp')
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(persistent_data, f, indent=2)
+            os.replace(tmp, self.save_path)
+        except OSError:
+            self._mark_dirty()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self._flush_interval)
+            self._wake.clear()
+            with self._lock:
+                due = self._dirty and (self._dirty >= self._flush_threshold or
+                                       time.monotonic() - self._dirty_since >= self._flush_interval)
+            if due:
+                self.flush()
+
+    def close(self):
+        self._running = False
+        self._wake.set()
+        self.flush()
 
     def __getattr__(self, name):
         if name in self._data:
@@ -46,7 +100,10 @@ class Statistics:
             self._data[name] = value
 
     def increment(self, key, delta=1):
-        self._data[key] = self._data.get(key, 0) + delta
+        with self._lock:
+            self._data[key] = self._data.get(key, 0) + delta
+        if key in self._persistent_keys:
+            self._mark_dirty()
 
     def accumulate_session_time(self):
         if hasattr(self, 'session_start'):
@@ -93,10 +93,9 @@ def _taichi_compute_fractal_deepzoom(
     scale = zoom / half_w
     esc_sq = esc_radius * esc_radius
     for py, px in ti.ndrange(h, w):
-        dx = (ti.cast(px, ti_f) - half_w) * scale
-        dy = (ti.cast(py, ti_f) - half_h) * scale
-        x = center_x + dx
-        y = center_y + dy
+        # δc считается от опорной точки, а не от центра кадра: тайлы делят одну орбиту
+        dx = (ti.cast(px, ti_f) - half_w) * scale + (center_x - ref_cx)
+        dy = (half_h - ti.cast(py, ti_f)) * scale + (center_y - ref_cy)
 
         # Perturbation deltas (always defined)
         zx_p: ti_f = 0.0
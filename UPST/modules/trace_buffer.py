@@ -0,0 +1,207 @@
+# UPST/modules/trace_buffer.py
+import os
+import json
+import time
+import bisect
+import threading
+import collections
+
+_END = object()
+
+
+class TraceRing:
+    """Preallocated begin/end event ring owned by one thread. Only the owner writes;
+    the reader (TraceRecorder.drain) never blocks it and detects overwritten slots
+    by comparing cursors with `head`."""
+    __slots__ = ('tid', 'thread_name', 'mask', 'ts', 'keys', 'groups', 'head',
+                 'cursor', 'stack', 'lost')
+
+    def __init__(self, capacity):
+        cap = 1 << max(4, int(capacity - 1).bit_length())
+        t = threading.current_thread()
+        self.tid, self.thread_name = t.ident, t.name
+        self.mask = cap - 1
+        self.ts = [0] * cap
+        self.keys = [None] * cap
+        self.groups = [None] * cap
+        self.head = 0
+        self.cursor = 0
+        self.stack = []
+        self.lost = 0
+
+    def begin(self, key, group):
+        i = self.head & self.mask
+        self.keys[i] = key
+        self.groups[i] = group
+        self.ts[i] = time.perf_counter_ns()
+        self.head += 1
+
+    def end(self, key):
+        t = time.perf_counter_ns()
+        i = self.head & self.mask
+        self.keys[i] = key
+        self.groups[i] = _END
+        self.ts[i] = t
+        self.head += 1
+
+
+class TraceRecorder:
+    """Lock-free span recorder behind @profile.
+
+    Probes write into per-thread TraceRing buffers; `drain` (called off the hot path)
+    pairs begin/end events into spans (tid, key, group, start_ns, dur_ns, depth, stack,
+    self_ns), buckets them into frames delimited by `mark_frame`, and keeps a bounded
+    span history for Chrome-trace and collapsed-stack export."""
+
+    def __init__(self, ring_capacity=65536, history=200000, frames=600):
+        self._enabled = True
+        self.ring_capacity = ring_capacity
+        self.rings = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.spans = collections.deque(maxlen=history)
+        self.marks = collections.deque(maxlen=frames + 1)
+        self.frame_stats = collections.deque(maxlen=frames)
+        self._open = []  # спаны, чей кадр ещё не закрыт
+
+    @property
+    def enabled(self):
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value):
+        with self._lock:
+            if value == self._enabled:
+                return
+            self._enabled = value
+            # begin без end (и наоборот) через переключение не сопоставить - дочитываем и сбрасываем стеки
+            self._collect()
+            for ring in self.rings:
+                ring.stack.clear()
+
+    def ring(self):
+        try:
+            return self._local.ring
+        except AttributeError:
+            ring = self._local.ring = TraceRing(self.ring_capacity)
+            with self._lock:
+                self.rings.append(ring)
+            return ring
+
+    def mark_frame(self):
+        self.marks.append(time.perf_counter_ns())
+
+    def _drain_ring(self, ring, out):
+        head = ring.head
+        start = max(ring.cursor, head - ring.mask - 1)
+        if start != ring.cursor:
+            ring.lost += start - ring.cursor
+            ring.stack.clear()
+        mask, ts, keys, groups = ring.mask, ring.ts, ring.keys, ring.groups
+        events = [(ts[i & mask], keys[i & mask], groups[i & mask]) for i in range(start, head)]
+        # писатель мог обогнать нас во время чтения - отбрасываем перезаписанное
+        valid = ring.head - ring.mask - 1
+        if valid > start:
+            ring.lost += valid - start
+            events = events[valid - start:]
+            ring.stack.clear()
+        ring.cursor = head
+        stack, tid = ring.stack, ring.tid
+        for t, key, group in events:
+            if group is not _END:
+                path = f"{stack[-1][3]};{key}" if stack else key
+                stack.append([key, group or "uncategorized", t, path, 0])
+                continue
+            # end закрывает ближайший begin с тем же ключом; незакрытые над ним отбрасываются
+            for j in range(len(stack) - 1, -1, -1):
+                if stack[j][0] == key:
+                    break
+            else:
+                continue
+            del stack[j + 1:]
+            k, g, t0, path, child = stack.pop()
+            dur = t - t0
+            if stack:
+                stack[-1][4] += dur
+            out.append((tid, k, g, t0, dur, len(stack), path, dur - child))
+
+    def _collect(self):
+        new = []
+        for ring in self.rings:
+            self._drain_ring(ring, new)
+        self.spans.extend(new)
+        self._open.extend(new)
+
+    def drain(self):
+        """Collect finished spans from every ring; returns the frames closed since the
+        previous call as a list of (frame_start_ns, {key: (ms, group)}, {group: ms})."""
+        with self._lock:
+            self._collect()
+            marks = list(self.marks)
+            closed = []
+            if len(marks) < 2:
+                return closed
+            buckets = collections.defaultdict(list)
+            pending = []
+            for span in self._open:
+                end = span[3] + span[4]
+                idx = bisect.bisect_left(marks, end)
+                if idx >= len(marks):
+                    pending.append(span)
+                elif idx > 0:
+                    buckets[idx].append(span)
+            self._open = pending
+            for idx in sorted(buckets):
+                keys, cats = {}, collections.defaultdict(float)
+                for _, key, group, _, dur, depth, _, self_ns in buckets[idx]:
+                    ms = dur / 1e6
+                    prev = keys.get(key)
+                    keys[key] = (ms + (prev[0] if prev else 0.0), group)
+                    cats[group] += self_ns / 1e6
+                frame = (marks[idx - 1], keys, dict(cats))
+                self.frame_stats.append(frame)
+                closed.append(frame)
+            return closed
+
+    def _window(self, seconds):
+        spans = list(self.spans)
+        if seconds is None or not spans:
+            return spans
+        cutoff = time.perf_counter_ns() - int(seconds * 1e9)
+        return [s for s in spans if s[3] + s[4] >= cutoff]
+
+    def _thread_names(self):
+        with self._lock:
+            return {r.tid: r.thread_name for r in self.rings}
+
+    def chrome_trace(self, seconds=None):
+        self.drain()
+        pid = os.getpid()
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                  for tid, name in self._thread_names().items()]
+        spans = self._window(seconds)
+        for tid, key, group, t0, dur, depth, _, _ in spans:
+            events.append({"name": key, "cat": group, "ph": "X", "ts": t0 / 1000.0, "dur": dur / 1000.0,
+                           "pid": pid, "tid": tid})
+        if spans:
+            first = min(s[3] for s in spans)
+            events.extend({"name": "frame", "ph": "i", "s": "g", "ts": m / 1000.0, "pid": pid, "tid": 0}
+                          for m in self.marks if m >= first)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def collapsed_stacks(self, seconds=None):
+        self.drain()
+        names = self._thread_names()
+        totals = collections.defaultdict(int)
+        for tid, _, _, _, _, _, path, self_ns in self._window(seconds):
+            totals[f"{names.get(tid, tid)};{path}"] += self_ns
+        return "\n".join(f"{stack} {max(1, ns // 1000)}" for stack, ns in sorted(totals.items()))
+
+    def export(self, path, seconds=None):
+        if path.endswith('.json'):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.chrome_trace(seconds), f)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.collapsed_stacks(seconds) + "\n")
+        return path
@@ -6,6 +6,8 @@ from UPST.config import config
 import pygame
 import json
 from datetime import datetime
+from UPST.modules.snapshot_delta import can_diff, diff_state, apply_delta
+from UPST.utils.blob_store import referenced_blobs
 
 debug = get_debug()
 
@@ -27,13 +29,30 @@ class SnapshotMetadata:
         self.script_count = script_count
         self.custom_data = custom_data or {}
 
+class HistoryEntry:
+    __slots__ = ("payload", "keyframe", "size", "blobs")
+
+    def __init__(self, payload: bytes, keyframe: bool, blobs=frozenset()):
+        self.payload = payload
+        self.keyframe = keyframe
+        self.size = len(payload)
+        self.blobs = blobs
+
 class UndoRedoManager:
+    """Undo history of keyframes (full pickled state) and per-body deltas against the
+    preceding keyframe. Textures and script code live once in snapshot_manager.blobs;
+    history is trimmed by pickled size plus referenced blobs (memory_budget_mb)."""
+
     def __init__(self, snapshot_manager, on_state_change: Optional[Callable] = None):
         self.snapshot_manager = snapshot_manager
         self.history = []
         self.metadata_history = []
         self.current_index = -1
         self.max_snapshots = config.snapshot.max_snapshots
+        self.memory_budget = int(config.snapshot.memory_budget_mb * 1024 * 1024)
+        self.keyframe_interval = max(1, int(config.snapshot.keyframe_interval))
+        self.history_bytes = 0
+        self._keyframe_cache = (None, None)
         self.on_state_change = on_state_change
         self._batch_operations = 0
         self._batch_snapshot = None
@@ -60,7 +79,7 @@ class UndoRedoManager:
     def begin_batch_operation(self):
         self._batch_operations += 1
         if self._batch_operations == 1:
-            self._batch_snapshot = self.snapshot_manager.create_snapshot()
+            self._batch_snapshot = True
 
     def end_batch_operation(self):
         if self._batch_operations > 0:
@@ -73,27 +92,115 @@ class UndoRedoManager:
         if self._batch_operations > 0:
             return
         if self.current_index < len(self.history) - 1:
+            for entry in self.history[self.current_index + 1:]:
+                self.history_bytes -= entry.size
             self.history = self.history[:self.current_index + 1]
             self.metadata_history = self.metadata_history[:self.current_index + 1]
+            self._collect_blobs()
 
-        snapshot = self.snapshot_manager.create_snapshot()
+        state = self.snapshot_manager.capture_snapshot_data()
+        snapshot_meta = self._create_metadata_from_dict(state, len(self.history), custom_metadata)
 
-        snapshot_dict = pickle.loads(snapshot)
-        snapshot_meta = self._create_metadata_from_dict(snapshot_dict, len(self.history), custom_metadata)
-
-        self.history.append(snapshot)
+        self._push_state(state)
         self.metadata_history.append(snapshot_meta)
         self.current_index += 1
-        if len(self.history) > self.max_snapshots:
-            self.history.pop(0)
-            self.metadata_history.pop(0)
-            self.current_index -= 1
-            for i, meta in enumerate(self.metadata_history):
-                meta.index = i
-        Debug.log(f"taking snapshot, index: {self.current_index}", category="Snapshot")
+        self._trim_history()
+        Debug.log(f"taking snapshot, index: {self.current_index}, "
+                  f"{'keyframe' if self.history[-1].keyframe else 'delta'} {self.history[-1].size} B, "
+                  f"history {self.history_bytes / 1048576:.1f} MB", category="Snapshot")
         if self.on_state_change:
             self.on_state_change(self.current_index, len(self.history))
 
+    def _push_state(self, state: dict):
+        entry = None
+        if self.history:
+            key_idx = self._keyframe_index(len(self.history) - 1)
+            if len(self.history) - key_idx < self.keyframe_interval:
+                base = self._keyframe_state(key_idx)
+                if can_diff(base, state):
+                    entry = self._delta_entry(base, state)
+                    # дельта выросла почти до размера ключевого кадра - проще начать новый
+                    if entry.size * 2 >= self.history[key_idx].size:
+                        entry = None
+        if entry is None:
+            entry = self._keyframe_entry(state)
+        self.history.append(entry)
+        self.history_bytes += entry.size
+
+    @staticmethod
+    def _keyframe_entry(state: dict) -> HistoryEntry:
+        return HistoryEntry(pickle.dumps(state), True,
+                            frozenset(referenced_blobs(state.get("bodies", []), state.get("scripts"))))
+
+    @staticmethod
+    def _delta_entry(base: dict, state: dict) -> HistoryEntry:
+        delta = diff_state(base, state)
+        blobs = referenced_blobs(delta["bodies"].values(), delta["keys"].get("scripts"))
+        return HistoryEntry(pickle.dumps(delta), False, frozenset(blobs))
+
+    def _blob_store(self):
+        return getattr(self.snapshot_manager, "blobs", None)
+
+    def _collect_blobs(self):
+        store = self._blob_store()
+        if store is not None:
+            store.retain(set().union(*(e.blobs for e in self.history)))
+
+    def _used_bytes(self) -> int:
+        store = self._blob_store()
+        return self.history_bytes + (store.nbytes if store is not None else 0)
+
+    def _keyframe_index(self, index: int) -> int:
+        while not self.history[index].keyframe:
+            index -= 1
+        return index
+
+    def _keyframe_state(self, index: int) -> dict:
+        entry = self.history[index]
+        cached_entry, cached_state = self._keyframe_cache
+        if cached_entry is not entry:
+            cached_state = pickle.loads(entry.payload)
+            self._keyframe_cache = (entry, cached_state)
+        return cached_state
+
+    def get_state(self, index: int) -> dict:
+        key_idx = self._keyframe_index(index)
+        base = self._keyframe_state(key_idx)
+        if key_idx == index:
+            return base
+        return apply_delta(base, pickle.loads(self.history[index].payload))
+
+    def _trim_history(self):
+        while self.current_index > 0 and (self._used_bytes() > self.memory_budget or
+                                          0 < self.max_snapshots < len(self.history)):
+            self._drop_oldest()
+            self._collect_blobs()
+        for i, meta in enumerate(self.metadata_history):
+            meta.index = i
+
+    def _drop_oldest(self):
+        base = self._keyframe_state(0)
+        dropped = self.history.pop(0)
+        self.metadata_history.pop(0)
+        self.history_bytes -= dropped.size
+        self.current_index -= 1
+        if not self.history or self.history[0].keyframe:
+            return
+        # дельты удаляемого кадра перекладываем на следующий, он становится ключевым
+        end = 1
+        while end < len(self.history) and not self.history[end].keyframe:
+            end += 1
+        states = [apply_delta(base, pickle.loads(self.history[i].payload)) for i in range(end)]
+        new_entries = [self._keyframe_entry(states[0])]
+        for st in states[1:]:
+            new_entries.append(self._delta_entry(states[0], st))
+        for i, entry in enumerate(new_entries):
+            self.history_bytes += entry.size - self.history[i].size
+            self.history[i] = entry
+
+    def get_memory_usage(self) -> int:
+        return self._used_bytes()
+
     def _create_metadata_from_dict(self, snapshot: dict, index: int, custom_data: Dict[str, Any]) -> SnapshotMetadata:
         body_count = len(snapshot.get('bodies', []))
         total_mass = sum(b.get('mass', 0) for b in snapshot.get('bodies', []))
@@ -109,11 +216,15 @@ class UndoRedoManager:
 
         return SnapshotMetadata(index, datetime.now(), body_count, total_mass, script_count, custom_data)
 
+    def _restore(self, index: int):
+        # сравниваем с живым миром, а не со снапшотом current_index: правки после него тоже откатываются
+        previous = self.snapshot_manager.capture_snapshot_data()
+        self.current_index = index
+        self.snapshot_manager.restore_snapshot_data(self.get_state(index), previous)
+
     def undo(self) -> bool:
         if self.current_index > 0:
-            self.current_index -= 1
-            snapshot = self.history[self.current_index]
-            self.snapshot_manager.load_snapshot(snapshot)
+            self._restore(self.current_index - 1)
             Debug.log(f"loading snapshot, index: {self.current_index}", category="Snapshot")
             if self.on_state_change:
                 self.on_state_change(self.current_index, len(self.history))
@@ -122,9 +233,7 @@ class UndoRedoManager:
 
     def redo(self) -> bool:
         if self.current_index < len(self.history) - 1:
-            self.current_index += 1
-            snapshot = self.history[self.current_index]
-            self.snapshot_manager.load_snapshot(snapshot)
+            self._restore(self.current_index + 1)
             Debug.log(f"loading snapshot, index: {self.current_index}", category="Snapshot")
             if self.on_state_change:
                 self.on_state_change(self.current_index, len(self.history))
@@ -135,6 +244,9 @@ class UndoRedoManager:
         self.history.clear()
         self.metadata_history.clear()
         self.current_index = -1
+        self.history_bytes = 0
+        self._keyframe_cache = (None, None)
+        self._collect_blobs()
         if self.on_state_change:
             self.on_state_change(self.current_index, 0)
 
@@ -157,7 +269,7 @@ class UndoRedoManager:
 
     def export_history(self, filepath: str):
         export_data = {
-            'history': [pickle.loads(s) for s in self.history],
+            'history': [self.get_state(i) for i in range(len(self.history))],
             'metadata': [{'index': m.index, 'timestamp': m.timestamp.isoformat(), 'body_count': m.body_count, 'total_mass': m.total_mass, 'custom_data': m.custom_data} for m in self.metadata_history],
             'current_index': self.current_index
         }
@@ -167,13 +279,18 @@ class UndoRedoManager:
     def import_history(self, filepath: str):
         with open(filepath, 'r') as f:
             import_data = json.load(f)
-        self.history = [pickle.dumps(s) for s in import_data['history']]
+        self.history.clear()
+        self.history_bytes = 0
+        self._keyframe_cache = (None, None)
+        for state in import_data['history']:
+            self._push_state(state)
         self.metadata_history = [
             SnapshotMetadata(
                 m['index'],
                 datetime.fromisoformat(m['timestamp']),
                 m['body_count'],
                 m['total_mass'],
+                m.get('custom_data', {}).get('script_count', 0),
                 m.get('custom_data', {})
             ) for m in import_data['metadata']
         ]
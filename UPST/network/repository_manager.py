@@ -42,10 +42,13 @@ class RepositoryManager:
             Debug.log(f"Repo list fetch failed: {e}")
             return []
 
-    def download(self, item_id: str, title: str, progress_cb: Optional[Callable[[float], None]] = None) -> str:
+    def local_path(self, item_id: str) -> str:
         if not item_id.replace("-", "").isalnum():
             raise ValueError("Invalid item ID")
-        fp = os.path.join(self.local_dir, f"{item_id}.space")
+        return os.path.join(self.local_dir, f"{item_id}.space")
+
+    def download(self, item_id: str, title: str, progress_cb: Optional[Callable[[float], None]] = None) -> str:
+        fp = self.local_path(item_id)
         if os.path.exists(fp):
             Debug.log(f"Using cached file: {fp}")
             return fp
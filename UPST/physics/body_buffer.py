@@ -0,0 +1,365 @@
+# UPST/physics/body_buffer.py
+import math
+import pymunk
+import numpy as np
+from numba import njit
+
+from UPST.modules.hierarchy import links_version
+
+SHAPE_FIXED = 0
+SHAPE_SEGMENT = 1
+SHAPE_POLY = 2
+
+_DYNAMIC = pymunk.Body.DYNAMIC
+
+_geometry_version = 0
+
+
+def geometry_version() -> int:
+    """Bumped by geometry_changed(), so caches of shape geometry can be revalidated."""
+    return _geometry_version
+
+
+def geometry_changed():
+    """Call after editing a shape in place (radius, offset, vertices, endpoints)."""
+    global _geometry_version
+    _geometry_version += 1
+
+
+class TrackedSpace(pymunk.Space):
+    """pymunk.Space that counts add/remove calls in `topology`, so mirrors of its
+    contents can detect added or removed objects without comparing lists."""
+    topology = 0
+
+    def add(self, *objs):
+        super().add(*objs)
+        if objs:  # step() зовёт add()/remove() и без объектов
+            self.topology += 1
+
+    def remove(self, *objs):
+        super().remove(*objs)
+        if objs:
+            self.topology += 1
+
+
+@njit(cache=True, nogil=True)
+def _air_friction_kernel(pos, angle, vel, ang_vel, dynamic, shape_start,
+                         kind, off, lever, seg, thick, area, cd, vstart, vcount, verts,
+                         area_rot, lin_k, quad_k, mult, rho, out_force, out_torque):
+    n = pos.shape[0]
+    for i in range(n):
+        out_force[i, 0] = 0.0
+        out_force[i, 1] = 0.0
+        out_torque[i] = 0.0
+        if not dynamic[i]:
+            continue
+        ca = math.cos(angle[i])
+        sa = math.sin(angle[i])
+        w = ang_vel[i]
+        fx_sum = 0.0
+        fy_sum = 0.0
+        t_sum = 0.0
+        for s in range(shape_start[i], shape_start[i + 1]):
+            rx = off[s, 0] * ca - off[s, 1] * sa
+            ry = off[s, 0] * sa + off[s, 1] * ca
+            vpx = vel[i, 0] - w * ry
+            vpy = vel[i, 1] + w * rx
+            vm = math.sqrt(vpx * vpx + vpy * vpy)
+            if vm <= 1e-9:
+                continue
+            ux = vpx / vm
+            uy = vpy / vm
+            px = -uy
+            py = ux
+            k = kind[s]
+            if k == SHAPE_SEGMENT:
+                dx = seg[s, 0] * ca - seg[s, 1] * sa
+                dy = seg[s, 0] * sa + seg[s, 1] * ca
+                A = max(0.001, abs(dx * px + dy * py) * (thick[s] * 2.0))
+            elif k == SHAPE_POLY:
+                lo = 1e300
+                hi = -1e300
+                for v in range(vstart[s], vstart[s] + vcount[s]):
+                    wx = pos[i, 0] + verts[v, 0] * ca - verts[v, 1] * sa
+                    wy = pos[i, 1] + verts[v, 0] * sa + verts[v, 1] * ca
+                    p = wx * px + wy * py
+                    if p < lo:
+                        lo = p
+                    if p > hi:
+                        hi = p
+                A = abs(hi - lo)
+                if A < 1e-4:
+                    A = area[s]
+            else:
+                A = area[s]
+            A = max(0.0, A)
+            lin_c = -mult * lin_k * A
+            quad_c = -mult * (0.5 * rho * cd[s] * A * vm) * quad_k
+            fx = lin_c * vpx + quad_c * ux
+            fy = lin_c * vpy + quad_c * uy
+            lx = lever[s, 0] * ca - lever[s, 1] * sa
+            ly = lever[s, 0] * sa + lever[s, 1] * ca
+            fx_sum += fx
+            fy_sum += fy
+            t_sum += lx * fy - ly * fx
+        if abs(w) > 1e-9:
+            ar = area_rot[i]
+            torque_lin = -mult * lin_k * ar * w
+            torque_quad = -mult * quad_k * 0.5 * rho * ar * abs(w) * w
+            t_sum += torque_lin + torque_quad * 10000
+        out_force[i, 0] = fx_sum
+        out_force[i, 1] = fy_sum
+        out_torque[i] = t_sum
+
+
+def _poly_area(verts):
+    sm = 0.0
+    n = len(verts)
+    for i in range(n):
+        x1, y1 = verts[i]
+        x2, y2 = verts[(i + 1) % n]
+        sm += x1 * y2 - x2 * y1
+    return abs(sm) * 0.5
+
+
+class BodyBuffer:
+    """Structure-of-arrays mirror of the bodies in a pymunk space.
+
+    Shape geometry (offsets, vertices, drag coefficients, rotational drag area) is
+    cached per topology and rebuilt only when bodies or shapes change; per-body
+    state is gathered once per sync and consumed by batched kernels."""
+
+    def __init__(self, space):
+        self.space = space
+        self.bodies = []
+        self.dynamic_bodies = []
+        self._body_types = []
+        self._shape_count = -1
+        self._topology = None
+        self._dirty = True
+        self._geometry = -1
+        self.version = 0
+        n = 0
+        self.pos = np.zeros((n, 2), dtype=np.float64)
+        self.angle = np.zeros(n, dtype=np.float64)
+        self.vel = np.zeros((n, 2), dtype=np.float64)
+        self.ang_vel = np.zeros(n, dtype=np.float64)
+        self.dynamic = np.zeros(n, dtype=np.bool_)
+        self._force = np.zeros((n, 2), dtype=np.float64)
+        self._torque = np.zeros(n, dtype=np.float64)
+        self.active = np.zeros(n, dtype=np.bool_)
+        self.active_idx = np.zeros(0, dtype=np.int64)
+        self.woke = self.slept = self.active_idx
+        self._dyn_idx = self._linked_idx = self.active_idx
+        self.linked_bodies = []
+        self._links_key = None
+        self._marked = []
+        self._full_sync = True
+        self._build_shapes([])
+
+    def invalidate(self):
+        self._dirty = True
+
+    def _topology_changed(self):
+        if self._dirty or self._geometry != _geometry_version:
+            return True
+        space = self.space
+        topology = getattr(space, 'topology', None)
+        if topology is None:
+            # обычный pymunk.Space: space.bodies - это view, сравниваем списком
+            if len(space.shapes) != self._shape_count or list(space.bodies) != self.bodies:
+                return True
+        elif topology != self._topology:
+            return True
+        # тип тела меняют на месте (инструменты перемещения, контекстное меню)
+        for b, t in zip(self.bodies, self._body_types):
+            if b.body_type != t:
+                return True
+        return False
+
+    def refresh(self):
+        if self._topology_changed():
+            self._rebuild(self.space.bodies)
+
+    def sync(self, active_only=False):
+        self.refresh()
+        pos, angle, vel, ang_vel = self.pos, self.angle, self.vel, self.ang_vel
+        bodies = self.bodies
+        if active_only and not self._full_sync:
+            idx = self.active_idx.tolist()
+        else:
+            idx = range(len(bodies))
+            self._full_sync = False
+        for i in idx:
+            b = bodies[i]
+            p = b.position
+            v = b.velocity
+            pos[i, 0] = p.x
+            pos[i, 1] = p.y
+            vel[i, 0] = v.x
+            vel[i, 1] = v.y
+            angle[i] = b.angle
+            ang_vel[i] = b.angular_velocity
+
+    def _rebuild(self, bodies):
+        n = len(bodies)
+        self.bodies = list(bodies)
+        self._body_types = [b.body_type for b in self.bodies]
+        self.dynamic_bodies = [b for b in self.bodies if b.body_type == _DYNAMIC]
+        self._shape_count = len(self.space.shapes)
+        self._topology = getattr(self.space, 'topology', None)
+        self.pos = np.zeros((n, 2), dtype=np.float64)
+        self.angle = np.zeros(n, dtype=np.float64)
+        self.vel = np.zeros((n, 2), dtype=np.float64)
+        self.ang_vel = np.zeros(n, dtype=np.float64)
+        self.dynamic = np.array([t == _DYNAMIC for t in self._body_types], dtype=np.bool_)
+        self._force = np.zeros((n, 2), dtype=np.float64)
+        self._torque = np.zeros(n, dtype=np.float64)
+        self._dyn_idx = np.flatnonzero(self.dynamic)
+        # до следующего update_active считаем активными все динамические тела
+        self.active = self.dynamic.copy()
+        self.active_idx = self._dyn_idx
+        self._links_key = None
+        self._full_sync = True
+        self._build_shapes(self.bodies)
+        self._dirty = False
+        self._geometry = _geometry_version
+        self.version += 1
+
+    def _refresh_links(self):
+        key = (self.version, links_version())
+        if key == self._links_key:
+            return
+        linked, idx = [], []
+        for i, b in enumerate(self.bodies):
+            node = getattr(b, 'hierarchy_node', None)
+            if node is not None and node.parent:
+                linked.append(b)
+                idx.append(i)
+        self.linked_bodies = linked
+        self._linked_idx = np.array(idx, dtype=np.int64)
+        self._links_key = key
+
+    def mark_active(self, indices):
+        """Keeps bodies (e.g. inside a force field) in the active set for the next update."""
+        self._marked.append(np.asarray(indices, dtype=np.int64))
+
+    def update_active(self):
+        """Rebuilds the active set: awake dynamic bodies, bodies driven by a hierarchy
+        parent and bodies marked since the last call. `woke`/`slept` hold the transitions."""
+        self.refresh()
+        self._refresh_links()
+        dyn = self.dynamic_bodies
+        sleeping = np.fromiter((b.is_sleeping for b in dyn), dtype=np.bool_, count=len(dyn))
+        active = np.zeros(len(self.bodies), dtype=np.bool_)
+        active[self._dyn_idx[~sleeping]] = True
+        active[self._linked_idx] = True
+        for m in self._marked:
+            active[m] = True
+        self._marked.clear()
+        prev = self.active
+        self.woke = np.flatnonzero(active & ~prev)
+        self.slept = np.flatnonzero(prev & ~active)
+        self.active = active
+        self.active_idx = np.flatnonzero(active)
+        return self.active_idx
+
+    def _build_shapes(self, bodies):
+        shape_start = [0]
+        kind, off, lever, seg, thick, area, cd, vstart, vcount, verts = [], [], [], [], [], [], [], [], [], []
+        area_rot = []
+        for b in bodies:
+            rot_area = 0.0
+            cog = b.center_of_gravity if b.body_type == _DYNAMIC else pymunk.Vec2d(0, 0)
+            for s in b.shapes:
+                local_verts = s.get_vertices() if isinstance(s, pymunk.Poly) else None
+                if isinstance(s, pymunk.Circle):
+                    rot_area += s.radius
+                elif isinstance(s, pymunk.Segment):
+                    rot_area += (s.b - s.a).length * (getattr(s, "radius", 0.5) * 2.0)
+                elif local_verts:
+                    rot_area += _poly_area(local_verts)
+                if b.body_type != _DYNAMIC or getattr(s, "sensor", False):
+                    continue
+                if hasattr(s, "offset"):
+                    o = pymunk.Vec2d(*s.offset)
+                elif isinstance(s, pymunk.Segment):
+                    o = (s.a + s.b) * 0.5
+                elif local_verts:
+                    o = sum(local_verts, pymunk.Vec2d(0, 0)) / len(local_verts)
+                else:
+                    o = pymunk.Vec2d(0, 0)
+                k, a, d, t, vs, vc = SHAPE_FIXED, 0.001, (0.0, 0.0), 0.0, len(verts), 0
+                if getattr(s, "cross_sectional_area", None) is not None:
+                    a = float(s.cross_sectional_area)
+                elif isinstance(s, pymunk.Circle):
+                    a = 2.0 * float(s.radius)
+                elif isinstance(s, pymunk.Segment):
+                    k, d, t = SHAPE_SEGMENT, tuple(s.b - s.a), getattr(s, "radius", 0.5)
+                elif isinstance(s, pymunk.Poly):
+                    if local_verts:
+                        k, vc = SHAPE_POLY, len(local_verts)
+                        verts.extend(tuple(v) for v in local_verts)
+                        a = max(0.001, _poly_area(local_verts) ** 0.5)
+                    else:
+                        a = 0.0
+                if getattr(s, "drag_coeff", None) is not None:
+                    c = float(s.drag_coeff)
+                elif isinstance(s, pymunk.Circle):
+                    c = 0.47
+                elif isinstance(s, pymunk.Segment):
+                    c = 1.2
+                else:
+                    c = 1.0
+                kind.append(k)
+                off.append(tuple(o))
+                lever.append(tuple(o - cog))
+                seg.append(d)
+                thick.append(t)
+                area.append(a)
+                cd.append(max(0.0, c))
+                vstart.append(vs)
+                vcount.append(vc)
+            area_rot.append(max(0.001, rot_area))
+            shape_start.append(len(kind))
+        self.shape_start = np.array(shape_start, dtype=np.int64)
+        self.shape_kind = np.array(kind, dtype=np.int64)
+        self.shape_off = np.array(off, dtype=np.float64).reshape(-1, 2)
+        self.shape_lever = np.array(lever, dtype=np.float64).reshape(-1, 2)
+        self.shape_seg = np.array(seg, dtype=np.float64).reshape(-1, 2)
+        self.shape_thick = np.array(thick, dtype=np.float64)
+        self.shape_area = np.array(area, dtype=np.float64)
+        self.shape_cd = np.array(cd, dtype=np.float64)
+        self.shape_vstart = np.array(vstart, dtype=np.int64)
+        self.shape_vcount = np.array(vcount, dtype=np.int64)
+        self.verts = np.array(verts, dtype=np.float64).reshape(-1, 2)
+        self.area_rot = np.array(area_rot, dtype=np.float64)
+
+    def apply_air_friction(self, lin_k, quad_k, mult, rho):
+        self.sync(active_only=True)
+        if not self.dynamic_bodies:
+            return
+        # спящие тела не трогаем: запись force у pymunk будит тело
+        moving = self.dynamic & self.active
+        _air_friction_kernel(self.pos, self.angle, self.vel, self.ang_vel, moving, self.shape_start,
+                             self.shape_kind, self.shape_off, self.shape_lever, self.shape_seg,
+                             self.shape_thick, self.shape_area, self.shape_cd, self.shape_vstart,
+                             self.shape_vcount, self.verts, self.area_rot,
+                             float(lin_k), float(quad_k), float(mult), float(rho),
+                             self._force, self._torque)
+        force, torque = self._force, self._torque
+        for i in np.flatnonzero(moving):
+            fx, fy, t = force[i, 0], force[i, 1], torque[i]
+            if fx == 0.0 and fy == 0.0 and t == 0.0:
+                continue
+            b = self.bodies[i]
+            f = b.force
+            b.force = (f.x + fx, f.y + fy)
+            b.torque += t
+
+    def apply_angular_damping(self, k):
+        self.refresh()
+        bodies, dynamic = self.bodies, self.dynamic
+        for i in self.active_idx.tolist():
+            if dynamic[i]:
+                bodies[i].angular_velocity *= k
@@ -0,0 +1,135 @@
+# UPST/physics/ccd.py
+import math
+import pymunk
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True, nogil=True)
+def sweep_candidates(prev, cur, size, frac, min_move, out):
+    k = 0
+    for i in range(prev.shape[0]):
+        dx = cur[i, 0] - prev[i, 0]
+        dy = cur[i, 1] - prev[i, 1]
+        lim = max(size[i] * frac, min_move)
+        if dx * dx + dy * dy > lim * lim:
+            out[k] = i
+            k += 1
+    return k
+
+
+def _body_extent(body):
+    # наименьший габарит тела: быстрее этого за шаг оно может проскочить препятствие
+    ext = math.inf
+    for s in body.shapes:
+        if isinstance(s, pymunk.Circle):
+            e = s.radius
+        elif isinstance(s, pymunk.Segment):
+            e = s.radius + (s.b - s.a).length * 0.5
+        elif isinstance(s, pymunk.Poly):
+            bb = s.bb
+            e = min(bb.right - bb.left, bb.top - bb.bottom) * 0.5 + s.radius
+        else:
+            continue
+        ext = min(ext, e)
+    return ext if math.isfinite(ext) else 0.0
+
+
+class CCDSystem:
+    """Continuous collision pass for bodies registered with PhysicsManager.enable_ccd.
+
+    Previous positions live in a persistent array aligned with `bodies`. After every
+    substep one kernel picks the bodies that moved further than `fraction` of their
+    smallest extent; only those sweep their path through the space's BB tree."""
+
+    def __init__(self, space, fraction=0.5):
+        self.space = space
+        self.fraction = fraction
+        self.bodies = []
+        self._index = {}
+        self._dirty = False
+        self.prev = np.zeros((0, 2), dtype=np.float64)
+        self.cur = np.zeros((0, 2), dtype=np.float64)
+        self.size = np.zeros(0, dtype=np.float64)
+        self._cand = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def __contains__(self, body):
+        return body in self._index
+
+    def add(self, body):
+        if body not in self._index:
+            self._index[body] = len(self.bodies)
+            self.bodies.append(body)
+            self._dirty = True
+
+    def discard(self, body):
+        if self._index.pop(body, None) is not None:
+            self.bodies.remove(body)
+            self._index = {b: i for i, b in enumerate(self.bodies)}
+            self._dirty = True
+
+    def clear(self):
+        self.bodies.clear()
+        self._index.clear()
+        self._dirty = True
+
+    def _gather(self, out):
+        for i, b in enumerate(self.bodies):
+            p = b.position
+            out[i, 0] = p.x
+            out[i, 1] = p.y
+
+    def begin(self):
+        """Captures start positions; called once per PhysicsManager.step."""
+        if self._dirty or any(b.space is not self.space for b in self.bodies):
+            self.bodies = [b for b in self.bodies if b.space is self.space]
+            self._index = {b: i for i, b in enumerate(self.bodies)}
+            n = len(self.bodies)
+            self.prev = np.zeros((n, 2), dtype=np.float64)
+            self.cur = np.zeros((n, 2), dtype=np.float64)
+            self._cand = np.zeros(n, dtype=np.int64)
+            self._dirty = False
+        self.size = np.array([_body_extent(b) for b in self.bodies], dtype=np.float64)
+        self._gather(self.prev)
+
+    def resolve(self):
+        if not self.bodies:
+            return 0
+        space = self.space
+        slop = space.collision_slop
+        self._gather(self.cur)
+        k = sweep_candidates(self.prev, self.cur, self.size, self.fraction, slop, self._cand)
+        cur = self.cur
+        for j in range(k):
+            i = self._cand[j]
+            b = self.bodies[i]
+            if b.body_type != pymunk.Body.DYNAMIC or b.space is not space:
+                continue
+            start = pymunk.Vec2d(self.prev[i, 0], self.prev[i, 1])
+            end = pymunk.Vec2d(cur[i, 0], cur[i, 1])
+            hit = None
+            for q in space.segment_query(start, end, slop, pymunk.ShapeFilter()):
+                if q.shape is not None and q.shape.body is not b and q.alpha < 1.0 and not q.shape.sensor:
+                    if hit is None or q.alpha < hit.alpha:
+                        hit = q
+            if hit is None:
+                continue
+            n = hit.normal
+            b.position = hit.point - n * (slop * 1.01)
+            e = 0.5
+            try:
+                e = 0.5 * (hit.shape.elasticity + sum(s.elasticity for s in b.shapes) / max(1, len(b.shapes)))
+            except Exception:
+                pass
+            v = pymunk.Vec2d(*b.velocity)
+            vn = v.dot(n) * n
+            vt = v - vn
+            b.velocity = vt - vn * max(0.0, min(1.0, e))
+            p = b.position
+            cur[i, 0] = p.x
+            cur[i, 1] = p.y
+        self.prev, self.cur = self.cur, self.prev
+        return k
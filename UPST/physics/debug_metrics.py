@@ -0,0 +1,149 @@
+# UPST/physics/debug_metrics.py
+import numpy as np
+from numba import njit
+
+MAX_VEL = 1e7  # защита от переполнения v^2
+
+# out: mass, px, py, L, ke, pe, com_x, com_y
+SYSTEM_FIELDS = 8
+
+
+@njit(cache=True, nogil=True)
+def system_metrics(pos, vel, ang_vel, mass, moment, g, screen_h, out):
+    m_sum = px = py = L = ke = pe = cx = cy = 0.0
+    for i in range(pos.shape[0]):
+        m = mass[i]
+        x, y = pos[i, 0], pos[i, 1]
+        vx, vy = vel[i, 0], vel[i, 1]
+        w = ang_vel[i]
+        m_sum += m
+        px += m * vx
+        py += m * vy
+        L += moment[i] * w + m * (x * vy - y * vx)
+        ke += 0.5 * m * (vx * vx + vy * vy) + 0.5 * moment[i] * w * w
+        h = (screen_h - y) * 0.001
+        if h > 0.0:
+            pe += m * g * h
+        cx += m * x
+        cy += m * y
+    if m_sum > 0.0:
+        cx /= m_sum
+        cy /= m_sum
+    out[0], out[1], out[2], out[3] = m_sum, px, py, L
+    out[4], out[5], out[6], out[7] = ke, pe, cx, cy
+
+
+def spring_energy(pa, pb, rest, stiffness):
+    if not len(rest):
+        return 0.0
+    d = np.hypot(pb[:, 0] - pa[:, 0], pb[:, 1] - pa[:, 1]) - rest
+    return float(0.5 * np.dot(stiffness, d * d))
+
+
+class MetricsSnapshot:
+    """Dynamic-body state copied out of BodyBuffer on the main thread, so reductions can
+    run on the debug worker without touching pymunk objects."""
+    __slots__ = ('bodies', 'version', 'pos', 'vel', 'ang_vel', 'mass', 'moment', 'force', 'torque',
+                 'sleeping', 'speed', 'ke', 're', 'pe', 'gravity', 'screen_h', 'springs')
+
+    def __init__(self, buf, gravity, screen_h):
+        idx = np.flatnonzero(buf.dynamic)
+        self.bodies = bodies = [buf.bodies[i] for i in idx.tolist()]
+        self.version = buf.version
+        self.pos = buf.pos[idx]
+        self.vel = buf.vel[idx]
+        self.ang_vel = buf.ang_vel[idx]
+        n = len(bodies)
+        self.mass = np.fromiter((b.mass for b in bodies), dtype=np.float64, count=n)
+        self.moment = np.fromiter((b.moment for b in bodies), dtype=np.float64, count=n)
+        self.sleeping = np.fromiter((b.is_sleeping for b in bodies), dtype=np.bool_, count=n)
+        self.force = np.zeros((n, 2), dtype=np.float64)
+        self.torque = np.zeros(n, dtype=np.float64)
+        for i, b in enumerate(bodies):
+            f = b.force
+            self.force[i, 0] = f.x
+            self.force[i, 1] = f.y
+            self.torque[i] = b.torque
+        self.gravity = gravity
+        self.screen_h = screen_h
+        self.springs = None
+        self.speed = self.ke = self.re = self.pe = None
+
+    def body_energies(self):
+        """Per-body speed, kinetic, rotational and potential energy as arrays."""
+        if self.ke is None:
+            v = np.clip(self.vel, -MAX_VEL, MAX_VEL)
+            v2 = np.einsum('ij,ij->i', v, v)
+            self.speed = np.sqrt(v2)
+            self.ke = 0.5 * self.mass * v2
+            with np.errstate(over='ignore', invalid='ignore'):
+                re = 0.5 * self.moment * self.ang_vel * self.ang_vel
+            self.re = np.where(np.isfinite(re), re, 0.0)
+            self.pe = self.mass * self.gravity * np.maximum(0.0, (self.screen_h - self.pos[:, 1]) * 0.001)
+        return self.speed, self.ke, self.re, self.pe
+
+    def reduce(self):
+        out = np.zeros(SYSTEM_FIELDS, dtype=np.float64)
+        system_metrics(self.pos, self.vel, self.ang_vel, self.mass, self.moment,
+                       float(self.gravity), float(self.screen_h), out)
+        elastic = spring_energy(*self.springs) if self.springs is not None else 0.0
+        return (out[1], out[2]), out[3], out[4] + out[5] + elastic, (out[6], out[7])
+
+
+class BodyRing:
+    """Fixed-size per-body history: a (bodies, window, width) ring where every push
+    writes one column for all bodies at once. Rows follow the dynamic-body order of a
+    MetricsSnapshot and are re-mapped only when BodyBuffer.version changes."""
+
+    def __init__(self, window, width):
+        self.window = max(1, int(window))
+        self.width = width
+        self.bodies = []
+        self.version = None
+        self.head = -1
+        self.data = np.zeros((0, self.window, width), dtype=np.float64)
+        self.count = np.zeros(0, dtype=np.int64)
+
+    def clear(self):
+        self.count[:] = 0
+
+    def resize(self, window):
+        window = max(1, int(window))
+        if window != self.window:
+            self.window = window
+            self.version = None
+            self.bodies = []
+
+    def bind(self, bodies, version):
+        if version == self.version and len(bodies) == len(self.bodies):
+            return
+        data = np.zeros((len(bodies), self.window, self.width), dtype=np.float64)
+        count = np.zeros(len(bodies), dtype=np.int64)
+        old = {b: i for i, b in enumerate(self.bodies)}
+        src = np.fromiter((old.get(b, -1) for b in bodies), dtype=np.int64, count=len(bodies))
+        keep = np.flatnonzero(src >= 0)
+        if len(keep) and self.data.shape[1] == self.window:
+            data[keep] = self.data[src[keep]]
+            count[keep] = self.count[src[keep]]
+        self.bodies, self.version = list(bodies), version
+        self.data, self.count = data, count
+
+    def push(self, values):
+        self.head = (self.head + 1) % self.window
+        fresh = self.count == 0
+        if fresh.any():
+            # как и раньше, новое окно сглаживания заполняется первым значением
+            self.data[fresh] = values[fresh][:, None, :]
+        self.data[:, self.head] = values
+        np.minimum(self.count + 1, self.window, out=self.count)
+
+    def mean(self):
+        return self.data.mean(axis=1)
+
+    def last(self):
+        return self.data[:, self.head]
+
+    def ordered(self, rows):
+        """Histories of `rows`, oldest first."""
+        order = (np.arange(1, self.window + 1) + self.head) % self.window
+        return self.data[rows][:, order]
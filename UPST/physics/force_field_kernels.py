@@ -0,0 +1,124 @@
+# UPST/physics/force_field_kernels.py
+import math
+from numba import njit
+
+FIELD_ATTRACTION = 1 << 0
+FIELD_REPULSION = 1 << 1
+FIELD_RING = 1 << 2
+FIELD_SPIRAL = 1 << 3
+FIELD_FREEZE = 1 << 4
+FIELD_WIND = 1 << 5
+FIELD_VORTEX = 1 << 6
+FIELD_NOISE = 1 << 7
+
+FIELD_FLAGS = {
+    "attraction": FIELD_ATTRACTION,
+    "repulsion": FIELD_REPULSION,
+    "ring": FIELD_RING,
+    "spiral": FIELD_SPIRAL,
+    "freeze": FIELD_FREEZE,
+    "wind": FIELD_WIND,
+    "vortex": FIELD_VORTEX,
+    "noise": FIELD_NOISE,
+}
+# Fields that only touch bodies inside the field radius and can be cell-culled
+LOCAL_FIELDS = FIELD_ATTRACTION | FIELD_REPULSION | FIELD_FREEZE | FIELD_VORTEX
+
+FALLOFF_LINEAR = 0
+FALLOFF_INV = 1
+FALLOFF_INV2 = 2
+FALLOFF_MODES = {"linear": FALLOFF_LINEAR, "inv": FALLOFF_INV, "inv2": FALLOFF_INV2}
+
+
+@njit(cache=True, nogil=True)
+def falloff(dist, radius, mode):
+    if dist <= 1e-5:
+        return 1.0
+    r = max(1e-5, radius)
+    x = min(1.0, dist / r)
+    if mode == FALLOFF_LINEAR:
+        return 1.0 - x
+    if mode == FALLOFF_INV:
+        return 1.0 / (1.0 + 9.0 * x)
+    return 1.0 / (1.0 + 9.0 * (x * x))
+
+
+@njit(cache=True, nogil=True)
+def evaluate_fields(idx, pos, dynamic, ring_slot, spiral_slot, n_dynamic, fields,
+                    px, py, radius, strength, mode, noise,
+                    out_force, out_impulse, out_freeze):
+    ring_inc = 2.0 * math.pi / max(1, n_dynamic)
+    spiral_spacing = max(1.0, radius / 100.0)
+    for j in range(idx.shape[0]):
+        i = idx[j]
+        fx = 0.0
+        fy = 0.0
+        ix = 0.0
+        iy = 0.0
+        frozen = False
+        if dynamic[i]:
+            x = pos[i, 0]
+            y = pos[i, 1]
+            if fields & FIELD_ATTRACTION:
+                dx = px - x
+                dy = py - y
+                dist = math.sqrt(dx * dx + dy * dy)
+                if dist <= radius:
+                    k = falloff(dist, radius, mode) * strength / (dist + 1e-6)
+                    fx += dx * k
+                    fy += dy * k
+            if fields & FIELD_REPULSION:
+                dx = x - px
+                dy = y - py
+                dist = math.sqrt(dx * dx + dy * dy)
+                if dist > 0.0 and dist <= radius:
+                    k = falloff(dist, radius, mode) * strength * 3000 / (dist + 1e-6)
+                    fx += dx * k
+                    fy += dy * k
+            if fields & FIELD_RING:
+                ang = ring_slot[i] * ring_inc
+                dx = px + radius * math.cos(ang) - x
+                dy = py + radius * math.sin(ang) - y
+                k = falloff(math.sqrt(dx * dx + dy * dy), radius, mode) * 0.5
+                ix += dx * k
+                iy += dy * k
+            if fields & FIELD_SPIRAL:
+                s = spiral_slot[i]
+                sr = 50.0 + s * spiral_spacing
+                ang = s * (math.pi / 10.0)
+                dx = px + sr * math.cos(ang) - x
+                dy = py + sr * math.sin(ang) - y
+                k = falloff(math.sqrt(dx * dx + dy * dy), radius, mode) * 0.4
+                ix += dx * k
+                iy += dy * k
+            if fields & FIELD_FREEZE:
+                dx = x - px
+                dy = y - py
+                if math.sqrt(dx * dx + dy * dy) <= radius:
+                    frozen = True
+            if fields & FIELD_WIND:
+                fx += strength * 0.2
+            if fields & FIELD_VORTEX:
+                rx = x - px
+                ry = y - py
+                dist = math.sqrt(rx * rx + ry * ry)
+                if dist > 0.0 and dist <= radius:
+                    k = strength * falloff(dist, radius, mode) / max(1.0, dist) / dist
+                    fx += -ry * k
+                    fy += rx * k
+            if fields & FIELD_NOISE:
+                fx += noise[j, 0] * strength
+                fy += noise[j, 1] * strength
+        out_force[j, 0] = fx
+        out_force[j, 1] = fy
+        out_impulse[j, 0] = ix
+        out_impulse[j, 1] = iy
+        out_freeze[j] = frozen
+
+
+def field_mask(active_fields):
+    mask = 0
+    for name, on in active_fields.items():
+        if on:
+            mask |= FIELD_FLAGS.get(name, 0)
+    return mask
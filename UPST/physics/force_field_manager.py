@@ -1,11 +1,13 @@
-import math
-import random
-import pymunk
+import numpy as np
 import pygame
 
 from UPST.debug.debug_manager import Debug
 from UPST.gizmos.gizmos_manager import Gizmos
 from UPST.modules.profiler import profile
+from UPST.physics.force_field_kernels import (
+    FIELD_ATTRACTION, FIELD_REPULSION, FIELD_RING, FIELD_SPIRAL, FIELD_FREEZE, FIELD_WIND, FIELD_VORTEX,
+    FIELD_NOISE, LOCAL_FIELDS, FALLOFF_MODES, FALLOFF_INV2, evaluate_fields, falloff, field_mask
+)
 
 
 class ForceFieldManager:
@@ -26,6 +28,13 @@ class ForceFieldManager:
             "noise": False
         }
         self.shuffled_bodies = []
+        self.cell_culling = True
+        self.ring_slot = np.zeros(0, dtype=np.int64)
+        self.spiral_slot = np.zeros(0, dtype=np.int64)
+        self._slots_version = -1
+        self._slots_count = -1
+        self._rng = np.random.default_rng()
+        self._no_noise = np.zeros((0, 2), dtype=np.float64)
         Debug.log_info("ForceFieldManager initialized.", "ForceField")
 
     def set_radius(self, r: float):
@@ -51,12 +60,9 @@ class ForceFieldManager:
     def update(self, world_mouse_pos, screen):
         if not self.physics_manager.running_physics:
             return
-        for field, is_active in self.active_fields.items():
-            if not is_active:
-                continue
-            fn = getattr(self, f"apply_{field}", None)
-            if fn:
-                fn(world_mouse_pos)
+        mask = field_mask(self.active_fields)
+        if mask:
+            self.apply_fields(mask, world_mouse_pos)
         if screen is not None:
             pygame.draw.circle(
                 screen,
@@ -67,120 +73,78 @@ class ForceFieldManager:
             )
 
     def _falloff(self, dist: float) -> float:
-        if dist <= 1e-5:
-            return 1.0
-        r = max(1e-5, float(self.radius))
-        x = min(1.0, dist / r)
-        if self.falloff_mode == "linear":
-            return 1.0 - x
-        if self.falloff_mode == "inv":
-            return 1.0 / (1.0 + 9.0 * x)
-        return 1.0 / (1.0 + 9.0 * (x * x))
+        return falloff(float(dist), float(self.radius), FALLOFF_MODES.get(self.falloff_mode, FALLOFF_INV2))
+
+    def _refresh_slots(self, buf):
+        dyn = np.flatnonzero(buf.dynamic)
+        if buf.version == self._slots_version and dyn.shape[0] == self._slots_count:
+            return
+        self.spiral_slot = np.zeros(len(buf.bodies), dtype=np.int64)
+        self.spiral_slot[dyn] = np.arange(dyn.shape[0], dtype=np.int64)
+        perm = dyn.copy()
+        self._rng.shuffle(perm)
+        self.ring_slot = np.zeros(len(buf.bodies), dtype=np.int64)
+        self.ring_slot[perm] = np.arange(perm.shape[0], dtype=np.int64)
+        self.shuffled_bodies = [buf.bodies[i] for i in perm]
+        self._slots_version = buf.version
+        self._slots_count = dyn.shape[0]
+
+    def apply_fields(self, mask, pos):
+        pm = self.physics_manager
+        index = pm.spatial_index
+        index.refresh(pm._state_stamp)
+        # позиции берём из индекса: он перечитывает сдвинувшиеся тела, а buf.pos здесь не синхронизирован
+        buf = pm.body_buffer
+        self._refresh_slots(buf)
+        px, py = float(pos[0]), float(pos[1])
+        r = float(self.radius)
+        if self.cell_culling and not (mask & ~LOCAL_FIELDS):
+            idx = index.candidate_indices(px - r, py - r, px + r, py + r)
+        else:
+            idx = np.flatnonzero(buf.dynamic)
+        n = idx.shape[0]
+        if n == 0:
+            return
+        noise = self._rng.random((n, 2)) - 0.5 if mask & FIELD_NOISE else self._no_noise
+        force = np.empty((n, 2), dtype=np.float64)
+        impulse = np.empty((n, 2), dtype=np.float64)
+        frozen = np.empty(n, dtype=np.bool_)
+        evaluate_fields(idx, index.positions, buf.dynamic, self.ring_slot, self.spiral_slot, self._slots_count, mask,
+                        px, py, r, float(self.strength), FALLOFF_MODES.get(self.falloff_mode, FALLOFF_INV2),
+                        noise, force, impulse, frozen)
+        touched = np.flatnonzero(frozen | (force != 0.0).any(axis=1) | (impulse != 0.0).any(axis=1))
+        buf.mark_active(idx[touched])
+        bodies = buf.bodies
+        for j in touched:
+            body = bodies[idx[j]]
+            if frozen[j]:
+                body.velocity = (0, 0)
+                body.angular_velocity = 0
+            elif impulse[j, 0] != 0.0 or impulse[j, 1] != 0.0:
+                body.apply_impulse_at_world_point((impulse[j, 0], impulse[j, 1]), body.position)
+            if force[j, 0] != 0.0 or force[j, 1] != 0.0:
+                body.apply_force_at_world_point((force[j, 0], force[j, 1]), body.position)
 
     def apply_attraction(self, pos):
-        px, py = pos
-        for body in self.physics_manager.space.bodies:
-            if body.body_type != pymunk.Body.DYNAMIC:
-                continue
-            dx = px - body.position.x
-            dy = py - body.position.y
-            dist = math.hypot(dx, dy)
-            if dist > self.radius:
-                continue
-            k = self._falloff(dist)
-            fx = (dx / (dist + 1e-6)) * self.strength * k
-            fy = (dy / (dist + 1e-6)) * self.strength * k
-            body.apply_force_at_world_point((fx, fy), body.position)
+        self.apply_fields(FIELD_ATTRACTION, pos)
 
     def apply_repulsion(self, pos):
-        px, py = pos
-        for body in self.physics_manager.space.bodies:
-            if body.body_type != pymunk.Body.DYNAMIC:
-                continue
-            dx = body.position.x - px
-            dy = body.position.y - py
-            dist = math.hypot(dx, dy)
-            if 0 < dist <= self.radius:
-                k = self._falloff(dist)
-                fx = (dx / (dist + 1e-6)) * self.strength * 3000 * k
-                fy = (dy / (dist + 1e-6)) * self.strength * 3000 * k
-                body.apply_force_at_world_point((fx, fy), body.position)
+        self.apply_fields(FIELD_REPULSION, pos)
 
     def apply_ring(self, pos):
-        px, py = pos
-        bodies = [b for b in self.physics_manager.space.bodies if b.body_type == pymunk.Body.DYNAMIC]
-        if not bodies:
-            return
-        if not self.shuffled_bodies or len(self.shuffled_bodies) != len(bodies):
-            self.shuffled_bodies = bodies[:]
-            random.shuffle(self.shuffled_bodies)
-        n = len(self.shuffled_bodies)
-        angle_inc = 2 * math.pi / max(1, n)
-        for i, body in enumerate(self.shuffled_bodies):
-            ang = i * angle_inc
-            tx = px + self.radius * math.cos(ang)
-            ty = py + self.radius * math.sin(ang)
-            dx = tx - body.position.x
-            dy = ty - body.position.y
-            dist = math.hypot(dx, dy)
-            k = self._falloff(dist)
-            body.apply_impulse_at_world_point((dx * 0.5 * k, dy * 0.5 * k), body.position)
+        self.apply_fields(FIELD_RING, pos)
 
     def apply_spiral(self, pos):
-        px, py = pos
-        bodies = [b for b in self.physics_manager.space.bodies if b.body_type == pymunk.Body.DYNAMIC]
-        if not bodies:
-            return
-        spiral_radius = 50.0
-        spiral_spacing = max(1.0, self.radius / 100.0)
-        angle_increment = math.pi / 10.0
-        angle = 0.0
-        for body in bodies:
-            tx = px + spiral_radius * math.cos(angle)
-            ty = py + spiral_radius * math.sin(angle)
-            dx = tx - body.position.x
-            dy = ty - body.position.y
-            dist = math.hypot(dx, dy)
-            k = self._falloff(dist)
-            body.apply_impulse_at_world_point((dx * 0.4 * k, dy * 0.4 * k), body.position)
-            spiral_radius += spiral_spacing
-            angle += angle_increment
+        self.apply_fields(FIELD_SPIRAL, pos)
 
     def apply_freeze(self, pos):
-        px, py = pos
-        for body in self.physics_manager.space.bodies:
-            if body.body_type != pymunk.Body.DYNAMIC:
-                continue
-            dist = pymunk.Vec2d(body.position.x - px, body.position.y - py).length
-            if dist <= self.radius:
-                body.velocity = (0, 0)
-                body.angular_velocity = 0
+        self.apply_fields(FIELD_FREEZE, pos)
 
     def apply_wind(self, pos):
-        wind = (self.strength * 0.2, 0.0)
-        for body in self.physics_manager.space.bodies:
-            if body.body_type == pymunk.Body.DYNAMIC:
-                body.apply_force_at_world_point(wind, body.position)
+        self.apply_fields(FIELD_WIND, pos)
 
     def apply_vortex(self, pos):
-        px, py = pos
-        circulation = self.strength
-        for body in self.physics_manager.space.bodies:
-            if body.body_type != pymunk.Body.DYNAMIC:
-                continue
-            r = pymunk.Vec2d(body.position.x - px, body.position.y - py)
-            dist = r.length
-            if 0 < dist <= self.radius:
-                t = r.perpendicular_normal()
-                k = self._falloff(dist)
-                f = t * (circulation * k / max(1.0, dist))
-                body.apply_force_at_world_point(f, body.position)
+        self.apply_fields(FIELD_VORTEX, pos)
 
     def apply_noise(self, pos):
-        for body in self.physics_manager.space.bodies:
-            if body.body_type != pymunk.Body.DYNAMIC:
-                continue
-            nx = (random.random() - 0.5) * self.strength
-            ny = (random.random() - 0.5) * self.strength
-            body.apply_force_at_world_point((nx, ny), body.position)
-
+        self.apply_fields(FIELD_NOISE, pos)
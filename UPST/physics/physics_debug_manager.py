@@ -1,15 +1,21 @@
 import pygame
 from collections import deque
 import math
+import numpy as np
 import pymunk
 import threading
 import queue
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Optional
 from dataclasses import dataclass
 from UPST.config import config
 from UPST.gizmos.gizmos_manager import Gizmos
 from UPST.debug.debug_manager import Debug
 from UPST.modules.profiler import profile
+from UPST.physics.debug_metrics import MetricsSnapshot, BodyRing
+
+_BODY_FLAGS = ('show_object_dimensions', 'show_center_of_mass', 'show_colliders', 'show_sleep_state',
+               'show_velocity_vectors', 'show_acceleration_vectors', 'show_forces', 'show_angular_velocity',
+               'show_angular_momentum', 'show_energy_meters', 'show_rotation_axes')
 
 
 class PhysicsDebugManager:
@@ -20,12 +26,8 @@ class PhysicsDebugManager:
         self.font_small = pygame.font.Font(None, 12)
         self.font_medium = pygame.font.Font(None, 16)
         self.font_large = pygame.font.Font(None, 20)
-        self.previous_velocities: Dict[pymunk.Body, Tuple[float, float]] = {}
-        self.previous_angular_velocities: Dict[pymunk.Body, float] = {}
-        self.previous_positions: Dict[pymunk.Body, Tuple[float, float]] = {}
         self.previous_time = 0.0
         self.dt_history = deque(maxlen=100)
-        self.trails: Dict[pymunk.Body, deque] = {}
         self.velocity_history: Dict[pymunk.Body, deque] = {}
         self.energy_history: Dict[pymunk.Body, deque] = {}
         self.phase_space_data: Dict[pymunk.Body, deque] = {}
@@ -38,7 +40,12 @@ class PhysicsDebugManager:
         self.total_system_energy = 0.0
         self.system_center_of_mass = (0.0, 0.0)
         self.plot_parameters: Dict[pymunk.Body, List[str]] = {}
-        self.history_buffer: Dict[pymunk.Body, Dict[str, deque]] = {}
+        cfg = config.physics_debug
+        # кольцевые буферы по телам вместо deque на каждое тело
+        self.trails = BodyRing(cfg.trail_length, 2)
+        self.smoothing_history = BodyRing(cfg.smoothing_window, 6)  # vx, vy, |v|, ax, ay, |a|
+        self.previous_velocities = BodyRing(1, 2)
+        self.snapshot: Optional[MetricsSnapshot] = None
         self._task_queue = queue.Queue(maxsize=1)
         self._result_queue = queue.Queue(maxsize=1)
         self._worker_thread = threading.Thread(target=self._worker_loop, daemon=True)
@@ -66,22 +73,13 @@ class PhysicsDebugManager:
             'smoothing': cfg.smoothing,
             'smoothing_window': cfg.smoothing_window,
             'trail_length': cfg.trail_length,
+            'trail_segments': cfg.trail_segments,
             'vector_scale': cfg.vector_scale,
             'precision_digits': cfg.precision_digits,
             'energy_bar_height': cfg.energy_bar_height,
             'text_scale': cfg.text_scale
         }
 
-    def _get_smoothed(self, body, key, value):
-        if body not in self.history_buffer:
-            self.history_buffer[body] = {}
-        if key not in self.history_buffer[body]:
-            window = self._debug_settings_cache['smoothing_window']
-            self.history_buffer[body][key] = deque([value] * window, maxlen=window)
-        hist = self.history_buffer[body][key]
-        hist.append(value)
-        return sum(hist) / len(hist)
-
     def add_plot_parameter(self, body: pymunk.Body, parameter: str):
         if body not in self.plot_parameters:
             self.plot_parameters[body] = []
@@ -94,14 +92,64 @@ class PhysicsDebugManager:
         self.plot_parameters.clear()
         Debug.log("Cleared all plot data", "PhysicsDebug")
 
+    def _capture(self):
+        pm = self.physics_manager
+        with pm.worker.hold():
+            buf = pm.body_buffer
+            buf.sync()
+            snap = MetricsSnapshot(buf, self._cached_gravity_magnitude, config.app.screen_height)
+            pa, pb, rest, k = [], [], [], []
+            for c in pm.space.constraints:
+                if isinstance(c, pymunk.DampedSpring):
+                    pa.append(tuple(c.a.local_to_world(c.anchor_a)))
+                    pb.append(tuple(c.b.local_to_world(c.anchor_b)))
+                    rest.append(c.rest_length)
+                    k.append(c.stiffness)
+            if rest:
+                snap.springs = (np.array(pa, dtype=np.float64), np.array(pb, dtype=np.float64),
+                                np.array(rest, dtype=np.float64), np.array(k, dtype=np.float64))
+        return snap
+
+    def _update_histories(self, snap, dt, debug_cache):
+        speed = snap.body_energies()[0]
+        vel = snap.vel
+        prev = self.previous_velocities
+        prev.bind(snap.bodies, snap.version)
+        has_prev = prev.count > 0
+        if dt > 0:
+            acc = np.where(has_prev[:, None], (vel - prev.last()) / dt, 0.0)
+        else:
+            acc = np.zeros_like(vel)
+            has_prev[:] = False
+        prev.push(vel)
+        acc_mag = np.hypot(acc[:, 0], acc[:, 1])
+        raw = np.column_stack((vel, speed, acc, acc_mag))
+        hist = self.smoothing_history
+        hist.resize(debug_cache['smoothing_window'])
+        hist.bind(snap.bodies, snap.version)
+        hist.push(raw)
+        smooth = hist.mean() if debug_cache['smoothing'] else raw
+        # ускорение рисуем только если есть прошлый кадр и сырое |a| заметно
+        return smooth, raw, has_prev & (acc_mag > 1.0)
+
     def update(self, delta_time: float):
         current_time = pygame.time.get_ticks() / 1000.0
         self.dt_history.append(delta_time)
         self._cached_gravity_magnitude = math.hypot(*self.physics_manager.space.gravity)
         self._update_debug_cache()
+        debug_cache = self._debug_settings_cache
+        body_overlays = any(debug_cache[k] for k in _BODY_FLAGS)
 
+        if not (body_overlays or debug_cache['show_trails'] or self.plot_parameters):
+            # снимок тел никому не нужен: не синхронизируем буфер и не обходим связи
+            self.snapshot = None
+            self._draw_constraints(debug_cache)
+            self.previous_time = current_time
+            return
+
+        snap = self.snapshot = self._capture()
         if self._task_queue.empty():
-            self._task_queue.put(("update_system_properties", {}))
+            self._task_queue.put(("update_system_properties", snap))
 
         while not self._result_queue.empty():
             task_type, result = self._result_queue.get_nowait()
@@ -111,165 +159,88 @@ class PhysicsDebugManager:
                  self.total_system_energy,
                  self.system_center_of_mass) = result
 
-        debug_cache = self._debug_settings_cache
-        space = self.physics_manager.space
-        for body in space.bodies:
-            if body.body_type == pymunk.Body.DYNAMIC:
-                self._update_body_debug(body, delta_time, current_time, debug_cache)
+        if self.plot_parameters:
+            self._update_plots(snap)
+        if debug_cache['show_trails']:
+            self._update_trails(snap, debug_cache)
+        if body_overlays:
+            smooth, raw, acc_mask = self._update_histories(snap, delta_time, debug_cache)
+            speed, ke, re, pe = snap.body_energies()
+            positions = snap.pos.tolist()
+            smooth_l, raw_l, acc_l = smooth.tolist(), raw.tolist(), acc_mask.tolist()
+            energies = np.column_stack((ke, re, pe)).tolist() if debug_cache['show_energy_meters'] else None
+            sleeping = snap.sleeping.tolist()
+            for i, body in enumerate(snap.bodies):
+                pos = pymunk.Vec2d(*positions[i])
+                self._update_body_debug(body, pos, delta_time, current_time, debug_cache, smooth_l[i], raw_l[i],
+                                        acc_l[i], energies[i] if energies else None, sleeping[i])
+
+        self._draw_constraints(debug_cache)
+        self.previous_time = current_time
 
+    def _draw_constraints(self, debug_cache):
         if debug_cache['show_constraints']:
-            for constraint in space.constraints:
+            for constraint in self.physics_manager.space.constraints:
                 self._draw_constraint(constraint, debug_cache)
 
-        self.previous_time = current_time
-
     def _worker_loop(self):
         while True:
             try:
                 task = self._task_queue.get(timeout=0.116)  # ~60fps
                 if task is None:
                     break
-                task_type, kwargs = task
+                task_type, snap = task
                 if task_type == "update_system_properties":
-                    bodies = [b for b in self.physics_manager.space.bodies if b.body_type == pymunk.Body.DYNAMIC]
-                    if not bodies:
-                        self._result_queue.put((task_type, ((0.0, 0.0), 0.0, 0.0, (0.0, 0.0))))
-                        continue
-
-                    total_mass = 0.0
-                    total_momentum_x = 0.0
-                    total_momentum_y = 0.0
-                    total_angular_momentum = 0.0
-                    com_x = 0.0
-                    com_y = 0.0
-
-                    for b in bodies:
-                        total_mass += b.mass
-                        total_momentum_x += b.mass * b.velocity.x
-                        total_momentum_y += b.mass * b.velocity.y
-                        total_angular_momentum += (b.moment * b.angular_velocity +
-                                                   b.mass * (b.position.x * b.velocity.y - b.position.y * b.velocity.x))
-                        com_x += b.mass * b.position.x
-                        com_y += b.mass * b.position.y
-
-                    if total_mass > 0:
-                        com_x /= total_mass
-                        com_y /= total_mass
-
-                    system_com = (com_x, com_y)
-                    total_momentum = (total_momentum_x, total_momentum_y)
-
-                    total_ke = 0.0
-                    total_pe = 0.0
-                    elastic_pe = 0.0
-                    gravity_mag = self._cached_gravity_magnitude
-                    screen_height = config.app.screen_height
-
-                    for b in bodies:
-                        vel_sq = b.velocity.length_squared
-                        total_ke += 0.5 * b.mass * vel_sq + 0.5 * b.moment * (b.angular_velocity ** 2)
-                        height = max(0, (screen_height - b.position.y) * 0.001)
-                        total_pe += b.mass * gravity_mag * height
-
-                    for constraint in self.physics_manager.space.constraints:
-                        if isinstance(constraint, pymunk.DampedSpring):
-                            a, b = constraint.a, constraint.b
-                            pa = a.local_to_world(constraint.anchor_a) if hasattr(constraint,
-                                                                                  'anchor_a') else a.position
-                            pb = b.local_to_world(constraint.anchor_b) if hasattr(constraint,
-                                                                                  'anchor_b') else b.position
-                            current_length = (pb - pa).length
-                            displacement = current_length - constraint.rest_length
-                            elastic_pe += 0.5 * constraint.stiffness * (displacement ** 2)
-
-                    total_energy = total_ke + total_pe + elastic_pe
+                    if not snap.bodies:
+                        result = ((0.0, 0.0), 0.0, 0.0, (0.0, 0.0))
+                    else:
+                        result = snap.reduce()
                     try:
-                        self._result_queue.put_nowait(
-                            (task_type, (total_momentum, total_angular_momentum, total_energy, system_com)))
+                        self._result_queue.put_nowait((task_type, result))
                     except queue.Full:
                         pass
             except queue.Empty:
                 continue
 
-    def _calculate_body_properties(self, body_mass, body_moment, body_velocity, body_angular_velocity, body_position_y):
-        MAX_VEL = 1e7  # Prevent overflow in v^2
-        vx, vy = body_velocity.x, body_velocity.y
-        if abs(vx) > MAX_VEL or abs(vy) > MAX_VEL:
-            scale = MAX_VEL / max(abs(vx), abs(vy))
-            vx *= scale
-            vy *= scale
-        vel_sq = vx * vx + vy * vy
-
-        velocity_length = math.sqrt(vel_sq) if vel_sq > 0 else 0.0
-        kinetic_energy = 0.5 * body_mass * vel_sq
-
-        rotational_energy = 0.5 * body_moment * (body_angular_velocity ** 2)
-        if math.isnan(rotational_energy) or math.isinf(rotational_energy):
-            rotational_energy = 0.0
-
-        potential_energy = body_mass * self._cached_gravity_magnitude * max(0, (
-                config.app.screen_height - body_position_y) * 0.001)
-        total_energy = kinetic_energy + rotational_energy + potential_energy
-        linear_momentum = body_mass * velocity_length
-        angular_momentum = body_moment * body_angular_velocity
-        return (velocity_length,
-                kinetic_energy,
-                rotational_energy,
-                potential_energy,
-                total_energy,
-                linear_momentum,
-                angular_momentum)
-
-    def _update_body_debug(self, body: pymunk.Body, dt: float, t: float, debug_cache: dict):
-        pos = body.position
-        velocity_length, kinetic_energy, rotational_energy, potential_energy, total_energy, linear_momentum, angular_momentum = \
-            self._calculate_body_properties(body.mass, body.moment, body.velocity, body.angular_velocity, pos.y)
-
-        if body in self.plot_parameters:
-            for param in self.plot_parameters[body]:
-                key = f"{body.mass:.1f}kg_{param}"
-                group = f"Body {body.mass:.1f}kg"
-                value = 0.0
-                if param == 'Velocity Length':
-                    value = velocity_length
-                elif param == 'Angular Velocity':
-                    value = body.angular_velocity
-                elif param == 'Kinetic Energy':
-                    value = kinetic_energy
-                elif param == 'Potential Energy':
-                    value = potential_energy
-                elif param == 'Total Energy':
-                    value = total_energy
-                elif param == 'Mass':
-                    value = body.mass
-                elif param == 'Moment of Inertia':
-                    value = body.moment
-                elif param == 'Linear Momentum':
-                    value = linear_momentum
-                elif param == 'Angular Momentum':
-                    value = angular_momentum
-                elif param == 'Force X':
-                    value = body.force.x
-                elif param == 'Force Y':
-                    value = body.force.y
-                elif param == 'Torque':
-                    value = body.torque
-                self.plotter.add_data(key, value, group)
-
+    def _update_plots(self, snap):
+        index = {b: i for i, b in enumerate(snap.bodies)}
+        speed, ke, re, pe = snap.body_energies()
+        for body, params in self.plot_parameters.items():
+            i = index.get(body)
+            if i is None:
+                continue
+            mass, moment, w = float(snap.mass[i]), float(snap.moment[i]), float(snap.ang_vel[i])
+            values = {
+                'Velocity Length': float(speed[i]),
+                'Angular Velocity': w,
+                'Kinetic Energy': float(ke[i]),
+                'Potential Energy': float(pe[i]),
+                'Total Energy': float(ke[i] + re[i] + pe[i]),
+                'Mass': mass,
+                'Moment of Inertia': moment,
+                'Linear Momentum': mass * float(speed[i]),
+                'Angular Momentum': moment * w,
+                'Force X': float(snap.force[i, 0]),
+                'Force Y': float(snap.force[i, 1]),
+                'Torque': float(snap.torque[i]),
+            }
+            group = f"Body {mass:.1f}kg"
+            for param in params:
+                self.plotter.add_data(f"{mass:.1f}kg_{param}", values.get(param, 0.0), group)
+
+    def _update_body_debug(self, body, pos, dt, t, debug_cache, smooth, raw, draw_acc, energies, sleeping):
         if debug_cache['show_object_dimensions']:
             self._draw_object_dimensions(body, pos, debug_cache)
-        if debug_cache['show_trails']:
-            self._update_trail(body, pos, debug_cache)
         if debug_cache['show_center_of_mass']:
             self._draw_center_of_mass(body, pos, debug_cache)
         if debug_cache['show_colliders']:
             self._draw_colliders(body, debug_cache)
-        if debug_cache['show_sleep_state'] and body.is_sleeping:
+        if debug_cache['show_sleep_state'] and sleeping:
             self._draw_sleep_state(body, pos, debug_cache)
-        if debug_cache['show_velocity_vectors']:
-            self._draw_velocity_vector(body, pos, debug_cache)
-        if debug_cache['show_acceleration_vectors']:
-            self._draw_acceleration_vector(body, pos, dt, debug_cache)
+        if debug_cache['show_velocity_vectors'] and raw[2] > 0.01:
+            self._draw_velocity_vector(pos, smooth[0], smooth[1], smooth[2], debug_cache)
+        if debug_cache['show_acceleration_vectors'] and draw_acc:
+            self._draw_acceleration_vector(pos, smooth[3], smooth[4], smooth[5], debug_cache)
         if debug_cache['show_forces']:
             self._draw_forces(body, pos, debug_cache)
         if debug_cache['show_angular_velocity']:
@@ -277,34 +248,38 @@ class PhysicsDebugManager:
         if debug_cache['show_angular_momentum']:
             self._draw_angular_momentum(body, pos, debug_cache)
         if debug_cache['show_energy_meters']:
-            self._draw_energy_meters(body, pos, debug_cache)
+            self._draw_energy_meters(pos, *energies, debug_cache)
         if debug_cache['show_rotation_axes']:
             self._draw_rotation_axes(body, pos, debug_cache)
 
-    def _update_trail(self, body, pos, debug_cache):
-        if body not in self.trails:
-            self.trails[body] = deque(maxlen=debug_cache['trail_length'])
-        trail = self.trails[body]
-        trail.append((pos.x, pos.y))
-        if len(trail) < 2:
+    @profile("_update_trails", "physics_debug_manager")
+    def _update_trails(self, snap, debug_cache):
+        ring = self.trails
+        length = debug_cache['trail_length']
+        ring.resize(length)
+        ring.bind(snap.bodies, snap.version)
+        ring.push(snap.pos)
+        if ring.window < 2:
             return
-
+        pts = ring.ordered(slice(None))
+        # неподвижные (спящие) тела дают вырожденный след - отсекаем их целиком
+        moving = np.flatnonzero(np.ptp(pts, axis=1).max(axis=1) > 0.5)
+        if not len(moving):
+            return
+        # след прореживаем до trail_segments отрезков: тысячи тел x 50 точек не рисуем
+        k = np.unique(np.linspace(0, ring.window - 1, min(ring.window, debug_cache['trail_segments'] + 1))
+                      .round().astype(np.int64))
+        pts = pts[moving][:, k].tolist()
         color_base = config.physics_debug.velocity_color
+        style = []
+        for j in k[1:].tolist():
+            alpha = min(1.0, j / length)
+            style.append(((*color_base, int(255 * alpha)), max(1, int(3 * alpha))))
         duration = 0.1
-        scale = debug_cache['trail_length']
-        for i in range(1, len(trail)):
-            alpha = i / scale
-            color = (*color_base, int(255 * alpha))
-            thickness = max(1, int(3 * alpha))
-            Gizmos.draw_line(trail[i - 1], trail[i], color, thickness, duration=duration)
-
-    def _update_velocity_history(self, body):
-        if body not in self.velocity_history:
-            self.velocity_history[body] = []
-        history = self.velocity_history[body]
-        history.append((body.velocity.x, body.velocity.y))
-        if len(history) > 200:
-            history.pop(0)
+        for trail in pts:
+            for s in range(1, len(trail)):
+                color, thickness = style[s - 1]
+                Gizmos.draw_line(trail[s - 1], trail[s], color, thickness, duration=duration)
 
     @profile("_draw_object_dimensions", "physics_debug_manager")
     def _draw_object_dimensions(self, body, pos, debug_cache):
@@ -416,12 +391,7 @@ class PhysicsDebugManager:
                          font_size=14 * int(debug_cache['text_scale']), background_color=(0, 0, 0, 128))
 
     @profile("_draw_velocity_vector", "physics_debug_manager")
-    def _draw_velocity_vector(self, body, pos, debug_cache):
-        velocity = body.velocity
-        if velocity.length <= 0.01: return
-        speed = self._get_smoothed(body, 'speed', velocity.length) if debug_cache['smoothing'] else velocity.length
-        vx = self._get_smoothed(body, 'vx', velocity.x) if debug_cache['smoothing'] else velocity.x
-        vy = self._get_smoothed(body, 'vy', velocity.y) if debug_cache['smoothing'] else velocity.y
+    def _draw_velocity_vector(self, pos, vx, vy, speed, debug_cache):
         scale = debug_cache['vector_scale'] * 20
         origin = (pos.x, pos.y)
         vx_end = (pos.x + vx * scale, pos.y)
@@ -444,21 +414,7 @@ class PhysicsDebugManager:
                              font_size=16 * int(debug_cache['text_scale']), background_color=(0, 0, 0, 128))
 
     @profile("_draw_acceleration_vector", "physics_debug_manager")
-    def _draw_acceleration_vector(self, body, pos, dt, debug_cache):
-        current_velocity = (body.velocity.x, body.velocity.y)
-        if body not in self.previous_velocities or dt <= 0:
-            self.previous_velocities[body] = current_velocity
-            return
-        prev_vx, prev_vy = self.previous_velocities[body]
-        acc_x = (current_velocity[0] - prev_vx) / dt
-        acc_y = (current_velocity[1] - prev_vy) / dt
-        acc_mag = math.hypot(acc_x, acc_y)
-        if acc_mag <= 1.0:
-            self.previous_velocities[body] = current_velocity
-            return
-        acc_x = self._get_smoothed(body, 'acc_x', acc_x) if debug_cache['smoothing'] else acc_x
-        acc_y = self._get_smoothed(body, 'acc_y', acc_y) if debug_cache['smoothing'] else acc_y
-        acc_mag = self._get_smoothed(body, 'acc_mag', acc_mag) if debug_cache['smoothing'] else acc_mag
+    def _draw_acceleration_vector(self, pos, acc_x, acc_y, acc_mag, debug_cache):
         scale = debug_cache['vector_scale'] * 5
         end = (pos.x + acc_x * scale, pos.y + acc_y * scale)
         thickness = max(2, min(6, int(acc_mag * 0.05)))
@@ -471,7 +427,6 @@ class PhysicsDebugManager:
             label_pos = (pos.x + acc_x * scale * 0.6, pos.y + acc_y * scale * 0.6 + 15)
             Gizmos.draw_text(label_pos, f"a={acc_mag*0.01:.{pm}f}m/s² ∠{angle_deg:+.{pm}f}°", col, duration=duration,
                              font_size=16 * int(debug_cache['text_scale']), background_color=(0, 0, 0, 128))
-        self.previous_velocities[body] = current_velocity
 
     @profile("_draw_forces", "physics_debug_manager")
     def _draw_forces(self, body, pos, debug_cache):
@@ -542,11 +497,7 @@ class PhysicsDebugManager:
             Gizmos.draw_circle((pos.x, pos.y), 8, (255, 255, 255), thickness=2, duration=0.1)
 
     @profile("_draw_energy_meters", "physics_debug_manager")
-    def _draw_energy_meters(self, body, pos, debug_cache):
-        kinetic_energy = 0.5 * body.mass * (body.velocity.length ** 2)
-        rotational_energy = 0.5 * body.moment * (body.angular_velocity ** 2)
-        height = max(0, (config.app.screen_height - pos.y) * 0.001)
-        potential_energy = body.mass * self._cached_gravity_magnitude * height
+    def _draw_energy_meters(self, pos, kinetic_energy, rotational_energy, potential_energy, debug_cache):
         total_energy = kinetic_energy + rotational_energy + potential_energy
         max_energy = max(total_energy, 1)
         bar_width = 8
@@ -622,6 +573,8 @@ class PhysicsDebugManager:
 
     def clear_trails(self):
         self.trails.clear()
+        self.smoothing_history.clear()
+        self.previous_velocities.clear()
         self.velocity_history.clear()
         self.phase_space_data.clear()
         Debug.log("All debug history cleared", "PhysicsDebug")
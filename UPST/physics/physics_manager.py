@@ -1,5 +1,6 @@
 from UPST.config import config
 import math
+import time
 import pymunk
 from UPST.debug.debug_manager import Debug
 from UPST.gizmos.gizmos_manager import Gizmos, get_gizmos
@@ -8,8 +9,21 @@ from UPST.modules.profiler import profile
 from UPST.scripting.script_manager import ScriptManager
 from UPST.modules.undo_redo_manager import get_undo_redo
 from UPST.modules.statistics import stats
+from UPST.physics.body_buffer import BodyBuffer, TrackedSpace
+from UPST.physics.spatial_index import SpatialIndex
+from UPST.physics.physics_worker import PhysicsWorker
+from UPST.physics.ccd import CCDSystem
 from numba import njit, prange
 import numpy as np
+import functools
+
+
+def _serialized(method):
+    # при работе физики в отдельном потоке доступ к space идёт через очередь воркера
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.worker.call(method, self, *args, **kwargs)
+    return wrapper
 
 class PhysicsManager:
     def __init__(self, game_app, undo_redo_manager, script_manager):
@@ -18,7 +32,7 @@ class PhysicsManager:
             self.app = game_app
             self.script_manager = script_manager
             self.undo_redo_manager = undo_redo_manager
-            self.space = pymunk.Space(threaded=config.multithreading.pymunk_threaded)
+            self.space = TrackedSpace(threaded=config.multithreading.pymunk_threaded)
             # self.space.use_spatial_hash(dim=1, count=10)
             self.space.threads = config.multithreading.pymunk_threads
             self.space.iterations = int(config.physics.iterations)
@@ -35,13 +49,18 @@ class PhysicsManager:
             self.static_lines = []
             self._fixed_dt = 1.0 / max(1, self.simulation_frequency)
             self._accumulator = 0.0
-            self._ccd_bodies = set()
             self._angular_damping = 0.0
             self.air_friction = True
             self.air_friction_linear = 0.0100
             self.air_friction_quadratic = 0.00100
             self.air_friction_multiplier = 1.0
             self.air_density = 1.225
+            self.body_buffer = BodyBuffer(self.space)
+            self.spatial_index = SpatialIndex(self.space, self.body_buffer, config.physics.spatial_cell_size)
+            self.ccd = CCDSystem(self.space, config.physics.ccd_sweep_fraction)
+            self._state_stamp = 0
+            self.worker = PhysicsWorker(self)
+            self.phase_times = None
             self.theme = config.world.themes.get(config.world.current_theme, config.world.themes["Default"])
             self.simulation_time = 0.0
             self.selected_bodies = set()
@@ -53,20 +72,31 @@ class PhysicsManager:
                 Debug.log_warning(f"Theme '{self.app.world_theme}' not found, defaulting to Classic.", "Physics")
                 self.theme = config.world.themes["Default"]
             Debug.log_info(f"Physics space initialized with {self.space.threads} threads and {self.space.iterations} iterations.", "Physics")
+            if config.physics.threaded_stepping:
+                self.worker.start()
 
         except Exception as e:
             Debug.log_error(f"Failed to initialize PhysicsManager: {e}", "Physics")
 
     def select_bodies_in_rect(self, rect_world):
         self.selected_bodies.clear()
-        for shape in self.space.shapes:
-            if not hasattr(shape, 'body') or not shape.body: continue
-            pos = shape.body.position
-            if rect_world.collidepoint(pos.x, pos.y):
-                self.selected_bodies.add(shape.body)
+        for body in self.bodies_in_rect(rect_world.left, rect_world.top, rect_world.right, rect_world.bottom):
+            if body.shapes:
+                self.selected_bodies.add(body)
+
+    @_serialized
+    def bodies_in_rect(self, left, top, right, bottom):
+        self.spatial_index.refresh(self._state_stamp)
+        return self.spatial_index.query_rect(left, top, right, bottom)
+
+    @_serialized
+    def bodies_in_radius(self, center, radius):
+        self.spatial_index.refresh(self._state_stamp)
+        return self.spatial_index.query_radius(center, radius)
 
     def clear_selection(self):
         self.selected_bodies.clear()
+    @_serialized
     def weld_bodies(self, b_master, b_slave):
         if b_master is b_slave:
             return
@@ -177,64 +207,62 @@ class PhysicsManager:
         try:
             if not self.running_physics:
                 return
-            for body in self.space.bodies:
-                if hasattr(body, 'hierarchy_node'):
-                    node = body.hierarchy_node
-                    if node.parent:
-                        node._update_world_transform()
+            pt = self.phase_times
+            t0 = time.perf_counter() if pt is not None else 0.0
+            buf = self.body_buffer
+            buf.update_active()
+            for body in buf.linked_bodies:
+                body.hierarchy_node._update_world_transform()
             # for body in self.space.bodies:
             #     if hasattr(body, 'color') and body.color is not None:
             #         for shape in body.shapes:
             #             shape.color = body.color
             effective_dt = self._fixed_dt * self.simulation_speed_multiplier
             self._accumulator += max(0.0, float(dt) * self.simulation_speed_multiplier)
-            prev_pos = {b: b.position for b in self.space.bodies if b.body_type == pymunk.Body.DYNAMIC}
+            if pt is not None: t0 = self._mark_phase("hierarchy_sync", t0)
+            self.ccd.begin()
+            if pt is not None: t0 = self._mark_phase("ccd", t0)
             while self._accumulator >= effective_dt:
                 if self.air_friction:
-                    self._apply_air_friction()
+                    if config.physics.batched_air_friction:
+                        self.body_buffer.apply_air_friction(self.air_friction_linear, self.air_friction_quadratic,
+                                                            self.air_friction_multiplier, self.air_density)
+                    else:
+                        self._apply_air_friction()
+                if pt is not None: t0 = self._mark_phase("air_friction", t0)
 
                 self.space.step(effective_dt)
+                self._state_stamp += 1
+                if pt is not None: t0 = self._mark_phase("pymunk_step", t0)
                 if self._angular_damping > 0.0:
                     k = max(0.0, min(1.0, 1.0 - self._angular_damping))
-                    for b in self.space.bodies:
-                        if b.body_type == pymunk.Body.DYNAMIC:
-                            b.angular_velocity *= k
-                for b in list(self._ccd_bodies):
-                    if b not in prev_pos or b.body_type != pymunk.Body.DYNAMIC:
-                        continue
-                    start = prev_pos[b]
-                    end = pymunk.Vec2d(b.position)
-                    delta = end - start
-                    if delta.length < 1e-5:
-                        continue
-                    hit = self.space.segment_query_first(start, end, self.space.collision_slop, pymunk.ShapeFilter())
-                    if hit and hit.shape and hit.alpha < 1.0:
-                        n = hit.normal
-                        b.position = hit.point - n * (self.space.collision_slop * 1.01)
-                        e = 0.5
-                        try:
-                            e = 0.5 * (hit.shape.elasticity + sum(s.elasticity for s in b.shapes) / max(1, len(b.shapes)))
-                        except Exception:
-                            pass
-                        v = pymunk.Vec2d(b.velocity)
-                        vn = v.dot(n) * n
-                        vt = v - vn
-                        b.velocity = vt - vn * max(0.0, min(1.0, e))
-                prev_pos = {b: b.position for b in self.space.bodies if b.body_type == pymunk.Body.DYNAMIC}
+                    if config.physics.batched_air_friction:
+                        self.body_buffer.apply_angular_damping(k)
+                    else:
+                        for b in self.space.bodies:
+                            if b.body_type == pymunk.Body.DYNAMIC:
+                                b.angular_velocity *= k
+                if pt is not None: t0 = self._mark_phase("damping", t0)
+                self.ccd.resolve()
+                if pt is not None: t0 = self._mark_phase("ccd", t0)
                 self._accumulator -= effective_dt
         except Exception as e:
             Debug.log_error(f"Error in physics step: {e}", "Physics")
         self.simulation_time += effective_dt
 
+    def _mark_phase(self, name, t0):
+        t1 = time.perf_counter()
+        self.phase_times[name] = self.phase_times.get(name, 0.0) + (t1 - t0)
+        return t1
+
     def _is_in_space(self, obj):
-        if isinstance(obj, pymunk.Body):
-            return obj in self.space.bodies
-        elif isinstance(obj, pymunk.Shape):
-            return obj in self.space.shapes
+        if isinstance(obj, (pymunk.Body, pymunk.Shape)):
+            return obj.space is self.space
         elif isinstance(obj, pymunk.Constraint):
             return obj in self.space.constraints
         return False
 
+    @_serialized
     def remove_body(self, body):
         try:
             if not isinstance(body, pymunk.Body):
@@ -255,6 +283,7 @@ class PhysicsManager:
         except Exception as e:
             Debug.log_error(f"Error in remove_body: {e}", "Physics")
 
+    @_serialized
     def remove_shape_body(self, shape):
         try:
             if not isinstance(shape, pymunk.Shape):
@@ -276,6 +305,7 @@ class PhysicsManager:
                 Debug.log_info(f"Body {body.__hash__()} retained (still has active shapes).", "Physics")
         except Exception as e:
             Debug.log_error(f"Error in remove_shape_body: {e}", "Physics")
+    @_serialized
     def delete_all(self):
         try:
             Debug.log_info("Starting full physics space cleanup.", "Physics")
@@ -296,6 +326,8 @@ class PhysicsManager:
                 for s in orphaned_shapes:
                     Debug.log_info(f"Removed orphaned/static shape {s.__hash__()} (type: {type(s).__name__}).", "Physics")
             self.static_lines.clear()
+            self.body_buffer.invalidate()
+            self.spatial_index.invalidate()
 
             constraints = [c for c in self.space.constraints if self._is_in_space(c)]
             if constraints:
@@ -366,8 +398,18 @@ class PhysicsManager:
         except Exception:
             return 0.0, 1.0
 
+    def set_threaded(self, enabled: bool):
+        config.physics.threaded_stepping = bool(enabled)
+        if enabled:
+            self.worker.start()
+        else:
+            self.worker.stop()
+
     def update(self, rotation):
+        if self.worker.running:
+            return
         try:
+            self._state_stamp += 1
             self.step(1.0 / max(1, self.simulation_frequency))
         except Exception as e:
             Debug.log_error(f"Error in update: {e}", "Physics")
@@ -392,37 +434,36 @@ class PhysicsManager:
                 self.resume_physics()
             # self.undo_redo_manager.take_snapshot()
             stats.increment('paused_times', delta=1)
-            stats.save()
             Debug.log_info(f"Physics simulation {'paused' if not self.running_physics else 'unpaused'}.", "Physics")
         except Exception as e:
             Debug.log_error(f"Error in toggle_pause: {e}", "Physics")
 
+    @_serialized
     def add_body_shape(self, body, shape):
         try:
             self.space.add(body, shape)
             if not hasattr(body, 'hierarchy_node'):
                 body.hierarchy_node = HierarchyNode(name=f"Body_{id(body)}", body=body)
             stats.increment('objects_created', delta=1)
-            stats.save()
             Debug.log_info(f"Added body and shape to physics space. Body ID: {body.__hash__()}, Shape ID: {shape.__hash__()}.", "Physics")
         except Exception as e:
             Debug.log_error(f"Error in add_body_shape: {e}", "Physics")
 
+    @_serialized
     def add_static_line(self, segment):
         try:
             self.static_lines.append(segment)
             self.space.add(segment)
             stats.increment('static_created', delta=1)
-            stats.save()
             Debug.log_info(f"Added static line to physics space. Segment ID: {segment.__hash__()}.", "Physics")
         except Exception as e:
             Debug.log_error(f"Error in add_static_line: {e}", "Physics")
 
+    @_serialized
     def add_constraint(self, constraint):
         try:
             self.space.add(constraint)
             stats.increment('constraints_created', delta=1)
-            stats.save()
             Debug.log_info(f"Added constraint to physics space. Constraint ID: {constraint.__hash__()}.", "Physics")
         except Exception as e:
             Debug.log_error(f"Error in add_constraint: {e}", "Physics")
@@ -572,6 +613,7 @@ class PhysicsManager:
         except Exception as e:
             Debug.log_error(f"Error in set_gravity_mode: {e}", "Physics")
 
+    @_serialized
     def raycast(self, a: tuple, b: tuple, radius: float = 0.0, mask: pymunk.ShapeFilter = None):
         try:
             if mask is None:
@@ -581,6 +623,7 @@ class PhysicsManager:
             Debug.log_error(f"Error in raycast: {e}", "Physics")
             return None
 
+    @_serialized
     def overlap_aabb(self, bb: tuple, mask: pymunk.ShapeFilter = None):
         try:
             bb_obj = pymunk.BB(*bb)
@@ -592,6 +635,7 @@ class PhysicsManager:
             Debug.log_error(f"Error in overlap_aabb: {e}", "Physics")
             return []
 
+    @_serialized
     def shapecast(self, shape: pymunk.Shape, transform: pymunk.Transform = None):
         try:
             temp_body = pymunk.Body(body_type=pymunk.Body.KINEMATIC)
@@ -618,9 +662,9 @@ class PhysicsManager:
             if not isinstance(body, pymunk.Body):
                 return
             if enabled:
-                self._ccd_bodies.add(body)
+                self.ccd.add(body)
             else:
-                self._ccd_bodies.discard(body)
+                self.ccd.discard(body)
         except Exception as e:
             Debug.log_error(f"Error in enable_ccd: {e}", "Physics")
 
@@ -0,0 +1,159 @@
+# UPST/physics/physics_worker.py
+import time
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+from UPST.debug.debug_manager import Debug
+
+
+class PhysicsSnapshot:
+    """Read-only body transforms published after one physics tick."""
+    __slots__ = ('stamp', 'wall', 'bodies', 'index', 'pos', 'angle')
+
+    def __init__(self, stamp, wall, bodies, index, pos, angle):
+        pos.setflags(write=False)
+        angle.setflags(write=False)
+        self.stamp, self.wall, self.bodies, self.index, self.pos, self.angle = stamp, wall, bodies, index, pos, angle
+
+
+class PhysicsWorker:
+    """Steps a PhysicsManager on its own thread at simulation_frequency.
+
+    After every tick the worker publishes a PhysicsSnapshot; the last two are kept as a
+    (previous, current) pair swapped in one assignment, and `interpolated()` blends them
+    for the renderer. Everything that touches the space runs either on the worker or
+    inside `hold()` (the main thread's update phase, scripts' physics_lock()); other
+    threads go through `call()` / `submit()`, which queue the function for the next tick.
+    If a tick raises, the worker logs it, stops and runs whatever is still queued, and
+    PhysicsManager.update takes over stepping on the main thread."""
+
+    def __init__(self, physics_manager):
+        self.pm = physics_manager
+        self.lock = threading.RLock()
+        self.commands = queue.SimpleQueue()
+        self.running = False
+        self.tick_time = 0.0
+        self._buffers = (None, None)
+        self._thread = None
+        self._owner = None
+        self._depth = 0
+        self._bodies_key = None
+        self._bodies = ((), {})
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="PhysicsWorker", daemon=True)
+        self._thread.start()
+        Debug.log_info("Physics worker started.", "Physics")
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        if self._thread is not threading.current_thread():
+            self._thread.join(timeout=1.0)
+        self._thread = None
+        with self.hold():
+            self._drain()
+        self._buffers = (None, None)
+        Debug.log_info("Physics worker stopped.", "Physics")
+
+    @contextmanager
+    def hold(self):
+        with self.lock:
+            self._owner = threading.get_ident()
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if not self._depth:
+                    self._owner = None
+
+    def submit(self, fn, *args, **kwargs):
+        fut = Future()
+        self.commands.put((fut, fn, args, kwargs))
+        return fut
+
+    def call(self, fn, *args, **kwargs):
+        if self._owner == threading.get_ident() or self._thread is threading.current_thread():
+            return fn(*args, **kwargs)
+        if not self.running:
+            with self.hold():
+                return fn(*args, **kwargs)
+        fut = self.submit(fn, *args, **kwargs)
+        if not self.running:
+            # воркер остановился между проверкой и постановкой в очередь
+            with self.hold():
+                self._drain()
+        return fut.result()
+
+    def _drain(self):
+        while True:
+            try:
+                fut, fn, args, kwargs = self.commands.get_nowait()
+            except queue.Empty:
+                return
+            if not fut.set_running_or_notify_cancel():
+                continue
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                fut.set_exception(e)
+
+    def _capture(self):
+        bb = self.pm.body_buffer
+        bb.sync()
+        if self._bodies_key != bb.version:
+            bodies = tuple(bb.bodies)
+            self._bodies = (bodies, {b: i for i, b in enumerate(bodies)})
+            self._bodies_key = bb.version
+        bodies, index = self._bodies
+        return PhysicsSnapshot(self.pm._state_stamp, time.perf_counter(), bodies, index,
+                               bb.pos.copy(), bb.angle.copy())
+
+    def _run(self):
+        pm = self.pm
+        next_t = time.perf_counter()
+        while self.running:
+            dt = 1.0 / max(1, pm.simulation_frequency)
+            t0 = time.perf_counter()
+            with self.hold():
+                try:
+                    self._drain()
+                    pm._state_stamp += 1
+                    pm.step(dt)
+                    snap = self._capture()
+                except Exception:
+                    Debug.log_exception("Physics worker tick failed; stepping returns to the main thread.", "Physics")
+                    self.running = False
+                    self._buffers = (None, None)
+                    self._drain()
+                    return
+            self._buffers = (self._buffers[1], snap)
+            now = time.perf_counter()
+            self.tick_time = now - t0
+            next_t += dt
+            if now - next_t > 0.25:
+                # не догоняем бесконечно после долгого тика
+                next_t = now
+            if next_t > now:
+                time.sleep(next_t - now)
+
+    def interpolated(self):
+        """Current snapshot blended with the previous one by the time elapsed since it
+        was published; returns (bodies, index, pos, angle) or None."""
+        prev, curr = self._buffers
+        if curr is None:
+            return None
+        if prev is None or prev.bodies is not curr.bodies:
+            return curr.bodies, curr.index, curr.pos, curr.angle
+        span = curr.wall - prev.wall
+        alpha = min(1.0, max(0.0, (time.perf_counter() - curr.wall) / span)) if span > 0 else 1.0
+        pos = prev.pos + (curr.pos - prev.pos) * alpha
+        angle = prev.angle + (curr.angle - prev.angle) * alpha
+        return curr.bodies, curr.index, pos, angle
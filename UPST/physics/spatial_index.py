@@ -0,0 +1,220 @@
+# UPST/physics/spatial_index.py
+import numpy as np
+import pymunk
+from collections import defaultdict
+
+_CELL_BIAS = 1 << 31
+_CELL_LIMIT = (1 << 30) - 1
+_KINEMATIC = pymunk.Body.KINEMATIC
+# доля сдвинувшихся по ячейкам тел, начиная с которой проще пересортировать всё
+_RESORT_FRACTION = 0.125
+# раз в столько обновлений перечитываем все тела: спящие/статические могли подвинуть вручную
+_FULL_EVERY = 30
+
+
+class SpatialIndex:
+    """Uniform-grid index of body positions plus name/tag hash indices.
+
+    Cells are stored as a sorted array of packed (cx, cy) keys, so every grid
+    column covered by a query is one contiguous slice found by binary search.
+    Positions come from the shared BodyBuffer and are refreshed lazily, only
+    when the owner's state stamp or the space topology changed since the last
+    query. After a step only awake and kinematic bodies are re-read, and only
+    the ones that changed cell are moved in the sorted arrays. The name/tag maps
+    are rebuilt when the topology changes and otherwise kept up to date per body
+    by on_renamed / on_tag_added / on_tag_removed; a name that is not in the map
+    falls back to a scan, so renames made directly from scripts are still found.
+    Results keep the space.bodies order."""
+
+    def __init__(self, space, body_buffer, cell_size=100.0):
+        self.space = space
+        self.buffer = body_buffer
+        self.cell_size = max(1e-6, float(cell_size))
+        self.bodies = []
+        self._pos = np.zeros((0, 2), dtype=np.float64)
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._sorted_keys = np.zeros(0, dtype=np.int64)
+        self._order = np.zeros(0, dtype=np.int64)
+        self._kinematic = np.zeros(0, dtype=np.int64)
+        self._stamp = None
+        self._topology_version = -1
+        self._pos_version = -1
+        self._names = {}
+        self._tags = {}
+        self._row = {}
+        self._names_dirty = True
+        self.resorts = self.moves = 0
+        self._partial = 0
+
+    @property
+    def positions(self):
+        """(n, 2) body positions as of the last refresh; rows match self.bodies and the BodyBuffer rows."""
+        return self._pos
+
+    def invalidate(self):
+        self._stamp = None
+        self._names_dirty = True
+
+    def invalidate_names(self):
+        self._names_dirty = True
+
+    def refresh(self, stamp):
+        buf = self.buffer
+        buf.refresh()
+        if buf.version != self._pos_version or self._stamp is None:
+            buf.sync()
+            self._pos_version = buf.version
+            self.bodies = buf.bodies
+            self._pos = buf.pos.copy()
+            self._kinematic = np.array([i for i, b in enumerate(self.bodies) if b.body_type == _KINEMATIC],
+                                       dtype=np.int64)
+            self._resort(self._cell_keys(self._pos))
+        elif stamp != self._stamp or stamp is None:
+            self._partial += 1
+            if self._partial >= _FULL_EVERY:
+                self._partial = 0
+                self._update_moved(np.arange(len(self.bodies), dtype=np.int64))
+            else:
+                self._update_moved(np.union1d(buf.active_idx, self._kinematic))
+        self._stamp = stamp
+
+    def _resort(self, keys):
+        self._keys = keys
+        self._order = np.argsort(keys, kind="stable")
+        self._sorted_keys = keys[self._order]
+        self.resorts += 1
+
+    def _update_moved(self, idx):
+        if not len(idx):
+            return
+        pos, bodies = self._pos, self.bodies
+        for i in idx.tolist():
+            p = bodies[i].position
+            pos[i, 0] = p.x
+            pos[i, 1] = p.y
+        keys = self._cell_keys(pos[idx])
+        changed = keys != self._keys[idx]
+        moved, new_keys = idx[changed], keys[changed]
+        if not len(moved):
+            return
+        n = len(bodies)
+        if len(moved) > n * _RESORT_FRACTION:
+            self._keys[moved] = new_keys
+            self._resort(self._keys)
+            return
+        mask = np.zeros(n, dtype=np.bool_)
+        mask[moved] = True
+        keep = ~mask[self._order]
+        order, sorted_keys = self._order[keep], self._sorted_keys[keep]
+        s = np.argsort(new_keys, kind="stable")
+        at = np.searchsorted(sorted_keys, new_keys[s], side="right")
+        self._order = np.insert(order, at, moved[s])
+        self._sorted_keys = np.insert(sorted_keys, at, new_keys[s])
+        self._keys[moved] = new_keys
+        self.moves += len(moved)
+
+    def _cell_coords(self, v):
+        return np.clip(np.floor(v / self.cell_size), -_CELL_LIMIT, _CELL_LIMIT).astype(np.int64)
+
+    def _cell_keys(self, pos):
+        if pos.shape[0] == 0:
+            return np.zeros(0, dtype=np.int64)
+        cx = self._cell_coords(pos[:, 0])
+        cy = self._cell_coords(pos[:, 1])
+        return (cx << 32) + (cy + _CELL_BIAS)
+
+    def candidate_indices(self, min_x, min_y, max_x, max_y):
+        n = len(self.bodies)
+        if n == 0:
+            return np.zeros(0, dtype=np.int64)
+        c0 = self._cell_coords(np.array([min_x, min_y], dtype=np.float64))
+        c1 = self._cell_coords(np.array([max_x, max_y], dtype=np.float64))
+        if (c1[0] - c0[0] + 1) * 2 > n:
+            return np.arange(n, dtype=np.int64)
+        cols = np.arange(c0[0], c1[0] + 1, dtype=np.int64)
+        lo = np.searchsorted(self._sorted_keys, (cols << 32) + (c0[1] + _CELL_BIAS), side="left")
+        hi = np.searchsorted(self._sorted_keys, (cols << 32) + (c1[1] + _CELL_BIAS), side="right")
+        spans = [self._order[a:b] for a, b in zip(lo, hi) if b > a]
+        if not spans:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(spans)
+
+    def query_radius(self, center, radius):
+        cx, cy = float(center[0]), float(center[1])
+        r = max(0.0, float(radius))
+        idx = self.candidate_indices(cx - r, cy - r, cx + r, cy + r)
+        if idx.shape[0] == 0:
+            return []
+        d = self._pos[idx] - (cx, cy)
+        hit = idx[(d[:, 0] * d[:, 0] + d[:, 1] * d[:, 1]) <= r * r]
+        return [self.bodies[i] for i in np.sort(hit)]
+
+    def query_rect(self, left, top, right, bottom):
+        idx = self.candidate_indices(left, top, right, bottom)
+        if idx.shape[0] == 0:
+            return []
+        p = self._pos[idx]
+        hit = idx[(p[:, 0] >= left) & (p[:, 0] < right) & (p[:, 1] >= top) & (p[:, 1] < bottom)]
+        return [self.bodies[i] for i in np.sort(hit)]
+
+    def _rebuild_names(self):
+        names = defaultdict(list)
+        tags = defaultdict(set)
+        bodies = self.buffer.bodies
+        for b in bodies:
+            name = getattr(b, 'name', None)
+            if name is not None:
+                names[name].append(b)
+            for tag in getattr(b, 'tags', ()):
+                tags[tag].add(b)
+        self._names = dict(names)
+        self._tags = dict(tags)
+        self._row = {b: i for i, b in enumerate(bodies)}
+        self._names_dirty = False
+
+    def _ensure_names(self):
+        self.buffer.refresh()
+        if self.buffer.version != self._topology_version:
+            self._topology_version = self.buffer.version
+            self._names_dirty = True
+        if self._names_dirty:
+            self._rebuild_names()
+
+    def _in_order(self, bodies):
+        end = len(self._row)
+        return sorted(bodies, key=lambda b: self._row.get(b, end))
+
+    def find_by_name(self, name):
+        self._ensure_names()
+        for b in self._names.get(name, ()):
+            if getattr(b, 'name', None) == name and b.space is self.space:
+                return b
+        # имя могли сменить в обход on_renamed (например из скрипта)
+        for b in self.buffer.bodies:
+            if getattr(b, 'name', None) == name and b.space is self.space:
+                self.on_renamed(b, None)
+                return b
+        return None
+
+    def find_by_tag(self, tag):
+        self._ensure_names()
+        hits = [b for b in self._tags.get(tag, ()) if tag in getattr(b, 'tags', ()) and b.space is self.space]
+        return self._in_order(hits)
+
+    def on_renamed(self, body, old_name):
+        if self._names_dirty:
+            return
+        if old_name in self._names:
+            self._names[old_name] = [b for b in self._names[old_name] if b is not body]
+        name = getattr(body, 'name', None)
+        if name is not None and body in self._row:
+            same = [b for b in self._names.get(name, ()) if b is not body]
+            self._names[name] = self._in_order(same + [body])
+
+    def on_tag_added(self, body, tag):
+        if not self._names_dirty:
+            self._tags.setdefault(tag, set()).add(body)
+
+    def on_tag_removed(self, body, tag):
+        if not self._names_dirty and tag in self._tags:
+            self._tags[tag].discard(body)
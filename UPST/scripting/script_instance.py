@@ -1,4 +1,5 @@
 import os
+import contextlib
 import time
 import math
 import random
@@ -116,7 +117,7 @@ class ScriptInstance:
             "Gizmos": Gizmos, "Debug": Debug, "synthesizer": synthesizer, "pymunk": pymunk,
             "time": time, "math": math, "random": random, "threading": threading,
             "pygame": pygame, "self": self, "traceback": traceback, "profile": profile,
-            "thread_lock": self.thread_lock, "spawn_thread": self.spawn_thread,
+            "thread_lock": self.thread_lock, "spawn_thread": self.spawn_thread, "physics_lock": self.physics_lock,
             "log": lambda m: Debug.log_info(str(m), "UserScript"), "set_bg_fps": self.set_bg_fps,
             "threaded": make_threaded(), "np": np, "njit": njit,
             "Optional": Optional, "Any": Any, "Callable": Callable, "TypeVar": TypeVar,
@@ -194,6 +195,12 @@ class ScriptInstance:
         with self.thread_lock:
             return 1.0 / max(1.0, self._bg_fps)
 
+    def physics_lock(self):
+        """Context manager for scripts that touch bodies directly from a thread: holds the
+        space while the physics worker is running, no-op otherwise. API calls lock themselves."""
+        worker = getattr(getattr(self.app, 'physics_manager', None), 'worker', None)
+        return worker.hold() if worker is not None and worker.running else contextlib.nullcontext()
+
     def spawn_thread(self, target: Callable, *args, **kwargs) -> Optional[threading.Thread]:
         if not self.running:
             Debug.log_warning(f"Attempted to spawn thread on stopped script '{self.name}'", "Scripting")
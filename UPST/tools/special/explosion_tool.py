@@ -68,7 +68,7 @@ class ExplosionTool(BaseTool):
 
     def _trigger_explosion(self, pos):
         affected = []
-        for body in self.app.physics_manager.space.bodies:
+        for body in self.app.physics_manager.bodies_in_radius(pos, self.radius):
             if body == self.app.physics_manager.static_body or body.body_type == pymunk.Body.STATIC:
                 continue
             offset = body.position - pos
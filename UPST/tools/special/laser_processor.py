@@ -11,6 +11,7 @@ opt.EPS=1e-6;opt.ABSORB_THR=1e-3;opt.ALPHA_EPS=1e-6
 try:
     import numpy as _np
     from numba import njit as _njit
+    from UPST.tools.special.laser_trace import OpticsScene,trace_rays
     JIT_AVAILABLE=True
 except:
     _njit=lambda f:f;_np=None;JIT_AVAILABLE=False
@@ -95,25 +96,75 @@ class LaserRay:
 class LaserProcessor:
     def __init__(self,pm,max_bounce=100):
         self.pm=pm;self.max_bounce=max_bounce;self.emitters=[];self._wl_cache={}
+        self.scene=OpticsScene(pm.space) if JIT_AVAILABLE else None
     def add_emitter(self,e):self.emitters.append(e)
     def remove_emitter(self,e):
         if e in self.emitters:self.emitters.remove(e)
     def update(self):
+        if self.scene is not None and self.emitters:
+            if self.scene.space is not self.pm.space:self.scene=OpticsScene(self.pm.space)
+            self.scene.sync()
         for e in self.emitters:
             b=getattr(e,"attached_body",None)
             if b:
                 try:e.pos=b.local_to_world(e.local_off);e.angle=b.angle+e.angle_off
                 except:pass
             e.ray=self._compute_ray(e)
+    def _spectrum(self,e):
+        sp=getattr(e,"spectrum",None)
+        if sp:return sp
+        n=getattr(e,"samples",opt.N_SAMPLES)
+        mn=opt.MIN_WL;mx=opt.MAX_WL;d=(mx-mn)/(n-1)
+        return [(mn+i*d,1.0) for i in range(n)]
     @profile("Laser_compute_ray","LaserProcessor")
     def _compute_ray(self,e):
+        if self.scene is None:return self._compute_ray_scalar(e)
+        spec=self._spectrum(e);px,py=e.pos
+        key=(px,py,e.angle,e.length,tuple(spec),self.max_bounce,
+             (C_A,C_B,opt.TRANSPARENCY,opt.ABSORB_THR,opt.EPS,opt.ALPHA_EPS))
+        c=getattr(e,"_trace_cache",None)
+        if c is not None and c["key"]==key and self._cache_valid(c):
+            c["version"]=self.scene.version;return c["ray"]
+        e._trace_cache=c=self._trace(e,spec,key)
+        return c["ray"]
+    def _cache_valid(self,c):
+        # путь пересчитывается, только если сдвинулось тело, которого луч касался,
+        # или какое-то тело въехало в уже посчитанный путь
+        sc=self.scene
+        if c["topology"]!=sc.topology:return False
+        if c["version"]==sc.version:return True
+        if c["version"]!=sc.version-1:return False
+        mv=sc.moved
+        if not mv.any():return True
+        if (mv&c["touched"]).any():return False
+        pb=c["path_bb"]
+        if not pb.shape[0]:return True
+        bb=sc.shape_bb[mv];lo=pb[:,:2].min(axis=0);hi=pb[:,2:].max(axis=0)
+        bb=bb[(bb[:,0]<=hi[0])&(bb[:,2]>=lo[0])&(bb[:,1]<=hi[1])&(bb[:,3]>=lo[1])]
+        if not bb.shape[0]:return True
+        hit=((bb[:,None,0]<=pb[None,:,2])&(bb[:,None,2]>=pb[None,:,0])
+             &(bb[:,None,1]<=pb[None,:,3])&(bb[:,None,3]>=pb[None,:,1]))
+        return not hit.any()
+    def _trace(self,e,spec,key):
+        sc=self.scene;px,py=e.pos
+        wls=_np.array([w for w,_ in spec],dtype=_np.float64);inten=_np.array([i for _,i in spec],dtype=_np.float64)
+        l=wls/1000.0;nmat=C_A+C_B/(l*l)
+        lim=self.max_bounce*len(spec)
+        seg=_np.empty((lim,4),dtype=_np.float64);wi=_np.empty(lim,dtype=_np.int64);ii=_np.empty(lim,dtype=_np.float64)
+        touched=_np.zeros(sc.shape_kind.shape[0],dtype=_np.bool_)
+        n=trace_rays(sc.shape_bb,sc.shape_kind,sc.edge_start,sc.edges,sc.edge_n,sc.circles,sc.skip_mask(getattr(e,"attached_body",None)),
+                     float(px),float(py),float(e.angle),float(e.length),nmat,inten,int(self.max_bounce),
+                     float(opt.ABSORB_THR),float(opt.TRANSPARENCY),float(opt.EPS),float(opt.ALPHA_EPS),
+                     seg,wi,ii,touched)
+        seg=seg[:n];wl=wls[wi[:n]]
+        segs=[((x0,y0),(x1,y1),w,i) for (x0,y0,x1,y1),w,i in zip(seg.tolist(),wl.tolist(),ii[:n].tolist())]
+        path_bb=_np.column_stack((_np.minimum(seg[:,0],seg[:,2]),_np.minimum(seg[:,1],seg[:,3]),
+                                  _np.maximum(seg[:,0],seg[:,2]),_np.maximum(seg[:,1],seg[:,3])))
+        r=LaserRay(e.pos,e.angle,e.length);r.segments=segs
+        return {"key":key,"ray":r,"touched":touched,"path_bb":path_bb,"version":sc.version,"topology":sc.topology}
+    def _compute_ray_scalar(self,e):
         pos=e.pos;ang0=e.angle;tot=e.length;sf=pymunk.ShapeFilter()
-        sp=getattr(e,"spectrum",None)
-        if sp:spec=sp
-        else:
-            n=getattr(e,"samples",opt.N_SAMPLES)
-            mn=opt.MIN_WL;mx=opt.MAX_WL;d=(mx-mn)/(n-1)
-            spec=[(mn+i*d,1.0) for i in range(n)]
+        spec=self._spectrum(e)
         px,py=pos;segs=[];space=self.pm.space
         try:pqs=space.point_query((px,py),0,sf);inside0={id(q.shape) for q in pqs}
         except:inside0=set()
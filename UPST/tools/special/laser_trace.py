@@ -0,0 +1,362 @@
+# UPST/tools/special/laser_trace.py
+import math
+import pymunk
+import numpy as np
+from numba import njit
+
+from UPST.physics.body_buffer import geometry_version
+
+OPT_EDGES = 0
+OPT_CIRCLE = 1
+
+
+@njit(cache=True, nogil=True)
+def _ray_hits_bb(sx, sy, dx, dy, bb):
+    # slab test of the segment s + t*d, t in [0, 1]
+    t0 = 0.0
+    t1 = 1.0
+    for k in range(2):
+        o = sx if k == 0 else sy
+        d = dx if k == 0 else dy
+        lo = bb[k]
+        hi = bb[k + 2]
+        if abs(d) < 1e-12:
+            if o < lo or o > hi:
+                return False
+            continue
+        a = (lo - o) / d
+        b = (hi - o) / d
+        if a > b:
+            a, b = b, a
+        if a > t0:
+            t0 = a
+        if b < t1:
+            t1 = b
+        if t0 > t1:
+            return False
+    return True
+
+
+@njit(cache=True, nogil=True)
+def trace_rays(shape_bb, shape_kind, edge_start, edges, edge_n, circles, skip,
+               ox, oy, ang, length, nmat, inten, max_bounce, thr, transparency, eps, alpha_eps,
+               out_seg, out_wl, out_i, touched):
+    """Trace all wavelength samples of one emitter. Returns the number of segments
+    written to out_seg (x0, y0, x1, y1) / out_wl (sample index) / out_i (intensity).
+    Shapes flagged in `skip` (the emitter's own mount) are ignored by the primary rays."""
+    nw = nmat.shape[0]
+    lim = max_bounce * nw
+    cap = nw + 2 * lim
+    st = np.empty((cap, 7), dtype=np.float64)
+    sp = 0
+    for w in range(nw):
+        if inten[w] > thr:
+            st[sp, 0] = ox
+            st[sp, 1] = oy
+            st[sp, 2] = ang
+            st[sp, 3] = length
+            st[sp, 4] = w
+            st[sp, 5] = inten[w]
+            st[sp, 6] = 1.0
+            sp += 1
+    n_out = 0
+    it = 0
+    ns = shape_kind.shape[0]
+    while sp > 0 and it < lim:
+        it += 1
+        sp -= 1
+        sx = st[sp, 0]
+        sy = st[sp, 1]
+        a = st[sp, 2]
+        rem = st[sp, 3]
+        w = int(st[sp, 4])
+        intn = st[sp, 5]
+        primary = st[sp, 6] > 0.0
+        if rem <= 0.0 or intn <= thr:
+            continue
+        ca = math.cos(a)
+        sa = math.sin(a)
+        dx = ca * rem
+        dy = sa * rem
+        best = 2.0
+        best_s = -1
+        bnx = 0.0
+        bny = 0.0
+        for s in range(ns):
+            if primary and skip[s]:
+                continue
+            if not _ray_hits_bb(sx, sy, dx, dy, shape_bb[s]):
+                continue
+            if shape_kind[s] == OPT_CIRCLE:
+                cx = circles[s, 0]
+                cy = circles[s, 1]
+                r = circles[s, 2]
+                fx = sx - cx
+                fy = sy - cy
+                qa = dx * dx + dy * dy
+                qb = 2.0 * (fx * dx + fy * dy)
+                qc = fx * fx + fy * fy - r * r
+                disc = qb * qb - 4.0 * qa * qc
+                if disc < 0.0 or qa <= 0.0:
+                    continue
+                sq = math.sqrt(disc)
+                for t in ((-qb - sq) / (2.0 * qa), (-qb + sq) / (2.0 * qa)):
+                    if alpha_eps < t < best:
+                        best = t
+                        best_s = s
+                        bnx = (fx + dx * t) / r
+                        bny = (fy + dy * t) / r
+                        break
+            else:
+                for e in range(edge_start[s], edge_start[s + 1]):
+                    ax = edges[e, 0]
+                    ay = edges[e, 1]
+                    ex = edges[e, 2] - ax
+                    ey = edges[e, 3] - ay
+                    den = dx * ey - dy * ex
+                    if abs(den) < 1e-12:
+                        continue
+                    qx = ax - sx
+                    qy = ay - sy
+                    t = (qx * ey - qy * ex) / den
+                    if t <= alpha_eps or t >= best:
+                        continue
+                    u = (qx * dy - qy * dx) / den
+                    if u < 0.0 or u > 1.0:
+                        continue
+                    best = t
+                    best_s = s
+                    bnx = edge_n[e, 0]
+                    bny = edge_n[e, 1]
+                    if bnx == 0.0 and bny == 0.0:
+                        # двусторонний отрезок: нормаль всегда навстречу лучу
+                        el = math.hypot(ex, ey)
+                        bnx = ey / el
+                        bny = -ex / el
+                        if bnx * ca + bny * sa > 0.0:
+                            bnx = -bnx
+                            bny = -bny
+        if best_s < 0:
+            out_seg[n_out, 0] = sx
+            out_seg[n_out, 1] = sy
+            out_seg[n_out, 2] = sx + dx
+            out_seg[n_out, 3] = sy + dy
+            out_wl[n_out] = w
+            out_i[n_out] = intn
+            n_out += 1
+            continue
+        hx = sx + dx * best
+        hy = sy + dy * best
+        out_seg[n_out, 0] = sx
+        out_seg[n_out, 1] = sy
+        out_seg[n_out, 2] = hx
+        out_seg[n_out, 3] = hy
+        out_wl[n_out] = w
+        out_i[n_out] = intn
+        n_out += 1
+        touched[best_s] = True
+        rem2 = rem * (1.0 - best)
+        if rem2 <= 0.0:
+            continue
+        # нормаль наружу: луч входит, если идёт против неё
+        entering = bnx * ca + bny * sa <= 0.0
+        if not entering:
+            bnx = -bnx
+            bny = -bny
+        n1 = 1.0 if entering else nmat[w]
+        n2 = nmat[w] if entering else 1.0
+        refl = intn * (1.0 - transparency)
+        trans = intn * transparency
+        if refl > thr:
+            d = ca * bnx + sa * bny
+            rx = ca - 2.0 * d * bnx
+            ry = sa - 2.0 * d * bny
+            st[sp, 0] = hx + rx * eps
+            st[sp, 1] = hy + ry * eps
+            st[sp, 2] = math.atan2(ry, rx)
+            st[sp, 3] = rem2
+            st[sp, 4] = w
+            st[sp, 5] = refl
+            st[sp, 6] = 0.0
+            sp += 1
+        if trans > thr:
+            d = -(ca * bnx + sa * bny)
+            ratio = n1 / n2
+            k = 1.0 - ratio * ratio * (1.0 - d * d)
+            if k >= 0.0:
+                sq = math.sqrt(k)
+                tx = ratio * ca + (ratio * d - sq) * bnx
+                ty = ratio * sa + (ratio * d - sq) * bny
+                st[sp, 0] = hx + tx * eps
+                st[sp, 1] = hy + ty * eps
+                st[sp, 2] = math.atan2(ty, tx)
+                st[sp, 3] = rem2
+                st[sp, 4] = w
+                st[sp, 5] = trans
+                st[sp, 6] = 0.0
+                sp += 1
+    return n_out
+
+
+class OpticsScene:
+    """World-space optics geometry of every shape in the space, as arrays for trace_rays.
+
+    Polys become edge loops with outward normals, thick segments become boxes, circles
+    are kept analytic. Body poses are gathered once per sync; geometry is re-transformed
+    and `version` bumped only when something moved, with `moved` marking the shapes that
+    changed since the previous version (consumed by per-emitter cache invalidation)."""
+
+    def __init__(self, space):
+        self.space = space
+        self.version = 0
+        self.topology = 0
+        self._shapes = None
+        self._key = None
+        self._build([])
+
+    def invalidate(self):
+        self._shapes = None
+
+    def _build(self, shapes):
+        bodies, body_idx = [], {}
+        owner, kind, edge_start, local_edges, local_n, local_circ = [], [], [0], [], [], []
+        for shape in shapes:
+            body = shape.body
+            if body is None:
+                continue
+            if isinstance(shape, pymunk.Circle):
+                k = OPT_CIRCLE
+                local_circ.append((*shape.offset, shape.radius))
+            elif isinstance(shape, pymunk.Poly):
+                verts = [tuple(v) for v in shape.get_vertices()]
+                if len(verts) < 2:
+                    continue
+                k = OPT_EDGES
+                local_circ.append((0.0, 0.0, 0.0))
+                cx = sum(v[0] for v in verts) / len(verts)
+                cy = sum(v[1] for v in verts) / len(verts)
+                for i, (ax, ay) in enumerate(verts):
+                    bx, by = verts[(i + 1) % len(verts)]
+                    local_edges.append((ax, ay, bx, by))
+                    local_n.append(_outward(ax, ay, bx, by, cx, cy))
+            elif isinstance(shape, pymunk.Segment):
+                k = OPT_EDGES
+                local_circ.append((0.0, 0.0, 0.0))
+                (ax, ay), (bx, by), r = shape.a, shape.b, shape.radius
+                ln = math.hypot(bx - ax, by - ay)
+                if r <= 0.0 or ln <= 0.0:
+                    local_edges.append((ax, ay, bx, by))
+                    local_n.append((0.0, 0.0))
+                else:
+                    ux, uy = (bx - ax) / ln, (by - ay) / ln
+                    px, py = -uy * r, ux * r
+                    box = [(ax - ux * r + px, ay - uy * r + py), (bx + ux * r + px, by + uy * r + py),
+                           (bx + ux * r - px, by + uy * r - py), (ax - ux * r - px, ay - uy * r - py)]
+                    cx, cy = (ax + bx) / 2, (ay + by) / 2
+                    for i, (x0, y0) in enumerate(box):
+                        x1, y1 = box[(i + 1) % 4]
+                        local_edges.append((x0, y0, x1, y1))
+                        local_n.append(_outward(x0, y0, x1, y1, cx, cy))
+            else:
+                continue
+            i = body_idx.get(body)
+            if i is None:
+                i = body_idx[body] = len(bodies)
+                bodies.append(body)
+            owner.append(i)
+            kind.append(k)
+            edge_start.append(len(local_edges))
+        self._shapes = list(shapes)
+        self.bodies = bodies
+        self._body_idx = body_idx
+        self.owner = np.array(owner, dtype=np.int64)
+        self.shape_kind = np.array(kind, dtype=np.int64)
+        self.edge_start = np.array(edge_start, dtype=np.int64)
+        self._local_edges = np.array(local_edges, dtype=np.float64).reshape(-1, 4)
+        self._local_n = np.array(local_n, dtype=np.float64).reshape(-1, 2)
+        self._local_circ = np.array(local_circ, dtype=np.float64).reshape(-1, 3)
+        self._edge_owner = np.repeat(self.owner, np.diff(self.edge_start))
+        n = len(kind)
+        self.edges = np.zeros((self._local_edges.shape[0], 4), dtype=np.float64)
+        self.edge_n = np.zeros((self._local_n.shape[0], 2), dtype=np.float64)
+        self.circles = np.zeros((n, 3), dtype=np.float64)
+        self.shape_bb = np.zeros((n, 4), dtype=np.float64)
+        self.moved = np.ones(n, dtype=np.bool_)
+        self._pose = None
+        self.topology += 1
+
+    def skip_mask(self, body):
+        mask = np.zeros(self.shape_kind.shape[0], dtype=np.bool_)
+        i = self._body_idx.get(body) if body is not None else None
+        if i is not None:
+            mask[self.owner == i] = True
+        return mask
+
+    def sync(self):
+        space = self.space
+        # счётчик add/remove у TrackedSpace; у обычного pymunk.Space сравниваем списки
+        key = (getattr(space, 'topology', None), geometry_version())
+        if (self._shapes is None or key != self._key
+                or (key[0] is None and list(space.shapes) != self._shapes)):
+            self._build(space.shapes)
+            self._key = key
+        n = len(self.bodies)
+        pose = np.empty((n, 3), dtype=np.float64)
+        for i, b in enumerate(self.bodies):
+            p = b.position
+            pose[i, 0] = p.x
+            pose[i, 1] = p.y
+            pose[i, 2] = b.angle
+        if self._pose is not None and np.array_equal(pose, self._pose):
+            return
+        body_moved = np.ones(n, dtype=np.bool_) if self._pose is None else (pose != self._pose).any(axis=1)
+        self._pose = pose
+        self._transform(pose)
+        self.moved = body_moved[self.owner] if n else np.zeros(0, dtype=np.bool_)
+        self.version += 1
+
+    def _transform(self, pose):
+        c, s = np.cos(pose[:, 2]), np.sin(pose[:, 2])
+        if self._local_edges.shape[0]:
+            o = self._edge_owner
+            oc, os_, px, py = c[o], s[o], pose[o, 0], pose[o, 1]
+            le, ln = self._local_edges, self._local_n
+            self.edges[:, 0] = px + le[:, 0] * oc - le[:, 1] * os_
+            self.edges[:, 1] = py + le[:, 0] * os_ + le[:, 1] * oc
+            self.edges[:, 2] = px + le[:, 2] * oc - le[:, 3] * os_
+            self.edges[:, 3] = py + le[:, 2] * os_ + le[:, 3] * oc
+            self.edge_n[:, 0] = ln[:, 0] * oc - ln[:, 1] * os_
+            self.edge_n[:, 1] = ln[:, 0] * os_ + ln[:, 1] * oc
+        if self.shape_kind.shape[0]:
+            o = self.owner
+            lc = self._local_circ
+            self.circles[:, 0] = pose[o, 0] + lc[:, 0] * c[o] - lc[:, 1] * s[o]
+            self.circles[:, 1] = pose[o, 1] + lc[:, 0] * s[o] + lc[:, 1] * c[o]
+            self.circles[:, 2] = lc[:, 2]
+            bb = self.shape_bb
+            circ = self.shape_kind == OPT_CIRCLE
+            bb[:, 0] = self.circles[:, 0] - self.circles[:, 2]
+            bb[:, 1] = self.circles[:, 1] - self.circles[:, 2]
+            bb[:, 2] = self.circles[:, 0] + self.circles[:, 2]
+            bb[:, 3] = self.circles[:, 1] + self.circles[:, 2]
+            starts = self.edge_start[:-1][~circ]
+            if starts.shape[0] and self.edges.shape[0]:
+                xs = np.minimum(self.edges[:, 0], self.edges[:, 2])
+                ys = np.minimum(self.edges[:, 1], self.edges[:, 3])
+                xe = np.maximum(self.edges[:, 0], self.edges[:, 2])
+                ye = np.maximum(self.edges[:, 1], self.edges[:, 3])
+                bb[~circ, 0] = np.minimum.reduceat(xs, starts)
+                bb[~circ, 1] = np.minimum.reduceat(ys, starts)
+                bb[~circ, 2] = np.maximum.reduceat(xe, starts)
+                bb[~circ, 3] = np.maximum.reduceat(ye, starts)
+
+
+def _outward(ax, ay, bx, by, cx, cy):
+    ex, ey = bx - ax, by - ay
+    ln = math.hypot(ex, ey)
+    if ln <= 0.0:
+        return 0.0, 0.0
+    nx, ny = ey / ln, -ex / ln
+    if nx * ((ax + bx) / 2 - cx) + ny * ((ay + by) / 2 - cy) < 0.0:
+        nx, ny = -nx, -ny
+    return nx, ny
@@ -0,0 +1,171 @@
+# UPST/utils/blob_store.py
+# Content-addressed storage for heavy payloads (texture pixels, script source).
+# Body/script records carry a digest ("texture_blob" / "code_blob") instead of the
+# payload itself, so a texture shared by many bodies or many snapshots is kept once.
+import hashlib
+
+from UPST.utils.utils import surface_to_bytes
+
+
+def blob_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class BlobStore:
+    def __init__(self):
+        self.blobs = {}
+        self.nbytes = 0
+        self._surfaces = {}
+
+    def __len__(self):
+        return len(self.blobs)
+
+    def __contains__(self, key):
+        return key in self.blobs
+
+    def put(self, data) -> str:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        key = blob_digest(data)
+        if key not in self.blobs:
+            self.blobs[key] = data
+            self.nbytes += len(data)
+        return key
+
+    def get(self, key):
+        return self.blobs.get(key)
+
+    def get_text(self, key):
+        data = self.blobs.get(key)
+        return data.decode("utf-8") if data is not None else None
+
+    def put_surface(self, surf):
+        # поверхности из кэша рендерера не меняются, поэтому пиксели снимаем один раз
+        hit = self._surfaces.get(id(surf))
+        if hit is not None and hit[0] is surf and hit[1] in self.blobs:
+            return hit[1]
+        key = self.put(surface_to_bytes(surf))
+        self._surfaces[id(surf)] = (surf, key)
+        return key
+
+    def update(self, blobs: dict):
+        for key, data in blobs.items():
+            if key not in self.blobs:
+                self.blobs[key] = data
+                self.nbytes += len(data)
+
+    def subset(self, keys) -> dict:
+        return {k: self.blobs[k] for k in keys if k in self.blobs}
+
+    def retain(self, keys):
+        keys = set(keys)
+        for k in [k for k in self.blobs if k not in keys]:
+            self.nbytes -= len(self.blobs.pop(k))
+        self._surfaces = {i: v for i, v in self._surfaces.items() if v[1] in keys}
+
+    def clear(self):
+        self.blobs.clear()
+        self._surfaces.clear()
+        self.nbytes = 0
+
+
+def _script_records(scripts):
+    if not isinstance(scripts, dict):
+        return []
+    return list(scripts.get("object_scripts", [])) + list(scripts.get("world_scripts", []))
+
+
+def externalize(data: dict, store: BlobStore) -> dict:
+    """Copy of `data` with inline texture_bytes / script code moved into `store`.
+    `data` itself and records without payloads are shared, not copied."""
+    out = dict(data)
+    if data.get("bodies"):
+        bodies = []
+        for bd in data["bodies"]:
+            if bd.get("texture_bytes") is not None:
+                bd = dict(bd)
+                bd["texture_blob"] = store.put(bd.pop("texture_bytes"))
+            bodies.append(bd)
+        out["bodies"] = bodies
+    if isinstance(data.get("scripts"), dict):
+        out["scripts"] = externalize_scripts(data["scripts"], store)
+    return out
+
+
+def externalize_scripts(scripts: dict, store: BlobStore) -> dict:
+    """ScriptManager.serialize_for_save() output with code moved into `store`."""
+    out = dict(scripts)
+    for k in ("object_scripts", "world_scripts"):
+        if k in scripts:
+            recs = []
+            for rec in scripts[k]:
+                if rec.get("code") is not None:
+                    rec = dict(rec)
+                    rec["code_blob"] = store.put(rec.pop("code"))
+                recs.append(rec)
+            out[k] = recs
+    return out
+
+
+def internalize(data: dict, store: BlobStore) -> dict:
+    """Copy of `data` with digests resolved back to inline payloads. `data` itself
+    and records without digests are shared, not copied."""
+    bodies = data.get("bodies")
+    scripts = data.get("scripts")
+    needs_bodies = bodies is not None and any("texture_blob" in bd for bd in bodies)
+    needs_scripts = any("code_blob" in rec for rec in _script_records(scripts))
+    if not needs_bodies and not needs_scripts:
+        return data
+    out = dict(data)
+    if needs_bodies:
+        resolved = []
+        for bd in bodies:
+            if "texture_blob" in bd:
+                bd = dict(bd)
+                bd["texture_bytes"] = store.get(bd.pop("texture_blob"))
+            resolved.append(bd)
+        out["bodies"] = resolved
+    if needs_scripts:
+        texts = {}
+
+        def resolve(rec):
+            if "code_blob" not in rec:
+                return rec
+            rec = dict(rec)
+            key = rec.pop("code_blob")
+            if key not in texts:
+                texts[key] = store.get_text(key)
+            rec["code"] = texts[key]
+            return rec
+
+        out["scripts"] = dict(scripts)
+        for k in ("object_scripts", "world_scripts"):
+            if k in scripts:
+                out["scripts"][k] = [resolve(rec) for rec in scripts[k]]
+    return out
+
+
+def referenced_blobs(bodies, scripts=None) -> set:
+    refs = {bd["texture_blob"] for bd in bodies if bd.get("texture_blob")}
+    refs.update(rec["code_blob"] for rec in _script_records(scripts) if rec.get("code_blob"))
+    return refs
+
+
+def pack_save_data(data: dict) -> dict:
+    """Self-contained save dict: payloads deduplicated into data['blobs']."""
+    store = BlobStore()
+    packed = externalize(data, store)
+    packed["blobs"] = store.blobs
+    return packed
+
+
+def unpack_save_data(data: dict) -> dict:
+    if "blobs" not in data:
+        return data
+    store = BlobStore()
+    store.update(data["blobs"])
+    out = internalize(data, store)
+    if out is data:
+        out = dict(data)
+    out.pop("blobs", None)
+    return out
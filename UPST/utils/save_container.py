@@ -0,0 +1,198 @@
+# UPST/utils/save_container.py
+# Chunked save container:
+#
+#   b"UPSTSAVE" | u16 version | u32 header length | header (JSON) | section payloads
+#
+# The header lists every section with its codec, encoding, offset and length, plus a
+# small "meta" dict, so metadata and the preview thumbnail are read without touching
+# the world. Structured sections are pickles restricted to plain data types
+# (SafeUnpickler), blobs are raw bytes, the preview is a PNG.
+import gzip
+import io
+import json
+import lzma
+import os
+import pickle
+import struct
+import zlib
+
+MAGIC = b"UPSTSAVE"
+VERSION = 1
+_PREFIX = struct.Struct("<8sHI")
+
+CODECS = {
+    "none": (lambda b: b, lambda b: b),
+    "zlib": (lambda b: zlib.compress(b, 6), zlib.decompress),
+    "gzip": (lambda b: gzip.compress(b, 6), gzip.decompress),
+    "lzma": (lzma.compress, lzma.decompress),
+}
+
+# top-level keys of the save dict grouped into sections; everything else goes to "world"
+SECTION_KEYS = {
+    "bodies": ("bodies",),
+    "constraints": ("constraints", "static_lines"),
+    "scripts": ("scripts",),
+    "plugins": ("plugins", "plugin_configs", "plugin_states"),
+}
+BLOB_PREFIX = "blob/"
+PREVIEW = "preview"
+
+_SAFE_GLOBALS = {
+    ("pymunk.vec2d", "Vec2d"),
+    # pygame регистрирует через copyreg свои конструкторы, Color пишется как pygame.__color_constructor
+    ("pygame", "__color_constructor"),
+    ("pygame", "__rect_constructor"),
+    ("pygame.color", "Color"),
+    ("pygame.rect", "Rect"),
+    # массивы и скаляры numpy (numpy 1.x: numpy.core, 2.x: numpy._core)
+    ("numpy", "dtype"),
+    ("numpy", "ndarray"),
+    ("numpy.core.multiarray", "_reconstruct"),
+    ("numpy.core.multiarray", "scalar"),
+    ("numpy._core.multiarray", "_reconstruct"),
+    ("numpy._core.multiarray", "scalar"),
+    ("builtins", "set"),
+    ("builtins", "frozenset"),
+    ("builtins", "bytearray"),
+    ("builtins", "complex"),
+    ("collections", "OrderedDict"),
+}
+
+
+class UnsafeSaveData(pickle.UnpicklingError):
+    pass
+
+
+class SafeUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if (module, name) in _SAFE_GLOBALS:
+            return super().find_class(module, name)
+        raise UnsafeSaveData(f"Save data references forbidden global {module}.{name}")
+
+
+def safe_loads(data: bytes):
+    return SafeUnpickler(io.BytesIO(data)).load()
+
+
+def is_container(fp) -> bool:
+    with open(fp, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def read_save_info(fp):
+    """(meta, preview PNG bytes or None) from the header and the preview section only;
+    the world and the other sections are not read. Legacy saves give ({}, None)."""
+    if not is_container(fp):
+        return {}, None
+    container = SaveContainer(fp)
+    return container.meta, container.read_preview_png()
+
+
+def write_container(fp, data: dict, codec: str = "lzma", meta: dict = None, preview_png: bytes = None):
+    """Write a save dict (as produced by pack_save_data) to `fp` atomically."""
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+    compress = CODECS[codec][0]
+    data = dict(data)
+    blobs = data.pop("blobs", {}) or {}
+    payloads = []
+    for name, keys in SECTION_KEYS.items():
+        part = {k: data.pop(k) for k in keys if k in data}
+        if part:
+            payloads.append((name, codec, "pickle", pickle.dumps(part, protocol=4)))
+    payloads.insert(0, ("world", codec, "pickle", pickle.dumps(data, protocol=4)))
+    for key, blob in blobs.items():
+        payloads.append((BLOB_PREFIX + key, codec, "raw", bytes(blob)))
+    if preview_png:
+        payloads.append((PREVIEW, "none", "png", preview_png))
+
+    sections, chunks, offset = [], [], 0
+    for name, c, encoding, raw in payloads:
+        packed = compress(raw) if c != "none" else raw
+        sections.append({"name": name, "codec": c, "encoding": encoding, "offset": offset,
+                         "length": len(packed), "raw_length": len(raw), "crc32": zlib.crc32(packed)})
+        chunks.append(packed)
+        offset += len(packed)
+    header = json.dumps({"version": VERSION, "meta": meta or {}, "sections": sections},
+                        separators=(",", ":")).encode("utf-8")
+    tmp = f"{fp}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp, fp)
+
+
+class SaveContainer:
+    """Random-access reader. Sections are read and inflated only when requested."""
+
+    def __init__(self, fp):
+        self.path = fp
+        with open(fp, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) != _PREFIX.size:
+                raise ValueError("Truncated save header")
+            magic, version, header_len = _PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError("Not a UPST save container")
+            if version > VERSION:
+                raise ValueError(f"Save container version {version} is newer than supported {VERSION}")
+            header = json.loads(f.read(header_len).decode("utf-8"))
+        self.version = version
+        self.meta = header.get("meta", {})
+        self.sections = {s["name"]: s for s in header.get("sections", [])}
+        self._data_start = _PREFIX.size + header_len
+        self.errors = {}
+
+    def has(self, name) -> bool:
+        return name in self.sections
+
+    def blob_keys(self):
+        return [n[len(BLOB_PREFIX):] for n in self.sections if n.startswith(BLOB_PREFIX)]
+
+    def read_raw(self, name) -> bytes:
+        s = self.sections[name]
+        if s["codec"] not in CODECS:
+            raise ValueError(f"Section '{name}' uses unknown codec {s['codec']}")
+        with open(self.path, "rb") as f:
+            f.seek(self._data_start + s["offset"])
+            packed = f.read(s["length"])
+        if len(packed) != s["length"] or zlib.crc32(packed) != s.get("crc32", zlib.crc32(packed)):
+            raise ValueError(f"Section '{name}' is corrupted")
+        return CODECS[s["codec"]][1](packed)
+
+    def read_section(self, name):
+        s = self.sections[name]
+        raw = self.read_raw(name)
+        if s["encoding"] == "pickle":
+            return safe_loads(raw)
+        return raw
+
+    def read_blob(self, key) -> bytes:
+        return self.read_raw(BLOB_PREFIX + key)
+
+    def read_preview_png(self):
+        return self.read_raw(PREVIEW) if PREVIEW in self.sections else None
+
+    def load(self, sections=None) -> dict:
+        """Merge the requested structured sections (all by default) into one save dict;
+        blobs go to data['blobs'] as in pack_save_data output. A section that is corrupted
+        or references a forbidden global is skipped and recorded in self.errors."""
+        names = sections or [n for n, s in self.sections.items() if s["encoding"] == "pickle"]
+        data = {}
+        self.errors = {}
+        for name in names:
+            if name in self.sections:
+                try:
+                    data.update(self.read_section(name))
+                except Exception as e:
+                    self.errors[name] = e
+        if sections is None or "blobs" in sections:
+            blobs = data["blobs"] = {}
+            for k in self.blob_keys():
+                try:
+                    blobs[k] = self.read_blob(k)
+                except Exception as e:
+                    self.errors[BLOB_PREFIX + k] = e
+        return data
@@ -1,7 +1,13 @@
+import gzip
+import lzma
+import pickle
 import pymunk
 import uuid
 from typing import List, Dict, Any, Tuple
 
+from UPST.config import config
+from UPST.debug.debug_manager import Debug
+from UPST.utils.save_container import SaveContainer, SafeUnpickler, is_container
 from UPST.utils.utils import surface_to_bytes
 
 
@@ -111,4 +117,114 @@ def deserialize_static_line(data: Dict[str, Any], static_body: pymunk.Body) -> p
     line.friction = float(data.get('friction', 0.5))
     line.elasticity = float(data.get('elasticity', 0.0))
     line.color = tuple(data.get('color', (200, 200, 200, 255)))
-    return line
\ No newline at end of file
+    return line
+
+
+def restore_physics_settings(physics_manager, data: Dict[str, Any]):
+    physics_manager.set_iterations(int(data.get("iterations",config.physics.iterations)))
+    physics_manager.set_simulation_frequency(int(data.get("sim_freq",config.physics.simulation_frequency)))
+    physics_manager.space.gravity = tuple(data.get("gravity",(0.0,900.0)))
+    physics_manager.set_damping(float(data.get("damping_linear",1.0)),float(data.get("damping_angular",0.0)))
+    physics_manager.set_sleep_time_threshold(float(data.get("sleep_time_threshold",config.physics.sleep_time_threshold)))
+    physics_manager.set_collision_slop(float(data.get("collision_slop",0.5)))
+    physics_manager.set_collision_bias(float(data.get("collision_bias",pow(1.0-0.1,60.0))))
+
+    physics_manager.set_air_friction_linear(int(data.get("air_friction_linear",config.physics.air_friction_linear)))
+    physics_manager.set_air_friction_quadratic(int(data.get("air_friction_quadratic",config.physics.air_friction_quadratic)))
+    physics_manager.set_air_friction_multiplier(int(data.get("air_friction_multiplier",config.physics.air_friction_multiplier)))
+    physics_manager.set_air_density(int(data.get("air_density",config.physics.air_density)))
+
+def restore_bodies(physics_manager, data: Dict[str, Any]) -> Tuple[List[pymunk.Body], Dict[uuid.UUID, pymunk.Body]]:
+    loaded_bodies = []
+    body_uuid_map = {}
+    for bd in data.get("bodies", []):
+        body_type = int(bd.get("body_type", int(pymunk.Body.DYNAMIC)))
+        bt = pymunk.Body(body_type=body_type)
+        if '_script_uuid' in bd and bd['_script_uuid']:
+            try:
+                bt._script_uuid = uuid.UUID(bd['_script_uuid'])
+            except:
+                bt._script_uuid = uuid.uuid4()
+        else:
+            bt._script_uuid = uuid.uuid4()
+        body_uuid_map[bt._script_uuid] = bt
+        if bt.body_type == pymunk.Body.DYNAMIC:
+            bt.mass = float(bd.get("mass",1.0))
+            bt.moment = float(bd.get("moment",1.0))
+        bt.name = bd.get("name",None)
+        bt.color = bd.get("color",(255,255,255,255))
+        bt.position = pymunk.Vec2d(*bd.get("position",(0.0,0.0)))
+        bt.angle = float(bd.get("angle",0.0))
+        bt.velocity = pymunk.Vec2d(*bd.get("velocity",(0.0,0.0)))
+        bt.angular_velocity = float(bd.get("angular_velocity",0.0))
+        bt.texture_path = bd.get("texture_path")
+        bt.texture_bytes = bd.get("texture_bytes")
+        bt.texture_size = bd.get("texture_size")
+        bt.texture_scale = float(bd.get("texture_scale",1.0))
+        bt.stretch_texture = bool(bd.get("stretch_texture",True))
+        shapes = []
+        for sd in bd.get("shapes",[]):
+            st = sd.get("type","")
+            shp = None
+            if st == "Circle": shp = pymunk.Circle(bt,float(sd["radius"]),tuple(sd.get("offset",(0.0,0.0))))
+            elif st == "Poly": shp = pymunk.Poly(bt,[pymunk.Vec2d(*v) for v in sd["vertices"]])
+            elif st == "Segment": shp = pymunk.Segment(bt,pymunk.Vec2d(*sd["a"]),pymunk.Vec2d(*sd["b"]),float(sd["radius"]))
+            if shp:
+                shp.friction = float(sd.get("friction",0.5))
+                shp.elasticity = float(sd.get("elasticity",0.0))
+                shp.color = tuple(sd.get("color",(200,200,200,255)))
+                shapes.append(shp)
+        if shapes: physics_manager.space.add(bt,*shapes)
+        else: physics_manager.space.add(bt)
+        loaded_bodies.append(bt)
+    return loaded_bodies, body_uuid_map
+
+def restore_constraints(physics_manager, data: Dict[str, Any], loaded_bodies: List[pymunk.Body]):
+    for cd in data.get("constraints",[]):
+        a = loaded_bodies[cd["a"]]; b = loaded_bodies[cd["b"]]; ctype = cd["type"]; c = None
+        if ctype == "PinJoint": c = pymunk.PinJoint(a,b,cd["anchor_a"],cd["anchor_b"])
+        elif ctype == "PivotJoint": c = pymunk.PivotJoint(a,b,cd["anchor"])
+        elif ctype == "DampedSpring":
+            c = pymunk.DampedSpring(a, b, cd["anchor_a"], cd["anchor_b"], float(cd["rest_length"]),
+                                    float(cd["stiffness"]), float(cd["damping"]))
+            if "size" in cd:
+                c.size = float(cd["size"])
+            if "color" in cd:
+                c.color = tuple(cd["color"])
+        elif ctype == "SimpleMotor": c = pymunk.SimpleMotor(a,b,float(cd["rate"]))
+        elif ctype == "GearJoint": c = pymunk.GearJoint(a,b,float(cd["phase"]),float(cd["ratio"]))
+        elif ctype == "SlideJoint": c = pymunk.SlideJoint(a,b,cd["anchor_a"],cd["anchor_b"],float(cd["min"]),float(cd["max"]))
+        elif ctype == "RotaryLimitJoint": c = pymunk.RotaryLimitJoint(a,b,float(cd["min"]),float(cd["max"]))
+        if c: physics_manager.add_constraint(c)
+
+def restore_static_lines(physics_manager, data: Dict[str, Any]):
+    for ld in data.get("static_lines",[]):
+        line = None
+        if ld.get("type") == "Poly": line = pymunk.Poly(physics_manager.static_body,[pymunk.Vec2d(*v) for v in ld["vertices"]])
+        elif ld.get("type") == "Segment": line = pymunk.Segment(physics_manager.static_body,pymunk.Vec2d(*ld["a"]),pymunk.Vec2d(*ld["b"]),float(ld["radius"]))
+        if line:
+            line.friction = float(ld.get("friction",0.5))
+            line.elasticity = float(ld.get("elasticity",0.0))
+            line.color = tuple(ld.get("color",(200,200,200,255)))
+            physics_manager.static_lines.append(line)
+            physics_manager.space.add(line)
+
+def read_save_file(fp, safe=False):
+    """Load a save as a dict. Chunked containers are parsed without unpickling arbitrary
+    objects; legacy single-pickle saves are unpickled fully unless `safe` is set."""
+    if is_container(fp):
+        container = SaveContainer(fp)
+        data = container.load()
+        for name, e in container.errors.items():
+            Debug.log_warning(f"Skipped save section '{name}' of {fp}: {e}", "SaveLoadManager")
+        return data
+    with open(fp, "rb") as f:
+        head = f.read(6)
+    if head.startswith(b"\xfd7zXZ"): opener = lzma.open
+    elif head.startswith(b"\x1f\x8b"): opener = gzip.open
+    else: opener = open
+    try:
+        with opener(fp, "rb") as f:
+            return SafeUnpickler(f).load() if safe else pickle.load(f)
+    except (lzma.LZMAError, gzip.BadGzipFile, EOFError) as e:
+        raise Exception(f"Unable to load save file: {e}")
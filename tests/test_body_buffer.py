@@ -0,0 +1,97 @@
+import types
+from types import SimpleNamespace
+
+import pytest
+
+pymunk = pytest.importorskip("pymunk")
+np = pytest.importorskip("numpy")
+pytest.importorskip("numba")
+pytest.importorskip("pygame")
+
+from UPST.physics.body_buffer import BodyBuffer, TrackedSpace
+from UPST.physics.physics_manager import PhysicsManager
+
+AIR = dict(lin_k=0.01, quad_k=0.02, mult=1.5, rho=1.2)
+
+
+def _scene(space_cls=TrackedSpace):
+    space = space_cls()
+    space.gravity = (0, 0)
+    ball = pymunk.Body(2.0, pymunk.moment_for_circle(2.0, 0, 5.0, (1.0, 2.0)))
+    ball.position, ball.velocity, ball.angular_velocity = (10, 20), (30, -4), 1.5
+    box = pymunk.Body(3.0, 50.0)
+    box.position, box.angle, box.velocity, box.angular_velocity = (-5, 7), 0.3, (-12, 9), -0.7
+    rod = pymunk.Body(1.0, 20.0)
+    rod.position, rod.velocity, rod.angular_velocity = (40, -3), (5, 15), 2.0
+    wall = pymunk.Body(body_type=pymunk.Body.STATIC)
+    space.add(ball, pymunk.Circle(ball, 5.0, (1.0, 2.0)),
+              box, pymunk.Poly(box, [(-4, -3), (5, -2), (3, 4), (-2, 5)]),
+              rod, pymunk.Segment(rod, (-6, 1), (7, -2), 0.5),
+              wall, pymunk.Segment(wall, (-100, -50), (100, -50), 1.0))
+    return space
+
+
+def _forces(space):
+    return {id(b): (b.force.x, b.force.y, b.torque) for b in space.bodies}
+
+
+def test_sync_without_topology_change_does_not_rebuild():
+    space = _scene()
+    buf = BodyBuffer(space)
+    buf.sync()
+    version = buf.version
+    space.step(1 / 60)
+    buf.sync()
+    buf.sync(active_only=True)
+    assert buf.version == version
+
+    extra = pymunk.Body(1.0, 1.0)
+    space.add(extra, pymunk.Circle(extra, 1.0))
+    buf.sync()
+    assert buf.version == version + 1 and extra in buf.bodies
+
+
+def test_plain_space_is_not_rebuilt_every_sync():
+    space = _scene(pymunk.Space)
+    buf = BodyBuffer(space)
+    buf.sync()
+    version = buf.version
+    buf.sync()
+    assert buf.version == version
+
+
+def test_active_set_is_reused_across_steps():
+    space = _scene()
+    buf = BodyBuffer(space)
+    first = buf.update_active()
+    version = buf.version
+    for _ in range(3):
+        space.step(1 / 60)
+        active = buf.update_active()
+        assert buf.version == version
+        assert np.array_equal(active, first)
+        assert len(buf.woke) == 0 and len(buf.slept) == 0
+
+
+def test_body_type_change_in_place_rebuilds():
+    space = _scene()
+    buf = BodyBuffer(space)
+    buf.sync()
+    version = buf.version
+    next(b for b in space.bodies if b.body_type == pymunk.Body.DYNAMIC).body_type = pymunk.Body.KINEMATIC
+    buf.sync()
+    assert buf.version == version + 1
+
+
+def test_batched_air_friction_matches_per_body_path():
+    scalar_space, batched_space = _scene(), _scene()
+    pm = SimpleNamespace(space=scalar_space, air_friction_linear=AIR["lin_k"], air_friction_quadratic=AIR["quad_k"],
+                         air_friction_multiplier=AIR["mult"], air_density=AIR["rho"])
+    pm._shape_proj_area_and_cd = types.MethodType(PhysicsManager._shape_proj_area_and_cd, pm)
+    PhysicsManager._apply_air_friction(pm)
+    BodyBuffer(batched_space).apply_air_friction(**AIR)
+
+    expected = list(_forces(scalar_space).values())
+    got = list(_forces(batched_space).values())
+    assert np.allclose(got, expected, rtol=1e-9, atol=1e-9)
+    assert any(abs(v) > 1e-6 for f in expected for v in f)
@@ -0,0 +1,104 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+pymunk = pytest.importorskip("pymunk")
+np = pytest.importorskip("numpy")
+pytest.importorskip("numba")
+pytest.importorskip("pygame")
+
+from UPST.physics.body_buffer import BodyBuffer, TrackedSpace
+from UPST.physics.force_field_kernels import (FIELD_ATTRACTION, FIELD_REPULSION, FIELD_VORTEX, FIELD_WIND,
+                                              FIELD_FREEZE, falloff, FALLOFF_MODES)
+from UPST.physics.force_field_manager import ForceFieldManager
+from UPST.physics.spatial_index import SpatialIndex
+
+CENTER = (0.0, 0.0)
+RADIUS, STRENGTH = 150.0, 2.5
+
+
+def _scene():
+    space = TrackedSpace()
+    for i, (x, y) in enumerate([(10, 5), (-40, 80), (120, -30), (0, 0), (400, 10), (-90, -100)]):
+        b = pymunk.Body(1.0 + i, 10.0)
+        b.position, b.velocity = (x, y), (3.0, -1.0)
+        space.add(b, pymunk.Circle(b, 4.0))
+    wall = pymunk.Body(body_type=pymunk.Body.STATIC)
+    wall.position = (20, 20)
+    space.add(wall, pymunk.Circle(wall, 4.0))
+    return space
+
+
+def _manager(space, mode):
+    buf = BodyBuffer(space)
+    pm = SimpleNamespace(space=space, body_buffer=buf, spatial_index=SpatialIndex(space, buf, cell_size=50.0),
+                         _state_stamp=0, running_physics=True)
+    ff = ForceFieldManager(pm, camera=None)
+    ff.set_radius(RADIUS)
+    ff.set_strength(STRENGTH)
+    ff.set_falloff_mode(mode)
+    return ff
+
+
+def _per_body(space, fields, mode):
+    # поштучный путь, как в ForceFieldManager до пакетного ядра
+    px, py = CENTER
+    m = FALLOFF_MODES[mode]
+    for body in space.bodies:
+        if body.body_type != pymunk.Body.DYNAMIC:
+            continue
+        x, y = body.position
+        if fields & FIELD_ATTRACTION:
+            dx, dy = px - x, py - y
+            dist = math.hypot(dx, dy)
+            if dist <= RADIUS:
+                k = falloff(dist, RADIUS, m)
+                body.apply_force_at_world_point(((dx / (dist + 1e-6)) * STRENGTH * k,
+                                                 (dy / (dist + 1e-6)) * STRENGTH * k), body.position)
+        if fields & FIELD_REPULSION:
+            dx, dy = x - px, y - py
+            dist = math.hypot(dx, dy)
+            if 0 < dist <= RADIUS:
+                k = falloff(dist, RADIUS, m)
+                body.apply_force_at_world_point(((dx / (dist + 1e-6)) * STRENGTH * 3000 * k,
+                                                 (dy / (dist + 1e-6)) * STRENGTH * 3000 * k), body.position)
+        if fields & FIELD_FREEZE and pymunk.Vec2d(x - px, y - py).length <= RADIUS:
+            body.velocity = (0, 0)
+            body.angular_velocity = 0
+        if fields & FIELD_WIND:
+            body.apply_force_at_world_point((STRENGTH * 0.2, 0.0), body.position)
+        if fields & FIELD_VORTEX:
+            r = pymunk.Vec2d(x - px, y - py)
+            dist = r.length
+            if 0 < dist <= RADIUS:
+                f = r.perpendicular_normal() * (STRENGTH * falloff(dist, RADIUS, m) / max(1.0, dist))
+                body.apply_force_at_world_point(f, body.position)
+
+
+def _state(space):
+    return np.array([(b.force.x, b.force.y, b.velocity.x, b.velocity.y) for b in space.bodies])
+
+
+@pytest.mark.parametrize("mode", ["linear", "inv", "inv2"])
+@pytest.mark.parametrize("fields", [FIELD_ATTRACTION, FIELD_REPULSION, FIELD_VORTEX, FIELD_WIND, FIELD_FREEZE,
+                                    FIELD_ATTRACTION | FIELD_VORTEX | FIELD_WIND])
+def test_batched_fields_match_per_body_path(fields, mode):
+    expected, batched = _scene(), _scene()
+    _per_body(expected, fields, mode)
+    _manager(batched, mode).apply_fields(fields, CENTER)
+    assert np.allclose(_state(batched), _state(expected), rtol=1e-9, atol=1e-9)
+
+
+def test_fields_see_bodies_moved_since_the_last_refresh():
+    expected, batched = _scene(), _scene()
+    ff = _manager(batched, "inv2")
+    ff.apply_fields(FIELD_ATTRACTION, CENTER)
+    for space in (expected, batched):
+        for b in space.bodies:
+            if b.body_type == pymunk.Body.DYNAMIC:
+                b.force, b.position = (0, 0), b.position + (30, -20)
+    ff.physics_manager._state_stamp += 1
+    ff.apply_fields(FIELD_ATTRACTION, CENTER)
+    _per_body(expected, FIELD_ATTRACTION, "inv2")
+    assert np.allclose(_state(batched), _state(expected), rtol=1e-9, atol=1e-9)
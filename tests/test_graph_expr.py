@@ -0,0 +1,63 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from UPST.modules import graph_expr
+from UPST.modules.graph_expr import GraphExpr, MATH_NAMES
+
+REAL = ["sin(x) * x ** 2", "sqrt(x)", "log(x, 2)", "1 / x", "x ** 0.5", "x // 0.7", "x % 1.3",
+        "x if x > 0 else -x", "(x > 1) + (x < -1)", "hypot(x, 2 * x)", "atan2(x, 1) - floor(x)",
+        "factorial(3) * x", "gamma(x)", "exp(-x * x / 2) * cos(3 * x)"]
+XS = np.linspace(-3.0, 3.0, 601)
+
+
+def _eval_per_sample(source, **arrays):
+    # поштучный eval, как считали графики до GraphExpr
+    code = compile(source, "<graph>", "eval")
+    env = {**MATH_NAMES, "__builtins__": {}}
+    n = len(next(iter(arrays.values())))
+    out = []
+    for i in range(n):
+        try:
+            v = eval(code, env, {k: float(a[i]) for k, a in arrays.items()})
+        except Exception:
+            v = None
+        out.append(float(v) if isinstance(v, (int, float)) else math.nan)
+    return np.array(out)
+
+
+def _assert_same_plot(got, expected, rtol=1e-12):
+    # графики отбрасывают всё, что не isfinite
+    finite = np.isfinite(expected)
+    assert np.array_equal(np.isfinite(got), finite)
+    assert np.allclose(got[finite], expected[finite], rtol=rtol, atol=1e-12)
+
+
+@pytest.mark.parametrize("source", REAL)
+def test_vectorized_matches_eval(source):
+    _assert_same_plot(GraphExpr(source).evaluate_real(x=XS), _eval_per_sample(source, x=XS))
+
+
+@pytest.mark.parametrize("source", [s for s in REAL if GraphExpr(s).vectorized])
+def test_jit_matches_eval(source, monkeypatch):
+    pytest.importorskip("numba")
+    monkeypatch.setattr(graph_expr, "JIT_MIN_SAMPLES", 1)
+    # libm в numba и math расходятся в последних битах
+    _assert_same_plot(GraphExpr(source).evaluate(x=XS), _eval_per_sample(source, x=XS), rtol=1e-9)
+
+
+def test_jit_kernel_is_used_for_math_expressions(monkeypatch):
+    pytest.importorskip("numba")
+    monkeypatch.setattr(graph_expr, "JIT_MIN_SAMPLES", 1)
+    expr = GraphExpr("exp(-x * x / 2) * cos(3 * x)")
+    expr.evaluate(x=XS)
+    assert not expr._jit_failed
+
+
+def test_complex_expression_matches_eval():
+    zs = XS[::20] + 1j * XS[::-20]
+    code = compile("z.conjugate() * z + z ** 2", "<graph>", "eval")
+    expected = np.array([eval(code, {**MATH_NAMES, "__builtins__": {}}, {"z": complex(z)}) for z in zs])
+    assert np.allclose(GraphExpr("z.conjugate() * z + z ** 2").evaluate(z=zs), expected)
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+import pytest
+
+pymunk = pytest.importorskip("pymunk")
+pytest.importorskip("numpy")
+pytest.importorskip("numba")
+pytest.importorskip("pygame")
+
+from UPST.physics.body_buffer import TrackedSpace
+from UPST.tools.special.laser_processor import LaserProcessor, JIT_AVAILABLE
+
+
+def _setup():
+    space = TrackedSpace()
+    block = pymunk.Body(body_type=pymunk.Body.STATIC)
+    block.position = (100, 0)
+    space.add(block, pymunk.Poly.create_box(block, (20, 40)))
+    proc = LaserProcessor(SimpleNamespace(space=space), max_bounce=8)
+    emitter = SimpleNamespace(pos=(0.0, 0.0), angle=0.0, length=500.0, samples=3, attached_body=None)
+    proc.add_emitter(emitter)
+    return space, proc, emitter
+
+
+@pytest.mark.skipif(not JIT_AVAILABLE, reason="numba optics path unavailable")
+def test_unchanged_scene_reuses_cached_path():
+    space, proc, emitter = _setup()
+    proc.update()
+    cache, topology = emitter._trace_cache, proc.scene.topology
+    assert emitter.ray.segments
+    for _ in range(3):
+        proc.update()
+        assert proc.scene.topology == topology
+        assert emitter._trace_cache is cache
+
+    other = pymunk.Body(body_type=pymunk.Body.STATIC)
+    other.position = (0, 300)
+    space.add(other, pymunk.Circle(other, 5))
+    proc.update()
+    assert proc.scene.topology == topology + 1
+    assert emitter._trace_cache is not cache
@@ -0,0 +1,130 @@
+import math
+from collections import deque
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pygame")
+
+from UPST.gui.plotter import Plotter, SeriesBuffer
+
+
+class _PerSample:
+    """Scalar analysis of the list-based plotter, kept as the reference."""
+    enable_osc_analysis = True
+
+    def _median(self, arr):
+        a = sorted(arr)
+        m = len(a) // 2
+        return (a[m] if len(a) % 2 == 1 else 0.5 * (a[m - 1] + a[m])) if a else 0.0
+
+    def _dt_median(self, xs):
+        return self._median([abs(xs[i + 1] - xs[i]) for i in range(len(xs) - 1)]) if len(xs) > 1 else 1.0
+
+    def find_extrema(self, ys):
+        peaks, troughs = [], []
+        for i in range(1, len(ys) - 1):
+            window = ys[max(0, i - 2):min(len(ys), i + 3)]
+            if ys[i] == max(window) and ys[i] > ys[i - 1] and ys[i] > ys[i + 1]:
+                peaks.append((i, ys[i] - max(ys[i - 1], ys[i + 1])))
+            elif ys[i] == min(window) and ys[i] < ys[i - 1] and ys[i] < ys[i + 1]:
+                troughs.append((i, min(ys[i - 1], ys[i + 1]) - ys[i]))
+        return peaks, troughs
+
+    def zero_crossings(self, ys, xs):
+        out = []
+        for i in range(1, len(ys)):
+            y0, y1 = ys[i - 1], ys[i]
+            if y0 * y1 < 0:
+                out.append(xs[i - 1] + abs(y0) / (abs(y0) + abs(y1)) * (xs[i] - xs[i - 1]))
+        return out
+
+    def frequency_components(self, ys, xs):
+        N = len(ys)
+        scale = 0.001 if self._dt_median(xs) > 1.0 else 1.0
+        Fs = N / ((xs[-1] - xs[0]) * scale)
+        mean_y = sum(ys) / N
+        w = [0.5 - 0.5 * math.cos(2 * math.pi * i / (N - 1)) for i in range(N)]
+        ys_w = [(ys[i] - mean_y) * w[i] for i in range(N)]
+        comps = []
+        for k in range(1, min(N // 2, 32)):
+            re = sum(ys_w[n] * math.cos(2 * math.pi * k * n / N) for n in range(N))
+            im = -sum(ys_w[n] * math.sin(2 * math.pi * k * n / N) for n in range(N))
+            mag = math.hypot(re, im) / N
+            if mag > 1e-9: comps.append((mag, k * Fs / N))
+        mags = [m for m, _ in comps]
+        maxm, medm = max(mags), self._median(mags)
+        return [(m, f) for m, f in comps[:5] if m > 1e-6 and (m > 0.2 * maxm or m > medm * 2)][:2]
+
+    def autocorr_period(self, xs, ys):
+        n = len(ys)
+        mean_y = sum(ys) / n
+        y = [v - mean_y for v in ys]
+        max_lag = min(n // 4, 64)
+        den = sum(v * v for v in y) + 1e-12
+        ac = [0.0] + [sum(y[i] * y[i + lag] for i in range(n - lag)) / den for lag in range(1, max_lag + 1)]
+        mx = max(ac[1:])
+        if mx <= 0.05: return float('inf'), mx
+        peak_lag = next((i for i in range(2, len(ac) - 1)
+                         if ac[i] > ac[i - 1] and ac[i] >= ac[i + 1] and ac[i] > 0.3 * mx), 1 + ac[1:].index(mx))
+        dt_med = self._dt_median(xs)
+        return peak_lag * dt_med * (0.001 if dt_med > 1.0 else 1.0), mx
+
+    def amplitude_and_decay(self, ys, xs):
+        pks, tr = self.find_extrema([y - sum(ys) / len(ys) for y in ys])
+        ext = sorted((i, abs(ys[i]), xs[i]) for i, _ in pks + tr)
+        scale = 0.001 if self._dt_median(xs) > 1.0 else 1.0
+        tvals = [t * scale for _, _, t in ext]
+        amps = [a for _, a, _ in ext if a > 1e-9]
+        lnamps = [math.log(a) for a in amps]
+        n = len(lnamps)
+        t = tvals[:n]
+        sumx, sumy = sum(t), sum(lnamps)
+        sumxy, sumx2 = sum(a * b for a, b in zip(t, lnamps)), sum(a * a for a in t)
+        b = (n * sumxy - sumx * sumy) / (n * sumx2 - sumx * sumx)
+        return sum(amps) / len(amps), (-b if b < 0 else 0.0)
+
+
+def _series(n=300, capacity=120):
+    buf, xs_ref, ys_ref = SeriesBuffer(capacity), deque(maxlen=capacity), deque(maxlen=capacity)
+    for i in range(n):
+        x = i * 16.6
+        y = 3.0 * math.exp(-x / 4000.0) * math.sin(x / 40.0) + 0.4 * math.sin(x / 11.0) + 0.25
+        buf.append(x, y)
+        xs_ref.append(x)
+        ys_ref.append(y)
+    return buf, list(xs_ref), list(ys_ref)
+
+
+def _plotter():
+    p = Plotter.__new__(Plotter)
+    p.enable_osc_analysis = True
+    return p
+
+
+def test_ring_buffer_matches_bounded_deque():
+    buf, xs, ys = _series()
+    bx, by = buf.arrays()
+    assert bx.tolist() == xs and by.tolist() == ys and buf.last() == ys[-1]
+    buf.resize(50)
+    bx, by = buf.arrays()
+    assert bx.tolist() == xs[-50:] and by.tolist() == ys[-50:]
+
+
+def test_analysis_matches_per_sample_path():
+    buf, xs, ys = _series()
+    p, ref = _plotter(), _PerSample()
+    bx, by = buf.arrays()
+    yc = by - by.mean()
+    yc_l = [v - sum(ys) / len(ys) for v in ys]
+
+    peaks, troughs = p._find_extrema(yc)
+    ref_peaks, ref_troughs = ref.find_extrema(yc_l)
+    assert [i for i, _ in peaks] == [i for i, _ in ref_peaks] and len(peaks) > 2
+    assert [i for i, _ in troughs] == [i for i, _ in ref_troughs]
+    assert np.allclose([v for _, v in peaks + troughs], [v for _, v in ref_peaks + ref_troughs])
+
+    assert np.allclose(p._detect_zero_crossings(yc, bx), ref.zero_crossings(yc_l, xs))
+    assert np.allclose(p._detect_frequency_components(yc, bx), ref.frequency_components(yc_l, xs))
+    assert np.allclose(p._autocorr_period(bx, yc), ref.autocorr_period(xs, yc_l))
+    assert np.allclose(p._estimate_amplitude_and_decay(yc, bx), ref.amplitude_and_decay(yc_l, xs))
@@ -0,0 +1,26 @@
+from UPST.utils import save_container
+from UPST.utils.save_container import SaveContainer, read_save_info, write_container
+
+
+def test_save_info_does_not_decompress_the_world(tmp_path, monkeypatch):
+    fp = tmp_path / "world.space"
+    write_container(str(fp), {"gravity": (0.0, 900.0), "bodies": [{"name": "a"}] * 100},
+                    codec="lzma", meta={"title": "demo", "body_count": 100}, preview_png=b"\x89PNG-preview")
+    inflated = []
+    decompress = save_container.CODECS["lzma"][1]
+    monkeypatch.setitem(save_container.CODECS, "lzma",
+                        (save_container.CODECS["lzma"][0], lambda b: inflated.append(b) or decompress(b)))
+
+    meta, png = read_save_info(str(fp))
+    assert meta == {"title": "demo", "body_count": 100}
+    assert png == b"\x89PNG-preview"
+    assert inflated == []
+
+    SaveContainer(str(fp)).read_section("world")
+    assert len(inflated) == 1
+
+
+def test_save_info_of_legacy_save_is_empty(tmp_path):
+    fp = tmp_path / "old.space"
+    fp.write_bytes(b"\x80\x04legacy pickle")
+    assert read_save_info(str(fp)) == ({}, None)
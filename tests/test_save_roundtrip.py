@@ -0,0 +1,77 @@
+import pickle
+from types import SimpleNamespace
+
+import pytest
+
+pygame = pytest.importorskip("pygame")
+pymunk = pytest.importorskip("pymunk")
+
+from UPST.gizmos import gizmos_manager
+from UPST.gizmos.gizmos_manager import GizmoData, GizmoType
+from UPST.modules.save_load_manager import SaveLoadManager
+from UPST.utils.blob_store import BlobStore, pack_save_data, unpack_save_data
+from UPST.utils.save_container import SaveContainer, UnsafeSaveData, safe_loads, write_container
+from UPST.utils.serialization import read_save_file
+
+
+def _manager(space):
+    pm = SimpleNamespace(space=space, static_body=space.static_body, static_lines=[],
+                         air_friction_linear=0.0, air_friction_quadratic=0.0, air_friction_multiplier=1.0,
+                         air_density=1.0, simulation_frequency=60,
+                         script_manager=SimpleNamespace(serialize_for_save=lambda: {}), app=SimpleNamespace())
+    mgr = SaveLoadManager.__new__(SaveLoadManager)
+    mgr.physics_manager = pm
+    mgr.camera = SimpleNamespace(translation=pymunk.Transform(), scaling=1.0)
+    mgr.app = SimpleNamespace()
+    mgr.blobs = BlobStore()
+    return mgr
+
+
+@pytest.fixture
+def labels():
+    store = SimpleNamespace(gizmos=[], persistent_gizmos=[])
+    prev = gizmos_manager.get_gizmos()
+    gizmos_manager.set_gizmos(store)
+    yield store
+    gizmos_manager.set_gizmos(prev)
+
+
+def test_tool_colors_survive_save_and_load(tmp_path, labels):
+    space = pymunk.Space()
+    body = pymunk.Body(1.0, 10.0)
+    circle = pymunk.Circle(body, 5.0)
+    circle.color = pygame.Color(10, 20, 30, 255)  # как CircleTool._get_color
+    space.add(body, circle)
+    labels.persistent_gizmos.append(GizmoData(gizmo_type=GizmoType.TEXT, position=(1.0, 2.0), text="hi",
+                                              color=pygame.Color(255, 255, 255),
+                                              background_color=pygame.Color(0, 0, 0, 128)))
+
+    data = _manager(space)._prepare_save_data()
+    fp = tmp_path / "world.ngsv"
+    write_container(str(fp), pack_save_data(data), codec="zlib")
+    loaded = unpack_save_data(read_save_file(str(fp)))
+
+    assert loaded["bodies"][0]["shapes"][0]["color"] == (10, 20, 30, 255)
+    label = loaded["text_gizmos"][0]
+    assert label["color"] == (255, 255, 255, 255)
+    assert label["background_color"] == (0, 0, 0, 128)
+
+
+def test_pygame_color_is_allowed_by_safe_unpickler():
+    assert tuple(safe_loads(pickle.dumps({"c": pygame.Color(1, 2, 3, 4)}))["c"]) == (1, 2, 3, 4)
+
+
+def test_numpy_values_are_allowed_by_safe_unpickler():
+    np = pytest.importorskip("numpy")
+    data = safe_loads(pickle.dumps({"a": np.arange(4, dtype=np.float64), "s": np.float32(1.5)}, protocol=4))
+    assert np.array_equal(data["a"], [0.0, 1.0, 2.0, 3.0]) and data["s"] == np.float32(1.5)
+
+
+def test_bad_section_is_skipped_instead_of_aborting_load(tmp_path):
+    fp = tmp_path / "world.ngsv"
+    write_container(str(fp), {"gravity": (0.0, 900.0), "bodies": [{"name": "a"}],
+                              "scripts": {"object_scripts": [SimpleNamespace()]}}, codec="zlib")
+    container = SaveContainer(str(fp))
+    data = container.load()
+    assert data["gravity"] == (0.0, 900.0) and data["bodies"] == [{"name": "a"}]
+    assert "scripts" not in data and isinstance(container.errors["scripts"], UnsafeSaveData)
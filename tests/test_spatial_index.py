@@ -0,0 +1,50 @@
+import pytest
+
+pymunk = pytest.importorskip("pymunk")
+pytest.importorskip("numpy")
+pytest.importorskip("numba")
+pytest.importorskip("pygame")
+
+from UPST.physics.body_buffer import BodyBuffer, TrackedSpace
+from UPST.physics.spatial_index import SpatialIndex
+
+
+def _index(n=6):
+    space = TrackedSpace()
+    for i in range(n):
+        b = pymunk.Body(1.0, 1.0)
+        b.position, b.name, b.tags = (i * 30.0, 0.0), f"b{i}", {"even"} if i % 2 == 0 else set()
+        space.add(b, pymunk.Circle(b, 2.0))
+    return space, SpatialIndex(space, BodyBuffer(space))
+
+
+def test_body_labels_are_plain_attributes():
+    assert "name" not in vars(pymunk.Body) and "tags" not in vars(pymunk.Body)
+
+
+def test_find_by_tag_keeps_space_order():
+    space, index = _index()
+    bodies = list(space.bodies)
+    for b in reversed(bodies[1::2]):
+        b.tags.add("even")
+        index.on_tag_added(b, "even")
+    assert index.find_by_tag("even") == bodies
+    bodies[2].tags.discard("even")
+    index.on_tag_removed(bodies[2], "even")
+    assert index.find_by_tag("even") == [b for i, b in enumerate(bodies) if i != 2]
+
+
+def test_renames_are_tracked_per_body():
+    space, index = _index()
+    bodies = list(space.bodies)
+    assert index.find_by_name("b3") is bodies[3]
+    version = index._topology_version
+    bodies[3].name = "hero"
+    index.on_renamed(bodies[3], "b3")
+    assert index.find_by_name("hero") is bodies[3] and index.find_by_name("b3") is None
+    # переименование в обход on_renamed находится сканированием
+    bodies[4].name = "b0"
+    assert index.find_by_name("b0") is bodies[0]
+    bodies[0].name = "x"
+    assert index.find_by_name("b0") is bodies[4]
+    assert index._topology_version == version